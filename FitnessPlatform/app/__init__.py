@@ -3,21 +3,59 @@
 """
 
 import os
-from flask import Flask
+import importlib
+from flask import Flask, request, render_template, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, current_user
-from flask_migrate import Migrate
-from flask_mail import Mail
-from flask_cors import CORS
+from sqlalchemy import event
+from sqlalchemy.orm import Mapper
 import logging
 from logging.handlers import RotatingFileHandler
 from datetime import datetime
 
+from app.utils.replicas import RoutingSession, replicas
+
 # Инициализация расширений
-db = SQLAlchemy()
-migrate = Migrate()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+migrate = None  # Flask-Migrate (alembic) подключается только для команд flask, см. init_migrations
 login_manager = LoginManager()
-mail = Mail()
+
+from app.utils.settings_cache import settings_cache
+
+# Blueprints: (имя, модуль, префикс URL). Набор регистрируемых задается
+# APP_BLUEPRINTS — например, процессу только с JSON API не нужны формы и шаблоны
+BLUEPRINTS = (
+    ('main', 'app.routes.main', None),
+    ('auth', 'app.routes.auth', '/auth'),
+    ('trainings', 'app.routes.trainings', '/trainings'),
+    ('progress', 'app.routes.progress', '/progress'),
+    ('api', 'app.routes.api', '/api'),
+)
+
+def _created_by_cli():
+    """Приложение создается командой flask (flask db, flask run и т.п.)"""
+    import click
+    return click.get_current_context(silent=True) is not None
+
+def init_migrations(app):
+    """Flask-Migrate (команды flask db); alembic импортируется только здесь"""
+    global migrate
+    from flask_migrate import Migrate
+    
+    if migrate is None:
+        # SQLite не умеет ALTER COLUMN и ограничения — такие ревизии пересоздают таблицу (batch).
+        # Каталог миграций — рядом с пакетом app, независимо от текущей директории
+        migrate = Migrate(render_as_batch=True,
+                          directory=os.path.join(os.path.dirname(app.root_path), 'migrations'))
+    migrate.init_app(app, db)
+
+def _register_model_events():
+    """Слушатели событий моделей (вызывается SQLAlchemy перед настройкой мапперов)"""
+    from app.utils import notifications, notification_templates, moderation, moderation_queue
+    notifications.register_listeners()
+    notification_templates.register_listeners()
+    moderation.register_listeners()  # счетчик тренировок на проверке
+    moderation_queue.register_listeners()  # новые отзывы, комментарии и жалобы — в очередь модерации
 
 def create_app(config_class):
     """Фабрика создания приложения"""
@@ -25,11 +63,20 @@ def create_app(config_class):
     app.config.from_object(config_class)
     
     # Инициализация расширений с приложением
+    from app.utils import sqlite_profile
+    replicas.init_app(app)
+    sqlite_profile.init_app(app)  # до db.init_app: меняет параметры движка
     db.init_app(app)
-    migrate.init_app(app, db)
+    if app.config.get('MIGRATIONS_ENABLED') or _created_by_cli():
+        init_migrations(app)
     login_manager.init_app(app)
-    mail.init_app(app)
-    CORS(app)
+    settings_cache.init_app(app)
+    
+    # События моделей (счетчики непрочитанных и тренировок на проверке, очередь
+    # модерации, кэш шаблонов уведомлений) регистрируются при первой настройке
+    # мапперов — модели и эти модули не загружаются, пока к базе не обратились
+    if not event.contains(Mapper, 'before_configured', _register_model_events):
+        event.listen(Mapper, 'before_configured', _register_model_events)
     
     # Настройка логирования
     if not app.debug:
@@ -56,21 +103,42 @@ def create_app(config_class):
     @login_manager.unauthorized_handler
     def unauthorized():
         from flask import flash, redirect, url_for
+        
+        # Без страницы входа (процесс только с API) — ответ в JSON
+        if 'auth' not in app.blueprints:
+            return jsonify({'error': 'Требуется авторизация'}), 401
+        
         flash('Пожалуйста, войдите в систему для доступа к этой странице.', 'warning')
         return redirect(url_for('auth.login'))
     
+    # Режим обслуживания (настройка читается из кэша, без запросов к БД)
+    @app.before_request
+    def check_maintenance_mode():
+        if not settings_cache.get('maintenance_mode', False):
+            return None
+        
+        if request.endpoint in ('static', 'auth.login', 'auth.logout'):
+            return None
+        
+        if current_user.is_authenticated and current_user.role == 'admin':
+            return None
+        
+        return render_template('errors/503.html'), 503
+    
     # Контекстные процессоры
     @app.context_processor
     def inject_current_year():
         return {'current_year': datetime.now().year}
     
     from app.utils.helpers import get_pending_trainings_count
+    from app.utils.idempotency import new_key as idempotency_key
 
     @app.context_processor
     def inject_helpers():
         """Добавляет вспомогательные функции в контекст Jinja2"""
         return {
             'get_pending_trainings_count': get_pending_trainings_count,
+            'idempotency_key': idempotency_key,
         }
     
     @app.context_processor
@@ -80,7 +148,7 @@ def create_app(config_class):
         
         if current_user.is_authenticated:
             try:
-                from app.models import TrainingRegistration, Notification
+                from app.models import TrainingRegistration
                 
                 # Используем локальную переменную current_user
                 stats = {
@@ -92,10 +160,7 @@ def create_app(config_class):
                         user_id=current_user.id,
                         status='attended'
                     ).count(),
-                    'unread_notifications': Notification.query.filter_by(
-                        user_id=current_user.id,
-                        is_read=False
-                    ).count()
+                    'unread_notifications': current_user.get_unread_notifications_count()
                 }
                 return {'user_stats': stats}
             except Exception as e:
@@ -127,32 +192,29 @@ def create_app(config_class):
         return "только что"
     
     # Регистрация Blueprints
-    try:
-        from app.routes.main import bp as main_bp
-        app.register_blueprint(main_bp)
-        app.logger.info('✓ Main blueprint registered')
-    except Exception as e:
-        app.logger.error(f'✗ Error registering main blueprint: {e}')
-    
-    try:
-        from app.routes.auth import bp as auth_bp
-        app.register_blueprint(auth_bp, url_prefix='/auth')
-        app.logger.info('✓ Auth blueprint registered')
-    except Exception as e:
-        app.logger.error(f'✗ Error registering auth blueprint: {e}')
-    
-    try:
-        from app.routes.trainings import bp as trainings_bp
-        app.register_blueprint(trainings_bp, url_prefix='/trainings')
-        app.logger.info('✓ Trainings blueprint registered')
-    except Exception as e:
-        app.logger.error(f'✗ Error registering trainings blueprint: {e}')
-    
-    try:
-        from app.routes.progress import bp as progress_bp
-        app.register_blueprint(progress_bp, url_prefix='/progress')
-        app.logger.info('✓ Progress blueprint registered')
-    except Exception as e:
-        app.logger.error(f'✗ Error registering progress blueprint: {e}')
+    enabled = app.config.get('APP_BLUEPRINTS') or [name for name, _, _ in BLUEPRINTS]
+    
+    if 'api' in enabled:
+        # CORS нужен только JSON API
+        from flask_cors import CORS
+        CORS(app)
+    
+    if set(enabled) - {'api'}:
+        # Собранные статические ресурсы (хэшированные имена, предсжатые копии) — для страниц
+        from app.utils.assets import assets
+        assets.init_app(app)
+    for name, module_name, url_prefix in BLUEPRINTS:
+        if name not in enabled:
+            continue
+        try:
+            module = importlib.import_module(module_name)
+            app.register_blueprint(module.bp, url_prefix=url_prefix)
+            app.logger.info(f'✓ {name} blueprint registered')
+        except Exception as e:
+            app.logger.error(f'✗ Error registering {name} blueprint: {e}')
+    
+    # Команды CLI
+    from app.cli import register_commands
+    register_commands(app)
     
     return app
@@ -0,0 +1,330 @@
+"""
+Команды командной строки (flask <группа> <команда>)
+"""
+import json
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+audit_cli = AppGroup('audit', help='Логи аудита: партиции, архивирование, поиск')
+
+def _parse_datetime(value):
+    """Разбор даты из аргумента командной строки"""
+    return datetime.fromisoformat(value) if value else None
+
+@audit_cli.command('partitions')
+def audit_partitions():
+    """Список партиций в базе и в архиве"""
+    from app.utils.audit_archive import list_partitions, list_archives
+    
+    click.echo('База данных:')
+    for partition, count in list_partitions():
+        click.echo(f'  {partition}: {count}')
+    
+    click.echo('Архив:')
+    for partition, path in list_archives(current_app.config['AUDIT_ARCHIVE_FOLDER']):
+        click.echo(f'  {partition}: {path}')
+
+@audit_cli.command('archive')
+@click.option('--retention-months', type=int, default=None,
+              help='Сколько месяцев хранить в базе (по умолчанию AUDIT_LOG_RETENTION_MONTHS)')
+@click.option('--batch-size', type=int, default=1000)
+def audit_archive(retention_months, batch_size):
+    """Выгрузка просроченных партиций в сжатые архивы"""
+    from app.utils.audit_archive import archive_expired_partitions
+    
+    if retention_months is None:
+        retention_months = current_app.config['AUDIT_LOG_RETENTION_MONTHS']
+    
+    result = archive_expired_partitions(
+        current_app.config['AUDIT_ARCHIVE_FOLDER'],
+        retention_months,
+        batch_size=batch_size
+    )
+    
+    if not result:
+        click.echo('Нет партиций для архивирования')
+    for partition, count in result.items():
+        click.echo(f'✓ Партиция {partition}: {count} записей')
+
+@audit_cli.command('query')
+@click.option('--action')
+@click.option('--resource-type')
+@click.option('--resource-id')
+@click.option('--user-id', type=int)
+@click.option('--since', help='Начало интервала (ISO 8601)')
+@click.option('--until', help='Конец интервала (ISO 8601)')
+@click.option('--limit', type=int, default=100)
+@click.option('--archived/--no-archived', default=True, help='Искать также в архивах')
+def audit_query(action, resource_type, resource_id, user_id, since, until, limit, archived):
+    """Поиск по логам аудита в базе и в архивах (JSON Lines)"""
+    from app.models.system import AuditLog
+    from app.utils.audit_archive import iter_archived_logs
+    
+    since = _parse_datetime(since)
+    until = _parse_datetime(until)
+    
+    query = AuditLog.query
+    if action:
+        query = query.filter_by(action=action)
+    if resource_type:
+        query = query.filter_by(resource_type=resource_type)
+    if resource_id:
+        query = query.filter_by(resource_id=resource_id)
+    if user_id:
+        query = query.filter_by(user_id=user_id)
+    if since:
+        query = query.filter(AuditLog.created_at >= since)
+    if until:
+        query = query.filter(AuditLog.created_at < until)
+    
+    shown = 0
+    for log in query.order_by(AuditLog.created_at.desc()).limit(limit):
+        click.echo(json.dumps(log.to_dict(), ensure_ascii=False))
+        shown += 1
+    
+    if archived and shown < limit:
+        for record in iter_archived_logs(current_app.config['AUDIT_ARCHIVE_FOLDER'],
+                                         since=since, until=until,
+                                         action=action, resource_type=resource_type,
+                                         resource_id=resource_id, user_id=user_id):
+            click.echo(json.dumps(record, ensure_ascii=False))
+            shown += 1
+            if shown >= limit:
+                break
+
+email_cli = AppGroup('email', help='Очередь email-доставки уведомлений')
+
+@email_cli.command('worker')
+@click.option('--batch-size', type=int, default=None, help='Размер пачки (по умолчанию EMAIL_QUEUE_BATCH_SIZE)')
+@click.option('--poll-interval', type=int, default=None, help='Пауза при пустой очереди, секунды')
+@click.option('--once', is_flag=True, help='Обработать очередь один раз и выйти')
+def email_worker(batch_size, poll_interval, once):
+    """Воркер доставки email-уведомлений"""
+    from app.utils.email_queue import run_worker
+    
+    click.echo(f"Воркер доставки запущен (SMTP {current_app.config['MAIL_SERVER']}:{current_app.config['MAIL_PORT']})")
+    try:
+        totals = run_worker(batch_size=batch_size, poll_interval=poll_interval, once=once)
+    except KeyboardInterrupt:
+        click.echo('Остановлен')
+        return
+    
+    click.echo(f"✓ Отправлено: {totals['sent']}, ошибок: {totals['failed']}")
+
+@email_cli.command('stats')
+def email_stats():
+    """Состояние очереди доставки"""
+    from app.utils.email_queue import queue_stats
+    
+    for key, value in queue_stats().items():
+        click.echo(f'{key}: {value}')
+
+@email_cli.command('sink')
+@click.option('--host', default='127.0.0.1')
+@click.option('--port', type=int, default=1025)
+@click.option('--fail-first', type=int, default=0, help='Ответить временной ошибкой на первые N писем')
+def email_sink(host, port, fail_first):
+    """Локальный SMTP-сервер для проверки доставки (MAIL_SERVER=127.0.0.1, MAIL_USE_TLS=false)"""
+    import logging
+    from app.utils.smtp_sink import SMTPSink
+    
+    logging.getLogger('app.utils.smtp_sink').setLevel(logging.INFO)
+    sink = SMTPSink((host, port), fail_first=fail_first, echo=True)
+    click.echo(f'SMTP-заглушка слушает {host}:{sink.port}')
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        sink.server_close()
+
+uploads_cli = AppGroup('uploads', help='Загруженные файлы')
+
+@uploads_cli.command('cleanup')
+def uploads_cleanup():
+    """Отмена просроченных загрузок по частям и удаление временных файлов"""
+    from app.utils.chunked_upload import cleanup_expired
+    
+    click.echo(f'✓ Отменено загрузок: {cleanup_expired()}')
+
+assets_cli = AppGroup('assets', help='Статические ресурсы')
+
+@assets_cli.command('build')
+@click.option('--no-minify', is_flag=True, help='Без минификации CSS/JS')
+@click.option('--clean', is_flag=True, help='Удалить файлы прошлых сборок')
+def assets_build(no_minify, clean):
+    """Сборка: минификация, хэшированные имена, .gz/.br, manifest.json"""
+    from app.utils.assets import build
+    
+    output = current_app.config['ASSETS_FOLDER']
+    manifest = build(current_app.static_folder, output, minify=not no_minify, clean=clean)
+    for name, hashed in sorted(manifest.items()):
+        click.echo(f'{name} -> {hashed}')
+    click.echo(f'✓ Собрано файлов: {len(manifest)} ({output})')
+
+@assets_cli.command('vendor')
+def assets_vendor():
+    """Скачивание библиотек с CDN в static/vendor (затем flask assets build)"""
+    from app.utils.assets import download_vendor
+    
+    downloaded = download_vendor(current_app.static_folder)
+    click.echo(f'✓ Скачано файлов: {len(downloaded)}')
+
+data_cli = AppGroup('data', help='Синтетические данные')
+
+@data_cli.command('generate')
+@click.option('--scale', type=click.Choice(['small', 'medium', 'large', 'production']), default='small')
+@click.option('--clients', type=int)
+@click.option('--trainers', type=int)
+@click.option('--trainings', type=int)
+@click.option('--registrations-per-training', type=int)
+@click.option('--progress-years', type=int)
+@click.option('--progress-per-week', type=float)
+@click.option('--metrics-per-progress', type=int)
+@click.option('--feedback-ratio', type=float)
+@click.option('--notifications-per-user', type=int)
+@click.option('--seed', type=int, default=42)
+@click.option('--anchor', help='Дата отсчета (YYYY-MM-DD), по умолчанию сегодня')
+@click.option('--batch-size', type=int, default=None)
+@click.option('--keep-indexes', is_flag=True, help='Не снимать индексы на время загрузки')
+@click.option('--output', help='Файл JSON с количеством строк и персонажами')
+def data_generate(scale, seed, anchor, batch_size, keep_indexes, output, **overrides):
+    """Генерация данных объема продакшена (добавляются к существующим)"""
+    import time
+    from flask_migrate import upgrade
+    from app import db
+    from app.utils.datagen import SCALES, BATCH_SIZE, generate, foreign_key_violations
+    
+    volumes = dict(SCALES[scale])
+    volumes.update({name: value for name, value in overrides.items() if value is not None})
+    click.echo('Объемы: ' + ', '.join(f'{name}={value}' for name, value in volumes.items()))
+    
+    upgrade()  # пустая база создается миграциями, существующая обновляется до последней ревизии
+    started = time.perf_counter()
+    result = generate(
+        seed=seed, batch_size=batch_size or BATCH_SIZE, drop_indexes=not keep_indexes,
+        anchor=datetime.strptime(anchor, '%Y-%m-%d').date() if anchor else None,
+        progress_callback=lambda table, rows: click.echo(
+            f'  {table}: {rows} ({time.perf_counter() - started:.1f} с)'),
+        **volumes
+    )
+    elapsed = time.perf_counter() - started
+    rows = sum(value for value in result.values() if isinstance(value, int))
+    click.echo(f'✓ Вставлено строк: {rows} за {elapsed:.1f} с ({rows / max(elapsed, 1e-9):.0f} строк/с)')
+    
+    with db.engine.connect() as connection:
+        violations = foreign_key_violations(connection)
+    if violations:
+        raise click.ClickException(f'Нарушений внешних ключей: {len(violations)} (например, {violations[0]})')
+    
+    if output:
+        result['volumes'] = volumes
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        click.echo(f'Результат: {output}')
+
+replicas_cli = AppGroup('replicas', help='Реплики для чтения')
+
+@replicas_cli.command('status')
+def replicas_status():
+    """Доступность реплик из SQLALCHEMY_REPLICA_URIS"""
+    from app.utils.replicas import replicas
+    
+    statuses = replicas.status()
+    if not statuses:
+        click.echo('Реплики не настроены (DATABASE_REPLICA_URLS)')
+    for status in statuses:
+        mark = '✓' if status['healthy'] else f"✗ {status['last_error']}"
+        click.echo(f"{status['uri']}: {mark}")
+
+@replicas_cli.command('sync')
+def replicas_sync():
+    """Копия основной базы SQLite в файлы реплик (локальная замена репликации)"""
+    from app import db
+    from app.utils.replicas import replicas, sync_sqlite_replicas
+    
+    try:
+        synced = sync_sqlite_replicas(db.engine, replicas.all())
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    for path in synced:
+        click.echo(f'✓ {path}')
+
+recommendations_cli = AppGroup('recommendations', help='Рекомендации тренировок')
+
+@recommendations_cli.command('build')
+@click.option('--batch-size', type=int, default=1000, help='Пользователей в одной матрице оценок')
+def recommendations_build(batch_size):
+    """Пересчет top-K рекомендаций всех клиентов (периодическая задача)"""
+    from app.utils.recommendations import build_all
+    
+    result = build_all(batch_size=batch_size, progress_callback=lambda users: click.echo(f'  пользователей: {users}'))
+    click.echo(f"✓ Пользователей: {result['users']}, кандидатов: {result['candidates']}, {result['seconds']} с")
+
+ratings_cli = AppGroup('ratings', help='Рейтинги тренеров и тренировок')
+
+@ratings_cli.command('rebuild')
+def ratings_rebuild():
+    """Полный пересчет рейтингов и разрезов trainer_rankings по одобренным отзывам"""
+    from app.utils.ratings import rebuild
+    
+    result = rebuild()
+    click.echo(f"✓ Априорное среднее: {result['prior_mean']:.3f}, строк рейтинга тренеров: {result['rankings']}")
+
+idempotency_cli = AppGroup('idempotency', help='Ключи идемпотентности POST-запросов')
+
+@idempotency_cli.command('purge')
+@click.option('--ttl-hours', type=int, default=None, help='По умолчанию IDEMPOTENCY_KEY_TTL_HOURS')
+def idempotency_purge(ttl_hours):
+    """Удаление старых ключей идемпотентности"""
+    from app.utils.idempotency import purge
+    
+    click.echo(f'✓ Удалено ключей: {purge(ttl_hours)}')
+
+notifications_cli = AppGroup('notifications', help='Уведомления')
+
+@notifications_cli.command('settle')
+@click.option('--lookback-minutes', type=int, default=10, help='Окно назад от текущего момента')
+def notifications_settle(lookback_minutes):
+    """Досчет непрочитанных: наступившие отложенные и истекшие уведомления"""
+    from app.utils.notifications import settle_unread
+    
+    users = settle_unread(datetime.utcnow() - timedelta(minutes=lookback_minutes))
+    click.echo(f'✓ Пересчитано счетчиков: {users}')
+
+moderation_cli = AppGroup('moderation', help='Модерация тренировок')
+
+@moderation_cli.command('recount')
+def moderation_recount():
+    """Пересчет счетчика тренировок на проверке по фактическим строкам"""
+    from app import db
+    from app.utils.moderation import recount
+    
+    value = recount()
+    db.session.commit()
+    click.echo(f'✓ Тренировок на проверке: {value}')
+
+@moderation_cli.command('rebuild-queue')
+@click.option('--batch-size', type=int, default=1000)
+def moderation_rebuild_queue(batch_size):
+    """Сверка очереди модерации контента и пересчет приоритетов по текущим весам"""
+    from app.utils.moderation_queue import rebuild
+    
+    result = rebuild(batch_size=batch_size)
+    click.echo(f"✓ Очередь модерации: добавлено {result['added']}, удалено {result['removed']}, "
+               f"всего {result['total']}")
+
+def register_commands(app):
+    """Регистрация команд в приложении"""
+    app.cli.add_command(audit_cli)
+    app.cli.add_command(email_cli)
+    app.cli.add_command(uploads_cli)
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(data_cli)
+    app.cli.add_command(replicas_cli)
+    app.cli.add_command(recommendations_cli)
+    app.cli.add_command(ratings_cli)
+    app.cli.add_command(idempotency_cli)
+    app.cli.add_command(notifications_cli)
+    app.cli.add_command(moderation_cli)
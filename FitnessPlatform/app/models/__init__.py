@@ -6,18 +6,23 @@ from app import db
 
 # Импортируем все модели
 from app.models.user import User, UserProfile, Trainer, Client
-from app.models.training import Training, TrainingCategory, TrainingRegistration, TrainingSchedule
-from app.models.feedback import Feedback, Rating, Comment
+from app.models.training import (Training, TrainingCategory, TrainingRegistration, TrainingSchedule,
+                                 Tag, Equipment, Contraindication, TrainingRecommendation)
+from app.models.feedback import Feedback, Rating, Comment, TrainerRanking
 from app.models.progress import Progress, ProgressMetric, Goal, Achievement
-from app.models.system import AuditLog, SystemSetting, ContentModeration
+from app.models.system import (AuditLog, SystemSetting, ContentModeration, IdempotencyKey, ModerationCounter,
+                               ModerationQueueItem)
 from app.models.notification import Notification, NotificationTemplate
+from app.models.media import StoredBlob, UploadedFile, UploadSession
 
 # Экспортируем все модели для удобного импорта
 __all__ = [
     'User', 'UserProfile', 'Trainer', 'Client',
     'Training', 'TrainingCategory', 'TrainingRegistration', 'TrainingSchedule',
-    'Feedback', 'Rating', 'Comment',
+    'Tag', 'Equipment', 'Contraindication', 'TrainingRecommendation',
+    'Feedback', 'Rating', 'Comment', 'TrainerRanking',
     'Progress', 'ProgressMetric', 'Goal', 'Achievement',
-    'AuditLog', 'SystemSetting', 'ContentModeration',
-    'Notification', 'NotificationTemplate'
+    'AuditLog', 'SystemSetting', 'ContentModeration', 'IdempotencyKey', 'ModerationCounter', 'ModerationQueueItem',
+    'Notification', 'NotificationTemplate',
+    'StoredBlob', 'UploadedFile', 'UploadSession'
 ]
\ No newline at end of file
@@ -40,6 +40,7 @@ class Feedback(db.Model):
     # Уникальный constraint
     __table_args__ = (
         db.UniqueConstraint('user_id', 'training_id', name='unique_user_training_feedback'),
+        db.Index('idx_feedbacks_training_moderation', 'training_id', 'moderation_status', 'created_at'),
     )
     
     # Связь с пользователем (автором отзыва) - ИСПРАВЛЕНО: убрали backref
@@ -49,21 +50,55 @@ class Feedback(db.Model):
     moderator = db.relationship('User', foreign_keys=[moderated_by], lazy=True)
     
     def approve(self, moderator_id, notes=None):
-        """Одобрение отзыва модератором"""
-        self.moderation_status = 'approved'
-        self.moderated_by = moderator_id
-        self.moderation_notes = notes
-        self.moderated_at = datetime.utcnow()
+        """Одобрение отзыва модератором (оценка входит в рейтинги один раз)"""
+        self.set_moderation('approved', moderator_id, notes)
         db.session.commit()
     
     def reject(self, moderator_id, notes):
-        """Отклонение отзыва модератором"""
-        self.moderation_status = 'rejected'
-        self.moderated_by = moderator_id
-        self.moderation_notes = notes
-        self.moderated_at = datetime.utcnow()
+        """Отклонение отзыва модератором (оценка одобренного отзыва вычитается из рейтингов)"""
+        self.set_moderation('rejected', moderator_id, notes)
         db.session.commit()
     
+    def set_moderation(self, status, moderator_id, notes=None):
+        """
+        Решение модератора без коммита (для пачки решений из очереди модерации)
+        
+        Оценка входит в рейтинги при переходе в approved и вычитается при
+        уходе из него; отзыв удаляется из очереди модерации.
+        """
+        from app.utils import ratings, moderation_queue
+        
+        if status == 'approved':
+            transition = db.func.coalesce(Feedback.moderation_status, 'pending') != 'approved'
+        else:
+            transition = Feedback.moderation_status == 'approved'
+        if self._moderate(status, moderator_id, notes, transition):
+            ratings.apply_feedback(self.id, 1 if status == 'approved' else -1)
+        moderation_queue.dequeue(db.session, 'feedback', [self.id])
+    
+    def _moderate(self, status, moderator_id, notes, transition):
+        """
+        Смена статуса условным UPDATE: из двух одновременных модераций
+        переход transition выполняет только одна
+        
+        Returns:
+            bool: выполнен ли переход transition
+        """
+        values = {'moderation_status': status, 'moderated_by': moderator_id,
+                  'moderation_notes': notes, 'moderated_at': datetime.utcnow()}
+        if self.id is None:
+            db.session.flush()
+        
+        result = db.session.execute(Feedback.__table__.update()
+                                    .where(Feedback.id == self.id, transition).values(**values))
+        if result.rowcount:
+            db.session.expire(self, list(values))
+            return True
+        
+        for name, value in values.items():
+            setattr(self, name, value)
+        return False
+    
     def add_like(self):
         """Добавление лайка"""
         self.likes_count += 1
@@ -75,8 +110,16 @@ class Feedback(db.Model):
         db.session.commit()
     
     def report(self):
-        """Жалоба на отзыв"""
-        self.reports_count += 1
+        """Жалоба на отзыв: атомарный счетчик и возврат в очередь модерации с новым приоритетом"""
+        from app.utils import moderation_queue
+        
+        if self.id is None:
+            db.session.flush()
+        
+        db.session.execute(Feedback.__table__.update().where(Feedback.id == self.id)
+                           .values(reports_count=db.func.coalesce(Feedback.reports_count, 0) + 1))
+        db.session.expire(self, ['reports_count'])
+        moderation_queue.enqueue(db.session, 'feedback', self.id, self.user_id, self.created_at, self.reports_count)
         db.session.commit()
     
     @property
@@ -165,4 +208,44 @@ class Comment(db.Model):
         db.session.commit()
     
     def __repr__(self):
-        return f'<Comment User:{self.user_id} on Feedback:{self.feedback_id}>'
\ No newline at end of file
+        return f'<Comment User:{self.user_id} on Feedback:{self.feedback_id}>'
+
+class TrainerRanking(db.Model):
+    """
+    Рейтинг тренеров в разрезе: общий, по специализации, по категории тренировок
+    
+    Строка на (разрез, ключ, тренер) с точными суммой и числом оценок и
+    байесовской оценкой score (см. app/utils/ratings.py). Топ разреза —
+    чтение диапазона индекса idx_trainer_rankings_scope_score без сортировки.
+    """
+    __tablename__ = 'trainer_rankings'
+    
+    SCOPE_ALL = 'all'
+    SCOPE_SPECIALIZATION = 'specialization'
+    SCOPE_CATEGORY = 'category'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(20), nullable=False)
+    scope_key = db.Column(db.String(100), nullable=False, default='')  # ключ специализации или id категории
+    trainer_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    
+    rating_sum = db.Column(db.Float, nullable=False, default=0.0)
+    total_ratings = db.Column(db.Integer, nullable=False, default=0)
+    score = db.Column(db.Float, nullable=False, default=0.0)
+    
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    trainer = db.relationship('User', lazy=True)
+    
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'scope_key', 'trainer_user_id', name='uq_trainer_rankings_scope_trainer'),
+        db.Index('idx_trainer_rankings_scope_score', 'scope', 'scope_key', 'score', 'total_ratings'),
+    )
+    
+    @property
+    def average(self):
+        """Среднее без поправки"""
+        return self.rating_sum / self.total_ratings if self.total_ratings else 0.0
+    
+    def __repr__(self):
+        return f'<TrainerRanking {self.scope}:{self.scope_key} Trainer:{self.trainer_user_id} {self.score:.3f}>'
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""
+Модели загруженных файлов
+"""
+
+from app import db
+from datetime import datetime
+import json
+
+class StoredBlob(db.Model):
+    """Содержимое файла в хранилище, адресуемом по хэшу (одно на все дубликаты)"""
+    __tablename__ = 'stored_blobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    relative_path = db.Column(db.String(500), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<StoredBlob {self.sha256[:12]} refs={self.ref_count}>'
+
+class UploadedFile(db.Model):
+    """Загруженный файл и состояние его обработки"""
+    __tablename__ = 'uploaded_files'
+    
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_READY = 'ready'
+    STATUS_FAILED = 'failed'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
+    
+    # Файл
+    purpose = db.Column(db.String(20), nullable=False, default='image')  # avatar, image, document, video, audio
+    original_filename = db.Column(db.String(255))
+    relative_path = db.Column(db.String(500), nullable=False)
+    mime_type = db.Column(db.String(100))
+    size = db.Column(db.BigInteger)  # видео бывают больше 2 ГБ
+    blob_id = db.Column(db.Integer, db.ForeignKey('stored_blobs.id'), index=True)
+    
+    # Обработка
+    status = db.Column(db.String(20), default=STATUS_PENDING, index=True)  # pending, processing, ready, failed
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    variants = db.Column(db.Text)  # JSON: {вариант: {формат: относительный путь, width, height}}
+    error = db.Column(db.String(500))
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime)
+    
+    # Связи
+    user = db.relationship('User', backref=db.backref('uploaded_files', lazy='dynamic'))
+    blob = db.relationship('StoredBlob')
+    
+    @property
+    def is_ready(self):
+        """Готовы ли варианты файла"""
+        return self.status == self.STATUS_READY
+    
+    def get_variants(self):
+        """Варианты файла"""
+        if self.variants:
+            try:
+                return json.loads(self.variants)
+            except ValueError:
+                return {}
+        return {}
+    
+    def variant_path(self, name, fmt='jpg'):
+        """Относительный путь варианта (или None, если он еще не готов)"""
+        variant = self.get_variants().get(name)
+        if not variant:
+            return None
+        return variant.get(fmt)
+    
+    def to_dict(self, url_prefix='/uploads'):
+        """Преобразование в словарь (формат API)"""
+        def url(path):
+            return f"{url_prefix.rstrip('/')}/{path}" if path else None
+        
+        variants = {}
+        for name, variant in self.get_variants().items():
+            variants[name] = {
+                'width': variant.get('width'),
+                'height': variant.get('height'),
+                'webp': url(variant.get('webp')),
+                'jpg': url(variant.get('jpg')),
+            }
+        
+        return {
+            'id': self.id,
+            'purpose': self.purpose,
+            'status': self.status,
+            'original_filename': self.original_filename,
+            'url': url(self.relative_path),
+            'mime_type': self.mime_type,
+            'size': self.size,
+            'width': self.width,
+            'height': self.height,
+            'variants': variants,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'processed_at': self.processed_at.isoformat() if self.processed_at else None
+        }
+    
+    def __repr__(self):
+        return f'<UploadedFile {self.relative_path} ({self.status})>'
+
+class UploadSession(db.Model):
+    """Сеанс возобновляемой загрузки по частям (видео тренировок)"""
+    __tablename__ = 'upload_sessions'
+    
+    STATUS_ACTIVE = 'active'
+    STATUS_COMPLETED = 'completed'
+    STATUS_ABORTED = 'aborted'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    token = db.Column(db.String(32), unique=True, nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    training_id = db.Column(db.Integer, db.ForeignKey('trainings.id'))
+    
+    # Файл
+    purpose = db.Column(db.String(20), default='video')
+    original_filename = db.Column(db.String(255), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    expected_sha256 = db.Column(db.String(64))  # контрольная сумма всего файла от клиента
+    temp_path = db.Column(db.String(500), nullable=False)
+    
+    # Состояние: offset — сколько байт записано и проверено
+    offset = db.Column(db.BigInteger, nullable=False, default=0)
+    status = db.Column(db.String(20), default=STATUS_ACTIVE, index=True)  # active, completed, aborted
+    uploaded_file_id = db.Column(db.Integer, db.ForeignKey('uploaded_files.id'))
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, index=True)
+    
+    # Связи
+    uploaded_file = db.relationship('UploadedFile')
+    
+    @property
+    def is_complete(self):
+        """Получены ли все байты файла"""
+        return self.offset >= self.total_size
+    
+    def to_dict(self):
+        """Преобразование в словарь (формат API)"""
+        return {
+            'upload_id': self.token,
+            'filename': self.original_filename,
+            'size': self.total_size,
+            'offset': self.offset,
+            'status': self.status,
+            'file_id': self.uploaded_file_id,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
+    
+    def __repr__(self):
+        return f'<UploadSession {self.token} {self.offset}/{self.total_size}>'
@@ -45,9 +45,21 @@ class Notification(db.Model):
     push_sent = db.Column(db.Boolean, default=False)
     delivery_attempts = db.Column(db.Integer, default=0)
     
+    # Очередь email-доставки
+    email_next_attempt_at = db.Column(db.DateTime)  # следующая попытка / окончание захвата воркером
+    email_claim_token = db.Column(db.String(32))  # воркер, захвативший уведомление
+    email_last_error = db.Column(db.String(500))
+    
     # Связи
     template_id = db.Column(db.Integer, db.ForeignKey('notification_templates.id'))
     
+    __table_args__ = (
+        db.Index('idx_notifications_email_queue', 'send_email', 'email_sent', 'email_next_attempt_at'),
+        # Непрочитанные пользователя (частичный индекс: условие совпадает с фильтром запроса)
+        db.Index('idx_notifications_user_unread', 'user_id', 'id',
+                 sqlite_where=db.text('is_read IS 0'), postgresql_where=db.text('is_read IS false')),
+    )
+    
     def mark_as_read(self):
         """Отметка уведомления как прочитанного"""
         if not self.is_read:
@@ -64,6 +76,22 @@ class Notification(db.Model):
         self.sent_at = datetime.utcnow()
         db.session.commit()
     
+    def to_dict(self):
+        """Преобразование в словарь (формат API)"""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'message': self.message,
+            'type': self.notification_type,
+            'action_url': self.action_url,
+            'action_text': self.action_text,
+            'is_read': self.is_read,
+            'is_important': self.is_important,
+            'priority': self.priority,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'read_at': self.read_at.isoformat() if self.read_at else None
+        }
+    
     def get_data_dict(self):
         """Получение данных в виде словаря"""
         if self.data:
@@ -129,25 +157,25 @@ class NotificationTemplate(db.Model):
     # Связи
     notifications = db.relationship('Notification', backref='template', lazy='dynamic')
     
-    def render(self, context):
-        """Рендеринг шаблона с контекстом"""
-        from string import Template
-        
+    def compiled(self):
+        """Скомпилированный шаблон (кэшируется по id, версии и времени изменения)"""
+        from app.utils.notification_templates import get_compiled
+        return get_compiled(self)
+    
+    def render(self, context, channel='in_app'):
+        """Рендеринг шаблона с контекстом (channel: in_app, email, push)"""
         try:
-            title = Template(self.title_template).safe_substitute(context)
-            message = Template(self.message_template).safe_substitute(context)
-            return title, message
+            return self.compiled().render(context, channel)
         except Exception as e:
             return f"Ошибка рендеринга: {str(e)}", ""
     
+    def render_many(self, contexts, shared=None, channel='in_app'):
+        """Рендеринг для пачки получателей (общий контекст подставляется один раз)"""
+        return self.compiled().render_many(contexts, shared=shared, channel=channel)
+    
     def get_variables_list(self):
         """Получение списка переменных"""
-        if self.variables:
-            try:
-                return json.loads(self.variables)
-            except:
-                return []
-        return []
+        return self.compiled().variables
     
     def __repr__(self):
         return f'<NotificationTemplate {self.name}>'
\ No newline at end of file
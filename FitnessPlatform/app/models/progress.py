@@ -52,6 +52,11 @@ class Progress(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # История и дашборд: записи пользователя по дате без сортировки во временном B-дереве
+    __table_args__ = (
+        db.Index('idx_progress_user_date', 'user_id', 'date', 'created_at'),
+    )
+    
     # Связи
     metrics = db.relationship('ProgressMetric', backref='progress', lazy='dynamic', cascade='all, delete-orphan')
     
@@ -145,6 +150,12 @@ class Goal(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     completed_at = db.Column(db.DateTime)
     
+    # Страница целей и дашборд: цели пользователя по статусу (datagen целей не создает,
+    # поэтому советник по индексам их не видит — индекс добавлен по запросам страницы)
+    __table_args__ = (
+        db.Index('idx_goals_user_status', 'user_id', 'status'),
+    )
+    
     # Связи
     achievements = db.relationship('Achievement', backref='goal', lazy='dynamic')
     
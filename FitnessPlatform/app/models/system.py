@@ -6,10 +6,17 @@ from app import db
 from datetime import datetime
 import json
 
+def month_key(value):
+    """Ключ месячной партиции (YYYYMM) для даты"""
+    return value.year * 100 + value.month
+
 class AuditLog(db.Model):
     """Логи аудита действий в системе"""
     __tablename__ = 'audit_logs'
     
+    # Максимальная длина сохраняемого User-Agent
+    USER_AGENT_MAX_LENGTH = 256
+    
     id = db.Column(db.Integer, primary_key=True)
     
     # Кто совершил действие
@@ -19,8 +26,8 @@ class AuditLog(db.Model):
     
     # Что произошло
     action = db.Column(db.String(100), nullable=False, index=True)
-    resource_type = db.Column(db.String(50), nullable=False, index=True)
-    resource_id = db.Column(db.String(100), index=True)
+    resource_type = db.Column(db.String(50), nullable=False)
+    resource_id = db.Column(db.String(100))
     
     # Детали
     details_before = db.Column(db.Text)  # JSON состояние до
@@ -36,21 +43,35 @@ class AuditLog(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     duration_ms = db.Column(db.Integer)  # длительность в миллисекундах
     
+    # Месячная партиция (YYYYMM), по которой работает ретеншн
+    partition_month = db.Column(
+        db.Integer, nullable=False, index=True,
+        default=lambda ctx: month_key(ctx.get_current_parameters().get('created_at') or datetime.utcnow())
+    )
+    
+    # Составной индекс для таймлайна ресурса ("всё по ресурсу X")
+    __table_args__ = (
+        db.Index('idx_audit_resource_timeline', 'resource_type', 'resource_id', 'created_at'),
+    )
+    
     def log_action(user_id, action, resource_type, resource_id=None, 
                   details_before=None, details_after=None, request=None):
         """Создание записи в логе аудита"""
+        now = datetime.utcnow()
         log = AuditLog(
             user_id=user_id,
             action=action,
             resource_type=resource_type,
             resource_id=str(resource_id) if resource_id else None,
             details_before=json.dumps(details_before, ensure_ascii=False) if details_before else None,
-            details_after=json.dumps(details_after, ensure_ascii=False) if details_after else None
+            details_after=json.dumps(details_after, ensure_ascii=False) if details_after else None,
+            created_at=now,
+            partition_month=month_key(now)
         )
         
         if request:
             log.user_ip = request.remote_addr
-            log.user_agent = request.user_agent.string
+            log.user_agent = (request.user_agent.string or '')[:AuditLog.USER_AGENT_MAX_LENGTH]
             log.request_path = request.path
             log.request_method = request.method
         
@@ -70,6 +91,66 @@ class AuditLog(db.Model):
         
         return log
     
+    @staticmethod
+    def log_batch(user_id, action, resource_type, resource_ids, details_after=None, request=None):
+        """
+        Одна запись аудита на каждый ресурс пачки — одним INSERT (executemany)
+        
+        В отличие от log_action не коммитит: записи фиксируются вместе
+        с действием, которое они описывают.
+        
+        Returns:
+            int: количество записей
+        """
+        if not resource_ids:
+            return 0
+        
+        now = datetime.utcnow()
+        common = {
+            'user_id': user_id,
+            'action': action,
+            'resource_type': resource_type,
+            'details_after': json.dumps(details_after, ensure_ascii=False) if details_after else None,
+            'created_at': now,
+            'partition_month': month_key(now),
+            'user_ip': request.remote_addr if request else None,
+            'user_agent': (request.user_agent.string or '')[:AuditLog.USER_AGENT_MAX_LENGTH] if request else None,
+            'request_path': request.path if request else None,
+            'request_method': request.method if request else None,
+        }
+        db.session.execute(AuditLog.__table__.insert(),
+                           [dict(common, resource_id=str(resource_id)) for resource_id in resource_ids])
+        return len(resource_ids)
+    
+    def to_dict(self):
+        """Преобразование в словарь (формат архива)"""
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'user_ip': self.user_ip,
+            'user_agent': self.user_agent,
+            'action': self.action,
+            'resource_type': self.resource_type,
+            'resource_id': self.resource_id,
+            'details_before': self.details_before,
+            'details_after': self.details_after,
+            'changes': self.changes,
+            'request_path': self.request_path,
+            'request_method': self.request_method,
+            'status_code': self.status_code,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'duration_ms': self.duration_ms,
+            'partition_month': self.partition_month
+        }
+    
+    @classmethod
+    def resource_timeline(cls, resource_type, resource_id):
+        """Таймлайн ресурса (идет по индексу idx_audit_resource_timeline)"""
+        return cls.query.filter_by(
+            resource_type=resource_type,
+            resource_id=str(resource_id)
+        ).order_by(cls.created_at.desc())
+    
     def __repr__(self):
         return f'<AuditLog {self.action} by User:{self.user_id}>'
 
@@ -135,11 +216,9 @@ class SystemSetting(db.Model):
     
     @classmethod
     def get_setting(cls, key, default=None):
-        """Получение значения настройки"""
-        setting = cls.query.filter_by(key=key).first()
-        if setting:
-            return setting.get_value()
-        return default
+        """Получение значения настройки (через кэш настроек)"""
+        from app.utils.settings_cache import settings_cache
+        return settings_cache.get(key, default)
     
     @classmethod
     def set_setting(cls, key, value, value_type='string', category='general'):
@@ -194,6 +273,7 @@ class ContentModeration(db.Model):
         self.moderated_by = moderator_id
         self.moderation_notes = notes
         self.moderated_at = datetime.utcnow()
+        self._resolve()
         db.session.commit()
     
     def reject(self, moderator_id, notes, actions=None, penalty=0):
@@ -207,6 +287,7 @@ class ContentModeration(db.Model):
         if actions:
             self.actions_taken = json.dumps(actions, ensure_ascii=False)
         
+        self._resolve(penalty)
         db.session.commit()
     
     def remove(self, moderator_id, notes, actions=None, penalty=0):
@@ -220,7 +301,92 @@ class ContentModeration(db.Model):
         if actions:
             self.actions_taken = json.dumps(actions, ensure_ascii=False)
         
+        self._resolve(penalty)
         db.session.commit()
     
+    def _resolve(self, penalty=0):
+        """Жалоба решена: удаление из очереди модерации, штрафные баллы автору контента"""
+        from app.utils import moderation_queue
+        
+        moderation_queue.dequeue(db.session, 'report', [self.id])
+        if penalty:
+            author_id = moderation_queue.content_author(db.session, self.content_type, self.content_id)
+            moderation_queue.add_penalties(db.session, {author_id: penalty})
+    
+    def __repr__(self):
+        return f'<ContentModeration {self.content_type}:{self.content_id}>'
+
+class ModerationCounter(db.Model):
+    """Поддерживаемый счетчик очереди модерации (app/utils/moderation.py) вместо COUNT(*) на каждый показ"""
+    __tablename__ = 'moderation_counters'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ModerationCounter {self.name}={self.value}>'
+
+class ModerationQueueItem(db.Model):
+    """
+    Элемент общей очереди модерации (app/utils/moderation_queue.py)
+    
+    Строка на отзыв, комментарий или жалобу (content_moderation), ожидающие
+    решения; после решения строка удаляется. priority не зависит от текущего
+    времени (возраст учтен через created_at), поэтому хранится и индексируется.
+    """
+    __tablename__ = 'moderation_queue'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    content_type = db.Column(db.String(20), nullable=False)  # feedback, comment, report
+    content_id = db.Column(db.Integer, nullable=False)
+    author_user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), index=True)
+    
+    # Слагаемые приоритета
+    reports_count = db.Column(db.Integer, nullable=False, default=0)
+    author_penalty = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    priority = db.Column(db.Float, nullable=False, default=0.0)
+    
+    # Захват модератором: до lease_expires_at элемент не выдается другим
+    claimed_by = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'))
+    claim_token = db.Column(db.String(32), index=True)
+    lease_expires_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.UniqueConstraint('content_type', 'content_id', name='unique_moderation_queue_content'),
+        db.Index('idx_moderation_queue_priority', 'priority', 'id'),
+    )
+    
+    author = db.relationship('User', foreign_keys=[author_user_id], lazy=True)
+    claimer = db.relationship('User', foreign_keys=[claimed_by], lazy=True)
+    
+    def __repr__(self):
+        return f'<ModerationQueueItem {self.content_type}:{self.content_id} {self.priority:.1f}>'
+
+class IdempotencyKey(db.Model):
+    """Ключ идемпотентности POST-запроса и сохраненный первый ответ (app/utils/idempotency.py)"""
+    __tablename__ = 'idempotency_keys'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    key = db.Column(db.String(64), nullable=False)
+    endpoint = db.Column(db.String(100))
+    
+    # Ответ первого запроса: пока completed_at пуст, запрос еще выполняется
+    status_code = db.Column(db.Integer)
+    location = db.Column(db.String(500))
+    flashes = db.Column(db.Text)  # JSON: [[категория, сообщение], ...]
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    completed_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='unique_user_idempotency_key'),
+    )
+    
+    def get_flashes(self):
+        return json.loads(self.flashes) if self.flashes else []
+    
     def __repr__(self):
-        return f'<ContentModeration {self.content_type}:{self.content_id}>'
\ No newline at end of file
+        return f'<IdempotencyKey User:{self.user_id} {self.key}>'
\ No newline at end of file
@@ -4,6 +4,7 @@
 
 from app import db
 from datetime import datetime, time, timedelta
+from collections import OrderedDict
 import json
 
 class TrainingCategory(db.Model):
@@ -25,6 +26,79 @@ class TrainingCategory(db.Model):
     def __repr__(self):
         return f'<TrainingCategory {self.name}>'
 
+class TermMixin:
+    """Справочник названий: отображаемое name и ключ поиска key (без регистра и лишних пробелов)"""
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    key = db.Column(db.String(100), nullable=False, unique=True, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @staticmethod
+    def normalize(name):
+        return ' '.join(str(name).split())[:100]
+    
+    @classmethod
+    def key_for(cls, name):
+        return cls.normalize(name).casefold()
+    
+    @classmethod
+    def resolve(cls, names):
+        """Записи справочника для названий (недостающие создаются), без дублей, в исходном порядке"""
+        wanted = OrderedDict()
+        for name in names:
+            name = cls.normalize(name)
+            if name:
+                wanted.setdefault(name.casefold(), name)
+        if not wanted:
+            return []
+        
+        existing = {term.key: term for term in cls.query.filter(cls.key.in_(list(wanted))).all()}
+        for key, name in wanted.items():
+            if key not in existing:
+                existing[key] = cls(name=name, key=key)
+                db.session.add(existing[key])
+        return [existing[key] for key in wanted]
+    
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {self.name}>'
+
+class Tag(TermMixin, db.Model):
+    """Тег тренировки"""
+    __tablename__ = 'tags'
+    
+    @classmethod
+    def popular(cls, limit=30):
+        """Самые используемые теги (для фильтра каталога)"""
+        usage = db.func.count(training_tags.c.training_id)
+        return cls.query.join(training_tags).group_by(cls.id).order_by(usage.desc(), cls.name).limit(limit).all()
+
+class Equipment(TermMixin, db.Model):
+    """Оборудование для тренировки"""
+    __tablename__ = 'equipment'
+
+class Contraindication(TermMixin, db.Model):
+    """Медицинское противопоказание"""
+    __tablename__ = 'contraindications'
+
+def _term_link_table(name, term_table, term_column):
+    """
+    Связь тренировок со справочником
+    
+    Первичный ключ (training_id, term_id) обслуживает карточку тренировки,
+    обратный индекс (term_id, training_id) — фильтр каталога «есть тег X».
+    """
+    return db.Table(
+        name,
+        db.Column('training_id', db.Integer, db.ForeignKey('trainings.id', ondelete='CASCADE'), primary_key=True),
+        db.Column(term_column, db.Integer, db.ForeignKey(f'{term_table}.id', ondelete='CASCADE'), primary_key=True),
+        db.Index(f'idx_{name}_term', term_column, 'training_id'),
+    )
+
+training_tags = _term_link_table('training_tags', 'tags', 'tag_id')
+training_equipment = _term_link_table('training_equipment', 'equipment', 'equipment_id')
+training_contraindications = _term_link_table('training_contraindications', 'contraindications', 'contraindication_id')
+
 class Training(db.Model):
     """Модель тренировки"""
     __tablename__ = 'trainings'
@@ -62,8 +136,10 @@ class Training(db.Model):
     materials_link = db.Column(db.String(500))  # дополнительные материалы
     
     # Медицинские ограничения
-    medical_contraindications = db.Column(db.Text)  # JSON список противопоказаний
-    required_equipment = db.Column(db.Text)  # JSON список оборудования
+    # Прежние текстовые списки (JSON или строки через перевод строки) — только для
+    # миграции 0009_training_terms; актуальные данные в contraindications и equipment
+    medical_contraindications_legacy = db.Column('medical_contraindications', db.Text)
+    required_equipment_legacy = db.Column('required_equipment', db.Text)
     
     # Статус и модерация
     status = db.Column(db.String(20), default='draft')  # draft, pending, approved, active, cancelled, completed
@@ -75,15 +151,24 @@ class Training(db.Model):
     price = db.Column(db.Float, default=0.0)
     currency = db.Column(db.String(3), default='RUB')
     
-    # Рейтинги и статистика
+    # Рейтинги и статистика: точные сумма и число одобренных оценок, среднее и
+    # байесовская оценка для сортировки — только через app/utils/ratings.py
     average_rating = db.Column(db.Float, default=0.0)
     total_ratings = db.Column(db.Integer, default=0)
+    rating_sum = db.Column(db.Float, default=0.0)
+    rating_score = db.Column(db.Float, default=0.0)
     views_count = db.Column(db.Integer, default=0)
     registrations_count = db.Column(db.Integer, default=0)
+    # Лист ожидания (app/utils/waitlist.py): сколько ждут и сколько уже вышло из головы очереди
+    waitlist_count = db.Column(db.Integer, nullable=False, default=0)
+    waitlist_offset = db.Column(db.Integer, nullable=False, default=0)
+    # Версия состояния мест и очереди: каждое изменение registrations_count и листа ожидания
+    # увеличивает ее условным UPDATE (оптимистическая блокировка, app/utils/registrations.py)
+    version = db.Column(db.Integer, nullable=False, default=1)
     attendance_rate = db.Column(db.Float, default=0.0)  # процент посещаемости
     
     # Метаданные
-    tags = db.Column(db.String(500))  # JSON список тегов
+    tags_legacy = db.Column('tags', db.String(500))  # прежний список тегов, см. выше
     keywords = db.Column(db.String(500))
     language = db.Column(db.String(10), default='ru')
     
@@ -91,10 +176,25 @@ class Training(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     published_at = db.Column(db.DateTime)
     
+    # Индексы из python -m benchmarks.indexes: каталог по статусу и дате, тренировки тренера
+    __table_args__ = (
+        db.Index('idx_trainings_status_schedule', 'status', 'schedule_time'),
+        db.Index('idx_trainings_trainer_created', 'trainer_user_id', 'created_at'),
+        # Лучшие тренировки категории (app/utils/ratings.py)
+        db.Index('idx_trainings_category_score', 'category_id', 'rating_score'),
+    )
+    
     # Связи
     registrations = db.relationship('TrainingRegistration', backref='training', lazy='dynamic', cascade='all, delete-orphan')
     feedbacks = db.relationship('Feedback', backref='training', lazy='dynamic')
     schedules = db.relationship('TrainingSchedule', backref='training', lazy='dynamic')
+    tags = db.relationship('Tag', secondary='training_tags', order_by='Tag.name', lazy=True,
+                           backref=db.backref('trainings', lazy='dynamic'))
+    equipment = db.relationship('Equipment', secondary='training_equipment', order_by='Equipment.name', lazy=True,
+                                backref=db.backref('trainings', lazy='dynamic'))
+    contraindications = db.relationship('Contraindication', secondary='training_contraindications',
+                                        order_by='Contraindication.name', lazy=True,
+                                        backref=db.backref('trainings', lazy='dynamic'))
     
     # Связь с пользователем-тренером - ИСПРАВЛЕНО: убрали backref, так как он уже определен в User
     trainer_user = db.relationship('User', foreign_keys=[trainer_user_id], lazy=True)
@@ -155,20 +255,52 @@ class Training(db.Model):
         
         return None
     
+    def count_user_trainings_on_day(self, user_id):
+        """Количество активных записей пользователя на день этой тренировки"""
+        day_start = datetime.combine(self.schedule_time.date(), time.min)
+        day_end = day_start + timedelta(days=1)
+        
+        return TrainingRegistration.query.filter_by(
+            user_id=user_id,
+            status='registered'
+        ).join(Training).filter(
+            Training.schedule_time >= day_start,
+            Training.schedule_time < day_end,
+            Training.id != self.id
+        ).count()
+    
+    @property
+    def tag_names(self):
+        return [tag.name for tag in self.tags]
+    
+    @property
+    def equipment_names(self):
+        return [item.name for item in self.equipment]
+    
+    @property
+    def contraindication_names(self):
+        return [item.name for item in self.contraindications]
+    
+    def set_terms(self, tags=None, equipment=None, contraindications=None):
+        """Замена тегов, оборудования и противопоказаний списками названий (None — не менять)"""
+        # Новая тренировка попадает в сессию через связь — без промежуточного flush
+        with db.session.no_autoflush:
+            if tags is not None:
+                self.tags = Tag.resolve(tags)
+            if equipment is not None:
+                self.equipment = Equipment.resolve(equipment)
+            if contraindications is not None:
+                self.contraindications = Contraindication.resolve(contraindications)
+    
     def check_medical_contraindications(self, user):
         """Проверка медицинских противопоказаний"""
-        if not self.medical_contraindications:
+        if not self.contraindications:
             return False
         
-        try:
-            contraindications = json.loads(self.medical_contraindications)
-            user_conditions = user.profile.medical_conditions.lower() if user.profile and user.profile.medical_conditions else ''
-            
-            for condition in contraindications:
-                if condition.lower() in user_conditions:
-                    return True
-        except:
-            pass
+        user_conditions = user.profile.medical_conditions.lower() if user.profile and user.profile.medical_conditions else ''
+        for condition in self.contraindications:
+            if condition.key in user_conditions:
+                return True
         
         return False
     
@@ -177,13 +309,6 @@ class Training(db.Model):
         self.views_count += 1
         db.session.commit()
     
-    def update_rating(self, new_rating):
-        """Обновление среднего рейтинга"""
-        total_score = self.average_rating * self.total_ratings + new_rating
-        self.total_ratings += 1
-        self.average_rating = round(total_score / self.total_ratings, 2)
-        db.session.commit()
-    
     def __repr__(self):
         return f'<Training {self.title} ({self.schedule_time})>'
 
@@ -196,8 +321,9 @@ class TrainingRegistration(db.Model):
     training_id = db.Column(db.Integer, db.ForeignKey('trainings.id'), nullable=False, index=True)
     
     # Статус участия
-    status = db.Column(db.String(20), default='registered')  # registered, attended, cancelled, no_show
+    status = db.Column(db.String(20), default='registered')  # registered, waitlisted, attended, cancelled, no_show
     registration_type = db.Column(db.String(20), default='standard')  # standard, waitlist, trial
+    waitlist_position = db.Column(db.Integer)  # номер в листе ожидания, только для waitlisted
     
     # Платеж
     payment_status = db.Column(db.String(20), default='pending')  # pending, paid, refunded
@@ -216,8 +342,46 @@ class TrainingRegistration(db.Model):
     # Уникальный constraint
     __table_args__ = (
         db.UniqueConstraint('user_id', 'training_id', name='unique_user_training_registration'),
+        db.Index('idx_registrations_user_status', 'user_id', 'status'),
+        db.Index('idx_registrations_training_status', 'training_id', 'status'),
+        db.Index('idx_registrations_waitlist', 'training_id', 'waitlist_position'),
     )
     
+    @classmethod
+    def activate(cls, user_id, training_id, status='registered', **values):
+        """
+        Запись одним upsert по (user_id, training_id): новая строка или
+        восстановление отмененной; активная запись не меняется
+        
+        Returns:
+            bool: создана или восстановлена ли запись
+        """
+        table = cls.__table__
+        now = datetime.utcnow()
+        row = dict(values, user_id=user_id, training_id=training_id, status=status, registered_at=now)
+        reactivate = dict(values, status=status, registered_at=now, cancelled_at=None, cancellation_reason=None)
+        
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            statement = insert(table).values(**row).on_conflict_do_update(
+                index_elements=['user_id', 'training_id'], set_=reactivate, where=table.c.status == 'cancelled')
+            return bool(db.session.execute(statement).rowcount)
+        
+        updated = db.session.execute(table.update().where(
+            table.c.user_id == user_id, table.c.training_id == training_id, table.c.status == 'cancelled'
+        ).values(**reactivate)).rowcount
+        if updated:
+            return True
+        exists = db.session.query(cls.id).filter_by(user_id=user_id, training_id=training_id).first()
+        if exists:
+            return False
+        db.session.execute(table.insert().values(**row))
+        return True
+    
     def cancel(self, reason=None):
         """Отмена регистрации"""
         self.status = 'cancelled'
@@ -237,16 +401,37 @@ class TrainingRegistration(db.Model):
         grace_period = training_end + timedelta(hours=24)  # 24 часа на отметку
         return datetime.utcnow() <= grace_period
     
+    @property
+    def cancellation_deadline(self):
+        """Крайний срок отмены регистрации"""
+        from app.utils.settings_cache import settings_cache
+        hours = settings_cache.get('cancellation_deadline_hours', 1)
+        return self.training.schedule_time - timedelta(hours=hours)
+    
     @property
     def can_be_cancelled(self):
         """Можно ли отменить регистрацию"""
-        # Можно отменить не позднее чем за 1 час до начала
-        cancellation_deadline = self.training.schedule_time - timedelta(hours=1)
-        return datetime.utcnow() < cancellation_deadline
+        # Можно отменить не позднее чем за cancellation_deadline_hours до начала
+        return datetime.utcnow() < self.cancellation_deadline
     
     def __repr__(self):
         return f'<TrainingRegistration User:{self.user_id} Training:{self.training_id}>'
 
+class TrainingRecommendation(db.Model):
+    """Предрассчитанные рекомендации пользователю (app.utils.recommendations)"""
+    __tablename__ = 'training_recommendations'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    training_ids = db.Column(db.Text, nullable=False, default='[]')  # JSON: id по убыванию оценки
+    scores = db.Column(db.Text, nullable=False, default='[]')  # JSON: оценки в том же порядке
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def get_training_ids(self):
+        return json.loads(self.training_ids) if self.training_ids else []
+    
+    def __repr__(self):
+        return f'<TrainingRecommendation User:{self.user_id}>'
+
 class TrainingSchedule(db.Model):
     """Расписание повторяющихся тренировок"""
     __tablename__ = 'training_schedules'
@@ -24,6 +24,11 @@ class User(UserMixin, db.Model):
     last_login = db.Column(db.DateTime)
     last_activity = db.Column(db.DateTime)
     
+    # Счетчик непрочитанных уведомлений (поддерживается app.utils.notifications)
+    unread_notifications_count = db.Column(db.Integer, default=0, nullable=False)
+    # Штрафные баллы за отклоненный контент (поддерживаются app.utils.moderation_queue)
+    penalty_points = db.Column(db.Integer, default=0, nullable=False)
+    
     # Связи - все с явным указанием foreign_keys
     
     # Профиль пользователя
@@ -215,7 +220,7 @@ class User(UserMixin, db.Model):
     
     def get_unread_notifications_count(self):
         """Получить количество непрочитанных уведомлений"""
-        return self.notifications.filter_by(is_read=False).count()
+        return self.unread_notifications_count or 0
     
     def get_active_goals(self):
         """Получить активные цели пользователя"""
@@ -310,8 +315,10 @@ class Trainer(db.Model):
     is_available = db.Column(db.Boolean, default=True)
     
     # Рейтинги и статистика
-    rating = db.Column(db.Float, default=0.0)
+    rating = db.Column(db.Float, default=0.0)  # среднее, см. app/utils/ratings.py
     total_ratings = db.Column(db.Integer, default=0)
+    rating_sum = db.Column(db.Float, default=0.0)
+    rating_score = db.Column(db.Float, default=0.0)
     completed_sessions = db.Column(db.Integer, default=0)
     
     # Расписание
@@ -359,13 +366,6 @@ class Trainer(db.Model):
             ).order_by(Training.schedule_time.desc()).all()
         return []
     
-    def update_rating(self, new_rating):
-        """Обновление рейтинга тренера"""
-        total_score = self.rating * self.total_ratings + new_rating
-        self.total_ratings += 1
-        self.rating = round(total_score / self.total_ratings, 2)
-        db.session.commit()
-    
     def get_work_schedule_dict(self):
         """Получить расписание работы в виде словаря"""
         import json
@@ -0,0 +1,201 @@
+"""
+JSON API и потоки событий
+"""
+
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context, url_for, abort
+from flask_login import login_required, current_user
+import logging
+
+from app.models.media import UploadedFile, UploadSession
+from app.models.training import Training
+from app.utils import notifications as notification_service
+from app.utils import chunked_upload
+
+bp = Blueprint('api', __name__, url_prefix='/api')
+
+# Настройка логирования
+logger = logging.getLogger(__name__)
+
+@bp.route('/notifications')
+@login_required
+def notifications_list():
+    """Входящие уведомления (keyset-пагинация: ?before=<id>&limit=<n>&unread=1)"""
+    before_id = request.args.get('before', type=int)
+    limit = request.args.get('limit', notification_service.INBOX_PAGE_SIZE, type=int)
+    unread_only = request.args.get('unread', '0') in ('1', 'true')
+    
+    items, next_cursor = notification_service.list_inbox(
+        current_user.id,
+        before_id=before_id,
+        limit=limit,
+        unread_only=unread_only
+    )
+    
+    return jsonify({
+        'notifications': [n.to_dict() for n in items],
+        'next_cursor': next_cursor,
+        'unread_count': notification_service.get_unread_count(current_user.id)
+    })
+
+@bp.route('/notifications/unread-count')
+@login_required
+def notifications_unread_count():
+    """Количество непрочитанных уведомлений"""
+    return jsonify({'count': notification_service.get_unread_count(current_user.id)})
+
+@bp.route('/notifications/<int:notification_id>/read', methods=['POST'])
+@login_required
+def notification_read(notification_id):
+    """Отметка одного уведомления прочитанным"""
+    updated = notification_service.mark_read(current_user.id, [notification_id])
+    
+    return jsonify({
+        'success': True,
+        'updated': updated,
+        'unread_count': notification_service.get_unread_count(current_user.id)
+    })
+
+@bp.route('/notifications/read', methods=['POST'])
+@login_required
+def notifications_read():
+    """Массовая отметка прочитанными: {"ids": [...]} или {"all": true}"""
+    data = request.get_json(silent=True) or {}
+    
+    if data.get('all'):
+        ids = None
+    else:
+        ids = data.get('ids')
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            return jsonify({'success': False, 'message': 'Ожидается список ids или all=true'}), 400
+    
+    updated = notification_service.mark_read(current_user.id, ids)
+    
+    return jsonify({
+        'success': True,
+        'updated': updated,
+        'unread_count': notification_service.get_unread_count(current_user.id)
+    })
+
+@bp.route('/uploads/<int:upload_id>')
+@login_required
+def upload_status(upload_id):
+    """Статус обработки загруженного файла и ссылки на готовые варианты"""
+    upload = UploadedFile.query.get_or_404(upload_id)
+    if upload.user_id != current_user.id and current_user.role != 'admin':
+        return jsonify({'success': False, 'message': 'Доступ запрещен'}), 403
+    
+    return jsonify(upload.to_dict(url_prefix=current_app.config['UPLOAD_URL_PATH']))
+
+def _get_upload_session(token):
+    """Сеанс загрузки текущего пользователя"""
+    session = UploadSession.query.filter_by(token=token).first_or_404()
+    if session.user_id != current_user.id:
+        abort(404)
+    return session
+
+def _upload_response(session, status=200):
+    data = session.to_dict()
+    data['chunk_size'] = current_app.config['UPLOAD_CHUNK_SIZE']
+    
+    response = jsonify(data)
+    response.status_code = status
+    response.headers['Upload-Offset'] = str(session.offset)
+    response.headers['Upload-Length'] = str(session.total_size)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@bp.errorhandler(chunked_upload.UploadError)
+def handle_upload_error(error):
+    return jsonify({'success': False, 'message': error.message}), error.status
+
+@bp.route('/uploads/videos', methods=['POST'])
+@login_required
+def video_upload_init():
+    """Создание сеанса загрузки видео: {"filename", "size", "sha256"?, "training_id"?}"""
+    if current_user.role not in ('trainer', 'admin'):
+        return jsonify({'success': False, 'message': 'Загружать видео могут только тренеры'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    training_id = data.get('training_id')
+    if training_id is not None:
+        training = Training.query.get_or_404(training_id)
+        if training.trainer_user_id != current_user.id and current_user.role != 'admin':
+            return jsonify({'success': False, 'message': 'Доступ запрещен'}), 403
+    
+    session = chunked_upload.create_session(
+        current_user.id,
+        data.get('filename'),
+        data.get('size'),
+        expected_sha256=data.get('sha256'),
+        training_id=training_id
+    )
+    
+    response = _upload_response(session, status=201)
+    response.headers['Location'] = url_for('api.video_upload_chunk', token=session.token)
+    return response
+
+@bp.route('/uploads/videos/<token>', methods=['HEAD', 'GET'])
+@login_required
+def video_upload_status(token):
+    """Подтвержденное смещение (с него клиент продолжает после обрыва)"""
+    return _upload_response(_get_upload_session(token))
+
+@bp.route('/uploads/videos/<token>', methods=['PUT', 'PATCH'])
+@login_required
+def video_upload_chunk(token):
+    """Часть файла: тело — байты, заголовки Upload-Offset и (необязательно) Upload-Checksum"""
+    session = _get_upload_session(token)
+    
+    offset = request.headers.get('Upload-Offset', type=int)
+    if offset is None:
+        return jsonify({'success': False, 'message': 'Не указан заголовок Upload-Offset'}), 400
+    
+    checksum = chunked_upload.parse_checksum(request.headers.get('Upload-Checksum'))
+    session.offset = chunked_upload.write_chunk(
+        session,
+        offset,
+        request.stream,
+        request.content_length,
+        checksum=checksum
+    )
+    return _upload_response(session)
+
+@bp.route('/uploads/videos/<token>/finalize', methods=['POST'])
+@login_required
+def video_upload_finalize(token):
+    """Сборка загруженного файла"""
+    session = _get_upload_session(token)
+    uploaded_file = chunked_upload.finalize(session)
+    
+    return jsonify({
+        'success': True,
+        'upload': session.to_dict(),
+        'file': uploaded_file.to_dict(url_prefix=current_app.config['UPLOAD_URL_PATH'])
+    })
+
+@bp.route('/uploads/videos/<token>', methods=['DELETE'])
+@login_required
+def video_upload_abort(token):
+    """Отмена загрузки"""
+    chunked_upload.abort(_get_upload_session(token))
+    return '', 204
+
+@bp.route('/notifications/stream')
+@login_required
+def notifications_stream():
+    """Поток уведомлений и счетчика непрочитанных (Server-Sent Events)"""
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    if last_event_id is None:
+        last_event_id = request.args.get('last_event_id', type=int)
+    
+    events = notification_service.stream_events(
+        current_user.id,
+        last_event_id=last_event_id,
+        poll_interval=current_app.config['NOTIFICATIONS_STREAM_POLL_INTERVAL']
+    )
+    
+    response = Response(stream_with_context(events), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Отключаем буферизацию ответа на nginx
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
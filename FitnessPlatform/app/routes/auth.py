@@ -15,6 +15,8 @@ from app.forms.auth import (
 )
 from app.models import User, UserProfile, Trainer, Client, AuditLog
 from app.utils.decorators import role_required
+from app.utils import ratings
+from app.utils.file_upload import save_uploaded_file
 import traceback 
 
 bp = Blueprint('auth', __name__, url_prefix='/auth')
@@ -255,6 +257,45 @@ def profile():
     
     return render_template('auth/profile.html', form=form, title='Мой профиль')
 
+@bp.route('/profile/update-avatar', methods=['POST'])
+@login_required
+def update_avatar():
+    """Смена аватара: файл (обрабатывается в фоне) или ссылка"""
+    avatar_file = request.files.get('avatar')
+    
+    if avatar_file:
+        file_info = save_uploaded_file(
+            avatar_file,
+            upload_folder='avatars',
+            file_type='image',
+            user_id=current_user.id,
+            purpose='avatar'
+        )
+        if not file_info:
+            return jsonify({'success': False, 'message': 'Недопустимый файл изображения'}), 400
+        
+        # Ответ не ждет обработки: готовность варианта видна по статусу загрузки
+        return jsonify({
+            'success': True,
+            'upload_id': file_info['upload_id'],
+            'status': file_info['status'],
+            'status_url': url_for('api.upload_status', upload_id=file_info['upload_id'])
+        }), 202
+    
+    data = request.get_json(silent=True) or {}
+    avatar_url = (data.get('avatar_url') or '').strip()
+    if not avatar_url.startswith(('http://', 'https://')) or len(avatar_url) > 500:
+        return jsonify({'success': False, 'message': 'Некорректная ссылка на изображение'}), 400
+    
+    user_profile = current_user.profile
+    if not user_profile:
+        user_profile = UserProfile(user_id=current_user.id)
+        db.session.add(user_profile)
+    user_profile.avatar_url = avatar_url
+    db.session.commit()
+    
+    return jsonify({'success': True, 'status': 'ready'})
+
 @bp.route('/profile/trainer', methods=['GET', 'POST'])
 @login_required
 @role_required('trainer')
@@ -272,7 +313,10 @@ def trainer_profile():
     
     if form.validate_on_submit():
         try:
+            specialization = trainer.specialization
             form.populate_obj(trainer)
+            if ratings.specialization_key(trainer.specialization) != ratings.specialization_key(specialization):
+                ratings.move_specialization(trainer.user_id, trainer.specialization)
             db.session.commit()
             
             # Логирование обновления профиля тренера
@@ -2,14 +2,19 @@
 from flask import Blueprint, render_template
 from flask_login import current_user
 
+from app.utils.file_serving import serve_upload
+from app.utils.recommendations import recommended_trainings
+
 bp = Blueprint('main', __name__)
 
 @bp.route('/')
 def index():
     """Главная страница"""
     if current_user.is_authenticated:
+        recommended = recommended_trainings(current_user.id) if current_user.role == 'client' else []
         return render_template('index.html', 
                              title='Главная',
+                             recommended=recommended,
                              current_year=2025)
     else:
         return render_template('landing.html',
@@ -28,4 +33,9 @@ def contact():
     """Страница контактов"""
     return render_template('contact.html',
                          title='Контакты',
-                         current_year=2025)
\ No newline at end of file
+                         current_year=2025)
+
+@bp.route('/uploads/<path:filename>')
+def serve_uploaded_file(filename):
+    """Загруженные файлы (аватары, изображения, видео тренировок)"""
+    return serve_upload(filename)
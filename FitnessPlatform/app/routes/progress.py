@@ -13,6 +13,7 @@ from app import db
 from app.forms.progress import ProgressEntryForm, GoalForm, ProgressFilterForm
 from app.models import Progress, Goal, Achievement, ProgressMetric, TrainingRegistration
 from app.utils.decorators import role_required
+from app.utils.replicas import read_replica
 
 bp = Blueprint('progress', __name__, url_prefix='/progress')
 
@@ -21,6 +22,7 @@ logger = logging.getLogger(__name__)
 
 @bp.route('/')
 @login_required
+@read_replica
 def dashboard():
     """Дашборд прогресса пользователя"""
     
@@ -167,6 +169,7 @@ def add_progress():
 
 @bp.route('/history')
 @login_required
+@read_replica
 def history():
     """История прогресса"""
     form = ProgressFilterForm(request.args)
@@ -220,21 +223,18 @@ def history():
     per_page = request.args.get('per_page', 20, type=int)
     progress_entries = query.paginate(page=page, per_page=per_page, error_out=False)
     
-    # Статистика по фильтру
+    # Статистика по фильтру (один агрегирующий запрос с теми же условиями)
+    totals = db.session.query(
+        func.count(Progress.id),
+        func.coalesce(func.sum(Progress.duration), 0),
+        func.coalesce(func.sum(Progress.calories_burned), 0),
+        func.coalesce(func.sum(Progress.distance), 0)
+    ).filter(query.whereclause).one()
     stats = {
-        'count': query.count(),
-        'total_duration': db.session.query(func.coalesce(func.sum(Progress.duration), 0)).filter(
-            Progress.user_id == current_user.id,
-            *query.whereclause
-        ).scalar(),
-        'total_calories': db.session.query(func.coalesce(func.sum(Progress.calories_burned), 0)).filter(
-            Progress.user_id == current_user.id,
-            *query.whereclause
-        ).scalar(),
-        'total_distance': db.session.query(func.coalesce(func.sum(Progress.distance), 0)).filter(
-            Progress.user_id == current_user.id,
-            *query.whereclause
-        ).scalar()
+        'count': totals[0],
+        'total_duration': totals[1],
+        'total_calories': totals[2],
+        'total_distance': totals[3]
     }
     
     return render_template(
@@ -432,6 +432,7 @@ def achievements():
 
 @bp.route('/statistics')
 @login_required
+@read_replica
 def statistics():
     """Подробная статистика"""
     # Временные диапазоны
@@ -508,6 +509,7 @@ def statistics():
 
 @bp.route('/api/chart-data')
 @login_required
+@read_replica
 def chart_data():
     """API данных для графиков"""
     chart_type = request.args.get('type', 'weekly')
@@ -1,18 +1,24 @@
 """Маршруты для тренировок"""
-from flask import Blueprint, render_template, flash, redirect, url_for, request, jsonify
+from flask import Blueprint, render_template, flash, redirect, url_for, request, jsonify, current_app
 from flask_login import login_required, current_user
-from datetime import datetime, timedelta
-import json
+from datetime import datetime
 
 from app import db
-from app.models.training import Training, TrainingCategory, TrainingRegistration
-from app.models.feedback import Feedback, Rating
+from app.models.training import Training, TrainingCategory, TrainingRegistration, Tag
+from app.models.feedback import Feedback, Rating, TrainerRanking
+from app.models.user import Trainer
 from app.forms.training import TrainingForm  # Убедитесь, что это правильный путь
+from app.utils.settings_cache import settings_cache
+from app.utils import fanout, moderation, moderation_queue, recommendations, ratings, registrations, waitlist
+from app.utils.idempotency import idempotent
+from app.utils.replicas import read_replica
+from app.utils.training_terms import split_terms, popular_tags
 
 # Создаем Blueprint здесь
 bp = Blueprint('trainings', __name__, url_prefix='/trainings')
 
 @bp.route('/', endpoint='training_list')
+@read_replica
 def list_trainings():
     """Список всех тренировок"""
     page = request.args.get('page', 1, type=int)
@@ -20,6 +26,8 @@ def list_trainings():
     training_type = request.args.get('type')
     difficulty = request.args.get('difficulty')
     training_date = request.args.get('date')
+    tag = request.args.get('tag', '').strip()
+    no_equipment = request.args.get('no_equipment') == '1'
     
     query = Training.query.filter(Training.status.in_(['active', 'approved', 'draft']))
     
@@ -37,6 +45,12 @@ def list_trainings():
         except ValueError:
             pass
     
+    # EXISTS по индексу связи (tag_id, training_id)
+    if tag:
+        query = query.filter(Training.tags.any(Tag.key == Tag.key_for(tag)))
+    if no_equipment:
+        query = query.filter(~Training.equipment.any())
+    
     # Только активные для обычных пользователей
     if not current_user.is_authenticated or current_user.role not in ['trainer', 'admin']:
         query = query.filter(Training.status.in_(['active', 'approved']))
@@ -52,6 +66,7 @@ def list_trainings():
     return render_template('trainings/list.html',
                          trainings=trainings.items,
                          categories=categories,
+                         popular_tags=popular_tags(),
                          pagination=trainings)
 
 @bp.route('/my')
@@ -187,27 +202,17 @@ def create_training():
                 materials_link=form.materials_link.data,
                 price=form.price.data or 0.0,
                 currency=form.currency.data,
-                # Используем текстовые поля формы
-                medical_contraindications=form.medical_contraindications.data,
-                required_equipment=form.required_equipment.data,
-                tags=form.tags.data,
                 keywords=form.keywords.data,
                 language=form.language.data,
                 status='draft' if current_user.role == 'trainer' else 'active'
             )
             
-            # Если динамические поля не пустые, добавляем их в соответствующие поля
-            if equipment:
-                if training.required_equipment:
-                    training.required_equipment += "\n" + "\n".join(equipment)
-                else:
-                    training.required_equipment = "\n".join(equipment)
-            
-            if contraindications:
-                if training.medical_contraindications:
-                    training.medical_contraindications += "\n" + "\n".join(contraindications)
-                else:
-                    training.medical_contraindications = "\n".join(contraindications)
+            # Текстовые поля формы и динамические поля — в справочники
+            training.set_terms(
+                tags=split_terms(form.tags.data),
+                equipment=split_terms(form.required_equipment.data) + equipment,
+                contraindications=split_terms(form.medical_contraindications.data) + contraindications
+            )
             
             db.session.add(training)
             db.session.commit()
@@ -274,33 +279,26 @@ def detail(training_id):
     for rating_type, data in ratings_summary.items():
         avg_ratings[rating_type] = data['sum'] / data['count'] if data['count'] > 0 else 0
     
-    # Парсим JSON данные
-    equipment = []
-    contraindications = []
-    
-    if training.required_equipment:
-        try:
-            equipment = json.loads(training.required_equipment)
-        except:
-            equipment = [training.required_equipment] if training.required_equipment else []
-    
-    if training.medical_contraindications:
-        try:
-            contraindications = json.loads(training.medical_contraindications)
-        except:
-            contraindications = [training.medical_contraindications] if training.medical_contraindications else []
+    # Отменить предстоящую тренировку может ее тренер или администратор
+    can_cancel_training = (current_user.is_authenticated
+                           and (current_user.role == 'admin' or training.trainer_user_id == current_user.id)
+                           and training.status not in ('cancelled', 'completed', 'rejected')
+                           and training.is_upcoming)
     
     return render_template('trainings/detail.html',
                          training=training,
+                         can_cancel_training=can_cancel_training,
                          registration=registration,
                          feedback=feedback,
                          feedbacks=feedbacks,
                          avg_ratings=avg_ratings,
-                         equipment=equipment,
-                         contraindications=contraindications)
+                         waitlist_position=waitlist.position(registration),
+                         equipment=training.equipment_names,
+                         contraindications=training.contraindication_names)
 
 @bp.route('/<int:training_id>/register', methods=['POST'])
 @login_required
+@idempotent
 def register(training_id):
     """Запись на тренировку"""
     training = Training.query.get_or_404(training_id)
@@ -310,57 +308,44 @@ def register(training_id):
         flash('Вы не можете записаться на свою собственную тренировку', 'danger')
         return redirect(url_for('trainings.detail', training_id=training_id))
     
-    if training.is_full:
-        flash('На эту тренировку нет свободных мест', 'danger')
-        return redirect(url_for('trainings.detail', training_id=training_id))
-    
     if not training.is_upcoming:
         flash('Нельзя записаться на прошедшую тренировку', 'danger')
         return redirect(url_for('trainings.detail', training_id=training_id))
     
+    # Проверка лимита тренировок в день
+    max_per_day = settings_cache.get('max_trainings_per_day')
+    if max_per_day and training.count_user_trainings_on_day(current_user.id) >= max_per_day:
+        flash(f'Нельзя записаться больше чем на {max_per_day} тренировки в день', 'danger')
+        return redirect(url_for('trainings.detail', training_id=training_id))
+    
     # Проверка накладки времени
     conflicting_training = training.check_time_conflict(current_user.id)
     if conflicting_training:
         flash(f'У вас уже есть тренировка в это время: {conflicting_training.title}', 'danger')
         return redirect(url_for('trainings.detail', training_id=training_id))
     
-    # Проверка существующей регистрации
-    existing_registration = TrainingRegistration.query.filter_by(
-        user_id=current_user.id,
-        training_id=training_id
-    ).first()
-    
-    # Если есть активная регистрация
-    if existing_registration and existing_registration.status == 'registered':
-        flash('Вы уже записаны на эту тренировку', 'info')
-        return redirect(url_for('trainings.detail', training_id=training_id))
-    
-    # Если регистрация отменена, АКТИВИРУЕМ ее снова
-    if existing_registration and existing_registration.status == 'cancelled':
-        existing_registration.status = 'registered'
-        existing_registration.cancelled_at = None
-        existing_registration.cancellation_reason = None
-        
-        db.session.commit()
-        flash('Ваша запись восстановлена!', 'success')
-        return redirect(url_for('trainings.detail', training_id=training_id))
-    
-    # Создание новой регистрации (если нет регистрации)
-    registration = TrainingRegistration(
-        user_id=current_user.id,
-        training_id=training_id,
-        payment_amount=training.price
-    )
-    
-    db.session.add(registration)
-    training.registrations_count += 1
+    # Место или лист ожидания — оптимистической блокировкой по версии тренировки
+    result, place = registrations.register(training, current_user.id)
     db.session.commit()
     
-    flash(f'Вы успешно записались на тренировку "{training.title}"!', 'success')
+    if result == 'registered':
+        recommendations.schedule_refresh(current_user.id)
+        flash(f'Вы успешно записались на тренировку "{training.title}"!', 'success')
+    elif result == 'waitlisted':
+        flash(f'Свободных мест нет. Вы в листе ожидания, место в очереди: {place}', 'info')
+    elif result == 'already_registered':
+        flash('Вы уже записаны на эту тренировку', 'info')
+    elif result == 'already_waitlisted':
+        flash(f'Вы уже в листе ожидания, место в очереди: {place}', 'info')
+    elif result == 'closed':
+        flash('Запись на эту тренировку закрыта', 'danger')
+    else:
+        flash('Слишком много одновременных записей, попробуйте еще раз', 'warning')
     return redirect(url_for('trainings.detail', training_id=training_id))
 
 @bp.route('/<int:training_id>/cancel', methods=['POST'])
 @login_required
+@idempotent
 def cancel_registration(training_id):
     """Отмена записи на тренировку"""
     registration = TrainingRegistration.query.filter_by(
@@ -368,24 +353,41 @@ def cancel_registration(training_id):
         training_id=training_id
     ).first_or_404()
     
+    # Выход из листа ожидания
+    if registration.status == 'waitlisted':
+        waitlist.leave(registration, 'Покинул лист ожидания')
+        db.session.commit()
+        flash('Вы покинули лист ожидания', 'success')
+        return redirect(url_for('trainings.detail', training_id=training_id))
+    
     # Проверяем, что регистрация активна
     if registration.status != 'registered':
         flash('Эта регистрация уже не активна', 'danger')
         return redirect(url_for('trainings.detail', training_id=training_id))
     
     # Проверяем, можно ли отменить регистрацию
-    cancellation_deadline = registration.training.schedule_time - timedelta(hours=1)
-    if datetime.utcnow() >= cancellation_deadline:
+    if not registration.can_be_cancelled:
         flash('Слишком поздно для отмены регистрации', 'danger')
         return redirect(url_for('trainings.detail', training_id=training_id))
     
-    # Меняем статус на 'cancelled'
-    registration.status = 'cancelled'
-    registration.cancelled_at = datetime.utcnow()
-    registration.cancellation_reason = 'Отменено пользователем'
-    
+    # Место освобождает только одна из повторных отмен; его получает первый в листе ожидания
+    cancelled, promoted_user_id = registrations.cancel(registration, 'Отменено пользователем')
     db.session.commit()
     
+    if not cancelled:
+        flash('Эта регистрация уже не активна', 'info')
+        return redirect(url_for('trainings.detail', training_id=training_id))
+    
+    if promoted_user_id:
+        training = registration.training
+        fanout.dispatch(
+            fanout.notify_user,
+            promoted_user_id,
+            'waitlist_promoted',
+            fanout.training_context(training),
+            action_url=url_for('trainings.detail', training_id=training_id)
+        )
+    
     flash('Регистрация на тренировку отменена', 'success')
     return redirect(url_for('trainings.detail', training_id=training_id))
 
@@ -442,12 +444,14 @@ def add_feedback(training_id):
     db.session.add(feedback)
     db.session.add(rating_obj)
     db.session.commit()
+    recommendations.schedule_refresh(current_user.id)
     
     flash('Спасибо за ваш отзыв! Он будет опубликован после проверки.', 'success')
     return redirect(url_for('trainings.detail', training_id=training_id))
 
 @bp.route('/calendar')
 @login_required
+@read_replica
 def calendar():
     """Календарь тренировок"""
     # Получаем месяц и год из запроса
@@ -485,6 +489,7 @@ def calendar():
 # Добавим новый маршрут для одобрения тренировок
 @bp.route('/<int:training_id>/approve', methods=['POST'])
 @login_required
+@idempotent
 def approve_training(training_id):
     """Одобрение тренировки (для админа)"""
     if current_user.role != 'admin':
@@ -493,24 +498,16 @@ def approve_training(training_id):
     
     training = Training.query.get_or_404(training_id)
     
-    # Меняем статус на 'active' или 'approved'
-    training.status = 'active'  # или 'approved', в зависимости от вашей модели
-    
-    # Если есть поле для отметки об одобрении
-    training.approved_by = current_user.id
-    training.approved_at = datetime.utcnow()
-    training.is_visible = True  # Делаем видимой для клиентов
-    
-    # Отправляем уведомление тренеру
-    # send_notification(training.trainer_user_id, 'training_approved', training.id)
-    
-    db.session.commit()
-    
-    flash(f'Тренировка "{training.title}" одобрена и теперь видна клиентам!', 'success')
+    # Тот же путь, что и у пачки в консоли: счетчик, аудит и уведомление тренеру (в фоне)
+    if moderation.moderate([training.id], 'approve', current_user.id, request=request):
+        flash(f'Тренировка "{training.title}" одобрена и теперь видна клиентам!', 'success')
+    else:
+        flash(f'Тренировка "{training.title}" уже не на проверке', 'info')
     return redirect(url_for('trainings.detail', training_id=training_id))
 
 @bp.route('/<int:training_id>/reject', methods=['POST'])
 @login_required
+@idempotent
 def reject_training(training_id):
     """Отклонение тренировки (для админа)"""
     if current_user.role != 'admin':
@@ -520,44 +517,207 @@ def reject_training(training_id):
     training = Training.query.get_or_404(training_id)
     
     # Получаем причину отклонения
-    reason = request.form.get('reason', 'Тренировка не соответствует требованиям')
+    reason = request.form.get('reason', '').strip() or moderation.DEFAULT_REJECT_REASON
     
-    # Меняем статус
-    training.status = 'rejected'
-    training.rejection_reason = reason
-    training.rejected_by = current_user.id
-    training.rejected_at = datetime.utcnow()
-    training.is_visible = False
+    if moderation.moderate([training.id], 'reject', current_user.id, reason=reason, request=request):
+        flash(f'Тренировка "{training.title}" отклонена', 'success')
+    else:
+        flash(f'Тренировка "{training.title}" уже не на проверке', 'info')
+    return redirect(url_for('trainings.detail', training_id=training_id))
+
+@bp.route('/<int:training_id>/cancel-training', methods=['POST'])
+@login_required
+@idempotent
+def cancel_training(training_id):
+    """Отмена тренировки тренером или администратором"""
+    training = Training.query.get_or_404(training_id)
     
-    # Отправляем уведомление тренеру
-    # send_notification(training.trainer_user_id, 'training_rejected', training.id, reason=reason)
+    if current_user.role != 'admin' and training.trainer_user_id != current_user.id:
+        flash('Отменить тренировку может только ее тренер или администратор', 'danger')
+        return redirect(url_for('trainings.detail', training_id=training_id))
     
+    reason = request.form.get('reason', '').strip()
+    # Тренировка, записи и лист ожидания — в одной транзакции
+    user_ids = registrations.cancel_training(training, reason)
     db.session.commit()
     
-    flash(f'Тренировка "{training.title}" отклонена', 'success')
+    if user_ids is None:
+        flash('Тренировка уже отменена или завершена', 'info')
+        return redirect(url_for('trainings.detail', training_id=training_id))
+    
+    # Уведомляем всех, кто был записан или стоял в очереди (в фоне, запрос не ждет рассылки)
+    if user_ids:
+        fanout.dispatch(
+            fanout.notify_training_registrants,
+            training.id,
+            'training_cancelled',
+            fanout.training_context(training, reason=reason),
+            action_url=url_for('trainings.detail', training_id=training.id),
+            user_ids=user_ids
+        )
+    
+    flash(f'Тренировка "{training.title}" отменена, участники получат уведомление', 'success')
     return redirect(url_for('trainings.detail', training_id=training_id))
 
+@bp.route('/trainers/top')
+@read_replica
+def top_trainers():
+    """Лучшие тренеры: общий рейтинг, по специализации или по категории"""
+    specialization = ratings.specialization_key(request.args.get('specialization'))
+    category_id = request.args.get('category', type=int)
+    
+    if category_id:
+        scope, key = TrainerRanking.SCOPE_CATEGORY, str(category_id)
+    elif specialization:
+        scope, key = TrainerRanking.SCOPE_SPECIALIZATION, specialization
+    else:
+        scope, key = TrainerRanking.SCOPE_ALL, ''
+    
+    # Названия специализаций для фильтра: тренеров немного, ключи считаются в Python
+    specializations = {}
+    for (name,) in db.session.query(Trainer.specialization).filter(Trainer.specialization.isnot(None)).distinct():
+        if ratings.specialization_key(name):
+            specializations.setdefault(ratings.specialization_key(name), name.strip())
+    
+    return render_template('trainings/top_trainers.html',
+                         leaders=ratings.top_trainers(scope, key),
+                         top_trainings=ratings.top_trainings(category_id) if category_id else [],
+                         categories=TrainingCategory.query.filter_by(is_active=True).all(),
+                         specializations=sorted(specializations.items(), key=lambda item: item[1]),
+                         selected_specialization=specialization,
+                         selected_category=category_id)
+
 @bp.route('/admin/pending')
 @login_required
 def admin_pending_trainings():
-    """Страница с тренировками на проверку (для админа)"""
+    """Консоль модерации: очередь тренировок на проверку (для админа)"""
     if current_user.role != 'admin':
         flash('Доступ запрещен', 'danger')
         return redirect(url_for('main.index'))
     
-    page = request.args.get('page', 1, type=int)
-    
-    # Тренировки на проверке
-    pending_trainings = Training.query.filter(
-        Training.status.in_(['draft', 'pending'])
-    ).order_by(Training.created_at.desc()).paginate(page=page, per_page=10)
+    # Keyset-пагинация по (created_at, id): курсор вместо номера страницы
+    after = request.args.get('after')
+    trainings, next_cursor = moderation.pending_page(after)
     
     return render_template('trainings/admin/pending.html',
-                         trainings=pending_trainings.items,
-                         pagination=pending_trainings)
+                         trainings=trainings,
+                         next_cursor=next_cursor,
+                         after=after,
+                         pending_count=moderation.pending_trainings_count(),
+                         max_batch_size=moderation.MAX_BATCH_SIZE)
+
+@bp.route('/admin/moderate', methods=['POST'])
+@login_required
+@idempotent
+def admin_moderate_trainings():
+    """Одобрение или отклонение отмеченных тренировок одним запросом (для админа)"""
+    if current_user.role != 'admin':
+        flash('Доступ запрещен', 'danger')
+        return redirect(url_for('main.index'))
+    
+    action = request.form.get('action')
+    training_ids = request.form.getlist('training_ids', type=int)
+    back = redirect(url_for('trainings.admin_pending_trainings', after=request.form.get('after') or None))
+    
+    if action not in moderation.ACTIONS or not training_ids:
+        flash('Отметьте тренировки и выберите действие', 'warning')
+        return back
+    if len(training_ids) > moderation.MAX_BATCH_SIZE:
+        flash(f'За один раз можно обработать не больше {moderation.MAX_BATCH_SIZE} тренировок', 'warning')
+        return back
+    
+    reason = request.form.get('reason', '').strip() or None
+    changed = moderation.moderate(training_ids, action, current_user.id, reason=reason, request=request)
+    
+    verb = 'одобрено' if action == 'approve' else 'отклонено'
+    flash(f'Тренировок {verb}: {len(changed)}', 'success')
+    skipped = len(set(training_ids)) - len(changed)
+    if skipped:
+        flash(f'Пропущено (уже не на проверке): {skipped}', 'info')
+    return back
+
+@bp.route('/admin/queue')
+@login_required
+def admin_content_queue():
+    """Общая очередь модерации отзывов, комментариев и жалоб (для админа)"""
+    if current_user.role != 'admin':
+        flash('Доступ запрещен', 'danger')
+        return redirect(url_for('main.index'))
+    
+    after = request.args.get('after')
+    content_type = request.args.get('type')
+    items, previews, next_cursor = moderation_queue.page(after, content_type)
+    
+    return render_template('trainings/admin/content_queue.html',
+                         items=items,
+                         previews=previews,
+                         next_cursor=next_cursor,
+                         after=after,
+                         content_type=content_type,
+                         now=datetime.utcnow(),
+                         current_priority=moderation_queue.current_priority)
+
+@bp.route('/admin/queue/claim', methods=['POST'])
+@login_required
+def admin_claim_content():
+    """Захват пачки самых приоритетных элементов очереди (для админа)"""
+    if current_user.role != 'admin':
+        flash('Доступ запрещен', 'danger')
+        return redirect(url_for('main.index'))
+    
+    content_type = request.form.get('type') or None
+    claimed = moderation_queue.claim(current_user.id, content_type=content_type)
+    if claimed:
+        minutes = current_app.config['MODERATION_LEASE_SECONDS'] // 60
+        flash(f'Захвачено элементов: {claimed}. Решите их в течение {minutes} мин.', 'success')
+    else:
+        flash('Свободных элементов в очереди нет', 'info')
+    return redirect(url_for('trainings.admin_content_queue', type=content_type))
+
+@bp.route('/admin/queue/release', methods=['POST'])
+@login_required
+def admin_release_content():
+    """Возврат своих нерешенных элементов в очередь (для админа)"""
+    if current_user.role != 'admin':
+        flash('Доступ запрещен', 'danger')
+        return redirect(url_for('main.index'))
+    
+    released = moderation_queue.release(current_user.id)
+    flash(f'Возвращено в очередь: {released}', 'info')
+    return redirect(url_for('trainings.admin_content_queue'))
+
+@bp.route('/admin/queue/decide', methods=['POST'])
+@login_required
+@idempotent
+def admin_decide_content():
+    """Решение по отмеченным захваченным элементам очереди (для админа)"""
+    if current_user.role != 'admin':
+        flash('Доступ запрещен', 'danger')
+        return redirect(url_for('main.index'))
+    
+    decision = request.form.get('decision')
+    item_ids = request.form.getlist('item_ids', type=int)
+    back = redirect(url_for('trainings.admin_content_queue', type=request.form.get('type') or None))
+    
+    if decision not in moderation_queue.DECISIONS or not item_ids:
+        flash('Отметьте элементы и выберите решение', 'warning')
+        return back
+    
+    decided = moderation_queue.decide(
+        item_ids, decision, current_user.id,
+        notes=request.form.get('notes', '').strip() or None,
+        penalty=max(0, min(request.form.get('penalty', 0, type=int) or 0, 100)),
+        request=request
+    )
+    total = sum(decided.values())
+    flash(f'Решено элементов: {total}', 'success')
+    if total < len(set(item_ids)):
+        flash(f'Пропущено (срок захвата истек или элемент у другого модератора): {len(set(item_ids)) - total}', 'warning')
+    return back
 
 @bp.route('/api/calendar')
 @login_required
+@read_replica
 def api_calendar():
     """API для календаря (FullCalendar)"""
     start = request.args.get('start')
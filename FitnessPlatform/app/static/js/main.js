@@ -12,9 +12,13 @@ document.addEventListener('DOMContentLoaded', function() {
     initProgressTracking();
     initTrainingRegistration();
     
-    // Обновление уведомлений каждые 30 секунд
+    // Поток уведомлений (SSE), без поддержки EventSource - опрос раз в 30 секунд
     if (window.userAuthenticated) {
-        setInterval(updateNotifications, 30000);
+        if (window.EventSource) {
+            subscribeNotifications();
+        } else {
+            setInterval(updateNotifications, 30000);
+        }
     }
 });
 
@@ -99,7 +103,7 @@ async function updateNotifications() {
         const response = await fetch('/api/notifications');
         if (response.ok) {
             const data = await response.json();
-            updateNotificationBadge(data.notifications.length);
+            updateNotificationBadge(data.unread_count);
             updateNotificationsPanel(data.notifications);
         }
     } catch (error) {
@@ -107,6 +111,34 @@ async function updateNotifications() {
     }
 }
 
+/**
+ * Подписка на поток уведомлений (Server-Sent Events)
+ */
+function subscribeNotifications() {
+    const source = new EventSource('/api/notifications/stream');
+    
+    source.addEventListener('unread', function(e) {
+        const data = JSON.parse(e.data);
+        updateNotificationBadge(data.count);
+    });
+    
+    source.addEventListener('notification', function(e) {
+        const notification = JSON.parse(e.data);
+        const panel = document.getElementById('notificationsPanel');
+        
+        // Открытую панель перерисовываем, иначе обновится при открытии
+        if (panel && panel.classList.contains('show')) {
+            updateNotifications();
+        }
+        
+        if (notification.is_important) {
+            showAlert('info', escapeHtml(notification.title));
+        }
+    });
+    
+    return source;
+}
+
 /**
  * Обновление бейджа уведомлений
  */
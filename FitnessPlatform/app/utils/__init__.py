@@ -34,16 +34,24 @@ from app.utils.helpers import (
     to_json
 )
 
-from app.utils.file_upload import (
-    allowed_file,
-    generate_unique_filename,
-    save_uploaded_file,
-    optimize_image,
-    delete_file,
-    get_file_url,
-    validate_file_size,
-    ALLOWED_EXTENSIONS
-)
+# Загрузка файлов подключается при первом обращении: пакет app.utils
+# импортируется при старте любого процесса, а обработка файлов нужна не всем
+_FILE_UPLOAD_EXPORTS = {
+    'allowed_file',
+    'generate_unique_filename',
+    'save_uploaded_file',
+    'optimize_image',
+    'delete_file',
+    'get_file_url',
+    'validate_file_size',
+    'ALLOWED_EXTENSIONS'
+}
+
+def __getattr__(name):
+    if name in _FILE_UPLOAD_EXPORTS:
+        from app.utils import file_upload
+        return getattr(file_upload, name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 __all__ = [
     # Декораторы
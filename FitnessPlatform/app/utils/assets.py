@@ -0,0 +1,365 @@
+"""
+Сборка и отдача статических ресурсов
+
+Сборка (flask assets build):
+- CSS/JS минифицируются (rcssmin/rjsmin, если установлены; для CSS есть
+  встроенный упрощенный минификатор, JS без rjsmin не минифицируется);
+- каждому файлу дается имя с хэшем содержимого: css/main.<hash>.css;
+- рядом пишутся предсжатые копии .gz и .br (br — при наличии brotli);
+- ссылки url(...) в CSS переписываются на хэшированные имена;
+- соответствие исходных и хэшированных имен пишется в manifest.json.
+
+Во время работы asset_url('css/main.css') возвращает хэшированный URL
+(без манифеста — обычный static), а маршрут /assets/ отдает файлы с
+кэшированием на год (immutable) и выбором предсжатой копии по
+Accept-Encoding.
+
+Библиотеки с CDN (Bootstrap, Font Awesome, FullCalendar, flatpickr,
+Chart.js) можно скачать в static/vendor (flask assets vendor) — тогда при
+ASSETS_USE_CDN=false они проходят через тот же конвейер и отдаются
+локально (для развертывания без доступа к CDN).
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import threading
+import logging
+
+from flask import Blueprint, current_app, request, abort, send_file, url_for
+from werkzeug.security import safe_join
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+HASH_LENGTH = 12
+COMPRESS_MIN_SIZE = 1024
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.json', '.svg', '.txt', '.map', '.ttf', '.eot', '.otf', '.ico'}
+
+# Библиотеки с CDN: ключ -> (URL на CDN, путь копии в static/vendor, дополнительные файлы)
+VENDOR_LIBRARIES = {
+    'bootstrap.css': (
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css',
+        'vendor/bootstrap/css/bootstrap.min.css',
+        {},
+    ),
+    'bootstrap.js': (
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js',
+        'vendor/bootstrap/js/bootstrap.bundle.min.js',
+        {},
+    ),
+    'fontawesome.css': (
+        'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css',
+        'vendor/fontawesome/css/all.min.css',
+        {
+            f'vendor/fontawesome/webfonts/{name}.{ext}':
+                f'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/webfonts/{name}.{ext}'
+            for name in ('fa-brands-400', 'fa-regular-400', 'fa-solid-900', 'fa-v4compatibility')
+            for ext in ('woff2', 'ttf')
+        },
+    ),
+    'fullcalendar.css': (
+        'https://cdn.jsdelivr.net/npm/fullcalendar@5.11.3/main.min.css',
+        'vendor/fullcalendar/main.min.css',
+        {},
+    ),
+    'fullcalendar.js': (
+        'https://cdn.jsdelivr.net/npm/fullcalendar@5.11.3/main.min.js',
+        'vendor/fullcalendar/main.min.js',
+        {},
+    ),
+    'fullcalendar-ru.js': (
+        'https://cdn.jsdelivr.net/npm/fullcalendar@5.11.3/locales/ru.js',
+        'vendor/fullcalendar/locales/ru.js',
+        {},
+    ),
+    'flatpickr.css': (
+        'https://cdn.jsdelivr.net/npm/flatpickr@4.6.13/dist/flatpickr.min.css',
+        'vendor/flatpickr/flatpickr.min.css',
+        {},
+    ),
+    'flatpickr.js': (
+        'https://cdn.jsdelivr.net/npm/flatpickr@4.6.13/dist/flatpickr.min.js',
+        'vendor/flatpickr/flatpickr.min.js',
+        {},
+    ),
+    'flatpickr-ru.js': (
+        'https://cdn.jsdelivr.net/npm/flatpickr@4.6.13/dist/l10n/ru.js',
+        'vendor/flatpickr/l10n/ru.js',
+        {},
+    ),
+    'chart.js': (
+        'https://cdn.jsdelivr.net/npm/chart.js@4.4.0/dist/chart.umd.min.js',
+        'vendor/chartjs/chart.umd.min.js',
+        {},
+    ),
+}
+
+_HASHED_NAME_RE = re.compile(r'\.([0-9a-f]{%d})\.' % HASH_LENGTH)
+_CSS_URL_RE = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+# -- Минификация ---------------------------------------------------------
+
+def minify_css(text):
+    """Минификация CSS (rcssmin или встроенный упрощенный вариант)"""
+    try:
+        import rcssmin
+        return rcssmin.cssmin(text)
+    except ImportError:
+        pass
+    
+    text = re.sub(r'/\*(?!!).*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    text = text.replace(';}', '}')
+    return text.strip()
+
+def minify_js(text):
+    """Минификация JS (только при установленном rjsmin, иначе без изменений)"""
+    try:
+        import rjsmin
+    except ImportError:
+        return text
+    return rjsmin.jsmin(text)
+
+def _compress(path, data):
+    """Предсжатые копии .gz и .br (только если они меньше исходного файла)"""
+    written = []
+    
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data):
+        _write_atomic(path + '.gz', gz)
+        written.append('gz')
+    
+    try:
+        import brotli
+    except ImportError:
+        return written
+    
+    br = brotli.compress(data, quality=11)
+    if len(br) < len(data):
+        _write_atomic(path + '.br', br)
+        written.append('br')
+    return written
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _hashed_name(name, data):
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    root, ext = posixpath.splitext(name)
+    if root.endswith('.min'):
+        root, ext = root[:-4], '.min' + ext
+    return f'{root}.{digest}{ext}'
+
+def _rewrite_css_urls(text, name, manifest):
+    """Ссылки url(...) на другие ресурсы — на их хэшированные имена"""
+    base = posixpath.dirname(name)
+    
+    def replace(match):
+        quote, url = match.group(1), match.group(2).strip()
+        if url.startswith(('data:', 'http:', 'https:', '//', '#', '/')):
+            return match.group(0)
+        
+        # Суффиксы вида ?#iefix и #svg-id сохраняются
+        match_suffix = re.search(r'[?#]', url)
+        if match_suffix:
+            path, suffix = url[:match_suffix.start()], url[match_suffix.start():]
+        else:
+            path, suffix = url, ''
+        
+        target = posixpath.normpath(posixpath.join(base, path))
+        hashed = manifest.get(target)
+        if hashed is None:
+            return match.group(0)
+        
+        relative = posixpath.relpath(hashed, base or '.')
+        return f'url({quote}{relative}{suffix}{quote})'
+    
+    return _CSS_URL_RE.sub(replace, text)
+
+# -- Сборка --------------------------------------------------------------
+
+def build(static_folder, output_folder, minify=True, clean=False):
+    """
+    Сборка ресурсов static_folder в output_folder
+    
+    Returns:
+        dict: манифест {исходное имя: хэшированное имя}
+    """
+    sources = []
+    output_abs = os.path.abspath(output_folder)
+    for root, dirs, files in os.walk(static_folder):
+        if os.path.abspath(root).startswith(output_abs):
+            continue
+        for filename in files:
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            sources.append((name, path))
+    
+    # CSS — последними: ссылки на шрифты и изображения уже есть в манифесте
+    sources.sort(key=lambda item: (item[0].endswith('.css'), item[0]))
+    
+    manifest = {}
+    for name, path in sources:
+        with open(path, 'rb') as f:
+            data = f.read()
+        
+        ext = posixpath.splitext(name)[1].lower()
+        is_minified = '.min.' in posixpath.basename(name)
+        if ext == '.css':
+            text = data.decode('utf-8')
+            if minify and not is_minified:
+                text = minify_css(text)
+            data = _rewrite_css_urls(text, name, manifest).encode('utf-8')
+        elif ext == '.js' and minify and not is_minified:
+            data = minify_js(data.decode('utf-8')).encode('utf-8')
+        
+        hashed = _hashed_name(name, data)
+        target = os.path.join(output_folder, hashed)
+        if not os.path.exists(target):
+            _write_atomic(target, data)
+            if ext in COMPRESSIBLE_EXTENSIONS and len(data) >= COMPRESS_MIN_SIZE:
+                _compress(target, data)
+        manifest[name] = hashed
+    
+    _write_atomic(os.path.join(output_folder, 'manifest.json'),
+                  json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    
+    if clean:
+        _remove_stale(output_folder, manifest)
+    
+    return manifest
+
+def _remove_stale(output_folder, manifest):
+    """Удаление файлов прошлых сборок, которых нет в манифесте"""
+    keep = {'manifest.json'}
+    for hashed in manifest.values():
+        keep.update({hashed, hashed + '.gz', hashed + '.br'})
+    
+    for root, dirs, files in os.walk(output_folder):
+        for filename in files:
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, output_folder).replace(os.sep, '/')
+            if name not in keep:
+                os.remove(path)
+
+def download_vendor(static_folder, timeout=30):
+    """
+    Скачивание библиотек с CDN в static/vendor
+    
+    Returns:
+        list: скачанные пути
+    """
+    import requests
+    
+    downloaded = []
+    for cdn_url, path, extra in VENDOR_LIBRARIES.values():
+        for relative_path, url in [(path, cdn_url)] + list(extra.items()):
+            response = requests.get(url, timeout=timeout)
+            response.raise_for_status()
+            _write_atomic(os.path.join(static_folder, relative_path), response.content)
+            downloaded.append(relative_path)
+    return downloaded
+
+# -- Работа приложения ---------------------------------------------------
+
+class Assets:
+    """Манифест собранных ресурсов и функции шаблонов asset_url/vendor_url"""
+    
+    def __init__(self, app=None):
+        self._manifest = None
+        self._manifest_mtime = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        app.config.setdefault('ASSETS_FOLDER', os.path.join(app.static_folder, 'dist'))
+        app.config.setdefault('ASSETS_URL_PATH', '/assets')
+        app.config.setdefault('ASSETS_USE_CDN', True)
+        
+        app.extensions['assets'] = self
+        app.jinja_env.globals['asset_url'] = self.asset_url
+        app.jinja_env.globals['vendor_url'] = self.vendor_url
+        
+        bp = Blueprint('assets', __name__)
+        bp.add_url_rule(f"{app.config['ASSETS_URL_PATH'].rstrip('/')}/<path:filename>",
+                        'serve', serve_asset)
+        app.register_blueprint(bp)
+    
+    def manifest(self):
+        """Манифест (в режиме отладки перечитывается при изменении)"""
+        path = os.path.join(current_app.config['ASSETS_FOLDER'], 'manifest.json')
+        if self._manifest is not None and not current_app.debug:
+            return self._manifest
+        
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            self._manifest = {}
+            return self._manifest
+        
+        if mtime != self._manifest_mtime:
+            with self._lock:
+                with open(path, encoding='utf-8') as f:
+                    self._manifest = json.load(f)
+                self._manifest_mtime = mtime
+        return self._manifest
+    
+    def asset_url(self, filename):
+        """URL ресурса: хэшированный из сборки или обычный static"""
+        hashed = self.manifest().get(filename)
+        if hashed is None:
+            return url_for('static', filename=filename)
+        return url_for('assets.serve', filename=hashed)
+    
+    def vendor_url(self, name):
+        """URL библиотеки: CDN или локальная копия из сборки"""
+        cdn_url, path, _ = VENDOR_LIBRARIES[name]
+        if current_app.config['ASSETS_USE_CDN'] or path not in self.manifest():
+            return cdn_url
+        return self.asset_url(path)
+
+def _preferred_encoding(path):
+    """Предсжатая копия по Accept-Encoding: (путь, кодировка или None)"""
+    accepted = request.accept_encodings
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if accepted[encoding] and os.path.exists(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+def serve_asset(filename):
+    """Собранный ресурс: immutable-кэширование и предсжатые копии"""
+    folder = current_app.config['ASSETS_FOLDER']
+    path = safe_join(folder, filename)
+    if path is None or filename == 'manifest.json' or not os.path.isfile(path):
+        abort(404)
+    
+    chosen, encoding = _preferred_encoding(path)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    
+    # Хэш в имени файла — уже ETag; у сжатых копий свой ETag
+    match = _HASHED_NAME_RE.search(posixpath.basename(filename))
+    etag = match.group(1) if match else None
+    if etag and encoding:
+        etag = f'{etag}-{encoding}'
+    
+    response = send_file(chosen, mimetype=mimetype, conditional=True, etag=etag or True, max_age=None)
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = IMMUTABLE_MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
+assets = Assets()
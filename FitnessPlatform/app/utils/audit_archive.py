@@ -0,0 +1,176 @@
+"""
+Ретеншн и архивирование логов аудита
+
+Логи аудита разбиты на месячные партиции (AuditLog.partition_month).
+Партиции старше срока хранения выгружаются в сжатые JSON Lines архивы
+(по одному файлу на месяц) и удаляются из базы одним DELETE по партиции.
+Архивы остаются доступными для поиска через iter_archived_logs.
+"""
+import os
+import gzip
+import json
+from datetime import datetime, date
+import logging
+
+from app import db
+from app.models.system import AuditLog, month_key
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_PREFIX = 'audit_logs_'
+ARCHIVE_SUFFIX = '.jsonl.gz'
+
+def archive_filename(partition):
+    """Имя файла архива для партиции YYYYMM"""
+    return f'{ARCHIVE_PREFIX}{partition // 100:04d}_{partition % 100:02d}{ARCHIVE_SUFFIX}'
+
+def parse_archive_filename(filename):
+    """Партиция YYYYMM по имени файла архива или None"""
+    if not (filename.startswith(ARCHIVE_PREFIX) and filename.endswith(ARCHIVE_SUFFIX)):
+        return None
+    
+    stem = filename[len(ARCHIVE_PREFIX):-len(ARCHIVE_SUFFIX)]
+    try:
+        year, month = stem.split('_')
+        return int(year) * 100 + int(month)
+    except ValueError:
+        return None
+
+def retention_cutoff(retention_months, today=None):
+    """Первая партиция, которая еще хранится в базе"""
+    today = today or date.today()
+    months = today.year * 12 + (today.month - 1) - retention_months
+    return (months // 12) * 100 + months % 12 + 1
+
+def list_partitions():
+    """Партиции в базе: список (partition_month, количество записей)"""
+    return db.session.query(
+        AuditLog.partition_month,
+        db.func.count(AuditLog.id)
+    ).group_by(AuditLog.partition_month).order_by(AuditLog.partition_month).all()
+
+def list_archives(archive_folder):
+    """Архивные партиции на диске: список (partition_month, путь)"""
+    if not os.path.isdir(archive_folder):
+        return []
+    
+    archives = []
+    for filename in os.listdir(archive_folder):
+        partition = parse_archive_filename(filename)
+        if partition is not None:
+            archives.append((partition, os.path.join(archive_folder, filename)))
+    return sorted(archives)
+
+def _read_archive(path):
+    """Построчное чтение архива"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def archive_partition(partition, archive_folder, batch_size=1000):
+    """
+    Выгрузка одной партиции в архив и удаление ее из базы
+    
+    Архив пишется во временный файл и атомарно переименовывается, поэтому
+    прерванный запуск не оставляет битых архивов. Если архив партиции уже
+    существует (повторный запуск после сбоя до DELETE), записи сливаются
+    без дубликатов.
+    
+    Returns:
+        int: количество выгруженных записей
+    """
+    os.makedirs(archive_folder, exist_ok=True)
+    path = os.path.join(archive_folder, archive_filename(partition))
+    tmp_path = path + '.tmp'
+    
+    archived = 0
+    seen_ids = set()
+    
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as out:
+        if os.path.exists(path):
+            for record in _read_archive(path):
+                seen_ids.add(record['id'])
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        
+        # Keyset-проход по партиции, чтобы не держать ее целиком в памяти
+        last_id = 0
+        while True:
+            batch = AuditLog.query.filter(
+                AuditLog.partition_month == partition,
+                AuditLog.id > last_id
+            ).order_by(AuditLog.id).limit(batch_size).all()
+            
+            if not batch:
+                break
+            
+            for log in batch:
+                if log.id not in seen_ids:
+                    out.write(json.dumps(log.to_dict(), ensure_ascii=False) + '\n')
+                    archived += 1
+            
+            last_id = batch[-1].id
+            db.session.expunge_all()
+    
+    os.replace(tmp_path, path)
+    
+    AuditLog.query.filter(
+        AuditLog.partition_month == partition
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    
+    logger.info(f'Audit partition {partition} archived: {archived} records -> {path}')
+    return archived
+
+def archive_expired_partitions(archive_folder, retention_months, batch_size=1000, today=None):
+    """
+    Архивирование всех партиций старше срока хранения
+    
+    Returns:
+        dict: партиция -> количество выгруженных записей
+    """
+    cutoff = retention_cutoff(retention_months, today)
+    expired = [partition for partition, _ in list_partitions() if partition < cutoff]
+    
+    return {
+        partition: archive_partition(partition, archive_folder, batch_size)
+        for partition in expired
+    }
+
+def _matches(record, filters):
+    """Проверка записи архива на соответствие фильтрам"""
+    for key, value in filters.items():
+        if value is not None and record.get(key) != value:
+            return False
+    return True
+
+def iter_archived_logs(archive_folder, since=None, until=None, **filters):
+    """
+    Поиск по архивам
+    
+    Архивы читаются от новых партиций к старым, и только те, что
+    пересекаются с интервалом [since, until).
+    
+    Args:
+        archive_folder: папка с архивами
+        since, until: границы интервала (datetime)
+        **filters: точное совпадение полей (action, resource_type, resource_id, user_id)
+    """
+    if filters.get('resource_id') is not None:
+        filters['resource_id'] = str(filters['resource_id'])
+    
+    first = month_key(since) if since else None
+    last = month_key(until) if until else None
+    
+    for partition, path in reversed(list_archives(archive_folder)):
+        if (first and partition < first) or (last and partition > last):
+            continue
+        
+        for record in _read_archive(path):
+            created_at = datetime.fromisoformat(record['created_at']) if record.get('created_at') else None
+            if since and (created_at is None or created_at < since):
+                continue
+            if until and (created_at is None or created_at >= until):
+                continue
+            if _matches(record, filters):
+                yield record
@@ -0,0 +1,53 @@
+"""
+Фоновые задачи
+
+Простой пул потоков внутри процесса: запрос ставит задачу и сразу
+возвращает ответ, задача выполняется в контексте приложения. Под gevent
+потоки пула становятся гринлетами.
+
+При BACKGROUND_TASKS_EAGER=True (тесты, CLI) задачи выполняются сразу.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import logging
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor(max_workers):
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='background')
+    return _executor
+
+def submit(fn, *args, **kwargs):
+    """
+    Запуск функции в фоне в контексте текущего приложения
+    
+    Returns:
+        Future или результат функции (в eager-режиме)
+    """
+    from app import db
+    
+    app = current_app._get_current_object()
+    
+    def run():
+        with app.app_context():
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                logger.exception(f'Background task {fn.__name__} failed')
+                db.session.rollback()
+            finally:
+                db.session.remove()
+    
+    if app.config.get('BACKGROUND_TASKS_EAGER'):
+        return run()
+    
+    return _get_executor(app.config.get('BACKGROUND_WORKERS', 4)).submit(run)
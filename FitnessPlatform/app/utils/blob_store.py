@@ -0,0 +1,226 @@
+"""
+Хранилище загруженных файлов, адресуемое по содержимому
+
+Файл хэшируется (SHA-256) во время потоковой записи на диск и хранится
+один раз под именем blobs/<aa>/<sha256>.<ext>. Записи (UploadedFile и др.)
+ссылаются на StoredBlob, у которого ведется счетчик ссылок: повторная
+загрузка того же содержимого только увеличивает счетчик, а файл удаляется
+с диска, когда освобождается последняя ссылка.
+"""
+import hashlib
+import os
+import uuid
+import logging
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+BLOB_FOLDER = 'blobs'
+READ_BLOCK_SIZE = 256 * 1024
+
+def _blobs_table():
+    from app.models.media import StoredBlob
+    return StoredBlob.__table__
+
+def blob_relative_path(sha256, ext=''):
+    """Относительный путь файла в хранилище"""
+    filename = f'{sha256}.{ext}' if ext else sha256
+    return os.path.join(BLOB_FOLDER, sha256[:2], filename)
+
+def is_blob_path(relative_path):
+    """Находится ли файл в хранилище"""
+    return os.path.normpath(relative_path).split(os.sep, 1)[0] == BLOB_FOLDER
+
+def temp_path():
+    """Путь для временного файла (на том же разделе, что и хранилище)"""
+    folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'tmp')
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, f'{uuid.uuid4().hex}.part')
+
+def write_stream(stream, path):
+    """
+    Потоковая запись с подсчетом хэша
+    
+    Returns:
+        tuple: (sha256 hex, размер)
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    with open(path, 'wb') as f:
+        while True:
+            block = stream.read(READ_BLOCK_SIZE)
+            if not block:
+                break
+            f.write(block)
+            hasher.update(block)
+            size += len(block)
+    return hasher.hexdigest(), size
+
+def store_stream(stream, ext=''):
+    """
+    Сохранение потока в хранилище
+    
+    Returns:
+        tuple: (StoredBlob, created) — created=False для дубликата
+    """
+    path = temp_path()
+    try:
+        sha256, size = write_stream(stream, path)
+        return adopt(path, sha256, size, ext)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+def adopt(path, sha256, size, ext=''):
+    """
+    Перенос уже записанного файла с известным хэшем в хранилище
+    
+    Новое содержимое переносится атомарным rename, для дубликата временный
+    файл удаляется, а счетчик ссылок существующего блоба увеличивается.
+    
+    Returns:
+        tuple: (StoredBlob, created)
+    """
+    from app.models.media import StoredBlob
+    
+    blobs = _blobs_table()
+    upload_root = current_app.config['UPLOAD_FOLDER']
+    
+    for _ in range(2):
+        existing = StoredBlob.query.filter_by(sha256=sha256).first()
+        if existing is not None:
+            db.session.execute(
+                blobs.update()
+                .where(blobs.c.id == existing.id)
+                .values(ref_count=blobs.c.ref_count + 1)
+            )
+            db.session.commit()
+            db.session.refresh(existing)
+            
+            target = os.path.join(upload_root, existing.relative_path)
+            if os.path.exists(path):
+                if os.path.exists(target):
+                    os.remove(path)
+                else:
+                    # Файл пропал (например, гонка с удалением) — восстанавливаем из загрузки
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    os.replace(path, target)
+            return existing, False
+        
+        relative_path = blob_relative_path(sha256, ext)
+        target = os.path.join(upload_root, relative_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(path, target)
+        
+        blob = StoredBlob(sha256=sha256, relative_path=relative_path, size=size, ref_count=1)
+        db.session.add(blob)
+        try:
+            db.session.commit()
+            return blob, True
+        except IntegrityError:
+            # Такое же содержимое параллельно загрузил другой запрос:
+            # файл на месте тот же, остается увеличить счетчик его блоба
+            db.session.rollback()
+    
+    raise RuntimeError(f'Could not store blob {sha256}')
+
+def release(blob_id):
+    """
+    Освобождение ссылки на блоб
+    
+    Последняя ссылка удаляет файл. Чтобы параллельный adopt() того же
+    содержимого не потерял свой файл, файл и варианты сначала отодвигаются
+    под уникальное имя, затем удаляется строка (только при ref_count = 0),
+    и лишь после этого отодвинутое удаляется с диска. Если кто-то успел
+    сослаться на блоб заново, файл возвращается на место.
+    
+    Returns:
+        bool: удален ли файл (была последняя ссылка)
+    """
+    from app.utils.image_pipeline import variants_dir
+    
+    blobs = _blobs_table()
+    db.session.execute(
+        blobs.update()
+        .where(blobs.c.id == blob_id, blobs.c.ref_count > 0)
+        .values(ref_count=blobs.c.ref_count - 1)
+    )
+    db.session.commit()
+    
+    row = db.session.execute(
+        db.select(blobs.c.relative_path, blobs.c.ref_count).where(blobs.c.id == blob_id)
+    ).first()
+    if row is None or row.ref_count > 0 or not row.relative_path:
+        return False
+    
+    upload_root = current_app.config['UPLOAD_FOLDER']
+    suffix = f'.{uuid.uuid4().hex}.deleting'
+    moved = [(path, path + suffix) for path in (
+        os.path.join(upload_root, row.relative_path),
+        os.path.join(upload_root, variants_dir(row.relative_path))
+    ) if _move(path, path + suffix)]
+    
+    # Строка удаляется, только если счетчик все еще 0 (никто не успел сослаться заново)
+    deleted = db.session.execute(
+        blobs.delete().where(blobs.c.id == blob_id, blobs.c.ref_count == 0)
+    ).rowcount
+    db.session.commit()
+    
+    if not deleted:
+        for path, aside in moved:
+            # adopt() мог уже восстановить файл из своей загрузки — тогда наша копия лишняя
+            if os.path.exists(path) or not _move(aside, path):
+                _discard(aside)
+        return False
+    
+    for path, aside in moved:
+        _discard(aside)
+    logger.info(f'Blob deleted: {row.relative_path}')
+    return True
+
+def release_path(relative_path):
+    """Освобождение ссылки по пути файла в хранилище"""
+    blobs = _blobs_table()
+    blob_id = db.session.execute(
+        db.select(blobs.c.id).where(blobs.c.relative_path == relative_path)
+    ).scalar()
+    if blob_id is None:
+        return False
+    
+    release(blob_id)
+    return True
+
+def _move(path, target):
+    """Переименование без ошибки, если исходного пути нет"""
+    try:
+        os.replace(path, target)
+        return True
+    except OSError:
+        return False
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def _discard(path):
+    """Удаление файла или папки вариантов"""
+    if os.path.isdir(path):
+        _remove_tree(path)
+    else:
+        _remove(path)
+
+def _remove_tree(path):
+    if not os.path.isdir(path):
+        return
+    for name in os.listdir(path):
+        _remove(os.path.join(path, name))
+    try:
+        os.rmdir(path)
+    except OSError:
+        pass
@@ -0,0 +1,366 @@
+"""
+Возобновляемая загрузка больших файлов по частям (видео тренировок)
+
+Протокол:
+    POST  /api/uploads/videos                      — создание сеанса (имя, размер, sha256)
+    HEAD  /api/uploads/videos/<id>                 — текущее смещение (Upload-Offset)
+    PUT   /api/uploads/videos/<id>                 — часть файла с заголовком Upload-Offset
+    POST  /api/uploads/videos/<id>/finalize        — сборка файла
+    DELETE /api/uploads/videos/<id>                — отмена
+
+Части пишутся потоково прямо во временный файл, заранее выделенный под
+полный размер. Смещение в базе сдвигается только после проверки части
+(размер, необязательная контрольная сумма части), поэтому после обрыва
+клиент продолжает с последнего подтвержденного смещения. Контрольная
+сумма всего файла считается инкрементально по мере приема частей и
+сверяется при сборке; готовый файл переносится на место атомарным rename.
+"""
+import base64
+import binascii
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import logging
+
+from flask import current_app
+from werkzeug.utils import secure_filename
+
+from app import db
+from app.utils import blob_store
+from app.utils.file_upload import allowed_file
+
+logger = logging.getLogger(__name__)
+
+READ_BLOCK_SIZE = 256 * 1024
+
+class UploadError(Exception):
+    """Ошибка протокола загрузки (status — HTTP-код ответа)"""
+    
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+class _HashStates:
+    """
+    Инкрементальные SHA-256 принятых префиксов файлов
+    
+    Состояние хэша нельзя сохранить в базе, поэтому оно живет в памяти
+    процесса. Если часть пришла в другой процесс (или после перезапуска),
+    состояние один раз восстанавливается чтением уже принятого префикса.
+    """
+    
+    def __init__(self, max_size=128):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, session):
+        with self._lock:
+            state = self._items.get(session.token)
+        if state is not None and state[0] == session.offset:
+            return state[1].copy()
+        
+        hasher = hashlib.sha256()
+        remaining = session.offset
+        with open(session.temp_path, 'rb') as f:
+            while remaining > 0:
+                block = f.read(min(READ_BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                hasher.update(block)
+                remaining -= len(block)
+        return hasher
+    
+    def put(self, token, offset, hasher):
+        with self._lock:
+            self._items[token] = (offset, hasher)
+            self._items.move_to_end(token)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+    
+    def discard(self, token):
+        with self._lock:
+            self._items.pop(token, None)
+
+_hash_states = _HashStates()
+
+def _temp_folder():
+    folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'tmp')
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+def _preallocate(path, size):
+    """Выделение места под файл целиком (без записи данных)"""
+    with open(path, 'wb') as f:
+        if size and hasattr(os, 'posix_fallocate'):
+            try:
+                os.posix_fallocate(f.fileno(), 0, size)
+                return
+            except OSError:
+                pass
+        f.truncate(size)
+
+def parse_checksum(header):
+    """
+    Разбор заголовка Upload-Checksum: "sha256 <base64>" или "sha256 <hex>"
+    
+    Returns:
+        bytes или None
+    """
+    if not header:
+        return None
+    
+    algorithm, _, value = header.strip().partition(' ')
+    if algorithm.lower() != 'sha256' or not value:
+        raise UploadError('Поддерживается только контрольная сумма sha256')
+    
+    value = value.strip()
+    try:
+        if len(value) == 64:
+            return bytes.fromhex(value)
+        return base64.b64decode(value, validate=True)
+    except (ValueError, binascii.Error):
+        raise UploadError('Некорректная контрольная сумма части')
+
+def _check_user_quota(user_id, total_size):
+    """
+    Лимит незавершенных загрузок пользователя
+    
+    Каждый сеанс сразу занимает на диске полный размер файла, поэтому
+    ограничено и число активных сеансов, и сумма их размеров. Просроченные
+    сеансы пользователя перед проверкой отменяются и освобождают место.
+    """
+    from app.models.media import UploadSession
+    
+    config = current_app.config
+    cleanup_expired(user_id=user_id)
+    sessions, reserved = db.session.query(
+        db.func.count(UploadSession.id), db.func.coalesce(db.func.sum(UploadSession.total_size), 0)
+    ).filter(
+        UploadSession.user_id == user_id,
+        UploadSession.status == UploadSession.STATUS_ACTIVE
+    ).one()
+    
+    if sessions >= config['UPLOAD_SESSIONS_PER_USER']:
+        raise UploadError('Слишком много незавершенных загрузок: завершите или отмените предыдущие', status=429)
+    if reserved + total_size > config['UPLOAD_RESERVED_BYTES_PER_USER']:
+        raise UploadError('Превышен объем незавершенных загрузок', status=413)
+
+def create_session(user_id, filename, total_size, expected_sha256=None, training_id=None):
+    """
+    Создание сеанса загрузки
+    
+    Returns:
+        UploadSession
+    """
+    from app.models.media import UploadSession
+    
+    config = current_app.config
+    if not filename or not allowed_file(filename, 'video'):
+        raise UploadError('Недопустимый тип файла')
+    if not isinstance(total_size, int) or total_size <= 0:
+        raise UploadError('Некорректный размер файла')
+    if total_size > config['VIDEO_UPLOAD_MAX_SIZE']:
+        raise UploadError('Файл слишком большой', status=413)
+    if expected_sha256 is not None:
+        expected_sha256 = str(expected_sha256).lower()
+        if len(expected_sha256) != 64 or any(c not in '0123456789abcdef' for c in expected_sha256):
+            raise UploadError('Некорректная контрольная сумма файла')
+    
+    _check_user_quota(user_id, total_size)
+    
+    token = uuid.uuid4().hex
+    temp_path = os.path.join(_temp_folder(), f'{token}.part')
+    _preallocate(temp_path, total_size)
+    
+    session = UploadSession(
+        token=token,
+        user_id=user_id,
+        training_id=training_id,
+        original_filename=secure_filename(filename) or 'video',
+        total_size=total_size,
+        expected_sha256=expected_sha256,
+        temp_path=temp_path,
+        offset=0,
+        expires_at=datetime.utcnow() + timedelta(hours=config['UPLOAD_SESSION_TTL_HOURS'])
+    )
+    db.session.add(session)
+    db.session.commit()
+    return session
+
+def _check_not_expired(session):
+    """Просроченный сеанс не принимает части и не собирается (его файл удалит cleanup_expired)"""
+    if session.expires_at is not None and session.expires_at < datetime.utcnow():
+        raise UploadError('Срок загрузки истек, начните загрузку заново', status=410)
+
+def write_chunk(session, offset, stream, length, checksum=None):
+    """
+    Запись части файла
+    
+    Args:
+        session: активный UploadSession
+        offset: смещение части (должно совпадать с подтвержденным)
+        stream: поток тела запроса
+        length: длина части (Content-Length)
+        checksum: ожидаемый SHA-256 части (bytes) или None
+    
+    Returns:
+        int: новое подтвержденное смещение
+    """
+    from app.models.media import UploadSession
+    
+    if session.status != UploadSession.STATUS_ACTIVE:
+        raise UploadError('Загрузка уже завершена или отменена', status=409)
+    _check_not_expired(session)
+    if offset != session.offset:
+        # Клиент должен продолжить с подтвержденного смещения (HEAD)
+        raise UploadError(f'Ожидается смещение {session.offset}', status=409)
+    if length is None or length <= 0:
+        raise UploadError('Не указана длина части', status=411)
+    if offset + length > session.total_size:
+        raise UploadError('Часть выходит за размер файла', status=413)
+    
+    file_hasher = _hash_states.get(session)
+    chunk_hasher = hashlib.sha256() if checksum is not None else None
+    received = 0
+    
+    with open(session.temp_path, 'r+b') as f:
+        f.seek(offset)
+        while received < length:
+            block = stream.read(min(READ_BLOCK_SIZE, length - received))
+            if not block:
+                break
+            f.write(block)
+            file_hasher.update(block)
+            if chunk_hasher is not None:
+                chunk_hasher.update(block)
+            received += len(block)
+    
+    if received != length:
+        # Обрыв соединения: смещение не сдвигаем, часть будет перезаписана
+        raise UploadError('Часть получена не полностью', status=400)
+    if chunk_hasher is not None and chunk_hasher.digest() != checksum:
+        raise UploadError('Контрольная сумма части не совпадает', status=460)
+    
+    # Сдвигаем смещение, только если его не изменил параллельный запрос
+    new_offset = offset + length
+    updated = UploadSession.query.filter_by(id=session.id, offset=offset).update(
+        {'offset': new_offset, 'updated_at': datetime.utcnow()},
+        synchronize_session=False
+    )
+    db.session.commit()
+    if not updated:
+        raise UploadError('Параллельная запись в ту же загрузку', status=409)
+    
+    _hash_states.put(session.token, new_offset, file_hasher)
+    return new_offset
+
+def finalize(session):
+    """
+    Сборка файла: проверка полноты и контрольной суммы, атомарный перенос
+    
+    Returns:
+        UploadedFile
+    """
+    from app.models.media import UploadSession, UploadedFile
+    from app.models.training import Training
+    from app.utils.image_processing import detect_mime
+    
+    if session.status == UploadSession.STATUS_COMPLETED:
+        return session.uploaded_file
+    if session.status != UploadSession.STATUS_ACTIVE:
+        raise UploadError('Загрузка отменена', status=409)
+    _check_not_expired(session)
+    if not session.is_complete:
+        raise UploadError(f'Получено {session.offset} из {session.total_size} байт', status=409)
+    
+    digest = _hash_states.get(session).hexdigest()
+    if session.expected_sha256 and digest != session.expected_sha256:
+        raise UploadError('Контрольная сумма файла не совпадает', status=460)
+    
+    mime_type = detect_mime(session.temp_path)
+    if not mime_type.startswith('video/'):
+        raise UploadError(f'Файл не является видео ({mime_type})')
+    
+    with open(session.temp_path, 'rb') as f:
+        os.fsync(f.fileno())
+    
+    # Файл уже проверен по хэшу — переносим в хранилище по содержимому
+    # (повторная загрузка того же видео не займет места)
+    extension = session.original_filename.rsplit('.', 1)[1].lower() if '.' in session.original_filename else ''
+    blob, created = blob_store.adopt(session.temp_path, digest, session.total_size, extension)
+    
+    uploaded_file = UploadedFile(
+        user_id=session.user_id,
+        purpose=session.purpose or 'video',
+        original_filename=session.original_filename,
+        relative_path=blob.relative_path,
+        mime_type=mime_type,
+        size=session.total_size,
+        blob_id=blob.id,
+        status=UploadedFile.STATUS_READY,
+        processed_at=datetime.utcnow()
+    )
+    db.session.add(uploaded_file)
+    db.session.flush()
+    
+    session.status = UploadSession.STATUS_COMPLETED
+    session.uploaded_file_id = uploaded_file.id
+    
+    if session.training_id:
+        training = db.session.get(Training, session.training_id)
+        if training and training.trainer_user_id == session.user_id:
+            url_prefix = current_app.config['UPLOAD_URL_PATH'].rstrip('/')
+            training.video_link = f'{url_prefix}/{uploaded_file.relative_path}'
+    
+    db.session.commit()
+    _hash_states.discard(session.token)
+    
+    logger.info(f'Chunked upload {session.token} finalized: {uploaded_file.relative_path}')
+    return uploaded_file
+
+def abort(session):
+    """Отмена загрузки и удаление временного файла"""
+    from app.models.media import UploadSession
+    
+    if session.status == UploadSession.STATUS_ACTIVE:
+        session.status = UploadSession.STATUS_ABORTED
+        db.session.commit()
+    _hash_states.discard(session.token)
+    _remove(session.temp_path)
+
+def cleanup_expired(now=None, user_id=None):
+    """
+    Отмена просроченных незавершенных загрузок (всех или одного пользователя)
+    
+    Returns:
+        int: количество отмененных загрузок
+    """
+    from app.models.media import UploadSession
+    
+    now = now or datetime.utcnow()
+    query = UploadSession.query.filter(
+        UploadSession.status == UploadSession.STATUS_ACTIVE,
+        UploadSession.expires_at < now
+    )
+    if user_id is not None:
+        query = query.filter(UploadSession.user_id == user_id)
+    expired = query.all()
+    
+    for session in expired:
+        session.status = UploadSession.STATUS_ABORTED
+        _hash_states.discard(session.token)
+        _remove(session.temp_path)
+    db.session.commit()
+    
+    return len(expired)
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,549 @@
+"""
+Генератор синтетических данных (flask data generate)
+
+Воспроизводит объемы и распределения продакшена на локальной базе:
+- популярность тренеров — степенной закон (Zipf): у немногих тренеров
+  большая часть тренировок и полные группы;
+- активность клиентов логнормальна, новые пользователи регистрируются
+  чаще старых (рост аудитории), часть клиентов со временем уходит;
+- сезонность: пик в январе (новогодние обещания), спад летом и в декабре,
+  по понедельникам занимаются чаще, чем по пятницам;
+- отзывы оставляют только посетившие тренировку, оценки зависят от
+  "качества" тренера; уведомления старше недели в основном прочитаны.
+
+Генерация детерминирована (seed и дата отсчета). Строки вставляются
+пачками через executemany драйвера (кортежи, без построения ORM-объектов),
+на время загрузки снимаются вторичные индексы больших таблиц, проверка
+внешних ключей откладывается до конца транзакции, а синхронная запись
+SQLite отключается. Идентификаторы назначаются заранее, поэтому внешние
+ключи согласованы без чтения вставленных строк. Счетчики (регистрации
+тренировок, рейтинги, непрочитанные уведомления) пересчитываются в конце
+одним UPDATE на таблицу.
+"""
+import bisect
+import math
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, date, timedelta
+import logging
+
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.utils import moderation, moderation_queue, ratings
+
+logger = logging.getLogger(__name__)
+
+PASSWORD = 'synthetic-password'
+EMAIL_DOMAIN = 'synthetic.fitnessplatform.com'
+BATCH_SIZE = 10000
+
+# Объемы: clients/trainers/trainings — количество, registrations_per_training —
+# среднее заполнение, progress_per_week — записей в неделю у среднего клиента,
+# metrics_per_progress — метрик у записи с носимого устройства
+SCALES = {
+    'small': {'clients': 300, 'trainers': 15, 'trainings': 300, 'registrations_per_training': 5,
+              'progress_years': 1, 'progress_per_week': 3, 'metrics_per_progress': 0,
+              'feedback_ratio': 0.3, 'notifications_per_user': 5},
+    'medium': {'clients': 3000, 'trainers': 60, 'trainings': 3000, 'registrations_per_training': 8,
+               'progress_years': 2, 'progress_per_week': 3, 'metrics_per_progress': 3,
+               'feedback_ratio': 0.3, 'notifications_per_user': 20},
+    'large': {'clients': 20000, 'trainers': 300, 'trainings': 30000, 'registrations_per_training': 10,
+              'progress_years': 3, 'progress_per_week': 3, 'metrics_per_progress': 4,
+              'feedback_ratio': 0.3, 'notifications_per_user': 40},
+    'production': {'clients': 60000, 'trainers': 800, 'trainings': 120000, 'registrations_per_training': 12,
+                   'progress_years': 3, 'progress_per_week': 2, 'metrics_per_progress': 6,
+                   'feedback_ratio': 0.25, 'notifications_per_user': 50},
+}
+
+CATEGORIES = (
+    ('Йога', '#FF6B6B'), ('Кардио', '#4ECDC4'), ('Силовые', '#45B7D1'),
+    ('Пилатес', '#96CEB4'), ('Стретчинг', '#FFEAA7'),
+)
+ACTIVITY_TYPES = ('running', 'cycling', 'strength', 'yoga', 'swimming', 'walking', 'hiit')
+DISTANCE_ACTIVITIES = {'running': (0.13, 0.2), 'cycling': (0.3, 0.5), 'walking': (0.07, 0.1), 'swimming': (0.02, 0.04)}
+CALORIES_PER_MINUTE = {'running': 11, 'cycling': 9, 'strength': 7, 'yoga': 4, 'swimming': 10, 'walking': 5, 'hiit': 12}
+METRICS = (('heart_rate', 'bpm', 135, 18), ('speed', 'km/h', 10, 3), ('cadence', 'spm', 160, 12),
+           ('elevation', 'm', 150, 60), ('power', 'W', 180, 40), ('spo2', '%', 97, 1.5))
+DIFFICULTIES = ('beginner', 'intermediate', 'advanced')
+TAGS = ('Утро', 'Вечер', 'Для начинающих', 'Спина', 'Пресс', 'Функциональный', 'HIIT', 'Онлайн',
+        'Растяжка', 'Выносливость', 'Баланс', 'Дыхание')
+EQUIPMENT = ('Коврик', 'Гантели', 'Фитбол', 'Эспандер', 'Степ-платформа', 'Гиря', 'Скакалка')
+NOTIFICATION_TYPES = (('training', 0.4), ('reminder', 0.3), ('system', 0.15), ('achievement', 0.15))
+
+# Сезонность: множитель по месяцу и дню недели (пн = 0)
+MONTH_FACTOR = {1: 1.4, 2: 1.25, 3: 1.1, 4: 1.05, 5: 1.0, 6: 0.9, 7: 0.75, 8: 0.75,
+                9: 1.15, 10: 1.1, 11: 1.0, 12: 0.8}
+WEEKDAY_FACTOR = (1.25, 1.15, 1.1, 1.0, 0.8, 0.85, 0.85)
+# Популярные часы начала тренировок
+HOURS = (7, 8, 9, 12, 18, 19, 20)
+HOUR_WEIGHTS = (2, 3, 2, 1, 3, 4, 3)
+
+# Большие таблицы: на время загрузки снимаются их вторичные индексы
+BULK_TABLES = ('progress', 'progress_metrics', 'training_registrations', 'feedbacks', 'ratings', 'notifications',
+               'training_tags', 'training_equipment')
+
+class BulkWriter:
+    """
+    Пачечная вставка кортежей через executemany драйвера
+    
+    Python-значения по умолчанию (created_at, is_active и т.п.) для столбцов,
+    которых нет в columns, вычисляются один раз и дописываются к каждой строке.
+    """
+    
+    def __init__(self, connection, table, columns, batch_size=BATCH_SIZE):
+        self.connection = connection
+        self.table = table
+        self.batch_size = batch_size
+        self.count = 0
+        self._rows = []
+        
+        defaults = []
+        for column in table.columns:
+            if column.name in columns or column.default is None or column.primary_key:
+                continue
+            default = column.default
+            if default.is_scalar:
+                defaults.append((column.name, default.arg))
+            elif default.is_callable and not column.unique:
+                defaults.append((column.name, default.arg(None)))
+        self.columns = list(columns) + [name for name, _ in defaults]
+        self._default_values = tuple(value for _, value in defaults)
+        
+        dialect = connection.dialect
+        preparer = dialect.identifier_preparer
+        self._positional = dialect.positional
+        if self._positional:
+            placeholder = {'qmark': '?', 'format': '%s'}.get(dialect.paramstyle, '?')
+            values = ', '.join([placeholder] * len(self.columns))
+            self._sql = (f'INSERT INTO {preparer.format_table(table)} '
+                         f'({", ".join(preparer.quote(name) for name in self.columns)}) VALUES ({values})')
+        else:
+            self._statement = table.insert()
+    
+    def add(self, row):
+        self._rows.append(row + self._default_values if self._default_values else row)
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+    
+    def flush(self):
+        if not self._rows:
+            return
+        if self._positional:
+            self.connection.exec_driver_sql(self._sql, self._rows)
+        else:
+            self.connection.execute(self._statement, [dict(zip(self.columns, row)) for row in self._rows])
+        self.count += len(self._rows)
+        self._rows = []
+
+def _next_id(connection, table):
+    return (connection.execute(db.select(db.func.max(table.c.id))).scalar() or 0) + 1
+
+def _weighted_days(start, days):
+    """Накопленные веса дней с учетом сезонности"""
+    cumulative = []
+    total = 0.0
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        total += MONTH_FACTOR[day.month] * WEEKDAY_FACTOR[day.weekday()]
+        cumulative.append(total)
+    return cumulative
+
+def _sample_day(rng, cumulative, low, high):
+    """Индекс дня в [low, high) с учетом весов"""
+    lower = cumulative[low - 1] if low > 0 else 0.0
+    target = lower + rng.random() * (cumulative[high - 1] - lower)
+    return min(high - 1, bisect.bisect_left(cumulative, target, low, high))
+
+def _poisson(rng, mean):
+    """Число событий со средним mean (нормальное приближение для больших mean)"""
+    if mean <= 0:
+        return 0
+    if mean > 30:
+        return max(0, int(round(rng.gauss(mean, math.sqrt(mean)))))
+    limit, count, product = math.exp(-mean), 0, rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
+
+@contextmanager
+def bulk_load(connection, tables, drop_indexes=True):
+    """
+    Режим массовой загрузки: вторичные индексы сняты, проверка внешних
+    ключей отложена до COMMIT, SQLite пишет без fsync
+    """
+    dialect = connection.dialect.name
+    dropped = []
+    if dialect == 'sqlite':
+        synchronous = connection.exec_driver_sql('PRAGMA synchronous').scalar()
+        connection.exec_driver_sql('PRAGMA synchronous = OFF')
+    
+    if drop_indexes:
+        for table in tables:
+            for index in table.indexes:
+                if not index.unique:
+                    index.drop(connection)
+                    dropped.append(index)
+    
+    try:
+        with connection.begin():
+            if dialect == 'sqlite':
+                connection.exec_driver_sql('PRAGMA defer_foreign_keys = ON')
+            elif dialect == 'postgresql':
+                connection.exec_driver_sql('SET CONSTRAINTS ALL DEFERRED')
+            yield connection
+    finally:
+        started = time.perf_counter()
+        for index in dropped:
+            index.create(connection)
+        if dropped:
+            logger.info(f'Indexes rebuilt in {time.perf_counter() - started:.1f}s')
+        if dialect == 'sqlite':
+            connection.exec_driver_sql(f'PRAGMA synchronous = {synchronous}')
+
+def generate(clients, trainers, trainings, registrations_per_training, progress_years,
+             progress_per_week, metrics_per_progress, feedback_ratio, notifications_per_user,
+             seed=42, anchor=None, batch_size=BATCH_SIZE, drop_indexes=True, progress_callback=None):
+    """
+    Генерация данных в существующих таблицах (к уже имеющимся строкам)
+    
+    Args:
+        anchor: дата отсчета ("сегодня" генератора), по умолчанию текущая
+        progress_callback: функция (таблица, вставлено строк) для вывода хода
+    
+    Returns:
+        dict: количество строк по таблицам и персонажи для бенчмарков
+            (самый активный клиент, самый популярный тренер, самая заполненная
+            предстоящая тренировка)
+    """
+    from app.models import (User, UserProfile, Trainer, Training, TrainingCategory, TrainingRegistration,
+                            Progress, ProgressMetric, Feedback, Rating, Notification, Tag, Equipment)
+    from app.models.training import training_tags, training_equipment
+    
+    rng = random.Random(seed)
+    anchor = anchor or date.today()
+    now = datetime.combine(anchor, datetime.min.time()) + timedelta(hours=12)
+    history_days = progress_years * 365
+    start_day = anchor - timedelta(days=history_days)
+    future_days = 60
+    day_weights = _weighted_days(start_day, history_days + future_days)
+    password_hash = generate_password_hash(PASSWORD)
+    tables = {model.__tablename__: model.__table__ for model in
+              (User, UserProfile, Trainer, Training, TrainingCategory, TrainingRegistration,
+               Progress, ProgressMetric, Feedback, Rating, Notification, Tag, Equipment)}
+    tables.update({table.name: table for table in (training_tags, training_equipment)})
+    counts = {}
+    
+    def report(writer):
+        counts[writer.table.name] = counts.get(writer.table.name, 0) + writer.count
+        if progress_callback:
+            progress_callback(writer.table.name, writer.count)
+    
+    with db.engine.connect() as connection:
+        with bulk_load(connection, [tables[name] for name in BULK_TABLES], drop_indexes):
+            # Категории
+            categories = connection.execute(db.select(tables['training_categories'].c.id)).scalars().all()
+            if not categories:
+                writer = BulkWriter(connection, tables['training_categories'], ('name', 'color', 'order'))
+                for order, (name, color) in enumerate(CATEGORIES):
+                    writer.add((name, color, order))
+                writer.flush()
+                report(writer)
+                categories = connection.execute(db.select(tables['training_categories'].c.id)).scalars().all()
+            
+            # Теги и оборудование: недостающие названия справочников
+            term_ids = {}
+            for table_name, names in (('tags', TAGS), ('equipment', EQUIPMENT)):
+                table = tables[table_name]
+                keys = [name.casefold() for name in names]
+                existing = set(connection.execute(db.select(table.c.key).where(table.c.key.in_(keys))).scalars())
+                writer = BulkWriter(connection, table, ('name', 'key'))
+                for name, key in zip(names, keys):
+                    if key not in existing:
+                        writer.add((name, key))
+                writer.flush()
+                report(writer)
+                term_ids[table_name] = connection.execute(
+                    db.select(table.c.id).where(table.c.key.in_(keys)).order_by(table.c.id)).scalars().all()
+            
+            # Пользователи: сначала тренеры, затем клиенты (чаще — недавние)
+            user_id = _next_id(connection, tables['users'])
+            users = BulkWriter(connection, tables['users'],
+                               ('id', 'public_id', 'email', 'username', 'password_hash', 'role', 'created_at'),
+                               batch_size)
+            profiles = BulkWriter(connection, tables['user_profiles'],
+                                  ('user_id', 'full_name', 'gender', 'height', 'weight', 'fitness_level'), batch_size)
+            trainer_rows = BulkWriter(connection, tables['trainers'],
+                                      ('user_id', 'specialization', 'experience_years'), batch_size)
+            
+            def add_user(role, signup_day):
+                nonlocal user_id
+                current = user_id
+                user_id += 1
+                users.add((current, f'syn-{seed}-{current}', f'synthetic_{current}@{EMAIL_DOMAIN}',
+                           f'synthetic_{current}', password_hash, role,
+                           datetime.combine(start_day + timedelta(days=signup_day), datetime.min.time())
+                           + timedelta(minutes=rng.randint(0, 1439))))
+                gender = rng.choice(('male', 'female'))
+                profiles.add((current, f'Пользователь {current}', gender,
+                              round(rng.gauss(178 if gender == 'male' else 165, 7), 1),
+                              round(rng.gauss(80 if gender == 'male' else 63, 10), 1),
+                              rng.choice(DIFFICULTIES)))
+                return current
+            
+            trainer_ids = []
+            trainer_quality = []
+            for rank in range(trainers):
+                trainer_id = add_user('trainer', rng.randint(0, history_days // 2))
+                trainer_rows.add((trainer_id, rng.choice(ACTIVITY_TYPES), rng.randint(1, 15)))
+                trainer_ids.append(trainer_id)
+                trainer_quality.append(min(4.9, max(3.0, rng.gauss(4.2, 0.4))))
+            
+            # Клиенты: дата регистрации, уход и логнормальная активность
+            client_ids, client_signup, client_churn, client_activity = [], [], [], []
+            activity_norm = math.exp(0.8 ** 2 / 2)
+            for _ in range(clients):
+                signup = int(history_days * (1 - math.sqrt(rng.random())))
+                churn = history_days if rng.random() < 0.7 else rng.randint(signup, history_days)
+                client_ids.append(add_user('client', signup))
+                client_signup.append(signup)
+                client_churn.append(max(churn, signup + 7))
+                client_activity.append(rng.lognormvariate(0, 0.8) / activity_norm)
+            for writer in (users, profiles, trainer_rows):
+                writer.flush()
+                report(writer)
+            
+            # Тренировки: тренер по закону Zipf, время — с учетом сезонности и популярных часов
+            trainer_cumulative = []
+            total = 0.0
+            for rank in range(trainers):
+                total += 1 / (rank + 1) ** 1.1
+                trainer_cumulative.append(total)
+            client_cumulative = []
+            total = 0.0
+            for activity in client_activity:
+                total += activity
+                client_cumulative.append(total)
+            
+            training_id = _next_id(connection, tables['trainings'])
+            registration_id = _next_id(connection, tables['training_registrations'])
+            feedback_id = _next_id(connection, tables['feedbacks'])
+            training_writer = BulkWriter(connection, tables['trainings'], (
+                'id', 'public_id', 'title', 'short_description', 'trainer_user_id', 'category_id',
+                'schedule_time', 'duration', 'training_type', 'difficulty', 'intensity', 'status',
+                'moderation_status', 'max_participants', 'price', 'created_at', 'published_at'), batch_size)
+            registration_writer = BulkWriter(connection, tables['training_registrations'], (
+                'id', 'user_id', 'training_id', 'status', 'payment_status', 'payment_amount',
+                'registered_at', 'cancelled_at', 'attended_at'), batch_size)
+            feedback_writer = BulkWriter(connection, tables['feedbacks'], (
+                'id', 'user_id', 'training_id', 'title', 'comment', 'moderation_status', 'created_at'), batch_size)
+            rating_writer = BulkWriter(connection, tables['ratings'], (
+                'feedback_id', 'rating_type', 'score', 'created_at'), batch_size)
+            tag_writer = BulkWriter(connection, tables['training_tags'], ('training_id', 'tag_id'), batch_size)
+            equipment_writer = BulkWriter(connection, tables['training_equipment'],
+                                          ('training_id', 'equipment_id'), batch_size)
+            # Отдельный генератор: теги не сдвигают остальную последовательность данных
+            term_rng = random.Random(seed + 1)
+            
+            busiest_upcoming = (None, -1)
+            for index in range(trainings):
+                trainer_rank = bisect.bisect_left(trainer_cumulative, rng.random() * trainer_cumulative[-1])
+                trainer_rank = min(trainer_rank, trainers - 1)
+                day = _sample_day(rng, day_weights, 0, len(day_weights))
+                schedule_time = datetime.combine(start_day + timedelta(days=day), datetime.min.time()).replace(
+                    hour=rng.choices(HOURS, HOUR_WEIGHTS)[0], minute=rng.choice((0, 30)))
+                is_past = schedule_time < now
+                capacity = rng.choice((6, 8, 10, 12, 15, 20, 30))
+                price = rng.choice((0.0, 0.0, 500.0, 800.0, 1200.0))
+                roll = rng.random()
+                if roll < 0.03:
+                    status, moderation_status = 'cancelled', 'approved'
+                elif not is_past and roll < 0.08:
+                    status, moderation_status = 'pending', 'pending'
+                else:
+                    status, moderation_status = ('completed' if is_past else 'approved'), 'approved'
+                created_at = schedule_time - timedelta(days=rng.randint(3, 30))
+                training_writer.add((
+                    training_id, f'SYN{seed}-{training_id}', f'Тренировка {training_id}',
+                    'Синтетическая тренировка', trainer_ids[trainer_rank], rng.choice(categories),
+                    schedule_time, rng.choice((30, 45, 60, 60, 90)),
+                    'group' if capacity > 6 else rng.choice(('group', 'individual')),
+                    rng.choice(DIFFICULTIES), rng.choice(('low', 'medium', 'high')), status,
+                    moderation_status, capacity, price, created_at,
+                    created_at + timedelta(hours=rng.randint(1, 48)) if moderation_status == 'approved' else None))
+                for tag_id in term_rng.sample(term_ids['tags'], term_rng.choice((0, 1, 2, 2, 3))):
+                    tag_writer.add((training_id, tag_id))
+                if term_rng.random() < 0.6:
+                    for equipment_id in term_rng.sample(term_ids['equipment'], term_rng.choice((1, 1, 2))):
+                        equipment_writer.add((training_id, equipment_id))
+                
+                # Заполнение группы: у популярных тренеров — ближе к полному
+                if status in ('approved', 'completed'):
+                    popularity = 1 / (trainer_rank + 1) ** 0.5
+                    target = registrations_per_training * (0.6 + 0.8 * popularity) * rng.uniform(0.6, 1.3)
+                    size = min(capacity, clients, max(0, int(round(target))))
+                    chosen = set()
+                    attempts = 0
+                    while len(chosen) < size and attempts < size * 4:
+                        attempts += 1
+                        position = bisect.bisect_left(client_cumulative, rng.random() * client_cumulative[-1])
+                        chosen.add(min(position, clients - 1))
+                    
+                    for position in chosen:
+                        roll = rng.random()
+                        registered_at = schedule_time - timedelta(hours=rng.randint(2, 24 * 14))
+                        cancelled_at = attended_at = None
+                        if roll < 0.1:
+                            registration_status = 'cancelled'
+                            cancelled_at = registered_at + (schedule_time - registered_at) * rng.random()
+                        elif is_past:
+                            registration_status = 'attended' if roll < 0.88 else 'no_show'
+                            attended_at = schedule_time if registration_status == 'attended' else None
+                        else:
+                            registration_status = 'registered'
+                        registration_writer.add((
+                            registration_id, client_ids[position], training_id, registration_status,
+                            'paid' if price and registration_status != 'cancelled' else 'pending',
+                            price or None, registered_at, cancelled_at, attended_at))
+                        registration_id += 1
+                        
+                        if registration_status == 'attended' and rng.random() < feedback_ratio:
+                            created = schedule_time + timedelta(hours=rng.randint(1, 96))
+                            feedback_writer.add((feedback_id, client_ids[position], training_id, 'Отзыв',
+                                                 'Отзыв о тренировке', 'approved', created))
+                            quality = trainer_quality[trainer_rank]
+                            for rating_type in ('overall', 'trainer'):
+                                score = float(min(5, max(1, round(rng.gauss(quality, 0.7)))))
+                                rating_writer.add((feedback_id, rating_type, score, created))
+                            feedback_id += 1
+                    
+                    if not is_past and len(chosen) > busiest_upcoming[1]:
+                        busiest_upcoming = (training_id, len(chosen))
+                training_id += 1
+            
+            for writer in (training_writer, tag_writer, equipment_writer, registration_writer, feedback_writer,
+                           rating_writer):
+                writer.flush()
+                report(writer)
+            
+            # Прогресс и метрики носимых устройств
+            progress_id = _next_id(connection, tables['progress'])
+            progress_writer = BulkWriter(connection, tables['progress'], (
+                'id', 'user_id', 'date', 'entry_type', 'activity_type', 'duration', 'calories_burned',
+                'distance', 'weight', 'resting_heart_rate', 'sleep_duration', 'energy_level', 'mood',
+                'source', 'created_at', 'updated_at'), batch_size)
+            metric_writer = BulkWriter(connection, tables['progress_metrics'], (
+                'progress_id', 'metric_type', 'value', 'unit', 'timestamp', 'interval', 'created_at'), batch_size)
+            
+            for position, client_id in enumerate(client_ids):
+                low, high = client_signup[position], min(client_churn[position], history_days)
+                if high <= low:
+                    continue
+                entries = _poisson(rng, (high - low) / 7 * progress_per_week * client_activity[position])
+                favourite = rng.sample(ACTIVITY_TYPES, 2)
+                weight = rng.gauss(76, 12)
+                for _ in range(entries):
+                    day = start_day + timedelta(days=_sample_day(rng, day_weights, low, high))
+                    activity_type = favourite[0] if rng.random() < 0.6 else (
+                        favourite[1] if rng.random() < 0.6 else rng.choice(ACTIVITY_TYPES))
+                    duration = max(10, int(rng.gauss(50, 18)))
+                    distance_range = DISTANCE_ACTIVITIES.get(activity_type)
+                    wearable = rng.random() < 0.35
+                    created_at = datetime.combine(day, datetime.min.time()) + timedelta(minutes=rng.randint(360, 1380))
+                    weight += rng.gauss(-0.01, 0.15)
+                    progress_writer.add((
+                        progress_id, client_id, day, 'auto' if wearable else 'manual', activity_type, duration,
+                        round(duration * CALORIES_PER_MINUTE[activity_type] * rng.uniform(0.8, 1.2), 1),
+                        round(duration * rng.uniform(*distance_range), 2) if distance_range else None,
+                        round(weight, 1) if rng.random() < 0.15 else None,
+                        int(rng.gauss(62, 6)) if wearable else None,
+                        int(rng.gauss(440, 50)) if wearable else None,
+                        rng.randint(3, 10), rng.randint(4, 10),
+                        'wearable' if wearable else 'app', created_at, created_at))
+                    
+                    if wearable and metrics_per_progress:
+                        interval = max(1, duration * 60 // metrics_per_progress)
+                        for step in range(metrics_per_progress):
+                            metric_type, unit, mean, spread = METRICS[step % len(METRICS)]
+                            metric_writer.add((progress_id, metric_type, round(rng.gauss(mean, spread), 1), unit,
+                                               created_at + timedelta(seconds=step * interval), interval, created_at))
+                    progress_id += 1
+            
+            for writer in (progress_writer, metric_writer):
+                writer.flush()
+                report(writer)
+            
+            # Уведомления: старше недели — в основном прочитаны
+            notification_writer = BulkWriter(connection, tables['notifications'], (
+                'user_id', 'title', 'message', 'notification_type', 'is_read', 'priority',
+                'created_at', 'sent_at', 'read_at'), batch_size)
+            type_names = [name for name, _ in NOTIFICATION_TYPES]
+            type_weights = [weight for _, weight in NOTIFICATION_TYPES]
+            for position, user in enumerate(trainer_ids + client_ids):
+                activity = client_activity[position - trainers] if position >= trainers else 1.0
+                signup = client_signup[position - trainers] if position >= trainers else 0
+                for _ in range(_poisson(rng, notifications_per_user * min(activity, 3))):
+                    day = _sample_day(rng, day_weights, signup, history_days)
+                    created_at = datetime.combine(start_day + timedelta(days=day), datetime.min.time()) \
+                        + timedelta(minutes=rng.randint(0, 1439))
+                    is_read = rng.random() < (0.92 if (now - created_at).days > 7 else 0.35)
+                    notification_type = rng.choices(type_names, type_weights)[0]
+                    notification_writer.add((
+                        user, 'Уведомление', f'Синтетическое уведомление ({notification_type})',
+                        notification_type, is_read, rng.choice((0, 0, 0, 5, 10)), created_at, created_at,
+                        created_at + timedelta(minutes=rng.randint(1, 4320)) if is_read else None))
+            notification_writer.flush()
+            report(notification_writer)
+        
+        # Счетчики одним UPDATE на таблицу — после восстановления индексов
+        with connection.begin():
+            recalculate_counters(connection)
+    
+    # Рейтинги и разрезы тренеров — тем же пересчетом, что flask ratings rebuild
+    ratings.rebuild()
+    # Отзывы на проверке вставлены в обход событий модели
+    moderation_queue.rebuild()
+    
+    busiest_client = max(range(clients), key=lambda position: client_activity[position]) if clients else None
+    counts['personas'] = {
+        'client_id': client_ids[busiest_client] if busiest_client is not None else None,
+        'client_email': f'synthetic_{client_ids[busiest_client]}@{EMAIL_DOMAIN}' if busiest_client is not None else None,
+        'trainer_id': trainer_ids[0] if trainer_ids else None,
+        'trainer_email': f'synthetic_{trainer_ids[0]}@{EMAIL_DOMAIN}' if trainer_ids else None,
+        'training_id': busiest_upcoming[0],
+        'password': PASSWORD,
+    }
+    return counts
+
+def recalculate_counters(connection):
+    """Денормализованные счетчики по фактическим строкам"""
+    from app.models import User, Training, TrainingRegistration, Notification
+    
+    trainings = Training.__table__
+    registrations = TrainingRegistration.__table__
+    notifications = Notification.__table__
+    users = User.__table__
+    
+    connection.execute(trainings.update().values(
+        registrations_count=db.select(db.func.count(registrations.c.id))
+        .where(registrations.c.training_id == trainings.c.id,
+               registrations.c.status.notin_(('cancelled', 'waitlisted')))
+        .scalar_subquery()
+    ))
+    
+    connection.execute(users.update().values(
+        unread_notifications_count=db.select(db.func.count(notifications.c.id))
+        .where(notifications.c.user_id == users.c.id, notifications.c.is_read.is_(False))
+        .scalar_subquery()
+    ))
+    
+    # Тренировки вставлены в обход событий модели
+    moderation.recount(connection)
+
+def foreign_key_violations(connection):
+    """Нарушения внешних ключей после загрузки (только SQLite)"""
+    if connection.dialect.name != 'sqlite':
+        return []
+    return connection.exec_driver_sql('PRAGMA foreign_key_check').fetchall()
@@ -0,0 +1,319 @@
+"""
+Очередь email-доставки уведомлений
+
+Воркер захватывает пачку готовых к отправке уведомлений (send_email=True,
+email_sent=False, scheduled_for <= now) одним UPDATE с токеном захвата,
+отправляет их через одно постоянное SMTP-соединение и фиксирует результат
+пачкой UPDATE. Неудачные отправки повторяются с экспоненциальной задержкой
+(delivery_attempts), после EMAIL_QUEUE_MAX_ATTEMPTS попыток уведомление
+больше не захватывается.
+
+Захват с токеном и сроком (email_next_attempt_at) позволяет запускать
+несколько воркеров: упавший воркер не блокирует уведомления дольше
+EMAIL_QUEUE_CLAIM_TIMEOUT.
+
+Запуск: flask email worker (для проверки — flask email sink, локальный
+SMTP-сервер, принимающий письма).
+"""
+import smtplib
+import threading
+import uuid
+from datetime import datetime, timedelta
+import logging
+
+from flask import current_app
+from sqlalchemy import bindparam
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+# Пробуждение воркера текущего процесса (например, после массовой рассылки)
+_wakeup = threading.Event()
+
+def wake():
+    """Разбудить воркер, ожидающий новых уведомлений"""
+    _wakeup.set()
+
+def _notifications_table():
+    from app.models.notification import Notification
+    return Notification.__table__
+
+def backoff_delay(attempts):
+    """Задержка перед следующей попыткой (экспоненциальная, с ограничением)"""
+    config = current_app.config
+    base = config['EMAIL_QUEUE_BACKOFF_BASE']
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), config['EMAIL_QUEUE_BACKOFF_MAX']))
+
+def _due_condition(notifications, now):
+    return db.and_(
+        notifications.c.send_email.is_(True),
+        notifications.c.email_sent.isnot(True),
+        db.or_(notifications.c.scheduled_for.is_(None), notifications.c.scheduled_for <= now),
+        db.or_(notifications.c.email_next_attempt_at.is_(None), notifications.c.email_next_attempt_at <= now),
+        db.func.coalesce(notifications.c.delivery_attempts, 0) < current_app.config['EMAIL_QUEUE_MAX_ATTEMPTS']
+    )
+
+def claim_batch(batch_size):
+    """
+    Захват пачки уведомлений для отправки
+    
+    Returns:
+        list: строки (id, user_id, title, message, action_url, delivery_attempts, email, username)
+    """
+    from app.models.user import User
+    
+    notifications = _notifications_table()
+    users = User.__table__
+    now = datetime.utcnow()
+    token = uuid.uuid4().hex
+    
+    candidates = db.select(notifications.c.id).where(
+        _due_condition(notifications, now)
+    ).order_by(
+        notifications.c.priority.desc(), notifications.c.id
+    ).limit(batch_size)
+    
+    # Условие повторяется в UPDATE: строку, уже захваченную другим воркером, не перехватываем
+    result = db.session.execute(
+        notifications.update()
+        .where(notifications.c.id.in_(candidates.scalar_subquery()), _due_condition(notifications, now))
+        .values(
+            email_claim_token=token,
+            email_next_attempt_at=now + timedelta(seconds=current_app.config['EMAIL_QUEUE_CLAIM_TIMEOUT'])
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    
+    if not result.rowcount:
+        return []
+    
+    rows = db.session.execute(
+        db.select(
+            notifications.c.id,
+            notifications.c.user_id,
+            notifications.c.title,
+            notifications.c.message,
+            notifications.c.action_url,
+            notifications.c.delivery_attempts,
+            users.c.email,
+            users.c.username
+        ).select_from(
+            notifications.join(users, users.c.id == notifications.c.user_id)
+        ).where(
+            notifications.c.email_claim_token == token
+        ).order_by(notifications.c.id)
+    ).all()
+    db.session.close()
+    return rows
+
+def _mail():
+    """Flask-Mail подключается при первой отправке — процессы без email его не загружают"""
+    from flask_mail import Mail
+    
+    mail = Mail()
+    if 'mail' not in current_app.extensions:
+        mail.init_app(current_app)
+    return mail
+
+def build_message(row):
+    """Письмо по строке уведомления"""
+    from flask_mail import Message
+    
+    body = row.message
+    if row.action_url:
+        base_url = current_app.config.get('EMAIL_BASE_URL', '').rstrip('/')
+        link = row.action_url if row.action_url.startswith('http') else base_url + row.action_url
+        body = f'{body}\n\n{link}'
+    
+    return Message(subject=row.title, recipients=[row.email], body=body)
+
+class SMTPConnection:
+    """Постоянное SMTP-соединение воркера (переподключение при обрыве)"""
+    
+    def __init__(self):
+        self._connection = None
+    
+    @property
+    def is_open(self):
+        return self._connection is not None
+    
+    def open(self):
+        if self._connection is None:
+            self._connection = _mail().connect().__enter__()
+    
+    def close(self):
+        if self._connection is not None:
+            try:
+                self._connection.__exit__(None, None, None)
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._connection = None
+    
+    def send(self, message):
+        self.open()
+        try:
+            self._connection.send(message)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            # Сервер закрыл простаивающее соединение — переподключаемся один раз
+            self._connection = None
+            self.open()
+            self._connection.send(message)
+
+def _is_permanent(error):
+    """Ошибка, которую бессмысленно повторять (5xx, неверный адрес)"""
+    from flask_mail import BadHeaderError
+    
+    if isinstance(error, (smtplib.SMTPRecipientsRefused, BadHeaderError, AssertionError)):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500
+    return False
+
+def _record_results(sent, failed):
+    """Фиксация результата пачки: отправленные одним UPDATE, ошибки — executemany"""
+    notifications = _notifications_table()
+    now = datetime.utcnow()
+    attempts = db.func.coalesce(notifications.c.delivery_attempts, 0) + 1
+    
+    if sent:
+        db.session.execute(
+            notifications.update()
+            .where(notifications.c.id.in_(sent))
+            .values(
+                email_sent=True,
+                sent_at=now,
+                delivery_attempts=attempts,
+                email_claim_token=None,
+                email_next_attempt_at=None,
+                email_last_error=None
+            )
+        )
+    
+    if failed:
+        db.session.execute(
+            notifications.update()
+            .where(notifications.c.id == bindparam('notification_id'))
+            .values(
+                delivery_attempts=bindparam('attempts'),
+                email_claim_token=None,
+                email_next_attempt_at=bindparam('next_attempt_at'),
+                email_last_error=bindparam('error')
+            ),
+            failed
+        )
+    
+    db.session.commit()
+
+def deliver_batch(connection, batch_size=None):
+    """
+    Один проход очереди: захват, отправка, фиксация результата
+    
+    Returns:
+        dict: {'claimed': n, 'sent': n, 'failed': n}
+    """
+    batch_size = batch_size or current_app.config['EMAIL_QUEUE_BATCH_SIZE']
+    max_attempts = current_app.config['EMAIL_QUEUE_MAX_ATTEMPTS']
+    rows = claim_batch(batch_size)
+    
+    sent, failed = [], []
+    now = datetime.utcnow()
+    
+    for index, row in enumerate(rows):
+        attempts = (row.delivery_attempts or 0) + 1
+        try:
+            connection.send(build_message(row))
+        except Exception as e:
+            permanent = _is_permanent(e)
+            if not isinstance(e, smtplib.SMTPResponseException):
+                # Состояние соединения неизвестно — следующая отправка переподключится
+                connection.close()
+            
+            logger.warning(f'Email for notification {row.id} failed (attempt {attempts}): {e}')
+            failed.append({
+                'notification_id': row.id,
+                'attempts': max_attempts if permanent else attempts,
+                'next_attempt_at': now + backoff_delay(attempts),
+                'error': str(e)[:500]
+            })
+            
+            if isinstance(e, (ConnectionError, smtplib.SMTPConnectError, smtplib.SMTPServerDisconnected)):
+                # Сервер недоступен — остаток пачки откладываем без попыток отправки
+                for rest in rows[index + 1:]:
+                    failed.append({
+                        'notification_id': rest.id,
+                        'attempts': rest.delivery_attempts or 0,
+                        'next_attempt_at': now + backoff_delay(attempts),
+                        'error': str(e)[:500]
+                    })
+                break
+        else:
+            sent.append(row.id)
+    
+    if rows:
+        _record_results(sent, failed)
+        logger.info(f'Email queue: {len(sent)} sent, {len(failed)} failed')
+    
+    return {'claimed': len(rows), 'sent': len(sent), 'failed': len(failed)}
+
+def run_worker(batch_size=None, poll_interval=None, once=False, stop_event=None):
+    """
+    Цикл воркера доставки
+    
+    Пока есть работа, пачки отправляются через одно соединение; при пустой
+    очереди соединение закрывается, а воркер ждет poll_interval или wake().
+    
+    Args:
+        batch_size: размер пачки
+        poll_interval: пауза при пустой очереди (секунды)
+        once: обработать очередь один раз и выйти
+        stop_event: threading.Event для остановки цикла
+    
+    Returns:
+        dict: суммарная статистика
+    """
+    poll_interval = poll_interval or current_app.config['EMAIL_QUEUE_POLL_INTERVAL']
+    totals = {'claimed': 0, 'sent': 0, 'failed': 0}
+    connection = SMTPConnection()
+    
+    try:
+        while stop_event is None or not stop_event.is_set():
+            _wakeup.clear()
+            stats = deliver_batch(connection, batch_size)
+            for key, value in stats.items():
+                totals[key] += value
+            
+            if stats['claimed']:
+                continue
+            
+            connection.close()
+            if once:
+                break
+            _wakeup.wait(poll_interval)
+    finally:
+        connection.close()
+        db.session.remove()
+    
+    return totals
+
+def queue_stats():
+    """Состояние очереди: ожидают, отправлены, исчерпали попытки"""
+    notifications = _notifications_table()
+    now = datetime.utcnow()
+    max_attempts = current_app.config['EMAIL_QUEUE_MAX_ATTEMPTS']
+    attempts = db.func.coalesce(notifications.c.delivery_attempts, 0)
+    
+    def count(*conditions):
+        return db.session.execute(
+            db.select(db.func.count()).select_from(notifications).where(
+                notifications.c.send_email.is_(True), *conditions
+            )
+        ).scalar()
+    
+    return {
+        'due': count(_due_condition(notifications, now)),
+        'pending': count(notifications.c.email_sent.isnot(True), attempts < max_attempts),
+        'sent': count(notifications.c.email_sent.is_(True)),
+        'dead': count(notifications.c.email_sent.isnot(True), attempts >= max_attempts),
+    }
\ No newline at end of file
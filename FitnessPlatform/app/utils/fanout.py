@@ -0,0 +1,330 @@
+"""
+Массовая рассылка уведомлений по событиям тренировок
+
+Уведомления группе получателей (например, всем записанным на тренировку)
+создаются одним INSERT ... SELECT: шаблон рендерится один раз на группу
+(render_many скомпилированного шаблона, общий контекст подставляется один
+раз), каналы доставки берутся из настроек профиля (email_notifications,
+push_notifications) прямо в SELECT, счетчики непрочитанных обновляются
+одним UPDATE. Доставку по email/push дальше выполняет очередь доставки.
+
+Функции notify_* рассчитаны на вызов через dispatch — в фоне, чтобы
+запрос, породивший событие, не ждал рассылки.
+"""
+import json
+from datetime import datetime
+import logging
+
+from sqlalchemy import literal
+
+from app import db
+from app.utils import background, email_queue
+from app.utils.notification_templates import get_compiled_default
+
+logger = logging.getLogger(__name__)
+
+# Шаблоны по умолчанию (используются, если в notification_templates нет записи)
+DEFAULT_TEMPLATES = {
+    'training_approved': {
+        'title_template': 'Тренировка одобрена',
+        'message_template': 'Ваша тренировка "$training_title" ($schedule_time) одобрена и опубликована.',
+        'notification_type': 'training',
+        'default_priority': 5,
+        'default_channels': ['in_app', 'email'],
+    },
+    'training_rejected': {
+        'title_template': 'Тренировка отклонена',
+        'message_template': 'Ваша тренировка "$training_title" отклонена. Причина: $reason',
+        'notification_type': 'training',
+        'default_priority': 5,
+        'default_channels': ['in_app', 'email'],
+    },
+    'training_changed': {
+        'title_template': 'Изменения в тренировке',
+        'message_template': 'В тренировке "$training_title" ($schedule_time) произошли изменения: $changes',
+        'notification_type': 'training',
+        'default_priority': 7,
+        'default_channels': ['in_app', 'email', 'push'],
+    },
+    'training_cancelled': {
+        'title_template': 'Тренировка отменена',
+        'message_template': 'Тренировка "$training_title" ($schedule_time) отменена. $reason',
+        'notification_type': 'training',
+        'default_priority': 9,
+        'default_channels': ['in_app', 'email', 'push'],
+    },
+    'waitlist_promoted': {
+        'title_template': 'Место освободилось',
+        'message_template': 'Вы записаны на тренировку "$training_title" ($schedule_time) из листа ожидания.',
+        'notification_type': 'training',
+        'default_priority': 8,
+        'default_channels': ['in_app', 'email', 'push'],
+    },
+}
+
+def dispatch(fn, *args, **kwargs):
+    """Запуск рассылки в фоне (запрос не ждет ее завершения)"""
+    return background.submit(fn, *args, **kwargs)
+
+def _resolve_template(template_name):
+    """
+    Шаблон из БД или встроенный по умолчанию
+    
+    Returns:
+        tuple: (NotificationTemplate или None, настройки шаблона)
+    """
+    from app.models.notification import NotificationTemplate
+    
+    template = NotificationTemplate.query.filter_by(name=template_name, is_active=True).first()
+    if template:
+        try:
+            channels = json.loads(template.default_channels) if template.default_channels else None
+        except ValueError:
+            channels = None
+        return template, {
+            'notification_type': template.notification_type or 'system',
+            'default_priority': template.default_priority or 0,
+            'default_channels': channels or ['in_app'],
+        }
+    
+    if template_name not in DEFAULT_TEMPLATES:
+        raise ValueError(f'Неизвестный шаблон уведомления: {template_name}')
+    
+    return None, DEFAULT_TEMPLATES[template_name]
+
+def _render_many(template, template_name, contexts, shared=None):
+    """
+    Рендеринг заголовков и текстов пачки скомпилированным шаблоном
+    
+    Общий контекст (shared) подставляется в шаблон один раз на пачку,
+    для каждого получателя — только персональные переменные.
+    
+    Returns:
+        list: [(заголовок, текст), ...] в порядке contexts
+    """
+    if template is not None:
+        compiled = template.compiled()
+    else:
+        compiled = get_compiled_default(template_name, DEFAULT_TEMPLATES[template_name])
+    return compiled.render_many(contexts, shared=shared)
+
+def fan_out(recipients, template_name, context, action_url=None, data=None, is_important=False):
+    """
+    Создание уведомлений для группы получателей одним INSERT ... SELECT
+    
+    Args:
+        recipients: SELECT с единственной колонкой user_id
+        template_name: имя шаблона (NotificationTemplate.name или DEFAULT_TEMPLATES)
+        context: общий для группы контекст шаблона
+        action_url: ссылка действия
+        data: дополнительные данные (JSON)
+        is_important: важное уведомление
+    
+    Returns:
+        int: количество созданных уведомлений
+    """
+    from app.models.notification import Notification
+    from app.models.user import User, UserProfile
+    from app.utils.notifications import notification_broker
+    
+    template, settings = _resolve_template(template_name)
+    # Вся группа получает один текст: контекст целиком общий
+    [(title, message)] = _render_many(template, template_name, [{}], shared=context)
+    channels = settings['default_channels']
+    now = datetime.utcnow()
+    
+    recipients = recipients.subquery()
+    profiles = UserProfile.__table__
+    notifications = Notification.__table__
+    users = User.__table__
+    
+    # Каналы: разрешены шаблоном и не отключены пользователем в профиле
+    if 'email' in channels:
+        send_email = db.func.coalesce(profiles.c.email_notifications, True)
+    else:
+        send_email = literal(False)
+    if 'push' in channels:
+        send_push = db.func.coalesce(profiles.c.push_notifications, True)
+    else:
+        send_push = literal(False)
+    
+    columns = {
+        'user_id': recipients.c.user_id,
+        'title': literal(title),
+        'message': literal(message),
+        'notification_type': literal(settings['notification_type']),
+        'action_url': literal(action_url),
+        'data': literal(json.dumps(data, ensure_ascii=False) if data else None),
+        'is_read': literal(False),
+        'is_important': literal(is_important),
+        'priority': literal(settings['default_priority']),
+        'send_email': send_email,
+        'send_push': send_push,
+        'send_in_app': literal('in_app' in channels),
+        'created_at': literal(now),
+        'scheduled_for': literal(now),
+        'email_sent': literal(False),
+        'push_sent': literal(False),
+        'delivery_attempts': literal(0),
+        'template_id': literal(template.id if template else None),
+    }
+    
+    select = db.select(*columns.values()).select_from(
+        recipients.outerjoin(profiles, profiles.c.user_id == recipients.c.user_id)
+    )
+    result = db.session.execute(
+        notifications.insert().from_select(list(columns.keys()), select)
+    )
+    created = result.rowcount
+    
+    if created and 'in_app' in channels:
+        # INSERT ... SELECT обходит события модели — счетчики обновляем одним UPDATE
+        db.session.execute(
+            users.update()
+            .where(users.c.id.in_(db.select(recipients.c.user_id)))
+            .values(unread_notifications_count=users.c.unread_notifications_count + 1)
+        )
+    
+    recipient_ids = db.session.execute(db.select(recipients.c.user_id)).scalars().all()
+    db.session.commit()
+    
+    for user_id in recipient_ids:
+        notification_broker.publish(user_id)
+    if created and 'email' in channels:
+        email_queue.wake()
+    
+    logger.info(f'Fan-out {template_name}: {created} notifications')
+    return created
+
+def training_context(training, **extra):
+    """Общий контекст шаблонов для событий тренировки"""
+    context = {
+        'training_id': training.id,
+        'training_title': training.title,
+        'schedule_time': training.schedule_time.strftime('%d.%m.%Y %H:%M') if training.schedule_time else '',
+    }
+    context.update(extra)
+    return context
+
+def notify_user(user_id, template_name, context, action_url=None):
+    """Уведомление одному пользователю"""
+    from app.models.user import User
+    
+    recipients = db.select(User.id.label('user_id')).where(User.id == user_id)
+    return fan_out(recipients, template_name, context, action_url=action_url)
+
+def notify_each(items, template_name, shared=None, is_important=False):
+    """
+    Пачка уведомлений с разным контекстом (например, по тренировке на каждого тренера)
+    
+    Шаблон разрешается один раз и рендерится одним render_many: общий для
+    пачки контекст (shared) подставляется один раз, в цикле — только
+    персональные переменные. Настройки каналов всех получателей читаются
+    одним SELECT, уведомления вставляются одним INSERT (executemany), счетчики
+    непрочитанных — по UPDATE на группу с одинаковым приращением.
+    
+    Args:
+        items: список (user_id, context, action_url)
+        template_name: имя шаблона (NotificationTemplate.name или DEFAULT_TEMPLATES)
+        shared: общий для всех получателей контекст шаблона
+        is_important: важное уведомление
+    
+    Returns:
+        int: количество созданных уведомлений
+    """
+    from app.models.notification import Notification
+    from app.models.user import User, UserProfile
+    from app.utils.notifications import notification_broker
+    
+    if not items:
+        return 0
+    
+    template, settings = _resolve_template(template_name)
+    channels = settings['default_channels']
+    now = datetime.utcnow()
+    
+    user_ids = {user_id for user_id, _, _ in items}
+    profiles = {}
+    if {'email', 'push'} & set(channels):
+        profiles = {row.user_id: (row.email_notifications, row.push_notifications) for row in db.session.execute(
+            db.select(UserProfile.user_id, UserProfile.email_notifications, UserProfile.push_notifications)
+            .where(UserProfile.user_id.in_(user_ids))
+        )}
+    
+    rendered = _render_many(template, template_name, [context for _, context, _ in items], shared=shared)
+    
+    rows = []
+    for (user_id, _, action_url), (title, message) in zip(items, rendered):
+        email_enabled, push_enabled = profiles.get(user_id, (None, None))
+        rows.append({
+            'user_id': user_id,
+            'title': title,
+            'message': message,
+            'notification_type': settings['notification_type'],
+            'action_url': action_url,
+            'is_read': False,
+            'is_important': is_important,
+            'priority': settings['default_priority'],
+            'send_email': 'email' in channels and email_enabled is not False,
+            'send_push': 'push' in channels and push_enabled is not False,
+            'send_in_app': 'in_app' in channels,
+            'created_at': now,
+            'scheduled_for': now,
+            'email_sent': False,
+            'push_sent': False,
+            'delivery_attempts': 0,
+            'template_id': template.id if template else None,
+        })
+    db.session.execute(Notification.__table__.insert(), rows)
+    
+    if 'in_app' in channels:
+        # Вставка в обход событий модели: получатели с одинаковым числом уведомлений — одним UPDATE
+        per_user = {}
+        for row in rows:
+            per_user[row['user_id']] = per_user.get(row['user_id'], 0) + 1
+        by_delta = {}
+        for user_id, delta in per_user.items():
+            by_delta.setdefault(delta, []).append(user_id)
+        users = User.__table__
+        for delta, ids in by_delta.items():
+            db.session.execute(
+                users.update()
+                .where(users.c.id.in_(ids))
+                .values(unread_notifications_count=users.c.unread_notifications_count + delta)
+            )
+    db.session.commit()
+    
+    for user_id in user_ids:
+        notification_broker.publish(user_id)
+    if 'email' in channels:
+        email_queue.wake()
+    
+    logger.info(f'Batch {template_name}: {len(rows)} notifications')
+    return len(rows)
+
+def notify_training_registrants(training_id, template_name, context, action_url=None, is_important=True,
+                                user_ids=None):
+    """
+    Уведомление всем активным участникам тренировки
+    
+    user_ids — получатели, чьи записи уже отменены вместе с тренировкой
+    (registrations.cancel_training): тогда статус записи не проверяется.
+    """
+    from app.models.training import TrainingRegistration
+    from app.models.user import User
+    
+    if user_ids is None:
+        selected = TrainingRegistration.status == 'registered'
+    else:
+        selected = TrainingRegistration.user_id.in_(user_ids)
+    recipients = db.select(TrainingRegistration.user_id.label('user_id')).join(
+        User, User.id == TrainingRegistration.user_id
+    ).where(
+        TrainingRegistration.training_id == training_id,
+        selected,
+        User.is_active.is_(True)
+    )
+    return fan_out(recipients, template_name, context,
+                   action_url=action_url,
+                   data={'training_id': training_id},
+                   is_important=is_important)
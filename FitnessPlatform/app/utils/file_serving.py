@@ -0,0 +1,109 @@
+"""
+Отдача загруженных файлов
+
+- Range-запросы (перемотка видео) и условные запросы — средствами
+  werkzeug; на 304 отвечаем по метаданным файла (stat), не открывая его.
+- Тело отдается через wsgi.file_wrapper (sendfile в gunicorn/uWSGI),
+  X-Sendfile (USE_X_SENDFILE) или X-Accel-Redirect для nginx
+  (UPLOAD_ACCEL_REDIRECT_PREFIX).
+- Файлы с уникальными именами (uuid, хэш содержимого) никогда не
+  перезаписываются, поэтому кэшируются как immutable на год; ETag у
+  файлов с хэшем в имени — сам хэш.
+"""
+import mimetypes
+import os
+import re
+import stat as stat_module
+from urllib.parse import quote
+
+from flask import current_app, request, abort, send_file, Response
+from werkzeug.security import safe_join
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Служебные папки и файлы, которые не отдаются: недокачанные части
+# (chunked_upload) и файлы, отодвинутые перед удалением (blob_store.release)
+PRIVATE_FOLDERS = ('tmp',)
+PRIVATE_SUFFIXES = ('.part', '.deleting')
+
+_HASH_RE = re.compile(r'(?<![0-9a-f])([0-9a-f]{64}|[0-9a-f]{40})(?![0-9a-f])')
+_UUID_RE = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
+
+def content_hash(filename):
+    """Хэш содержимого из имени файла (sha256/sha1 hex) или None"""
+    match = _HASH_RE.search(filename)
+    return match.group(1) if match else None
+
+def is_immutable(filename):
+    """Имя уникально для содержимого и не переиспользуется"""
+    return bool(content_hash(filename) or _UUID_RE.search(filename))
+
+def file_etag(filename, stat):
+    """Сильный ETag: хэш из имени или размер и время изменения"""
+    return content_hash(filename) or f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+
+def _apply_cache_headers(response, filename, etag, stat):
+    response.set_etag(etag)
+    response.last_modified = int(stat.st_mtime)
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    if is_immutable(filename):
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.max_age = current_app.config.get('UPLOAD_CACHE_MAX_AGE', 3600)
+    return response
+
+def _not_modified(etag, stat):
+    """Условный запрос, на который можно ответить 304"""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since:
+        return int(stat.st_mtime) <= request.if_modified_since.timestamp()
+    return False
+
+def _is_private(relative_path):
+    """Служебный путь (проверяется уже нормализованный путь внутри UPLOAD_FOLDER)"""
+    parts = relative_path.replace(os.sep, '/').split('/')
+    return parts[0] in PRIVATE_FOLDERS or any(part.endswith(PRIVATE_SUFFIXES) for part in parts)
+
+def serve_upload(filename):
+    """
+    Ответ с загруженным файлом
+    
+    Args:
+        filename: путь относительно UPLOAD_FOLDER
+    """
+    upload_root = current_app.config['UPLOAD_FOLDER']
+    path = safe_join(upload_root, filename)
+    if path is None:
+        abort(404)
+    
+    # Проверяем путь после нормализации: ./tmp/... и x/../tmp/... ведут туда же
+    filename = os.path.relpath(path, upload_root).replace(os.sep, '/')
+    if _is_private(filename):
+        abort(404)
+    
+    try:
+        stat = os.stat(path)
+    except OSError:
+        abort(404)
+    if not stat_module.S_ISREG(stat.st_mode):
+        abort(404)
+    
+    etag = file_etag(filename, stat)
+    
+    if request.method in ('GET', 'HEAD') and _not_modified(etag, stat):
+        return _apply_cache_headers(Response(status=304), filename, etag, stat)
+    
+    accel_prefix = current_app.config.get('UPLOAD_ACCEL_REDIRECT_PREFIX')
+    if accel_prefix:
+        # nginx сам отдаст файл (sendfile, Range) из internal location
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = Response(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + quote(filename)
+        return _apply_cache_headers(response, filename, etag, stat)
+    
+    response = send_file(path, conditional=True, etag=etag, max_age=None)
+    response.accept_ranges = 'bytes'
+    return _apply_cache_headers(response, filename, etag, stat)
@@ -3,10 +3,9 @@
 """
 import os
 import uuid
+from datetime import datetime
 from werkzeug.utils import secure_filename
-from PIL import Image
-import magic
-from flask import current_app
+from flask import current_app, url_for
 import logging
 
 logger = logging.getLogger(__name__)
@@ -55,18 +54,29 @@ def generate_unique_filename(filename):
     else:
         return unique_id
 
-def save_uploaded_file(file, upload_folder='uploads', file_type='image'):
+def save_uploaded_file(file, upload_folder='uploads', file_type='image', user_id=None, purpose=None):
     """
     Сохранение загруженного файла
     
+    Файл потоково записывается на диск с подсчетом SHA-256 и попадает в
+    хранилище по содержимому (blob_store): повторная загрузка того же файла
+    не создает копию. Изображения регистрируются как UploadedFile и
+    обрабатываются в фоне (image_pipeline); для дубликата уже готовые
+    варианты переиспользуются без повторной обработки.
+    
     Args:
         file: файловый объект из request.files
-        upload_folder: папка для сохранения
+        upload_folder: не используется (файлы хранятся в blobs/), оставлен для совместимости
         file_type: тип файла
+        user_id: владелец файла
+        purpose: назначение (avatar, image, ...), по умолчанию file_type
     
     Returns:
         dict: информация о сохраненном файле или None в случае ошибки
     """
+    from app.utils import blob_store
+    from app.utils.image_processing import detect_mime
+    
     if not file or file.filename == '':
         return None
     
@@ -75,53 +85,101 @@ def save_uploaded_file(file, upload_folder='uploads', file_type='image'):
         logger.warning(f'Invalid file extension: {file.filename}')
         return None
     
-    # Создаем безопасное имя файла
     original_filename = secure_filename(file.filename)
-    unique_filename = generate_unique_filename(original_filename)
-    
-    # Создаем папку, если её нет
-    upload_path = os.path.join(current_app.config.get('UPLOAD_FOLDER', 'uploads'), upload_folder)
-    os.makedirs(upload_path, exist_ok=True)
-    
-    filepath = os.path.join(upload_path, unique_filename)
+    extension = original_filename.rsplit('.', 1)[1].lower() if '.' in original_filename else ''
+    upload_root = current_app.config.get('UPLOAD_FOLDER', 'uploads')
     
     try:
-        # Сохраняем файл
-        file.save(filepath)
-        
-        # Проверяем MIME-тип
-        mime = magic.Magic(mime=True)
-        detected_type = mime.from_file(filepath).split('/')[0]
-        
-        if file_type == 'image' and detected_type != 'image':
-            os.remove(filepath)
-            logger.warning(f'Invalid MIME type for image: {detected_type}')
-            return None
+        # Сохраняем файл (потоково, с подсчетом хэша)
+        blob, created = blob_store.store_stream(file.stream, extension)
+        filepath = os.path.join(upload_root, blob.relative_path)
         
-        # Для изображений можно дополнительно обработать
         if file_type == 'image':
-            optimize_image(filepath)
+            # Проверка MIME-типа и варианты — в фоне
+            detected_type = None
+        else:
+            detected_type = detect_mime(filepath).split('/')[0]
         
         file_info = {
             'original_filename': original_filename,
-            'filename': unique_filename,
+            'filename': os.path.basename(blob.relative_path),
             'filepath': filepath,
-            'relative_path': os.path.join(upload_folder, unique_filename),
-            'size': os.path.getsize(filepath),
+            'relative_path': blob.relative_path,
+            'size': blob.size,
+            'sha256': blob.sha256,
+            'deduplicated': not created,
             'mime_type': detected_type,
-            'extension': original_filename.rsplit('.', 1)[1].lower() if '.' in original_filename else ''
+            'extension': extension
         }
         
-        logger.info(f'File uploaded successfully: {file_info["filename"]}')
+        if file_type == 'image':
+            upload = _register_image(file_info, blob, user_id, purpose or file_type)
+            file_info['upload_id'] = upload.id
+            file_info['status'] = upload.status
+        
+        logger.info(f'File uploaded successfully: {file_info["filename"]} (duplicate: {not created})')
         return file_info
         
     except Exception as e:
         logger.error(f'Error saving file: {str(e)}')
-        # Удаляем файл, если он был частично сохранен
-        if os.path.exists(filepath):
-            os.remove(filepath)
         return None
 
+def _register_image(file_info, blob, user_id, purpose):
+    """Запись UploadedFile и постановка изображения в очередь обработки (если нужно)"""
+    from app import db
+    from app.models.media import UploadedFile
+    from app.utils import image_pipeline
+    
+    upload = UploadedFile(
+        user_id=user_id,
+        purpose=purpose,
+        original_filename=file_info['original_filename'],
+        relative_path=file_info['relative_path'],
+        size=file_info['size'],
+        blob_id=blob.id,
+        status=UploadedFile.STATUS_PENDING
+    )
+    db.session.add(upload)
+    
+    # Дубликат: варианты того же набора уже построены для этого содержимого
+    if file_info['deduplicated']:
+        is_avatar = purpose == 'avatar'
+        processed = UploadedFile.query.filter(
+            UploadedFile.blob_id == blob.id,
+            UploadedFile.status == UploadedFile.STATUS_READY,
+            (UploadedFile.purpose == 'avatar') if is_avatar else (UploadedFile.purpose != 'avatar')
+        ).first()
+        if processed is not None:
+            upload.status = UploadedFile.STATUS_READY
+            upload.mime_type = processed.mime_type
+            upload.width = processed.width
+            upload.height = processed.height
+            upload.variants = processed.variants
+            upload.processed_at = datetime.utcnow()
+            db.session.flush()
+            if is_avatar:
+                image_pipeline.set_avatar(upload)
+            db.session.commit()
+            return upload
+    
+    db.session.commit()
+    
+    image_pipeline.enqueue(upload)
+    db.session.refresh(upload)
+    return upload
+
+def delete_upload(upload):
+    """Удаление записи UploadedFile с освобождением ссылки на содержимое"""
+    from app import db
+    from app.utils import blob_store
+    
+    blob_id = upload.blob_id
+    db.session.delete(upload)
+    db.session.commit()
+    
+    if blob_id is not None:
+        blob_store.release(blob_id)
+
 def optimize_image(filepath, max_size=(1920, 1080), quality=85):
     """
     Оптимизация изображения
@@ -131,8 +189,13 @@ def optimize_image(filepath, max_size=(1920, 1080), quality=85):
         max_size: максимальные размеры (ширина, высота)
         quality: качество JPEG (1-100)
     """
+    from PIL import Image, ImageOps
+    
     try:
         with Image.open(filepath) as img:
+            # Учитываем ориентацию из EXIF
+            img = ImageOps.exif_transpose(img)
+            
             # Конвертируем в RGB, если нужно
             if img.mode in ('RGBA', 'P'):
                 img = img.convert('RGB')
@@ -150,13 +213,24 @@ def delete_file(filepath):
     """
     Удаление файла
     
+    Для файлов хранилища (blobs/) освобождается одна ссылка.
+    
     Args:
         filepath: путь к файлу
     
     Returns:
         bool: успешно ли удален файл
     """
+    from app.utils import blob_store
+    
     try:
+        # Файл из хранилища по содержимому: освобождаем ссылку, сам файл
+        # удаляется только вместе с последней ссылкой
+        upload_root = current_app.config.get('UPLOAD_FOLDER', 'uploads')
+        relative_path = os.path.relpath(os.path.abspath(filepath), os.path.abspath(upload_root))
+        if blob_store.is_blob_path(relative_path):
+            return blob_store.release_path(relative_path)
+        
         if os.path.exists(filepath):
             os.remove(filepath)
             logger.info(f'File deleted: {filepath}')
@@ -1,42 +1,14 @@
 """
 Вспомогательные функции
 """
-"""
-Вспомогательные функции
-"""
 import hashlib
 import random
 import string
 import re
 from datetime import datetime, timedelta, date
 from flask import request, url_for, current_app
-import pytz
 import json
 
-def get_pending_trainings_count(user=None):
-    """Возвращает количество тренировок на проверке"""
-    # Если передали пользователя, используем его
-    # Иначе импортируем current_user
-    if user is None:
-        try:
-            from flask_login import current_user
-            user = current_user
-        except:
-            return 0
-    
-    if user.is_authenticated and user.role == 'admin':
-        try:
-            from app.models.training import Training
-            return Training.query.filter(
-                Training.status.in_(['draft', 'pending'])
-            ).count()
-        except Exception as e:
-            current_app.logger.error(f'Error getting pending trainings count: {e}')
-            return 0
-    return 0
-
-# Остальные функции остаются без изменений
-
 def generate_password(length=12):
     """Генерация случайного пароля"""
     chars = string.ascii_letters + string.digits + "!@#$%^&*"
@@ -100,6 +72,8 @@ def paginate_query(query, page, per_page=20):
 
 def get_client_timezone():
     """Получение часового пояса клиента"""
+    import pytz
+    
     # Пытаемся определить по заголовку
     tz_header = request.headers.get('X-Timezone')
     if tz_header:
@@ -113,6 +87,8 @@ def get_client_timezone():
 
 def convert_timezone(dt, from_tz='UTC', to_tz='Europe/Moscow'):
     """Конвертация времени между часовыми поясами"""
+    import pytz
+    
     try:
         from_tz_obj = pytz.timezone(from_tz)
         to_tz_obj = pytz.timezone(to_tz)
@@ -199,7 +175,7 @@ def to_json(data):
     return json.dumps(data, default=json_serial, ensure_ascii=False)
 
 def get_pending_trainings_count(user=None):
-    """Возвращает количество тренировок на проверке"""
+    """Возвращает количество тренировок на проверке (поддерживаемый счетчик, app/utils/moderation.py)"""
     if user is None:
         try:
             from flask_login import current_user
@@ -209,10 +185,8 @@ def get_pending_trainings_count(user=None):
     
     if user.is_authenticated and user.role == 'admin':
         try:
-            from app.models.training import Training
-            return Training.query.filter(
-                Training.status.in_(['draft', 'pending'])
-            ).count()
+            from app.utils.moderation import pending_trainings_count
+            return pending_trainings_count()
         except Exception as e:
             # Логируем ошибку, но возвращаем 0
             from flask import current_app
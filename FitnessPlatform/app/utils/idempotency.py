@@ -0,0 +1,118 @@
+"""
+Идемпотентность POST-запросов
+
+Форма передает ключ в скрытом поле idempotency_key (шаблоны получают его
+из idempotency_key()), клиент API — в заголовке Idempotency-Key. Первый
+запрос с ключом занимает строку idempotency_keys (уникальна по
+пользователю и ключу) в транзакции самого действия, а после ответа
+сохраняет его: код, адрес перенаправления и flash-сообщения. Повтор с тем
+же ключом — двойное нажатие или повторная отправка после обрыва связи —
+получает сохраненный ответ, и действие второй раз не выполняется. Пока
+первый запрос не завершен, повтор получает «запрос уже обрабатывается».
+Если действие упало, транзакция откатывается вместе с ключом, и повтор
+выполнит его заново.
+
+Ключи старше IDEMPOTENCY_KEY_TTL_HOURS удаляет flask idempotency purge.
+"""
+import json
+import uuid
+import logging
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import request, session, flash, redirect, url_for, current_app
+from flask_login import current_user
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'Idempotency-Key'
+FIELD = 'idempotency_key'
+MAX_KEY_LENGTH = 64
+
+def new_key():
+    """Ключ для скрытого поля формы"""
+    return uuid.uuid4().hex
+
+def _request_key():
+    key = request.headers.get(HEADER) or request.form.get(FIELD) or ''
+    return key.strip()[:MAX_KEY_LENGTH]
+
+def idempotent(f):
+    """Декоратор POST-представления: повтор с тем же ключом возвращает первый ответ"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        from app.models.system import IdempotencyKey
+        
+        key = _request_key()
+        if not key or not current_user.is_authenticated:
+            return f(*args, **kwargs)
+        
+        user_id = current_user.id
+        db.session.add(IdempotencyKey(user_id=user_id, key=key, endpoint=request.endpoint))
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            return _replay(user_id, key)
+        
+        flashes_before = len(session.get('_flashes', []))
+        response = f(*args, **kwargs)
+        _complete(user_id, key, response, session.get('_flashes', [])[flashes_before:])
+        return response
+    return decorated_function
+
+def _complete(user_id, key, response, flashes):
+    """Сохранение ответа (ключ уже зафиксирован с действием или еще ждет коммита)"""
+    from app.models.system import IdempotencyKey
+    
+    table = IdempotencyKey.__table__
+    values = {
+        'status_code': response.status_code,
+        'location': response.headers.get('Location'),
+        'flashes': json.dumps([list(item) for item in flashes], ensure_ascii=False),
+        'completed_at': datetime.utcnow(),
+    }
+    try:
+        updated = db.session.execute(table.update().where(
+            table.c.user_id == user_id, table.c.key == key).values(**values)).rowcount
+        if not updated:
+            # Представление откатило транзакцию вместе с ключом
+            db.session.execute(table.insert().values(user_id=user_id, key=key, endpoint=request.endpoint, **values))
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        logger.warning(f'Idempotency key {key} of user {user_id} was taken by a concurrent request')
+
+def _replay(user_id, key):
+    """Ответ первого запроса с этим ключом"""
+    from app.models.system import IdempotencyKey
+    
+    record = IdempotencyKey.query.filter_by(user_id=user_id, key=key).first()
+    if record is None or record.completed_at is None:
+        flash('Запрос уже обрабатывается', 'info')
+        return redirect(request.referrer or url_for('main.index'))
+    
+    for category, message in record.get_flashes():
+        flash(message, category)
+    if record.location:
+        return redirect(record.location, code=record.status_code or 302)
+    return current_app.response_class(status=record.status_code or 204)
+
+def purge(ttl_hours=None):
+    """
+    Удаление старых ключей
+    
+    Returns:
+        int: количество удаленных ключей
+    """
+    from app.models.system import IdempotencyKey
+    
+    ttl_hours = ttl_hours or current_app.config['IDEMPOTENCY_KEY_TTL_HOURS']
+    deleted = IdempotencyKey.query.filter(
+        IdempotencyKey.created_at < datetime.utcnow() - timedelta(hours=ttl_hours)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
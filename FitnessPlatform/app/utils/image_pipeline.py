@@ -0,0 +1,136 @@
+"""
+Фоновая обработка загруженных изображений
+
+Запрос только сохраняет файл и создает запись UploadedFile со статусом
+pending; проверка MIME-типа, поворот по EXIF и построение вариантов
+(WebP + JPEG) выполняются в пуле процессов и не занимают поток WSGI.
+По завершении статус меняется на ready (или failed), для аватаров
+обновляется ссылка в профиле.
+
+При BACKGROUND_TASKS_EAGER=True обработка выполняется сразу (тесты, CLI).
+"""
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import logging
+
+from flask import current_app
+
+from app import db
+from app.utils import blob_store
+from app.utils.image_processing import process_image, InvalidImageError
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor(max_workers):
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(max_workers=max_workers)
+    return _executor
+
+def variants_dir(relative_path):
+    """Относительная папка вариантов файла: <папка>/variants/<имя без расширения>"""
+    folder, filename = os.path.split(relative_path)
+    return os.path.join(folder, 'variants', os.path.splitext(filename)[0])
+
+def enqueue(upload):
+    """
+    Постановка изображения в очередь обработки
+    
+    Args:
+        upload: UploadedFile (уже сохраненный в базе)
+    """
+    app = current_app._get_current_object()
+    upload_root = app.config['UPLOAD_FOLDER']
+    source_path = os.path.join(upload_root, upload.relative_path)
+    output_dir = os.path.join(upload_root, variants_dir(upload.relative_path))
+    kind = 'avatar' if upload.purpose == 'avatar' else 'image'
+    upload_id = upload.id
+    
+    if app.config.get('BACKGROUND_TASKS_EAGER'):
+        try:
+            result = process_image(source_path, output_dir, kind)
+        except Exception as e:
+            _apply_result(app, upload_id, error=e)
+        else:
+            _apply_result(app, upload_id, result=result)
+        return
+    
+    upload.status = upload.STATUS_PROCESSING
+    db.session.commit()
+    
+    future = _get_executor(app.config.get('IMAGE_WORKERS', 2)).submit(
+        process_image, source_path, output_dir, kind
+    )
+    
+    def done(f):
+        error = f.exception()
+        _apply_result(app, upload_id, result=None if error else f.result(), error=error)
+    
+    future.add_done_callback(done)
+
+def _apply_result(app, upload_id, result=None, error=None):
+    """Сохранение результата обработки (вызывается после завершения задачи пула)"""
+    from app.models.media import UploadedFile
+    
+    with app.app_context():
+        try:
+            upload = db.session.get(UploadedFile, upload_id)
+            if upload is None:
+                return
+            
+            upload_root = app.config['UPLOAD_FOLDER']
+            upload.processed_at = datetime.utcnow()
+            
+            if error is not None:
+                upload.status = UploadedFile.STATUS_FAILED
+                upload.error = str(error)[:500]
+                if isinstance(error, InvalidImageError) and upload.blob_id:
+                    # Не изображение — ссылку на содержимое не держим
+                    blob_id, upload.blob_id = upload.blob_id, None
+                    db.session.commit()
+                    blob_store.release(blob_id)
+                logger.warning(f'Image processing failed for upload {upload_id}: {error}')
+            else:
+                variants = {}
+                for name, variant in result['variants'].items():
+                    variants[name] = {
+                        key: os.path.relpath(value, upload_root) if key in ('webp', 'jpg') else value
+                        for key, value in variant.items()
+                    }
+                
+                upload.status = UploadedFile.STATUS_READY
+                upload.mime_type = result['mime_type']
+                upload.width = result['width']
+                upload.height = result['height']
+                upload.variants = json.dumps(variants)
+                upload.error = None
+                
+                if upload.purpose == 'avatar':
+                    set_avatar(upload)
+            
+            db.session.commit()
+        except Exception:
+            logger.exception(f'Error saving image processing result for upload {upload_id}')
+            db.session.rollback()
+        finally:
+            db.session.remove()
+
+def set_avatar(upload):
+    """Ссылка на готовый аватар в профиле пользователя"""
+    from app.models.user import UserProfile
+    
+    profile = UserProfile.query.filter_by(user_id=upload.user_id).first()
+    if profile is None:
+        profile = UserProfile(user_id=upload.user_id)
+        db.session.add(profile)
+    
+    url_prefix = current_app.config.get('UPLOAD_URL_PATH', '/uploads').rstrip('/')
+    profile.avatar_url = f"{url_prefix}/{upload.variant_path('128', 'jpg')}"
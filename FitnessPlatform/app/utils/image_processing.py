@@ -0,0 +1,129 @@
+"""
+Обработка изображений (выполняется в процессах пула image_pipeline)
+
+Функции модуля не используют приложение и базу данных, поэтому их можно
+безопасно выполнять в отдельных процессах. Детектор MIME-типов (libmagic)
+создается один раз на процесс/поток, а не на каждый файл.
+"""
+import os
+import threading
+
+from PIL import Image, ImageOps
+
+# Варианты: (имя, (ширина, высота), обрезать до точного размера)
+VARIANTS = {
+    'avatar': (
+        ('512', (512, 512), True),
+        ('128', (128, 128), True),
+        ('64', (64, 64), True),
+    ),
+    'image': (
+        ('large', (1920, 1080), False),
+        ('medium', (800, 800), False),
+        ('thumb', (320, 320), False),
+    ),
+}
+
+# Форматы вариантов: (расширение, формат Pillow, параметры сохранения)
+FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpg', 'JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+)
+
+class InvalidImageError(ValueError):
+    """Файл не является поддерживаемым изображением"""
+
+_local = threading.local()
+
+def get_mime_detector():
+    """Детектор MIME-типов, переиспользуемый в пределах потока"""
+    detector = getattr(_local, 'mime_detector', None)
+    if detector is None:
+        import magic
+        detector = _local.mime_detector = magic.Magic(mime=True)
+    return detector
+
+def detect_mime(filepath):
+    """MIME-тип файла по содержимому (читаются только первые килобайты)"""
+    with open(filepath, 'rb') as f:
+        header = f.read(8192)
+    return get_mime_detector().from_buffer(header)
+
+def _flatten(img):
+    """Приведение к RGB (прозрачность — на белом фоне)"""
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel('A'))
+        return background
+    if img.mode != 'RGB':
+        return img.convert('RGB')
+    return img
+
+def _save_atomic(img, path, fmt, options):
+    """Сохранение через временный файл, чтобы не отдавать недописанный вариант"""
+    tmp_path = f'{path}.tmp'
+    img.save(tmp_path, fmt, **options)
+    os.replace(tmp_path, path)
+
+def process_image(source_path, output_dir, kind='image'):
+    """
+    Проверка изображения и построение вариантов
+    
+    Варианты строятся от большего к меньшему, каждый следующий — из
+    предыдущего, поэтому полное разрешение декодируется и уменьшается
+    только один раз. Для JPEG используется draft-декодирование сразу в
+    уменьшенном масштабе. Ориентация берется из EXIF, метаданные в
+    варианты не копируются.
+    
+    Args:
+        source_path: путь к исходному файлу
+        output_dir: папка для вариантов
+        kind: набор вариантов (ключ VARIANTS)
+    
+    Returns:
+        dict: {'mime_type', 'width', 'height', 'variants': {имя: {формат: путь, 'width', 'height'}}}
+    """
+    mime_type = detect_mime(source_path)
+    if not mime_type.startswith('image/'):
+        raise InvalidImageError(f'Not an image: {mime_type}')
+    
+    specs = VARIANTS[kind]
+    largest = max(max(size) for _, size, _ in specs)
+    os.makedirs(output_dir, exist_ok=True)
+    
+    try:
+        img = Image.open(source_path)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise InvalidImageError(str(e))
+    
+    with img:
+        if img.format == 'JPEG':
+            # Декодирование сразу в уменьшенном масштабе (DCT scaling)
+            img.draft('RGB', (largest, largest))
+        
+        oriented = _flatten(ImageOps.exif_transpose(img))
+        width, height = oriented.size
+        
+        variants = {}
+        current = oriented
+        for name, size, crop in specs:
+            if crop:
+                current = ImageOps.fit(current, size, Image.Resampling.LANCZOS)
+            else:
+                current = current.copy()
+                current.thumbnail(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+            
+            variant = {'width': current.width, 'height': current.height}
+            for ext, fmt, options in FORMATS:
+                path = os.path.join(output_dir, f'{name}.{ext}')
+                _save_atomic(current, path, fmt, options)
+                variant[ext] = path
+            variants[name] = variant
+    
+    return {
+        'mime_type': mime_type,
+        'width': width,
+        'height': height,
+        'variants': variants
+    }
@@ -0,0 +1,282 @@
+"""
+Консоль модерации тренировок
+
+Число тренировок на проверке хранится в moderation_counters и
+поддерживается событиями модели Training (вставка, смена статуса,
+удаление) в транзакции самого изменения; шаблоны читают его одним
+запросом по первичному ключу вместо COUNT(*) на каждый показ. Строку
+счетчика создают миграция 0014_moderation_counters, create_db.py и flask moderation recount;
+пока ее нет, чтение считает COUNT(*) и ничего не пишет.
+
+Очередь листается keyset-пагинацией по (created_at, id): строки на проверке
+находит индекс idx_trainings_status_schedule, сортируется только сама
+очередь, без OFFSET по уже просмотренным. Одобрение и отклонение пачки —
+один UPDATE ... WHERE id IN (...) AND status IN ('draft', 'pending'),
+одна вставка записей аудита и одна пачка уведомлений тренерам в фоне.
+"""
+from datetime import datetime
+import logging
+
+from flask import g, has_app_context, url_for
+from sqlalchemy import event, inspect
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+PENDING_STATUSES = ('draft', 'pending')
+PENDING_TRAININGS = 'pending_trainings'
+
+QUEUE_PAGE_SIZE = 50
+# Сколько тренировок можно одобрить или отклонить одним запросом
+MAX_BATCH_SIZE = 500
+
+ACTIONS = {
+    'approve': {
+        'status': 'active',
+        'moderation_status': 'approved',
+        'audit_action': 'training_approved',
+        'template': 'training_approved',
+    },
+    'reject': {
+        'status': 'rejected',
+        'moderation_status': 'rejected',
+        'audit_action': 'training_rejected',
+        'template': 'training_rejected',
+    },
+}
+
+DEFAULT_REJECT_REASON = 'Тренировка не соответствует требованиям'
+
+def _counters_table():
+    from app.models.system import ModerationCounter
+    return ModerationCounter.__table__
+
+def _change_counter(connection, name, delta):
+    """Атомарное изменение счетчика (нет строки — изменение не применяется до пересчета)"""
+    counters = _counters_table()
+    new_value = counters.c.value + delta
+    connection.execute(
+        counters.update()
+        .where(counters.c.name == name)
+        .values(value=db.case((new_value < 0, 0), else_=new_value), updated_at=datetime.utcnow())
+    )
+
+def adjust_pending(connection, delta):
+    """Поправка счетчика после UPDATE статуса тренировок в обход событий модели"""
+    _change_counter(connection, PENDING_TRAININGS, delta)
+
+def _pending_count_select():
+    from app.models.training import Training
+    
+    trainings = Training.__table__
+    return db.select(db.func.count(trainings.c.id)).where(trainings.c.status.in_(PENDING_STATUSES))
+
+def recount(connection=None):
+    """
+    Пересчет счетчика по фактическим строкам (upsert строки счетчика)
+    
+    Returns:
+        int: число тренировок на проверке
+    """
+    dialect = connection.dialect.name if connection is not None else db.engine.dialect.name
+    connection = connection if connection is not None else db.session
+    counters = _counters_table()
+    value = connection.execute(_pending_count_select()).scalar() or 0
+    values = {'name': PENDING_TRAININGS, 'value': value, 'updated_at': datetime.utcnow()}
+    
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(counters).values(**values)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=['name'], set_={'value': statement.excluded.value,
+                                           'updated_at': statement.excluded.updated_at}))
+    elif not connection.execute(counters.update().where(counters.c.name == PENDING_TRAININGS)
+                                .values(value=value, updated_at=values['updated_at'])).rowcount:
+        connection.execute(counters.insert().values(**values))
+    return value
+
+def pending_trainings_count():
+    """Число тренировок на проверке: одно чтение счетчика за запрос"""
+    if has_app_context() and 'pending_trainings_count' in g:
+        return g.pending_trainings_count
+    
+    counters = _counters_table()
+    value = db.session.execute(
+        db.select(counters.c.value).where(counters.c.name == PENDING_TRAININGS)
+    ).scalar()
+    if value is None:
+        # Строку создает пересчет вне запроса — из шаблона ничего не пишем
+        value = db.session.execute(_pending_count_select()).scalar() or 0
+    
+    if has_app_context():
+        g.pending_trainings_count = value
+    return value
+
+def pending_page(after=None, limit=QUEUE_PAGE_SIZE):
+    """
+    Страница очереди модерации (keyset-пагинация по (created_at, id), старые первыми)
+    
+    Args:
+        after: курсор — строка 'created_at_id' последней тренировки предыдущей страницы
+        limit: размер страницы
+    
+    Returns:
+        tuple: (список Training, курсор следующей страницы или None)
+    """
+    from sqlalchemy.orm import joinedload
+    from app.models.training import Training
+    
+    query = Training.query.options(joinedload(Training.trainer_user)).filter(
+        Training.status.in_(PENDING_STATUSES)
+    )
+    position = parse_cursor(after)
+    if position:
+        created_at, training_id = position
+        query = query.filter(db.or_(
+            Training.created_at > created_at,
+            db.and_(Training.created_at == created_at, Training.id > training_id)
+        ))
+    
+    items = query.order_by(Training.created_at, Training.id).limit(limit + 1).all()
+    next_cursor = make_cursor(items[limit - 1]) if len(items) > limit else None
+    
+    return items[:limit], next_cursor
+
+def make_cursor(training):
+    return f'{training.created_at.isoformat()}_{training.id}'
+
+def parse_cursor(value):
+    """Курсор очереди -> (created_at, id); некорректный курсор — начало очереди"""
+    if not value:
+        return None
+    created_at, _, training_id = value.rpartition('_')
+    try:
+        return datetime.fromisoformat(created_at), int(training_id)
+    except ValueError:
+        return None
+
+def moderate(training_ids, action, moderator_id, reason=None, request=None):
+    """
+    Одобрение или отклонение пачки тренировок
+    
+    Меняются только те, что еще на проверке: повторное или параллельное
+    решение по уже обработанной тренировке ничего не делает. Счетчик
+    уменьшается в той же транзакции, записи аудита вставляются одной пачкой,
+    уведомления тренерам отправляются в фоне после коммита.
+    
+    Args:
+        training_ids: id тренировок (не больше MAX_BATCH_SIZE)
+        action: 'approve' или 'reject'
+        moderator_id: id администратора
+        reason: причина отклонения
+        request: запрос Flask для записей аудита
+    
+    Returns:
+        list: id тренировок, статус которых изменился
+    """
+    from app.models.training import Training
+    from app.models.system import AuditLog
+    from app.utils import fanout
+    
+    spec = ACTIONS[action]
+    training_ids = sorted({int(training_id) for training_id in training_ids})[:MAX_BATCH_SIZE]
+    if not training_ids:
+        return []
+    if action == 'reject':
+        reason = reason or DEFAULT_REJECT_REASON
+    
+    trainings = Training.__table__
+    now = datetime.utcnow()
+    values = {
+        'status': spec['status'],
+        'moderation_status': spec['moderation_status'],
+        'moderation_notes': reason if action == 'reject' else None,
+        'moderator_id': moderator_id,
+        'version': trainings.c.version + 1,
+        'updated_at': now,
+    }
+    if action == 'approve':
+        values['published_at'] = db.func.coalesce(trainings.c.published_at, now)
+    
+    # Сначала выбираем строки на проверке (в PostgreSQL — с блокировкой), затем
+    # меняем ровно их. Если часть успело решить параллельное решение (rowcount
+    # меньше выбранного), транзакция откатывается и выбор повторяется.
+    for _ in range(3):
+        rows = db.session.execute(
+            db.select(trainings.c.id, trainings.c.trainer_user_id, trainings.c.title, trainings.c.schedule_time)
+            .where(trainings.c.id.in_(training_ids), trainings.c.status.in_(PENDING_STATUSES))
+            .order_by(trainings.c.id)
+            .with_for_update()
+        ).all()
+        if not rows:
+            return []
+        
+        changed = db.session.execute(
+            trainings.update()
+            .where(trainings.c.id.in_([row.id for row in rows]), trainings.c.status.in_(PENDING_STATUSES))
+            .values(**values)
+        ).rowcount
+        if changed == len(rows):
+            break
+        db.session.rollback()
+    else:
+        raise RuntimeError(f'Could not moderate trainings {training_ids}: concurrent decisions')
+    
+    # UPDATE в обход событий модели — счетчик меняем явно
+    _change_counter(db.session, PENDING_TRAININGS, -changed)
+    AuditLog.log_batch(moderator_id, spec['audit_action'], 'training', [row.id for row in rows],
+                       details_after={'status': spec['status'], 'reason': reason}, request=request)
+    db.session.commit()
+    g.pop('pending_trainings_count', None)
+    
+    items = [(row.trainer_user_id, fanout.training_context(row),
+              url_for('trainings.detail', training_id=row.id)) for row in rows]
+    fanout.dispatch(fanout.notify_each, items, spec['template'], shared={'reason': reason or ''})
+    
+    logger.info(f'Moderation {action}: {len(rows)} trainings by user {moderator_id}')
+    return [row.id for row in rows]
+
+def _is_pending(status):
+    return status in PENDING_STATUSES
+
+def _after_insert(mapper, connection, target):
+    if _is_pending(target.status):
+        _change_counter(connection, PENDING_TRAININGS, 1)
+
+def _after_update(mapper, connection, target):
+    history = inspect(target).attrs.status.history
+    if not history.has_changes():
+        return
+    
+    was_pending = _is_pending(history.deleted[0]) if history.deleted else False
+    if was_pending != _is_pending(target.status):
+        _change_counter(connection, PENDING_TRAININGS, -1 if was_pending else 1)
+
+def _after_delete(mapper, connection, target):
+    if _is_pending(target.status):
+        _change_counter(connection, PENDING_TRAININGS, -1)
+
+def _status_set(target, value, oldvalue, initiator):
+    """Ничего не меняет: слушатель нужен ради active_history"""
+
+_listeners_registered = False
+
+def register_listeners():
+    """Регистрация событий, поддерживающих счетчик тренировок на проверке"""
+    global _listeners_registered
+    
+    if _listeners_registered:
+        return
+    
+    from app.models.training import Training
+    # Прежний статус нужен и для объекта, истекшего после коммита: active_history
+    # загружает его при присваивании, иначе history.deleted пуст
+    event.listen(Training.status, 'set', _status_set, active_history=True)
+    event.listen(Training, 'after_insert', _after_insert)
+    event.listen(Training, 'after_update', _after_update)
+    event.listen(Training, 'after_delete', _after_delete)
+    _listeners_registered = True
\ No newline at end of file
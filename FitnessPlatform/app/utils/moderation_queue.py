@@ -0,0 +1,503 @@
+"""
+Общая очередь модерации контента
+
+Отзывы (feedbacks.moderation_status), комментарии
+(feedback_comments.moderation_status) и жалобы (content_moderation.status)
+ожидают решения в одной таблице moderation_queue: строка на единицу
+контента, после решения строка удаляется. Новые отзывы, комментарии и
+жалобы попадают в очередь событиями моделей, жалоба на отзыв
+(Feedback.report) возвращает его в очередь с новым числом жалоб.
+
+Приоритет складывается из числа жалоб, штрафных баллов автора и возраста:
+
+    вес_жалобы * жалобы + вес_штрафа * штраф + вес_часа * (сейчас - created_at)
+
+Слагаемое «сейчас» одинаково для всех строк и на порядок не влияет,
+поэтому в priority хранится значение без него:
+
+    вес_жалобы * жалобы + вес_штрафа * штраф - вес_часа * часы(created_at)
+
+Оно меняется только при новой жалобе или штрафе автора, индексируется
+(priority, id) и дает keyset-пагинацию без пересчета на каждый показ.
+После изменения весов очередь пересчитывает flask moderation rebuild-queue.
+
+Модератор захватывает пачку одним UPDATE с токеном и сроком
+(MODERATION_LEASE_SECONDS), как воркер email-очереди: захваченные строки
+другим не выдаются, пока срок не истек, а решение принимается только по
+своим неистекшим захватам — несколько модераторов работают параллельно,
+не решая одно и то же дважды.
+"""
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+import logging
+
+from flask import current_app
+from sqlalchemy import event
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = ('feedback', 'comment', 'report')
+DECISIONS = {'approve': 'approved', 'reject': 'rejected'}
+OPEN_REPORT_STATUSES = ('pending', 'reviewing')
+
+QUEUE_PAGE_SIZE = 50
+DEFAULT_REJECT_NOTES = 'Нарушение правил платформы'
+
+# Начало отсчета часов для слагаемого возраста
+EPOCH = datetime(2020, 1, 1)
+
+def _queue_table():
+    from app.models.system import ModerationQueueItem
+    return ModerationQueueItem.__table__
+
+def _hours(moment):
+    return (moment - EPOCH).total_seconds() / 3600
+
+def base_priority(reports_count, author_penalty, created_at):
+    """Хранимый приоритет (без слагаемого текущего времени)"""
+    config = current_app.config
+    return (config['MODERATION_REPORT_WEIGHT'] * (reports_count or 0)
+            + config['MODERATION_PENALTY_WEIGHT'] * (author_penalty or 0)
+            - config['MODERATION_AGE_WEIGHT'] * _hours(created_at or datetime.utcnow()))
+
+def current_priority(priority, now=None):
+    """Приоритет с учетом возраста на момент now — для показа"""
+    return priority + current_app.config['MODERATION_AGE_WEIGHT'] * _hours(now or datetime.utcnow())
+
+def _dialect(connection):
+    return getattr(connection, 'dialect', None) or db.engine.dialect
+
+def content_author(connection, content_type, content_id):
+    """Автор контента, на который подана жалоба (content_moderation.content_type)"""
+    from app.models.feedback import Feedback, Comment
+    from app.models.training import Training
+    
+    if content_type == 'user':
+        return content_id
+    column = {
+        'feedback': Feedback.__table__.c.user_id,
+        'comment': Comment.__table__.c.user_id,
+        'training': Training.__table__.c.trainer_user_id,
+    }.get(content_type)
+    if column is None:
+        return None
+    return connection.execute(db.select(column).where(column.table.c.id == content_id)).scalar()
+
+def enqueue(connection, content_type, content_id, author_user_id, created_at, reports_count=0):
+    """
+    Постановка в очередь или обновление числа жалоб (upsert по контенту)
+    
+    Захват модератором не сбрасывается: новая жалоба на захваченный отзыв
+    меняет только приоритет.
+    """
+    from app.models.user import User
+    
+    queue = _queue_table()
+    users = User.__table__
+    penalty = 0
+    if author_user_id:
+        penalty = connection.execute(
+            db.select(users.c.penalty_points).where(users.c.id == author_user_id)
+        ).scalar() or 0
+    created_at = created_at or datetime.utcnow()
+    values = {
+        'content_type': content_type,
+        'content_id': content_id,
+        'author_user_id': author_user_id,
+        'reports_count': reports_count or 0,
+        'author_penalty': penalty,
+        'created_at': created_at,
+        'priority': base_priority(reports_count, penalty, created_at),
+    }
+    
+    dialect = _dialect(connection).name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(queue).values(**values)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=['content_type', 'content_id'],
+            set_={name: statement.excluded[name] for name in ('reports_count', 'author_penalty', 'priority')}))
+        return
+    
+    updated = connection.execute(
+        queue.update()
+        .where(queue.c.content_type == content_type, queue.c.content_id == content_id)
+        .values(reports_count=values['reports_count'], author_penalty=penalty, priority=values['priority'])
+    ).rowcount
+    if not updated:
+        connection.execute(queue.insert().values(**values))
+
+def dequeue(connection, content_type, content_ids):
+    """Удаление решенного контента из очереди"""
+    queue = _queue_table()
+    connection.execute(queue.delete().where(
+        queue.c.content_type == content_type, queue.c.content_id.in_(list(content_ids))
+    ))
+
+def add_penalties(connection, penalties):
+    """
+    Штрафные баллы авторам и приоритет их элементов в очереди
+    
+    Args:
+        penalties: {user_id: баллы}; авторы с одинаковыми баллами — одним UPDATE
+    """
+    from app.models.user import User
+    
+    users = User.__table__
+    queue = _queue_table()
+    weight = current_app.config['MODERATION_PENALTY_WEIGHT']
+    
+    by_delta = {}
+    for user_id, delta in penalties.items():
+        if user_id and delta:
+            by_delta.setdefault(delta, []).append(user_id)
+    
+    for delta, user_ids in by_delta.items():
+        connection.execute(
+            users.update()
+            .where(users.c.id.in_(user_ids))
+            .values(penalty_points=db.func.coalesce(users.c.penalty_points, 0) + delta)
+        )
+        connection.execute(
+            queue.update()
+            .where(queue.c.author_user_id.in_(user_ids))
+            .values(author_penalty=queue.c.author_penalty + delta, priority=queue.c.priority + weight * delta)
+        )
+
+def make_cursor(item):
+    return f'{item.priority!r}_{item.id}'
+
+def parse_cursor(value):
+    """Курсор очереди -> (priority, id); некорректный курсор — начало очереди"""
+    if not value:
+        return None
+    priority, _, item_id = value.rpartition('_')
+    try:
+        return float(priority), int(item_id)
+    except ValueError:
+        return None
+
+def page(after=None, content_type=None, limit=QUEUE_PAGE_SIZE):
+    """
+    Страница очереди по убыванию приоритета (keyset-пагинация по (priority, id))
+    
+    Args:
+        after: курсор — строка 'priority_id' последнего элемента предыдущей страницы
+        content_type: только отзывы, комментарии или жалобы
+        limit: размер страницы
+    
+    Returns:
+        tuple: (список ModerationQueueItem, {(content_type, content_id): текст}, курсор или None)
+    """
+    from sqlalchemy.orm import joinedload
+    from app.models.system import ModerationQueueItem as Item
+    
+    query = Item.query.options(joinedload(Item.author), joinedload(Item.claimer))
+    if content_type in CONTENT_TYPES:
+        query = query.filter(Item.content_type == content_type)
+    position = parse_cursor(after)
+    if position:
+        priority, item_id = position
+        query = query.filter(db.or_(
+            Item.priority < priority,
+            db.and_(Item.priority == priority, Item.id < item_id)
+        ))
+    
+    items = query.order_by(Item.priority.desc(), Item.id.desc()).limit(limit + 1).all()
+    next_cursor = make_cursor(items[limit - 1]) if len(items) > limit else None
+    items = items[:limit]
+    
+    return items, previews(items), next_cursor
+
+def previews(items):
+    """Текст контента для страницы очереди: по одному запросу на вид"""
+    from app.models.feedback import Feedback, Comment
+    from app.models.system import ContentModeration
+    
+    ids = {}
+    for item in items:
+        ids.setdefault(item.content_type, []).append(item.content_id)
+    
+    result = {}
+    if ids.get('feedback'):
+        for row in db.session.execute(db.select(Feedback.id, Feedback.title, Feedback.comment)
+                                      .where(Feedback.id.in_(ids['feedback']))):
+            result[('feedback', row.id)] = ' — '.join(filter(None, (row.title, row.comment)))
+    if ids.get('comment'):
+        for row in db.session.execute(db.select(Comment.id, Comment.content).where(Comment.id.in_(ids['comment']))):
+            result[('comment', row.id)] = row.content
+    if ids.get('report'):
+        for row in db.session.execute(
+            db.select(ContentModeration.id, ContentModeration.content_type, ContentModeration.content_id,
+                      ContentModeration.reason, ContentModeration.description)
+            .where(ContentModeration.id.in_(ids['report']))
+        ):
+            text = f'{row.content_type} #{row.content_id}: {row.reason}'
+            result[('report', row.id)] = f'{text} — {row.description}' if row.description else text
+    return result
+
+def _claimable(queue, now):
+    return db.or_(queue.c.lease_expires_at.is_(None), queue.c.lease_expires_at <= now)
+
+def claim(moderator_id, batch_size=None, content_type=None):
+    """
+    Захват пачки самых приоритетных свободных элементов
+    
+    Условие свободы повторяется в UPDATE: элемент, захваченный другим
+    модератором между выбором и обновлением, не перехватывается.
+    
+    Returns:
+        int: количество захваченных элементов
+    """
+    queue = _queue_table()
+    now = datetime.utcnow()
+    batch_size = batch_size or current_app.config['MODERATION_CLAIM_BATCH_SIZE']
+    
+    candidates = db.select(queue.c.id).where(_claimable(queue, now))
+    if content_type in CONTENT_TYPES:
+        candidates = candidates.where(queue.c.content_type == content_type)
+    candidates = candidates.order_by(queue.c.priority.desc(), queue.c.id.desc()).limit(batch_size)
+    
+    claimed = db.session.execute(
+        queue.update()
+        .where(queue.c.id.in_(candidates.scalar_subquery()), _claimable(queue, now))
+        .values(
+            claimed_by=moderator_id,
+            claim_token=uuid.uuid4().hex,
+            lease_expires_at=now + timedelta(seconds=current_app.config['MODERATION_LEASE_SECONDS'])
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    
+    logger.info(f'Moderation queue: {claimed} items claimed by user {moderator_id}')
+    return claimed
+
+def release(moderator_id):
+    """Возврат своих нерешенных захватов в очередь"""
+    queue = _queue_table()
+    released = db.session.execute(
+        queue.update()
+        .where(queue.c.claimed_by == moderator_id)
+        .values(claimed_by=None, claim_token=None, lease_expires_at=None)
+    ).rowcount
+    db.session.commit()
+    return released
+
+def decide(item_ids, decision, moderator_id, notes=None, penalty=0, request=None):
+    """
+    Решение по своим захваченным элементам очереди
+    
+    Элементы с истекшим сроком захвата или захваченные другим модератором
+    пропускаются. Комментарии и жалобы меняются одним UPDATE на вид, отзывы —
+    через Feedback.set_moderation (рейтинги учитывают оценку один раз).
+    При отклонении с penalty авторам начисляются штрафные баллы, а их
+    оставшиеся элементы поднимаются в очереди. Все — одной транзакцией
+    с пачкой записей аудита.
+    
+    Args:
+        item_ids: id элементов moderation_queue
+        decision: 'approve' или 'reject'
+        moderator_id: id модератора
+        notes: примечание (при отклонении — причина)
+        penalty: штрафные баллы автору за каждый отклоненный элемент
+        request: запрос Flask для записей аудита
+    
+    Returns:
+        dict: количество решенных элементов по видам контента
+    """
+    from app.models.feedback import Feedback, Comment
+    from app.models.system import AuditLog, ContentModeration
+    
+    status = DECISIONS[decision]
+    if decision == 'reject':
+        notes = notes or DEFAULT_REJECT_NOTES
+    else:
+        penalty = 0
+    
+    queue = _queue_table()
+    now = datetime.utcnow()
+    token = uuid.uuid4().hex
+    
+    # Свои неистекшие захваты помечаем токеном решения: с этого момента строки заблокированы транзакцией
+    marked = db.session.execute(
+        queue.update()
+        .where(queue.c.id.in_([int(item_id) for item_id in item_ids]),
+               queue.c.claimed_by == moderator_id,
+               queue.c.lease_expires_at > now)
+        .values(claim_token=token)
+    ).rowcount
+    if not marked:
+        return {}
+    
+    rows = db.session.execute(
+        db.select(queue.c.content_type, queue.c.content_id, queue.c.author_user_id)
+        .where(queue.c.claim_token == token)
+    ).all()
+    by_type = {}
+    for row in rows:
+        by_type.setdefault(row.content_type, []).append(row.content_id)
+    
+    if by_type.get('feedback'):
+        for feedback in Feedback.query.filter(Feedback.id.in_(by_type['feedback'])).all():
+            feedback.set_moderation(status, moderator_id, notes)
+    
+    if by_type.get('comment'):
+        comments = Comment.__table__
+        db.session.execute(comments.update().where(comments.c.id.in_(by_type['comment']))
+                           .values(moderation_status=status, moderated_by=moderator_id, updated_at=now))
+    
+    if by_type.get('report'):
+        reports = ContentModeration.__table__
+        db.session.execute(
+            reports.update()
+            .where(reports.c.id.in_(by_type['report']), reports.c.status.in_(OPEN_REPORT_STATUSES))
+            .values(status=status, moderated_by=moderator_id, moderated_at=now, moderation_notes=notes,
+                    penalty_points=penalty, updated_at=now)
+        )
+    
+    db.session.execute(queue.delete().where(queue.c.claim_token == token))
+    if penalty:
+        authors = Counter(row.author_user_id for row in rows if row.author_user_id)
+        add_penalties(db.session, {user_id: penalty * count for user_id, count in authors.items()})
+    
+    for content_type, content_ids in by_type.items():
+        AuditLog.log_batch(moderator_id, f'{content_type}_{status}', content_type, content_ids,
+                           details_after={'status': status, 'notes': notes, 'penalty': penalty}, request=request)
+    db.session.commit()
+    
+    logger.info(f'Moderation queue: {len(rows)} items {status} by user {moderator_id}')
+    return {content_type: len(content_ids) for content_type, content_ids in by_type.items()}
+
+def rebuild(batch_size=1000):
+    """
+    Сверка очереди со статусами контента и пересчет приоритетов (после смены весов или загрузки данных)
+    
+    Недостающие отзывы и комментарии на проверке и открытые жалобы
+    добавляются, решенные в обход очереди — удаляются. Приоритеты всех
+    строк пересчитываются по текущим весам и штрафам авторов; захваты и
+    одобренные отзывы, вернувшиеся в очередь по жалобам, сохраняются.
+    
+    Returns:
+        dict: {'added': n, 'removed': n, 'total': n}
+    """
+    from sqlalchemy import bindparam
+    from app.models.feedback import Feedback, Comment
+    from app.models.system import ContentModeration
+    from app.models.user import User
+    
+    queue = _queue_table()
+    users = User.__table__
+    feedbacks = Feedback.__table__
+    comments = Comment.__table__
+    reports = ContentModeration.__table__
+    result = {'added': 0, 'removed': 0, 'total': 0}
+    
+    def queued(content_type, column):
+        return db.exists().where(queue.c.content_type == content_type, queue.c.content_id == column)
+    
+    # Решенные в обход очереди: отклоненные отзывы, обработанные комментарии и жалобы
+    for content_type, table, condition in (
+        ('feedback', feedbacks, db.func.coalesce(feedbacks.c.moderation_status, 'pending') == 'rejected'),
+        ('comment', comments, db.or_(db.func.coalesce(comments.c.moderation_status, 'pending') != 'pending',
+                                     comments.c.deleted_at.isnot(None))),
+        ('report', reports, db.func.coalesce(reports.c.status, 'pending').notin_(OPEN_REPORT_STATUSES)),
+    ):
+        result['removed'] += db.session.execute(queue.delete().where(
+            queue.c.content_type == content_type,
+            db.or_(queue.c.content_id.in_(db.select(table.c.id).where(condition)),
+                   queue.c.content_id.notin_(db.select(table.c.id)))
+        )).rowcount
+    
+    # Недостающий контент на проверке
+    sources = (
+        ('feedback', db.select(feedbacks.c.id, feedbacks.c.user_id, feedbacks.c.created_at, feedbacks.c.reports_count)
+         .where(db.func.coalesce(feedbacks.c.moderation_status, 'pending') == 'pending',
+                ~queued('feedback', feedbacks.c.id))),
+        ('comment', db.select(comments.c.id, comments.c.user_id, comments.c.created_at, db.literal(0))
+         .where(db.func.coalesce(comments.c.moderation_status, 'pending') == 'pending',
+                comments.c.deleted_at.is_(None), ~queued('comment', comments.c.id))),
+        ('report', db.select(reports.c.id, reports.c.content_type, reports.c.content_id,
+                             db.func.coalesce(reports.c.reported_at, reports.c.created_at), db.literal(1))
+         .where(db.func.coalesce(reports.c.status, 'pending').in_(OPEN_REPORT_STATUSES),
+                ~queued('report', reports.c.id))),
+    )
+    for content_type, source in sources:
+        rows = db.session.execute(source).all()
+        for start in range(0, len(rows), batch_size):
+            batch = []
+            for row in rows[start:start + batch_size]:
+                if content_type == 'report':
+                    content_id, target_type, target_id, created_at, reports_count = row
+                    author_user_id = content_author(db.session, target_type, target_id)
+                else:
+                    content_id, author_user_id, created_at, reports_count = row
+                batch.append({
+                    'content_type': content_type,
+                    'content_id': content_id,
+                    'author_user_id': author_user_id,
+                    'reports_count': reports_count or 0,
+                    'created_at': created_at or datetime.utcnow(),
+                })
+            # Штрафы и приоритет проставит пересчет ниже
+            db.session.execute(queue.insert(), [dict(item, author_penalty=0, priority=0.0) for item in batch])
+            result['added'] += len(batch)
+    
+    # Приоритеты по текущим весам и штрафам авторов, пачками по id
+    penalty = db.func.coalesce(users.c.penalty_points, 0)
+    last_id = 0
+    while True:
+        batch = db.session.execute(
+            db.select(queue.c.id, queue.c.reports_count, queue.c.created_at, penalty.label('penalty'))
+            .select_from(queue.outerjoin(users, users.c.id == queue.c.author_user_id))
+            .where(queue.c.id > last_id).order_by(queue.c.id).limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+        
+        db.session.execute(
+            queue.update().where(queue.c.id == bindparam('item_id'))
+            .values(author_penalty=bindparam('penalty'), priority=bindparam('priority')),
+            [{'item_id': row.id, 'penalty': row.penalty,
+              'priority': base_priority(row.reports_count, row.penalty, row.created_at)} for row in batch]
+        )
+        result['total'] += len(batch)
+    
+    db.session.commit()
+    return result
+
+def _feedback_inserted(mapper, connection, target):
+    if (target.moderation_status or 'pending') == 'pending':
+        enqueue(connection, 'feedback', target.id, target.user_id, target.created_at, target.reports_count)
+
+def _comment_inserted(mapper, connection, target):
+    if (target.moderation_status or 'pending') == 'pending':
+        enqueue(connection, 'comment', target.id, target.user_id, target.created_at)
+
+def _report_inserted(mapper, connection, target):
+    if (target.status or 'pending') in OPEN_REPORT_STATUSES:
+        enqueue(connection, 'report', target.id, content_author(connection, target.content_type, target.content_id),
+                target.reported_at or target.created_at, 1)
+
+_listeners_registered = False
+
+def register_listeners():
+    """Регистрация событий, ставящих новый контент в очередь модерации"""
+    global _listeners_registered
+    
+    if _listeners_registered:
+        return
+    
+    from app.models.feedback import Feedback, Comment
+    from app.models.system import ContentModeration
+    event.listen(Feedback, 'after_insert', _feedback_inserted)
+    event.listen(Comment, 'after_insert', _comment_inserted)
+    event.listen(ContentModeration, 'after_insert', _report_inserted)
+    _listeners_registered = True
\ No newline at end of file
@@ -0,0 +1,248 @@
+"""
+Кэш скомпилированных шаблонов уведомлений
+
+Шаблон (заголовок, текст, варианты для email и push) разбирается один раз:
+строка string.Template превращается в список литералов и подстановок,
+после чего рендеринг — склейка частей без повторного разбора регулярным
+выражением. Семантика совпадает с Template.safe_substitute: неизвестные
+переменные остаются в тексте как есть.
+
+Скомпилированные шаблоны кэшируются по ключу (id, version, updated_at):
+изменение шаблона в другом процессе меняет ключ, а в текущем процессе
+запись дополнительно удаляется событием модели.
+"""
+import json
+import threading
+from collections import OrderedDict
+from string import Template
+
+from sqlalchemy import event
+
+CACHE_MAX_SIZE = 256
+
+CHANNELS = ('in_app', 'email', 'push')
+
+_MISSING = object()
+
+class _Placeholder:
+    """Подстановка переменной (original — исходный текст для safe-семантики)"""
+    __slots__ = ('name', 'original')
+    
+    def __init__(self, name, original):
+        self.name = name
+        self.original = original
+
+def compile_string(text):
+    """
+    Разбор строки string.Template в список частей
+    
+    Returns:
+        tuple: строки-литералы и _Placeholder
+    """
+    if not text:
+        return ()
+    
+    parts = []
+    literal = []
+    position = 0
+    
+    for match in Template.pattern.finditer(text):
+        literal.append(text[position:match.start()])
+        position = match.end()
+        
+        name = match.group('named') or match.group('braced')
+        if name is not None:
+            chunk = ''.join(literal)
+            if chunk:
+                parts.append(chunk)
+            literal = []
+            parts.append(_Placeholder(name, match.group()))
+        elif match.group('escaped') is not None:
+            literal.append(Template.delimiter)
+        else:
+            # Некорректная подстановка — оставляем как есть (safe_substitute)
+            literal.append(match.group())
+    
+    literal.append(text[position:])
+    if any(literal):
+        parts.append(''.join(literal))
+    return tuple(parts)
+
+def _bind(parts, context):
+    """Частичная подстановка: известные из context переменные становятся литералами"""
+    bound = []
+    for part in parts:
+        if isinstance(part, _Placeholder):
+            value = context.get(part.name, _MISSING)
+            if value is _MISSING:
+                bound.append(part)
+                continue
+            part = str(value)
+        
+        if bound and isinstance(bound[-1], str):
+            bound[-1] += part
+        else:
+            bound.append(part)
+    return tuple(bound)
+
+def _substitute(parts, context):
+    """Рендеринг частей с контекстом"""
+    if len(parts) == 1 and isinstance(parts[0], str):
+        return parts[0]
+    
+    chunks = []
+    for part in parts:
+        if isinstance(part, str):
+            chunks.append(part)
+        else:
+            value = context.get(part.name, _MISSING)
+            chunks.append(part.original if value is _MISSING else str(value))
+    return ''.join(chunks)
+
+class CompiledTemplate:
+    """Разобранный шаблон уведомления со всеми вариантами каналов"""
+    
+    def __init__(self, title, message, email_subject=None, email_body=None,
+                 push_title=None, push_body=None, variables=None):
+        title = compile_string(title)
+        message = compile_string(message)
+        
+        # Варианты каналов: при отсутствии используется основной заголовок/текст
+        self.variants = {
+            'in_app': (title, message),
+            'email': (compile_string(email_subject) if email_subject else title,
+                      compile_string(email_body) if email_body else message),
+            'push': (compile_string(push_title) if push_title else title,
+                     compile_string(push_body) if push_body else message),
+        }
+        self.variables = variables or []
+    
+    @classmethod
+    def from_model(cls, template):
+        """Компиляция модели NotificationTemplate"""
+        try:
+            variables = json.loads(template.variables) if template.variables else []
+        except ValueError:
+            variables = []
+        
+        return cls(
+            template.title_template,
+            template.message_template,
+            email_subject=template.email_subject_template,
+            email_body=template.email_body_template,
+            push_title=template.push_title_template,
+            push_body=template.push_body_template,
+            variables=variables
+        )
+    
+    def render(self, context, channel='in_app'):
+        """
+        Рендеринг одного варианта
+        
+        Returns:
+            tuple: (заголовок, текст)
+        """
+        title, message = self.variants[channel]
+        return _substitute(title, context), _substitute(message, context)
+    
+    def render_many(self, contexts, shared=None, channel='in_app'):
+        """
+        Рендеринг для пачки получателей
+        
+        Переменные общего контекста (shared), которые не переопределяются
+        персональными контекстами, подставляются один раз до цикла.
+        
+        Args:
+            contexts: список персональных контекстов
+            shared: общий для пачки контекст
+            channel: in_app, email или push
+        
+        Returns:
+            list: [(заголовок, текст), ...] в порядке contexts
+        """
+        title, message = self.variants[channel]
+        
+        if shared:
+            personal_keys = set()
+            for context in contexts:
+                personal_keys.update(context)
+            fixed = {k: v for k, v in shared.items() if k not in personal_keys}
+            title = _bind(title, fixed)
+            message = _bind(message, fixed)
+            if len(fixed) != len(shared):
+                # Персональные значения перекрывают общие, остальное берется из shared
+                fallback = {k: v for k, v in shared.items() if k in personal_keys}
+                contexts = [dict(fallback, **context) for context in contexts]
+        
+        return [(_substitute(title, context), _substitute(message, context)) for context in contexts]
+
+class TemplateCache:
+    """Процессный LRU-кэш скомпилированных шаблонов"""
+    
+    def __init__(self, max_size=CACHE_MAX_SIZE):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key, factory):
+        """Шаблон по ключу, компилируется factory() при промахе"""
+        with self._lock:
+            compiled = self._items.get(key)
+            if compiled is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return compiled
+        
+        compiled = factory()
+        with self._lock:
+            self.misses += 1
+            self._items[key] = compiled
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+        return compiled
+    
+    def evict(self, template_id):
+        """Удаление всех версий шаблона"""
+        with self._lock:
+            for key in [k for k in self._items if k[0] == template_id]:
+                del self._items[key]
+    
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+    
+    def __len__(self):
+        return len(self._items)
+
+template_cache = TemplateCache()
+
+def get_compiled(template):
+    """Скомпилированный шаблон модели NotificationTemplate (из кэша)"""
+    key = (template.id, template.version, template.updated_at)
+    return template_cache.get(key, lambda: CompiledTemplate.from_model(template))
+
+def get_compiled_default(name, definition):
+    """Скомпилированный встроенный шаблон (словарь с title_template/message_template)"""
+    return template_cache.get(
+        ('default', name),
+        lambda: CompiledTemplate(definition['title_template'], definition['message_template'])
+    )
+
+def _evict(mapper, connection, target):
+    template_cache.evict(target.id)
+
+_listeners_registered = False
+
+def register_listeners():
+    """Сброс кэша при изменении шаблонов"""
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    
+    from app.models.notification import NotificationTemplate
+    event.listen(NotificationTemplate, 'after_update', _evict)
+    event.listen(NotificationTemplate, 'after_delete', _evict)
+    _listeners_registered = True
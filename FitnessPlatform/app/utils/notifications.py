@@ -0,0 +1,369 @@
+"""
+Сервис уведомлений: входящие, счетчик непрочитанных, доставка через SSE
+
+Счетчик непрочитанных хранится в users.unread_notifications_count и
+поддерживается событиями модели Notification (вставка, прочтение, удаление)
+и явными set-based обновлениями в mark_read, поэтому получение количества
+непрочитанных — чтение одного поля. Считаются только уведомления, видимые
+во входящих (visible_clause): отложенные до scheduled_for и истекшие по
+expires_at не учитываются. Уведомления, которые с тех пор наступили или
+истекли, досчитывает settle_unread (flask notifications settle по cron).
+
+Для потока событий (Server-Sent Events) используется процессный брокер:
+после коммита новых уведомлений подписчики получателя будут разбужены
+сразу. Уведомления, созданные другими процессами, подхватываются
+периодическим keyset-запросом (id > последнего отправленного).
+"""
+import json
+import queue
+import threading
+from datetime import datetime
+import logging
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import object_session
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+INBOX_PAGE_SIZE = 20
+INBOX_MAX_PAGE_SIZE = 100
+
+class NotificationBroker:
+    """Процессный pub/sub: пробуждение SSE-подписчиков пользователя"""
+    
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+    
+    def subscribe(self, user_id):
+        """Подписка на события пользователя, возвращает очередь"""
+        q = queue.Queue(maxsize=1)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(q)
+        return q
+    
+    def unsubscribe(self, user_id, q):
+        """Отписка"""
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers:
+                subscribers.discard(q)
+                if not subscribers:
+                    del self._subscribers[user_id]
+    
+    def publish(self, user_id):
+        """Пробуждение всех подписчиков пользователя"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        
+        for q in subscribers:
+            try:
+                q.put_nowait(True)
+            except queue.Full:
+                # Подписчик и так будет разбужен — событие уже в очереди
+                pass
+    
+    def subscribers_count(self):
+        """Количество активных подписок"""
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+notification_broker = NotificationBroker()
+
+def _users_table():
+    from app.models.user import User
+    return User.__table__
+
+def _change_unread_counter(connection, user_id, delta):
+    """Атомарное изменение счетчика непрочитанных"""
+    users = _users_table()
+    new_value = users.c.unread_notifications_count + delta
+    connection.execute(
+        users.update()
+        .where(users.c.id == user_id)
+        .values(unread_notifications_count=db.case((new_value < 0, 0), else_=new_value))
+    )
+
+def _queue_publish(target, user_id):
+    """Отложенная публикация события до коммита транзакции"""
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('notify_users', set()).add(user_id)
+
+def visible_clause(now=None):
+    """Условие видимости уведомления во входящих — общее для списка, счетчика и SSE"""
+    from app.models.notification import Notification
+    
+    now = now or datetime.utcnow()
+    return db.and_(
+        Notification.send_in_app.isnot(False),
+        db.or_(Notification.scheduled_for.is_(None), Notification.scheduled_for <= now),
+        db.or_(Notification.expires_at.is_(None), Notification.expires_at > now)
+    )
+
+def _is_visible(target, now=None):
+    """Видно ли уведомление во входящих (и учитывается ли в счетчике) сейчас"""
+    now = now or datetime.utcnow()
+    return (target.send_in_app is not False
+            and (target.scheduled_for is None or target.scheduled_for <= now)
+            and (target.expires_at is None or target.expires_at > now))
+
+def _after_insert(mapper, connection, target):
+    if not target.is_read and _is_visible(target):
+        _change_unread_counter(connection, target.user_id, 1)
+    _queue_publish(target, target.user_id)
+
+def _after_update(mapper, connection, target):
+    history = inspect(target).attrs.is_read.history
+    if not history.has_changes():
+        return
+    
+    was_read = bool(history.deleted[0]) if history.deleted else False
+    if was_read != bool(target.is_read) and _is_visible(target):
+        _change_unread_counter(connection, target.user_id, -1 if target.is_read else 1)
+        _queue_publish(target, target.user_id)
+
+def _after_delete(mapper, connection, target):
+    if not target.is_read and _is_visible(target):
+        _change_unread_counter(connection, target.user_id, -1)
+        _queue_publish(target, target.user_id)
+
+def _after_commit(session):
+    for user_id in session.info.pop('notify_users', ()):
+        notification_broker.publish(user_id)
+
+def _after_rollback(session):
+    session.info.pop('notify_users', None)
+
+def _is_read_set(target, value, oldvalue, initiator):
+    """Ничего не меняет: слушатель нужен ради active_history"""
+
+_listeners_registered = False
+
+def register_listeners():
+    """Регистрация событий, поддерживающих счетчик и брокер"""
+    global _listeners_registered
+    
+    if _listeners_registered:
+        return
+    
+    from app.models.notification import Notification
+    # Прежнее значение is_read нужно и для объекта, истекшего после коммита
+    event.listen(Notification.is_read, 'set', _is_read_set, active_history=True)
+    event.listen(Notification, 'after_insert', _after_insert)
+    event.listen(Notification, 'after_update', _after_update)
+    event.listen(Notification, 'after_delete', _after_delete)
+    event.listen(db.session, 'after_commit', _after_commit)
+    event.listen(db.session, 'after_soft_rollback', lambda session, previous_transaction: _after_rollback(session))
+    _listeners_registered = True
+
+def get_unread_count(user_id):
+    """Количество непрочитанных (O(1): чтение поля users по первичному ключу)"""
+    users = _users_table()
+    count = db.session.execute(
+        db.select(users.c.unread_notifications_count).where(users.c.id == user_id)
+    ).scalar()
+    return count or 0
+
+def list_inbox(user_id, before_id=None, limit=INBOX_PAGE_SIZE, unread_only=False):
+    """
+    Страница входящих уведомлений (keyset-пагинация по id)
+    
+    Args:
+        user_id: получатель
+        before_id: курсор — id последнего уведомления предыдущей страницы
+        limit: размер страницы
+        unread_only: только непрочитанные
+    
+    Returns:
+        tuple: (список уведомлений, курсор следующей страницы или None)
+    """
+    from app.models.notification import Notification
+    
+    limit = max(1, min(limit or INBOX_PAGE_SIZE, INBOX_MAX_PAGE_SIZE))
+    
+    query = Notification.query.filter(Notification.user_id == user_id, visible_clause())
+    if unread_only:
+        query = query.filter(Notification.is_read.is_(False))
+    if before_id:
+        query = query.filter(Notification.id < before_id)
+    
+    # Берем на одну запись больше, чтобы понять, есть ли следующая страница
+    items = query.order_by(Notification.id.desc()).limit(limit + 1).all()
+    next_cursor = items[limit - 1].id if len(items) > limit else None
+    
+    return items[:limit], next_cursor
+
+def mark_read(user_id, ids=None):
+    """
+    Отметка уведомлений прочитанными одним UPDATE
+    
+    Отмечаются только видимые во входящих — ровно те, что учтены в счетчике.
+    
+    Args:
+        user_id: получатель
+        ids: список id или None — отметить все
+    
+    Returns:
+        int: количество отмеченных уведомлений
+    """
+    from app.models.notification import Notification
+    
+    query = Notification.query.filter(
+        Notification.user_id == user_id,
+        Notification.is_read.is_(False),
+        visible_clause()
+    )
+    if ids is not None:
+        if not ids:
+            return 0
+        query = query.filter(Notification.id.in_(ids))
+    
+    updated = query.update(
+        {'is_read': True, 'read_at': datetime.utcnow()},
+        synchronize_session=False
+    )
+    
+    if updated:
+        # Массовый UPDATE не вызывает события модели — счетчик правим явно
+        _change_unread_counter(db.session, user_id, -updated)
+        db.session.info.setdefault('notify_users', set()).add(user_id)
+    
+    db.session.commit()
+    return updated
+
+def _recount_statement(now):
+    """UPDATE счетчика непрочитанных по правилу видимости на момент now"""
+    from app.models.notification import Notification
+    
+    users = _users_table()
+    unread = db.select(db.func.count(Notification.id)).where(
+        Notification.user_id == users.c.id,
+        Notification.is_read.is_(False),
+        visible_clause(now)
+    ).scalar_subquery()
+    
+    return users.update().values(unread_notifications_count=unread)
+
+def recount_unread(user_id=None):
+    """Пересчет счетчиков непрочитанных по таблице уведомлений (восстановление)"""
+    stmt = _recount_statement(datetime.utcnow())
+    if user_id is not None:
+        stmt = stmt.where(_users_table().c.id == user_id)
+    
+    db.session.execute(stmt)
+    db.session.commit()
+
+def settle_unread(since):
+    """
+    Досчет уведомлений, которые наступили (scheduled_for) или истекли
+    (expires_at) в интервале (since, сейчас]
+    
+    Счетчик затронутых пользователей пересчитывается целиком, поэтому
+    повторный запуск с перекрывающимся интервалом безопасен.
+    
+    Returns:
+        int: количество пересчитанных пользователей
+    """
+    from app.models.notification import Notification
+    
+    now = datetime.utcnow()
+    user_ids = [row[0] for row in db.session.query(Notification.user_id).filter(
+        Notification.is_read.is_(False),
+        Notification.send_in_app.isnot(False),
+        db.or_(
+            db.and_(Notification.scheduled_for > since, Notification.scheduled_for <= now),
+            db.and_(Notification.expires_at > since, Notification.expires_at <= now)
+        )
+    ).distinct()]
+    
+    if user_ids:
+        db.session.execute(_recount_statement(now).where(_users_table().c.id.in_(user_ids)))
+        db.session.info.setdefault('notify_users', set()).update(user_ids)
+    
+    db.session.commit()
+    return len(user_ids)
+
+def format_sse(event_name, data, event_id=None):
+    """Форматирование события Server-Sent Events"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event_name}')
+    lines.append(f'data: {json.dumps(data, ensure_ascii=False)}')
+    return '\n'.join(lines) + '\n\n'
+
+def stream_events(user_id, last_event_id=None, poll_interval=15, batch_size=50):
+    """
+    Генератор SSE-потока уведомлений пользователя
+    
+    Отправляет новые уведомления (event: notification) и изменения счетчика
+    непрочитанных (event: unread). Пока ждет, соединение с БД не держит;
+    раз в poll_interval отправляет heartbeat и проверяет базу на
+    уведомления из других процессов.
+    
+    Отложенные уведомления отправляются, когда наступит scheduled_for:
+    курсор id уже может быть дальше них, поэтому они выбираются отдельно —
+    по scheduled_for в интервале с прошлой проверки.
+    
+    Под gevent (ASYNC_SERVER=true или gunicorn -k gevent) ожидание
+    очереди кооперативное и не занимает поток на соединение.
+    """
+    from app.models.notification import Notification
+    
+    q = notification_broker.subscribe(user_id)
+    try:
+        if last_event_id is None:
+            # Новое подключение: историю не повторяем, только новые события
+            last_event_id = db.session.query(
+                db.func.coalesce(db.func.max(Notification.id), 0)
+            ).filter(Notification.user_id == user_id).scalar()
+        
+        last_count = None
+        last_check = datetime.utcnow()
+        yield f'retry: {int(poll_interval * 1000)}\n\n'
+        
+        while True:
+            now = datetime.utcnow()
+            new_items = Notification.query.filter(
+                Notification.user_id == user_id,
+                Notification.id > last_event_id,
+                visible_clause(now)
+            ).order_by(Notification.id).limit(batch_size).all()
+            
+            # Наступившие отложенные уведомления, которые курсор id уже пропустил
+            due_items = Notification.query.filter(
+                Notification.user_id == user_id,
+                Notification.id <= last_event_id,
+                Notification.scheduled_for > last_check,
+                visible_clause(now)
+            ).order_by(Notification.id).all()
+            last_check = now
+            
+            for notification in due_items:
+                yield format_sse('notification', notification.to_dict())
+            
+            for notification in new_items:
+                last_event_id = notification.id
+                yield format_sse('notification', notification.to_dict(), event_id=notification.id)
+            
+            count = get_unread_count(user_id)
+            if count != last_count:
+                last_count = count
+                yield format_sse('unread', {'count': count}, event_id=last_event_id)
+            
+            # Возвращаем соединение в пул на время ожидания
+            db.session.close()
+            
+            if len(new_items) == batch_size:
+                continue
+            
+            try:
+                q.get(timeout=poll_interval)
+            except queue.Empty:
+                yield ': ping\n\n'
+    finally:
+        notification_broker.unsubscribe(user_id, q)
+        db.session.close()
@@ -0,0 +1,270 @@
+"""
+Рейтинги тренеров и тренировок
+
+Учитываются оценки overall одобренных отзывов. Тренировка и тренер хранят
+точные сумму (rating_sum) и число (total_ratings) оценок; среднее
+(average_rating / rating) выводится из них без округления, а для
+сортировки служит байесовская оценка
+
+    score = (C * m + сумма) / (C + число)
+
+где m — среднее всех одобренных оценок, C — RATING_PRIOR_WEIGHT: две
+пятерки дают меньше, чем сотня оценок около 4.8. Без оценок score = 0.
+
+Инкрементальный путь — apply_feedback при одобрении отзыва и снятии
+одобрения: UPDATE с приращением суммы и числа для тренировки, тренера и
+его разрезов в trainer_rankings (общий, специализация, категория) в
+транзакции модерации, без чтения прежнего среднего. rebuild пересчитывает
+все по отзывам и обновляет m (flask ratings rebuild); до следующего
+пересчета новые оценки считаются с сохраненным m.
+"""
+import logging
+from datetime import datetime
+
+from flask import current_app
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+PRIOR_MEAN_KEY = 'rating_prior_mean'
+RATING_TYPE = 'overall'
+
+def prior():
+    """Априорное среднее m (из последнего пересчета) и его вес C"""
+    from app.models.system import SystemSetting
+    
+    mean = SystemSetting.get_setting(PRIOR_MEAN_KEY, current_app.config['RATING_PRIOR_MEAN'])
+    return float(mean), float(current_app.config['RATING_PRIOR_WEIGHT'])
+
+def bayesian_score(rating_sum, total_ratings, mean, weight):
+    """Байесовская оценка (0 без оценок)"""
+    if total_ratings <= 0:
+        return 0.0
+    return (weight * mean + rating_sum) / (weight + total_ratings)
+
+def score_expression(rating_sum, total_ratings, mean, weight):
+    """То же SQL-выражением (для UPDATE и INSERT ... SELECT)"""
+    return db.case((total_ratings > 0, (weight * mean + rating_sum) / (weight + total_ratings)), else_=0.0)
+
+def specialization_key(specialization):
+    """Ключ разреза по специализации: без лишних пробелов и регистра"""
+    return ' '.join((specialization or '').split()).casefold()[:100]
+
+def apply_feedback(feedback_id, sign=1):
+    """
+    Учет оценки отзыва в текущей транзакции (коммит — за вызывающим)
+    
+    Args:
+        sign: 1 — отзыв одобрен, -1 — одобрение снято
+    
+    Returns:
+        bool: была ли у отзыва оценка
+    """
+    from app.models import Feedback, Rating, Training
+    
+    row = (db.session.query(Training.id, Training.trainer_user_id, Training.category_id, Rating.score)
+           .join(Feedback, Feedback.training_id == Training.id)
+           .join(Rating, Rating.feedback_id == Feedback.id)
+           .filter(Feedback.id == feedback_id, Rating.rating_type == RATING_TYPE)
+           .first())
+    if row is None:
+        return False
+    
+    apply_score(row.trainer_user_id, sign * row.score, sign, training_id=row.id, category_id=row.category_id)
+    return True
+
+def apply_score(trainer_user_id, delta, count, training_id=None, category_id=None):
+    """Приращение суммы (delta) и числа (count) оценок тренировки, тренера и его разрезов"""
+    from app.models import Training, Trainer, TrainerRanking
+    
+    mean, weight = prior()
+    if training_id is not None:
+        _increment(Training.__table__, Training.__table__.c.id == training_id, delta, count, mean, weight,
+                   'rating_score', 'average_rating')
+    trainers = Trainer.__table__
+    _increment(trainers, trainers.c.user_id == trainer_user_id, delta, count, mean, weight, 'rating_score', 'rating')
+    
+    specialization = db.session.execute(
+        db.select(trainers.c.specialization).where(trainers.c.user_id == trainer_user_id)).scalar()
+    scopes = [(TrainerRanking.SCOPE_ALL, '')]
+    if specialization_key(specialization):
+        scopes.append((TrainerRanking.SCOPE_SPECIALIZATION, specialization_key(specialization)))
+    if category_id is not None:
+        scopes.append((TrainerRanking.SCOPE_CATEGORY, str(category_id)))
+    
+    rankings = TrainerRanking.__table__
+    for scope, key in scopes:
+        condition = db.and_(rankings.c.scope == scope, rankings.c.scope_key == key,
+                            rankings.c.trainer_user_id == trainer_user_id)
+        if count > 0:
+            _upsert_ranking(scope, key, trainer_user_id, delta, count, mean, weight)
+        else:
+            _increment(rankings, condition, delta, count, mean, weight, 'score')
+    
+    # Без оценок тренер выпадает из разреза: топ остается чтением индекса без фильтра
+    db.session.execute(rankings.delete().where(rankings.c.trainer_user_id == trainer_user_id,
+                                               rankings.c.total_ratings <= 0))
+
+def _increment(table, condition, delta, count, mean, weight, score_column, average_column=None):
+    """Один UPDATE: новые значения считаются от текущих в строке, а не прочитанных заранее"""
+    rating_sum = table.c.rating_sum + delta
+    total_ratings = table.c.total_ratings + count
+    values = {'rating_sum': rating_sum, 'total_ratings': total_ratings,
+              score_column: score_expression(rating_sum, total_ratings, mean, weight)}
+    if average_column:
+        values[average_column] = db.case((total_ratings > 0, rating_sum / total_ratings), else_=0.0)
+    if 'updated_at' in table.c:
+        values['updated_at'] = datetime.utcnow()
+    return db.session.execute(table.update().where(condition).values(**values)).rowcount
+
+def _upsert_ranking(scope, key, trainer_user_id, delta, count, mean, weight):
+    """Приращение строки разреза; первая оценка тренера в разрезе создает строку"""
+    from app.models import TrainerRanking
+    
+    rankings = TrainerRanking.__table__
+    row = {'scope': scope, 'scope_key': key, 'trainer_user_id': trainer_user_id,
+           'rating_sum': delta, 'total_ratings': count,
+           'score': bayesian_score(delta, count, mean, weight), 'updated_at': datetime.utcnow()}
+    rating_sum = rankings.c.rating_sum + delta
+    total_ratings = rankings.c.total_ratings + count
+    update = {'rating_sum': rating_sum, 'total_ratings': total_ratings,
+              'score': score_expression(rating_sum, total_ratings, mean, weight), 'updated_at': row['updated_at']}
+    
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        db.session.execute(insert(rankings).values(**row).on_conflict_do_update(
+            index_elements=['scope', 'scope_key', 'trainer_user_id'], set_=update))
+        return
+    
+    condition = db.and_(rankings.c.scope == scope, rankings.c.scope_key == key,
+                        rankings.c.trainer_user_id == trainer_user_id)
+    if not db.session.execute(rankings.update().where(condition).values(**update)).rowcount:
+        db.session.execute(rankings.insert().values(**row))
+
+def move_specialization(trainer_user_id, specialization):
+    """Перенос тренера в разрез новой специализации (после изменения профиля, в транзакции профиля)"""
+    from app.models import Trainer, TrainerRanking
+    
+    trainers = Trainer.__table__
+    rankings = TrainerRanking.__table__
+    db.session.execute(rankings.delete().where(rankings.c.scope == TrainerRanking.SCOPE_SPECIALIZATION,
+                                               rankings.c.trainer_user_id == trainer_user_id))
+    key = specialization_key(specialization)
+    if key:
+        db.session.execute(rankings.insert().from_select(
+            ['scope', 'scope_key', 'trainer_user_id', 'rating_sum', 'total_ratings', 'score', 'updated_at'],
+            db.select(db.literal(TrainerRanking.SCOPE_SPECIALIZATION), db.literal(key), trainers.c.user_id,
+                      trainers.c.rating_sum, trainers.c.total_ratings, trainers.c.rating_score,
+                      db.literal(datetime.utcnow()))
+            .where(trainers.c.user_id == trainer_user_id, trainers.c.total_ratings > 0)))
+
+def rebuild():
+    """
+    Полный пересчет по одобренным отзывам: суммы и число оценок тренировок
+    и тренеров, априорное среднее, байесовские оценки и trainer_rankings
+    
+    Returns:
+        dict: prior_mean и число строк разрезов
+    """
+    from app.models import Training, Trainer, Feedback, Rating, TrainerRanking
+    from app.models.system import SystemSetting
+    
+    trainings = Training.__table__
+    trainers = Trainer.__table__
+    rankings = TrainerRanking.__table__
+    overall = (db.select(Feedback.training_id.label('training_id'), Rating.score.label('score'))
+               .join_from(Rating, Feedback, Rating.feedback_id == Feedback.id)
+               .where(Rating.rating_type == RATING_TYPE, Feedback.moderation_status == 'approved')
+               .subquery())
+    mean = db.session.execute(db.select(db.func.avg(overall.c.score))).scalar()
+    mean = float(mean) if mean is not None else current_app.config['RATING_PRIOR_MEAN']
+    weight = float(current_app.config['RATING_PRIOR_WEIGHT'])
+    
+    # Тренировки: сумма и число по отзывам, затем производные значения
+    db.session.execute(trainings.update().values(
+        rating_sum=db.func.coalesce(
+            db.select(db.func.sum(overall.c.score)).where(overall.c.training_id == trainings.c.id).scalar_subquery(),
+            0.0),
+        total_ratings=db.select(db.func.count()).where(overall.c.training_id == trainings.c.id).scalar_subquery()
+    ))
+    _derive(trainings, mean, weight, 'average_rating')
+    
+    # Тренеры: суммы по их тренировкам
+    per_trainer = db.select(trainings.c.trainer_user_id).where(trainings.c.trainer_user_id == trainers.c.user_id)
+    db.session.execute(trainers.update().values(
+        rating_sum=db.func.coalesce(per_trainer.with_only_columns(db.func.sum(trainings.c.rating_sum))
+                                    .scalar_subquery(), 0.0),
+        total_ratings=db.func.coalesce(per_trainer.with_only_columns(db.func.sum(trainings.c.total_ratings))
+                                       .scalar_subquery(), 0)
+    ))
+    _derive(trainers, mean, weight, 'rating')
+    
+    # Разрезы: общий и по специализации — из тренеров (ключ специализации считается в Python),
+    # по категориям — одним INSERT ... SELECT с GROUP BY
+    db.session.execute(rankings.delete())
+    now = datetime.utcnow()
+    rows = []
+    for trainer in db.session.execute(
+            db.select(trainers.c.user_id, trainers.c.specialization, trainers.c.rating_sum,
+                      trainers.c.total_ratings, trainers.c.rating_score)
+            .where(trainers.c.total_ratings > 0)):
+        row = {'trainer_user_id': trainer.user_id, 'rating_sum': trainer.rating_sum,
+               'total_ratings': trainer.total_ratings, 'score': trainer.rating_score, 'updated_at': now}
+        rows.append(dict(row, scope=TrainerRanking.SCOPE_ALL, scope_key=''))
+        if specialization_key(trainer.specialization):
+            rows.append(dict(row, scope=TrainerRanking.SCOPE_SPECIALIZATION,
+                             scope_key=specialization_key(trainer.specialization)))
+    if rows:
+        db.session.execute(rankings.insert(), rows)
+    
+    category_sum = db.func.sum(trainings.c.rating_sum)
+    category_total = db.func.sum(trainings.c.total_ratings)
+    result = db.session.execute(rankings.insert().from_select(
+        ['scope', 'scope_key', 'trainer_user_id', 'rating_sum', 'total_ratings', 'score', 'updated_at'],
+        db.select(db.literal(TrainerRanking.SCOPE_CATEGORY), db.cast(trainings.c.category_id, db.String),
+                  trainings.c.trainer_user_id, category_sum, category_total,
+                  score_expression(category_sum, category_total, mean, weight), db.literal(now))
+        .where(trainings.c.category_id.isnot(None), trainings.c.total_ratings > 0)
+        .group_by(trainings.c.trainer_user_id, trainings.c.category_id)
+    ))
+    
+    # Сохранение m фиксирует всю транзакцию пересчета
+    SystemSetting.set_setting(PRIOR_MEAN_KEY, mean, value_type='float', category='ratings')
+    logger.info(f'Ratings rebuilt: prior mean {mean:.3f}, {len(rows)} trainer rankings, '
+                f'{result.rowcount} category rankings')
+    return {'prior_mean': mean, 'rankings': len(rows) + max(result.rowcount, 0)}
+
+def _derive(table, mean, weight, average_column):
+    """Среднее и байесовская оценка из уже посчитанных суммы и числа"""
+    db.session.execute(table.update().values(**{
+        average_column: db.case((table.c.total_ratings > 0, table.c.rating_sum / table.c.total_ratings),
+                                else_=0.0),
+        'rating_score': score_expression(table.c.rating_sum, table.c.total_ratings, mean, weight),
+    }))
+
+def top_trainers(scope='all', key='', limit=20):
+    """Топ разреза: (TrainerRanking, имя пользователя, специализация) по убыванию оценки"""
+    from app.models import User, Trainer, TrainerRanking
+    
+    return (db.session.query(TrainerRanking, User.username, Trainer.specialization)
+            .join(User, User.id == TrainerRanking.trainer_user_id)
+            .outerjoin(Trainer, Trainer.user_id == TrainerRanking.trainer_user_id)
+            .filter(TrainerRanking.scope == scope, TrainerRanking.scope_key == key)
+            .order_by(TrainerRanking.score.desc(), TrainerRanking.total_ratings.desc())
+            .limit(limit)
+            .all())
+
+def top_trainings(category_id, limit=10):
+    """Лучшие тренировки категории (индекс idx_trainings_category_score)"""
+    from app.models import Training
+    
+    return (Training.query
+            .filter(Training.category_id == category_id, Training.rating_score > 0)
+            .order_by(Training.rating_score.desc())
+            .limit(limit)
+            .all())
@@ -0,0 +1,425 @@
+"""
+Персональные рекомендации тренировок
+
+Кандидаты — открытые для записи тренировки ближайших
+RECOMMENDATIONS_HORIZON_DAYS дней со свободными местами. Оценка пары
+пользователь × тренировка складывается из:
+- содержательной близости: профиль пользователя (история записей с учетом
+  оценок, уровень подготовки, предпочитаемые типы и активности) и признаки
+  тренировки (категория, тип, сложность, интенсивность, теги) — скалярное
+  произведение нормированных векторов;
+- близости к тренеру: история с этим тренером и client_trainer_preferences;
+- совместных записей: тренеры, к которым ходят те же клиенты, что и к
+  тренерам пользователя (косинус по матрице клиенты × тренеры);
+- популярности: заполненность группы.
+
+Оценки считаются матрично (NumPy) пачками пользователей: профили B × F
+умножаются на признаки кандидатов F × N. Top-K каждого пользователя
+хранится в training_recommendations, и блок «Рекомендуем» читает одну
+строку по первичному ключу. Полный пересчет — flask recommendations
+build; после записи на тренировку или отзыва список пользователя
+пересчитывается в фоне по матрицам кандидатов, которые кэшируются в
+процессе на RECOMMENDATIONS_MODEL_TTL секунд.
+
+NumPy импортируется только при расчете: веб-процессу для показа блока он
+не нужен.
+"""
+import json
+import math
+import time
+import threading
+import logging
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import exc
+
+from app import db
+from app.utils import background
+
+logger = logging.getLogger(__name__)
+
+# Веса составляющих оценки
+WEIGHTS = {'content': 1.0, 'trainer': 0.8, 'collaborative': 0.5, 'popularity': 0.2}
+# Вес записи в истории по статусу; отзыв умножает его на score / 3
+HISTORY_WEIGHTS = {'attended': 1.0, 'registered': 0.6, 'no_show': 0.2}
+# Вес явных предпочтений профиля (уровень, типы, активности)
+PROFILE_WEIGHT = 1.0
+CANDIDATE_STATUSES = ('active', 'approved')
+USER_BATCH_SIZE = 1000
+# Не чаще: повторный фоновый пересчет из-за устаревшего списка при показе
+REFRESH_COOLDOWN = timedelta(minutes=1)
+
+_model_lock = threading.Lock()
+
+class CandidateModel:
+    """Матрицы кандидатов для расчета оценок"""
+    
+    def __init__(self, training_ids, features, columns, trainer_user_ids, trainers, popularity,
+                 trainer_similarity, category_keys, tag_keys):
+        self.training_ids = training_ids            # N: id кандидатов
+        self.features = features                    # N × F: нормированные признаки
+        self.columns = columns                      # (вид, значение) -> столбец признака
+        self.trainer_user_ids = trainer_user_ids    # N: user_id тренера кандидата
+        self.trainers = trainers                    # user_id тренера -> индекс в T
+        self.trainer_of = [trainers[user_id] for user_id in trainer_user_ids.tolist()]  # N: индекс тренера
+        self.popularity = popularity                # N: заполненность группы 0..1
+        self.trainer_similarity = trainer_similarity  # T × T: косинус по совместным клиентам
+        self.category_keys = category_keys          # название категории (casefold) -> id
+        self.tag_keys = tag_keys                    # ключ тега -> id
+        self.built_at = time.monotonic()
+    
+    def __len__(self):
+        return len(self.training_ids)
+
+def _training_keys(category_id, training_type, difficulty, intensity):
+    keys = []
+    if category_id is not None:
+        keys.append(('category', category_id))
+    for kind, value in (('type', training_type), ('difficulty', difficulty), ('intensity', intensity)):
+        if value:
+            keys.append((kind, value))
+    return keys
+
+def _normalize_rows(matrix, norm='l2'):
+    import numpy as np
+    
+    if norm == 'l2':
+        scale = np.sqrt((matrix * matrix).sum(axis=1, keepdims=True))
+    else:
+        scale = matrix.max(axis=1, keepdims=True)
+    np.divide(matrix, scale, out=matrix, where=scale > 0)
+    return matrix
+
+def build_model(now=None, horizon_days=None):
+    """
+    Признаки кандидатов и близость тренеров по совместным записям
+    
+    Returns:
+        CandidateModel
+    """
+    import numpy as np
+    from app.models.training import Training, TrainingCategory, TrainingRegistration, Tag, training_tags
+    
+    now = now or datetime.utcnow()
+    horizon_days = horizon_days or current_app.config.get('RECOMMENDATIONS_HORIZON_DAYS', 30)
+    open_candidates = db.and_(
+        Training.status.in_(CANDIDATE_STATUSES),
+        Training.schedule_time > now,
+        Training.schedule_time <= now + timedelta(days=horizon_days),
+        db.or_(Training.max_participants.is_(None),
+               db.func.coalesce(Training.registrations_count, 0) < Training.max_participants),
+    )
+    rows = db.session.execute(
+        db.select(Training.id, Training.trainer_user_id, Training.category_id, Training.training_type,
+                  Training.difficulty, Training.intensity, Training.registrations_count, Training.max_participants)
+        .where(open_candidates).order_by(Training.id)
+    ).all()
+    position = {row.id: index for index, row in enumerate(rows)}
+    
+    columns = {}
+    cells = []
+    for index, row in enumerate(rows):
+        for key in _training_keys(row.category_id, row.training_type, row.difficulty, row.intensity):
+            cells.append((index, columns.setdefault(key, len(columns))))
+    tag_rows = db.session.execute(
+        db.select(training_tags.c.training_id, training_tags.c.tag_id)
+        .where(training_tags.c.training_id.in_(db.select(Training.id).where(open_candidates)))
+    ).all()
+    for training_id, tag_id in tag_rows:
+        cells.append((position[training_id], columns.setdefault(('tag', tag_id), len(columns))))
+    
+    features = np.zeros((len(rows), max(len(columns), 1)), dtype=np.float32)
+    if cells:
+        cell_rows, cell_columns = zip(*cells)
+        features[list(cell_rows), list(cell_columns)] = 1.0
+    _normalize_rows(features)
+    
+    # Матрица клиенты × тренеры по истории, пачками клиентов: C = Rᵀ R
+    history = db.session.execute(
+        db.select(TrainingRegistration.user_id, Training.trainer_user_id, db.func.count())
+        .join(Training, Training.id == TrainingRegistration.training_id)
+        .where(TrainingRegistration.status.in_(list(HISTORY_WEIGHTS)))
+        .group_by(TrainingRegistration.user_id, Training.trainer_user_id)
+        .order_by(TrainingRegistration.user_id)
+    ).all()
+    trainers = {}
+    for row in rows:
+        trainers.setdefault(row.trainer_user_id, len(trainers))
+    for _, trainer_user_id, _ in history:
+        trainers.setdefault(trainer_user_id, len(trainers))
+    
+    co_registrations = np.zeros((len(trainers), len(trainers)), dtype=np.float32)
+    chunk_size = 5000
+    start = 0
+    while start < len(history):
+        end = start + chunk_size
+        # Граница пачки не разрывает историю одного клиента
+        while end < len(history) and history[end][0] == history[end - 1][0]:
+            end += 1
+        chunk = history[start:end]
+        clients = {}
+        client_index = [clients.setdefault(user_id, len(clients)) for user_id, _, _ in chunk]
+        matrix = np.zeros((len(clients), len(trainers)), dtype=np.float32)
+        matrix[client_index, [trainers[trainer_user_id] for _, trainer_user_id, _ in chunk]] = \
+            np.log1p([count for _, _, count in chunk])
+        co_registrations += matrix.T @ matrix
+        start = end
+    diagonal = np.sqrt(np.diag(co_registrations))
+    norms = np.outer(diagonal, diagonal)
+    similarity = np.divide(co_registrations, norms, out=np.zeros_like(co_registrations), where=norms > 0)
+    np.fill_diagonal(similarity, 0.0)
+    
+    capacity = np.array([row.max_participants or 0 for row in rows], dtype=np.float32)
+    registered = np.array([row.registrations_count or 0 for row in rows], dtype=np.float32)
+    popularity = np.divide(registered, capacity, out=np.zeros_like(registered), where=capacity > 0)
+    
+    model = CandidateModel(
+        training_ids=np.array([row.id for row in rows], dtype=np.int64),
+        features=features,
+        columns=columns,
+        trainer_user_ids=np.array([row.trainer_user_id for row in rows], dtype=np.int64),
+        trainers=trainers,
+        popularity=np.clip(popularity, 0.0, 1.0),
+        trainer_similarity=similarity,
+        category_keys={name.casefold(): category_id for category_id, name in
+                       db.session.execute(db.select(TrainingCategory.id, TrainingCategory.name)).all()},
+        tag_keys=dict(db.session.execute(db.select(Tag.key, Tag.id)).all()),
+    )
+    return model
+
+def get_model():
+    """Матрицы кандидатов текущего приложения (пересобираются раз в RECOMMENDATIONS_MODEL_TTL)"""
+    ttl = current_app.config.get('RECOMMENDATIONS_MODEL_TTL', 600)
+    model = current_app.extensions.get('recommendation_model')
+    if model is not None and time.monotonic() - model.built_at < ttl:
+        return model
+    with _model_lock:
+        model = current_app.extensions.get('recommendation_model')
+        if model is None or time.monotonic() - model.built_at >= ttl:
+            model = build_model()
+            current_app.extensions['recommendation_model'] = model
+    return model
+
+def _load_list(value):
+    try:
+        items = json.loads(value) if value else []
+    except ValueError:
+        return []
+    return items if isinstance(items, list) else []
+
+def score_users(model, user_ids, top_k=None):
+    """
+    Top-K кандидатов для пачки пользователей
+    
+    Returns:
+        dict: user_id -> (список id тренировок, список оценок) по убыванию оценки
+    """
+    import numpy as np
+    from app.models.training import Training, TrainingRegistration, training_tags
+    from app.models.feedback import Feedback, Rating
+    from app.models.user import UserProfile, Client, Trainer, client_trainer_preferences
+    
+    top_k = top_k or current_app.config.get('RECOMMENDATIONS_TOP_K', 20)
+    user_ids = list(user_ids)
+    if not user_ids or not len(model):
+        return {user_id: ([], []) for user_id in user_ids}
+    
+    users = {user_id: index for index, user_id in enumerate(user_ids)}
+    candidates = {training_id: index for index, training_id in enumerate(model.training_ids.tolist())}
+    profiles = np.zeros((len(user_ids), model.features.shape[1]), dtype=np.float32)
+    trainer_history = np.zeros((len(user_ids), len(model.trainers)), dtype=np.float32)
+    trainer_preferences = np.zeros_like(trainer_history)
+    excluded = []
+    
+    def add_feature(user_index, key, weight):
+        column = model.columns.get(key)
+        if column is not None:
+            profiles[user_index, column] += weight
+    
+    # История записей: вес по статусу, отзыв усиливает или ослабляет
+    overall = db.aliased(Rating)
+    history = db.session.execute(
+        db.select(TrainingRegistration.user_id, TrainingRegistration.training_id, TrainingRegistration.status,
+                  Training.trainer_user_id, Training.category_id, Training.training_type,
+                  Training.difficulty, Training.intensity, overall.score)
+        .join(Training, Training.id == TrainingRegistration.training_id)
+        .outerjoin(Feedback, db.and_(Feedback.user_id == TrainingRegistration.user_id,
+                                     Feedback.training_id == TrainingRegistration.training_id))
+        .outerjoin(overall, db.and_(overall.feedback_id == Feedback.id, overall.rating_type == 'overall'))
+        .where(TrainingRegistration.user_id.in_(user_ids))
+    ).all()
+    weights = {}
+    for row in history:
+        user_index = users[row.user_id]
+        if row.training_id in candidates:
+            excluded.append((user_index, candidates[row.training_id]))
+        weight = HISTORY_WEIGHTS.get(row.status)
+        if not weight:
+            continue
+        if row.score:
+            weight *= row.score / 3.0
+        weights[(row.user_id, row.training_id)] = weight
+        for key in _training_keys(row.category_id, row.training_type, row.difficulty, row.intensity):
+            add_feature(user_index, key, weight)
+        trainer_index = model.trainers.get(row.trainer_user_id)
+        if trainer_index is not None:
+            trainer_history[user_index, trainer_index] += weight
+    
+    if weights:
+        tag_rows = db.session.execute(
+            db.select(TrainingRegistration.user_id, TrainingRegistration.training_id, training_tags.c.tag_id)
+            .join(training_tags, training_tags.c.training_id == TrainingRegistration.training_id)
+            .where(TrainingRegistration.user_id.in_(user_ids),
+                   TrainingRegistration.status.in_(list(HISTORY_WEIGHTS)))
+        ).all()
+        for user_id, training_id, tag_id in tag_rows:
+            add_feature(users[user_id], ('tag', tag_id), weights.get((user_id, training_id), 0.0))
+    
+    # Явные предпочтения профиля
+    for user_id, fitness_level, activities in db.session.execute(
+            db.select(UserProfile.user_id, UserProfile.fitness_level, UserProfile.preferred_activities)
+            .where(UserProfile.user_id.in_(user_ids))).all():
+        if fitness_level:
+            add_feature(users[user_id], ('difficulty', fitness_level), PROFILE_WEIGHT)
+        for activity in _load_list(activities):
+            key = str(activity).casefold()
+            if key in model.category_keys:
+                add_feature(users[user_id], ('category', model.category_keys[key]), PROFILE_WEIGHT / 2)
+            if key in model.tag_keys:
+                add_feature(users[user_id], ('tag', model.tag_keys[key]), PROFILE_WEIGHT / 2)
+    
+    for user_id, training_types in db.session.execute(
+            db.select(Client.user_id, Client.preferred_training_types).where(Client.user_id.in_(user_ids))).all():
+        for training_type in _load_list(training_types):
+            add_feature(users[user_id], ('type', training_type), PROFILE_WEIGHT)
+            key = str(training_type).casefold()
+            if key in model.category_keys:
+                add_feature(users[user_id], ('category', model.category_keys[key]), PROFILE_WEIGHT)
+    
+    for user_id, trainer_user_id, score in db.session.execute(
+            db.select(Client.user_id, Trainer.user_id, client_trainer_preferences.c.preference_score)
+            .join(client_trainer_preferences, client_trainer_preferences.c.client_id == Client.id)
+            .join(Trainer, Trainer.id == client_trainer_preferences.c.trainer_id)
+            .where(Client.user_id.in_(user_ids))).all():
+        trainer_index = model.trainers.get(trainer_user_id)
+        if trainer_index is not None:
+            trainer_preferences[users[user_id], trainer_index] += score if score is not None else 1.0
+    
+    # Оценки: B × N
+    _normalize_rows(profiles)
+    content = profiles @ model.features.T
+    affinity = _normalize_rows(np.log1p(trainer_history) + trainer_preferences, norm='max')
+    collaborative = _normalize_rows(np.log1p(trainer_history) @ model.trainer_similarity, norm='max')
+    scores = (WEIGHTS['content'] * content
+              + WEIGHTS['trainer'] * affinity[:, model.trainer_of]
+              + WEIGHTS['collaborative'] * collaborative[:, model.trainer_of]
+              + WEIGHTS['popularity'] * model.popularity[np.newaxis, :])
+    
+    # Уже записан (или отменил запись) и собственные тренировки тренера
+    if excluded:
+        excluded_rows, excluded_columns = zip(*excluded)
+        scores[list(excluded_rows), list(excluded_columns)] = -np.inf
+    scores[np.array(user_ids, dtype=np.int64)[:, np.newaxis] == model.trainer_user_ids[np.newaxis, :]] = -np.inf
+    
+    k = min(top_k, scores.shape[1])
+    best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    best_scores = np.take_along_axis(scores, best, axis=1)
+    order = np.argsort(-best_scores, axis=1)
+    best = np.take_along_axis(best, order, axis=1)
+    best_scores = np.take_along_axis(best_scores, order, axis=1)
+    
+    results = {}
+    for user_id, index in users.items():
+        finite = np.isfinite(best_scores[index])
+        results[user_id] = (model.training_ids[best[index][finite]].tolist(),
+                            [round(float(score), 4) for score in best_scores[index][finite]])
+    return results
+
+def store(results, computed_at=None):
+    """Замена сохраненных списков пользователей пачки"""
+    from app.models.training import TrainingRecommendation
+    
+    if not results:
+        return
+    table = TrainingRecommendation.__table__
+    computed_at = computed_at or datetime.utcnow()
+    db.session.execute(table.delete().where(table.c.user_id.in_(list(results))))
+    db.session.execute(table.insert(), [
+        {'user_id': user_id, 'training_ids': json.dumps(training_ids), 'scores': json.dumps(scores),
+         'computed_at': computed_at}
+        for user_id, (training_ids, scores) in results.items()
+    ])
+    db.session.commit()
+
+def build_all(batch_size=USER_BATCH_SIZE, progress_callback=None):
+    """
+    Пересчет рекомендаций всех активных клиентов
+    
+    Returns:
+        dict: число пользователей, кандидатов и время расчета
+    """
+    from app.models.user import User
+    
+    started = time.perf_counter()
+    model = build_model()
+    current_app.extensions['recommendation_model'] = model
+    
+    users = 0
+    last_id = 0
+    while True:
+        user_ids = db.session.execute(
+            db.select(User.id).where(User.role == 'client', User.is_active.is_(True), User.id > last_id)
+            .order_by(User.id).limit(batch_size)
+        ).scalars().all()
+        if not user_ids:
+            break
+        last_id = user_ids[-1]
+        store(score_users(model, user_ids))
+        users += len(user_ids)
+        if progress_callback:
+            progress_callback(users)
+    
+    return {'users': users, 'candidates': len(model), 'seconds': round(time.perf_counter() - started, 2)}
+
+def refresh_user(user_id):
+    """Пересчет списка одного пользователя по закэшированным матрицам кандидатов"""
+    results = score_users(get_model(), [user_id])
+    try:
+        store(results)
+    except exc.IntegrityError:
+        # Параллельный пересчет того же пользователя уже сохранил свежий список
+        db.session.rollback()
+
+def schedule_refresh(user_id):
+    """Фоновый пересчет после записи на тренировку или отзыва"""
+    return background.submit(refresh_user, user_id)
+
+def recommended_trainings(user_id, limit=6):
+    """
+    Блок «Рекомендуем»: сохраненный список, без расчета в запросе
+    
+    Прошедшие, заполненные и снятые тренировки пропускаются; если списка
+    нет или он заметно устарел, пересчет ставится в фон.
+    """
+    from app.models.training import Training, TrainingRecommendation
+    
+    recommendation = db.session.get(TrainingRecommendation, user_id)
+    if recommendation is None:
+        schedule_refresh(user_id)
+        return []
+    
+    training_ids = recommendation.get_training_ids()[:limit * 2]
+    trainings = {training.id: training for training in
+                 Training.query.filter(Training.id.in_(training_ids)).all()} if training_ids else {}
+    now = datetime.utcnow()
+    available = [
+        trainings[training_id] for training_id in training_ids
+        if training_id in trainings
+        and trainings[training_id].status in CANDIDATE_STATUSES
+        and trainings[training_id].schedule_time > now
+        and (trainings[training_id].registrations_count or 0) < (trainings[training_id].max_participants or math.inf)
+    ]
+    if len(available) < min(limit, len(training_ids)) and now - recommendation.computed_at > REFRESH_COOLDOWN:
+        schedule_refresh(user_id)
+    return available[:limit]
@@ -0,0 +1,151 @@
+"""
+Запись на тренировку и отмена записи
+
+Решение «свободное место или лист ожидания» принимается по снимку строки
+тренировки (registrations_count, max_participants, waitlist_count,
+version) и фиксируется условным UPDATE ... WHERE version = :снимок. Если
+строку успели изменить (чужая запись, отмена, продвижение очереди),
+UPDATE не затрагивает строк, и попытка повторяется по новому снимку — до
+REGISTRATION_MAX_ATTEMPTS раз. Сама запись — upsert по уникальной паре
+(user_id, training_id) (TrainingRegistration.activate): повторное нажатие
+не создает вторую строку, а отмененная запись восстанавливается.
+
+Отмена меняет статус условным UPDATE, и место освобождает только одна из
+повторных отмен (см. app/utils/waitlist.py). Записаться и отменить запись
+можно только на открытую тренировку (OPEN_STATUSES); отмена самой
+тренировки (cancel_training) одним UPDATE отменяет все записи и лист
+ожидания. Коммит — за вызывающим.
+"""
+import logging
+from datetime import datetime
+
+from flask import current_app
+
+from app import db
+from app.utils import waitlist
+
+logger = logging.getLogger(__name__)
+
+# Статусы тренировки, при которых принимаются запись и отмена записи
+OPEN_STATUSES = ('active', 'approved')
+
+def register(training, user_id):
+    """
+    Запись на свободное место или в лист ожидания
+    
+    Returns:
+        tuple: (результат, место в очереди или None); результат —
+            registered, waitlisted, already_registered, already_waitlisted,
+            closed (тренировка не открыта для записи)
+            или busy (все попытки проиграли конкурентным изменениям)
+    """
+    from app.models.training import Training, TrainingRegistration
+    
+    trainings = Training.__table__
+    for attempt in range(current_app.config['REGISTRATION_MAX_ATTEMPTS']):
+        existing = TrainingRegistration.query.filter_by(user_id=user_id, training_id=training.id).first()
+        if existing is not None and existing.status == 'waitlisted':
+            return 'already_waitlisted', waitlist.position(existing)
+        if existing is not None and existing.status != 'cancelled':
+            return 'already_registered', None
+        
+        snapshot = db.session.execute(
+            db.select(trainings.c.version, trainings.c.status, trainings.c.registrations_count,
+                      trainings.c.max_participants, trainings.c.waitlist_count).where(trainings.c.id == training.id)
+        ).one()
+        if snapshot.status not in OPEN_STATUSES:
+            return 'closed', None
+        capacity = snapshot.max_participants
+        has_seat = ((capacity is None or (snapshot.registrations_count or 0) < capacity)
+                    and not snapshot.waitlist_count)
+        
+        if not has_seat:
+            place = waitlist.join(training, user_id, version=snapshot.version)
+            if place is not None:
+                return 'waitlisted', place
+        elif db.session.execute(trainings.update().where(
+                trainings.c.id == training.id, trainings.c.version == snapshot.version
+        ).values(registrations_count=trainings.c.registrations_count + 1,
+                 version=trainings.c.version + 1)).rowcount:
+            db.session.expire(training, ['registrations_count', 'version'])
+            if TrainingRegistration.activate(user_id, training.id, payment_amount=training.price):
+                return 'registered', None
+            # Параллельный запрос того же пользователя успел записаться — место возвращаем
+            db.session.execute(trainings.update().where(trainings.c.id == training.id).values(
+                registrations_count=trainings.c.registrations_count - 1, version=trainings.c.version + 1))
+        
+        db.session.expire_all()
+        logger.debug(f'Registration of user {user_id} to training {training.id}: '
+                     f'version {snapshot.version} changed, attempt {attempt + 1}')
+    
+    logger.warning(f'Registration of user {user_id} to training {training.id}: too many concurrent changes')
+    return 'busy', None
+
+def cancel(registration, reason):
+    """
+    Отмена активной записи; место получает первый в листе ожидания
+    
+    Returns:
+        tuple: (отменена ли запись этим вызовом, id продвинутого пользователя или None)
+    """
+    from app.models.training import Training, TrainingRegistration
+    
+    trainings = Training.__table__
+    status = db.session.execute(
+        db.select(trainings.c.status).where(trainings.c.id == registration.training_id)).scalar()
+    if status not in OPEN_STATUSES:
+        return False, None
+    
+    table = TrainingRegistration.__table__
+    cancelled = db.session.execute(table.update().where(
+        table.c.id == registration.id, table.c.status == 'registered'
+    ).values(status='cancelled', cancelled_at=datetime.utcnow(), cancellation_reason=reason)).rowcount
+    db.session.expire(registration)
+    if not cancelled:
+        return False, None
+    return True, waitlist.release_seat(registration.training_id)
+
+def cancel_training(training, reason=None):
+    """
+    Отмена тренировки вместе со всеми записями и листом ожидания
+    
+    Строка тренировки меняется первой (условно по статусу из снимка), поэтому
+    параллельные запись, отмена записи и продвижение очереди идут после нее и
+    видят уже закрытую тренировку. Записи и лист ожидания отменяются одним
+    UPDATE, счетчики и смещение очереди обнуляются.
+    
+    Returns:
+        list: id пользователей, чья запись или место в очереди отменены;
+            None — тренировка уже отменена или завершена
+    """
+    from app.models.training import Training, TrainingRegistration
+    from app.utils import moderation
+    
+    trainings = Training.__table__
+    registrations = TrainingRegistration.__table__
+    previous = db.session.execute(db.select(trainings.c.status).where(trainings.c.id == training.id)).scalar()
+    if previous in ('cancelled', 'completed'):
+        return None
+    
+    now = datetime.utcnow()
+    if not db.session.execute(trainings.update().where(
+            trainings.c.id == training.id, trainings.c.status == previous
+    ).values(status='cancelled', registrations_count=0, waitlist_count=0, waitlist_offset=0,
+             version=trainings.c.version + 1, updated_at=now)).rowcount:
+        # Статус успели изменить — решение принимает тот, кто изменил
+        db.session.expire(training)
+        return None
+    if previous in moderation.PENDING_STATUSES:
+        # UPDATE в обход событий модели — счетчик тренировок на проверке правим явно
+        moderation.adjust_pending(db.session, -1)
+    
+    active = db.and_(registrations.c.training_id == training.id,
+                     registrations.c.status.in_(('registered', 'waitlisted')))
+    user_ids = [row.user_id for row in db.session.execute(db.select(registrations.c.user_id).where(active))]
+    db.session.execute(registrations.update().where(active).values(
+        status='cancelled', waitlist_position=None, cancelled_at=now,
+        cancellation_reason=reason or 'Тренировка отменена'))
+    db.session.expire(training)
+    
+    logger.info(f'Training {training.id} cancelled, {len(user_ids)} registrations cancelled')
+    return user_ids
\ No newline at end of file
@@ -0,0 +1,231 @@
+"""
+Чтение с реплик базы данных
+
+Представления, помеченные @read_replica (дашборд и история прогресса,
+статистика, список и календарь тренировок), выполняют SELECT на репликах
+из SQLALCHEMY_REPLICA_URIS по очереди. На основную базу остаются:
+- запись и все запросы сессии после первой записи в этом запросе;
+- чтение пользователя в течение REPLICA_STICKINESS_SECONDS после его
+  записи (метка в сессии Flask — чтобы он видел свои изменения, даже
+  если реплика отстает);
+- SELECT ... FOR UPDATE и текстовые запросы;
+- все запросы, если здоровых реплик нет. Реплика проверяется SELECT 1
+  не чаще раза в REPLICA_HEALTH_CHECK_INTERVAL секунд, а при ошибке
+  соединения сразу исключается до следующей проверки.
+
+Локально реплику заменяет копия файла SQLite (flask replicas sync).
+"""
+import itertools
+import os
+import sqlite3
+import threading
+import time
+import logging
+from functools import wraps
+
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql import Select
+
+logger = logging.getLogger(__name__)
+
+STICKY_SESSION_KEY = '_primary_until'
+
+class RoutingSession(Session):
+    """Сессия, отправляющая SELECT из представлений @read_replica на реплики"""
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _is_plain_select(clause):
+            engine = replicas.engine_for_read()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def _is_plain_select(clause):
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+def read_replica(f):
+    """Декоратор представления, чтение которого можно выполнять на реплике"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.read_replica = True
+        return f(*args, **kwargs)
+    return decorated_function
+
+def _remember_write(db_session, flush_context):
+    """После записи чтение пользователя идет с основной базы"""
+    if db_session.new or db_session.dirty or db_session.deleted:
+        _stick_to_primary()
+
+def _remember_bulk_write(orm_execute_state):
+    """То же для UPDATE/DELETE/INSERT через session.execute"""
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        _stick_to_primary()
+
+def _stick_to_primary():
+    if not has_request_context():
+        return
+    g.wrote_primary = True
+    stickiness = current_app.config.get('REPLICA_STICKINESS_SECONDS', 10)
+    if stickiness:
+        session[STICKY_SESSION_KEY] = time.time() + stickiness
+
+class _Replica:
+    """Движок реплики и состояние его здоровья"""
+    
+    def __init__(self, uri, options, check_interval):
+        self.uri = uri
+        self.options = options
+        self.check_interval = check_interval
+        self.healthy = True
+        self.checked_at = 0.0
+        self.last_error = None
+        self._engine = None
+        self._lock = threading.Lock()
+    
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    engine = create_engine(self.uri, **self.options)
+                    event.listen(engine, 'handle_error', self._on_error)
+                    self._engine = engine
+        return self._engine
+    
+    def _on_error(self, context):
+        if context.is_disconnect or isinstance(context.original_exception, exc.OperationalError):
+            self.mark_down(context.original_exception)
+    
+    def mark_down(self, error):
+        if self.healthy:
+            logger.warning(f'Replica {self.display_uri} is unhealthy: {error}')
+        self.healthy = False
+        self.last_error = str(error)
+        self.checked_at = time.monotonic()
+    
+    def available(self):
+        now = time.monotonic()
+        if now - self.checked_at < self.check_interval:
+            return self.healthy
+        
+        with self._lock:
+            if now - self.checked_at < self.check_interval:
+                return self.healthy
+            self.checked_at = now
+        try:
+            with self.engine.connect() as connection:
+                connection.exec_driver_sql('SELECT 1')
+        except exc.SQLAlchemyError as e:
+            self.mark_down(e)
+            return False
+        
+        if not self.healthy:
+            logger.info(f'Replica {self.display_uri} is healthy again')
+        self.healthy = True
+        self.last_error = None
+        return True
+    
+    @property
+    def display_uri(self):
+        return make_url(self.uri).render_as_string(hide_password=True)
+
+class Replicas:
+    """Набор реплик приложения (app.extensions['replicas'])"""
+    
+    def init_app(self, app):
+        """Вызывается до sqlite_profile.init_app: нужны исходные SQLALCHEMY_ENGINE_OPTIONS"""
+        from app.utils import sqlite_profile
+        
+        app.config.setdefault('SQLALCHEMY_REPLICA_URIS', [])
+        app.config.setdefault('REPLICA_STICKINESS_SECONDS', 10)
+        app.config.setdefault('REPLICA_HEALTH_CHECK_INTERVAL', 10)
+        
+        replicas = []
+        for uri in app.config['SQLALCHEMY_REPLICA_URIS']:
+            uri = _resolve_sqlite_path(uri, app.instance_path)
+            options = sqlite_profile.engine_options(uri, app.config, app.config.get('SQLALCHEMY_ENGINE_OPTIONS'))
+            replicas.append(_Replica(uri, options, app.config['REPLICA_HEALTH_CHECK_INTERVAL']))
+        app.extensions['replicas'] = _ReplicaSet(replicas)
+        
+        if replicas and not event.contains(RoutingSession, 'after_flush', _remember_write):
+            event.listen(RoutingSession, 'after_flush', _remember_write)
+            event.listen(RoutingSession, 'do_orm_execute', _remember_bulk_write)
+    
+    @staticmethod
+    def _state():
+        return current_app.extensions.get('replicas')
+    
+    def engine_for_read(self):
+        """Движок реплики для текущего запроса или None (основная база)"""
+        if not has_request_context() or not g.get('read_replica') or g.get('wrote_primary'):
+            return None
+        state = self._state()
+        if state is None or not state.replicas:
+            return None
+        if session.get(STICKY_SESSION_KEY, 0) > time.time():
+            return None
+        return state.choose()
+    
+    def status(self):
+        state = self._state()
+        return [
+            {'uri': replica.display_uri, 'healthy': replica.available(), 'last_error': replica.last_error}
+            for replica in (state.replicas if state else [])
+        ]
+    
+    def all(self):
+        state = self._state()
+        return list(state.replicas) if state else []
+
+class _ReplicaSet:
+    
+    def __init__(self, replicas):
+        self.replicas = replicas
+        self._counter = itertools.count()
+    
+    def choose(self):
+        """Следующая здоровая реплика по кругу"""
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._counter) % len(self.replicas)]
+            if replica.available():
+                return replica.engine
+        return None
+
+def _resolve_sqlite_path(uri, instance_path):
+    """Относительный путь SQLite — от instance_path, как у основной базы во Flask-SQLAlchemy"""
+    url = make_url(uri)
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:') or os.path.isabs(url.database):
+        return uri
+    os.makedirs(instance_path, exist_ok=True)
+    return url.set(database=os.path.join(instance_path, url.database)).render_as_string(hide_password=False)
+
+def sync_sqlite_replicas(primary_engine, replica_list):
+    """
+    Копия основной базы SQLite в файлы реплик (backup API: согласованный снимок)
+    
+    Returns:
+        list: пути обновленных реплик
+    """
+    if primary_engine.dialect.name != 'sqlite':
+        raise ValueError('Синхронизация копированием возможна только для SQLite')
+    
+    synced = []
+    with primary_engine.connect() as connection:
+        source = connection.connection.dbapi_connection
+        for replica in replica_list:
+            url = make_url(replica.uri)
+            if url.get_backend_name() != 'sqlite' or not url.database:
+                continue
+            replica.engine.dispose()
+            target = sqlite3.connect(url.database)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+            synced.append(url.database)
+    return synced
+
+replicas = Replicas()
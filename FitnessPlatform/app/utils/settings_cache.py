@@ -0,0 +1,161 @@
+"""
+Кэш системных настроек
+
+Все настройки загружаются одним запросом и хранятся уже приведенными к
+своему типу. Изменения между процессами распространяются через счетчик
+версии (строка settings_version в system_settings): любое изменение
+SystemSetting увеличивает его в той же транзакции, а кэш сверяет версию
+не чаще одного раза в SETTINGS_CACHE_POLL_INTERVAL секунд. Между сверками
+чтение настроек не делает запросов к базе.
+"""
+import itertools
+import time
+import threading
+import logging
+
+from flask import current_app
+from sqlalchemy import event, cast, Integer, Text
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'settings_version'
+
+class SettingsCache:
+    """Процессный кэш SystemSetting с типизированными значениями"""
+    
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """Регистрация кэша в приложении"""
+        app.config.setdefault('SETTINGS_CACHE_POLL_INTERVAL', 5)
+        app.extensions['settings_cache'] = _SettingsState(app.config['SETTINGS_CACHE_POLL_INTERVAL'])
+        _register_version_listeners()
+    
+    @staticmethod
+    def _state():
+        return current_app.extensions['settings_cache']
+    
+    def get(self, key, default=None):
+        """Значение настройки из кэша"""
+        return self._state().get(key, default)
+    
+    def all(self):
+        """Снимок всех настроек"""
+        return dict(self._state().snapshot())
+    
+    def invalidate(self):
+        """Сброс кэша текущего процесса (перечитается при следующем обращении)"""
+        self._state().invalidate()
+
+class _SettingsState:
+    """
+    Состояние кэша одного приложения
+    
+    Сброс (invalidate) только увеличивает номер поколения и не берет
+    блокировку: его вызывают события flush, в том числе из-под перезагрузки
+    кэша в том же потоке. Читатель берет словарь значений в локальную
+    переменную один раз и возвращает именно его, поэтому параллельный сброс
+    не может подменить результат на None.
+    """
+    
+    def __init__(self, poll_interval):
+        self.poll_interval = poll_interval
+        self.values = None
+        self.version = None
+        self.checked_at = 0.0
+        self.generation = 0
+        self.loaded_generation = None
+        self._generations = itertools.count(1)
+        self.lock = threading.Lock()
+    
+    def invalidate(self):
+        self.generation = next(self._generations)
+    
+    def _is_stale(self, values):
+        return values is None or self.loaded_generation != self.generation
+    
+    def snapshot(self):
+        now = time.monotonic()
+        values = self.values
+        if self._is_stale(values) or now - self.checked_at >= self.poll_interval:
+            with self.lock:
+                values = self.values
+                if self._is_stale(values):
+                    values = self._reload(now)
+                elif now - self.checked_at >= self.poll_interval:
+                    if _read_version() != self.version:
+                        values = self._reload(now)
+                    else:
+                        self.checked_at = now
+        return values
+    
+    def get(self, key, default=None):
+        value = self.snapshot().get(key)
+        return default if value is None else value
+    
+    def _reload(self, now):
+        from app.models.system import SystemSetting
+        
+        # Сброс во время чтения оставит кэш устаревшим — перечитаем в следующий раз
+        generation = self.generation
+        values = {}
+        version = 0
+        for setting in SystemSetting.query.all():
+            if setting.key == VERSION_KEY:
+                version = int(setting.value or 0)
+            else:
+                values[setting.key] = setting.get_value()
+        
+        self.values = values
+        self.version = version
+        self.checked_at = now
+        self.loaded_generation = generation
+        logger.debug(f'Settings cache reloaded (version {version}, {len(values)} settings)')
+        return values
+
+def _read_version():
+    """Текущая версия настроек (один индексный запрос по ключу)"""
+    from app import db
+    from app.models.system import SystemSetting
+    
+    value = db.session.query(SystemSetting.value).filter_by(key=VERSION_KEY).scalar()
+    return int(value or 0)
+
+def _bump_version(mapper, connection, target):
+    """Увеличение счетчика версии в транзакции изменения настройки"""
+    if target.key == VERSION_KEY:
+        return
+    
+    table = mapper.local_table
+    result = connection.execute(
+        table.update()
+        .where(table.c.key == VERSION_KEY)
+        .values(value=cast(cast(table.c.value, Integer) + 1, Text))
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(
+            key=VERSION_KEY, value='1', value_type='integer', category='system',
+            description='Версия системных настроек (служебная)', is_editable=False
+        ))
+    
+    # Локальный кэш сбрасываем сразу, остальные процессы увидят новую версию
+    try:
+        current_app.extensions['settings_cache'].invalidate()
+    except (RuntimeError, KeyError):
+        pass
+
+_listeners_registered = False
+
+def _register_version_listeners():
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    
+    from app.models.system import SystemSetting
+    for event_name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(SystemSetting, event_name, _bump_version)
+    _listeners_registered = True
+
+settings_cache = SettingsCache()
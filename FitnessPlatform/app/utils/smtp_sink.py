@@ -0,0 +1,129 @@
+"""
+Локальный SMTP-сервер для разработки и проверки очереди доставки
+
+Принимает письма и хранит их в памяти (и/или выводит в консоль), ничего
+не пересылая. Поддерживает минимальный набор команд SMTP (EHLO/HELO, MAIL,
+RCPT, DATA, RSET, NOOP, QUIT), чего достаточно для smtplib и Flask-Mail.
+
+Для проверки повторов можно заставить сервер отвечать ошибкой на первые
+fail_first писем.
+"""
+import socketserver
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Обработка одного SMTP-соединения"""
+    
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+    
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply('220 fitness-platform smtp sink ready')
+        envelope = self._reset()
+        
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command[:4].upper()
+            
+            if verb in ('EHLO', 'HELO'):
+                if verb == 'EHLO':
+                    self.reply('250-localhost')
+                    self.reply('250 8BITMIME')
+                else:
+                    self.reply('250 localhost')
+            elif verb == 'MAIL':
+                envelope = self._reset()
+                envelope['from'] = command.split(':', 1)[-1].strip()
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                envelope['to'].append(command.split(':', 1)[-1].strip())
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                envelope['data'] = self._read_data()
+                self._deliver(envelope)
+                envelope = self._reset()
+            elif verb == 'RSET':
+                envelope = self._reset()
+                self.reply('250 OK')
+            elif verb == 'NOOP':
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                break
+            else:
+                self.reply('502 Command not implemented')
+    
+    @staticmethod
+    def _reset():
+        return {'from': None, 'to': [], 'data': b''}
+    
+    def _read_data(self):
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line in (b'.\r\n', b'.\n'):
+                break
+            # Снятие dot-stuffing
+            if line.startswith(b'..'):
+                line = line[1:]
+            lines.append(line)
+        return b''.join(lines)
+    
+    def _deliver(self, envelope):
+        server = self.server
+        with server.lock:
+            if server.fail_first > 0:
+                server.fail_first -= 1
+                self.reply('451 Temporary failure, try again later')
+                return
+            server.messages.append(envelope)
+        
+        if server.echo:
+            logger.info(f"Message from {envelope['from']} to {', '.join(envelope['to'])} ({len(envelope['data'])} bytes)")
+        self.reply('250 OK: queued')
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """
+    SMTP-сервер, складывающий письма в messages
+    
+    Использование:
+        sink = SMTPSink(('127.0.0.1', 0)).start()
+        ... MAIL_SERVER='127.0.0.1', MAIL_PORT=sink.port ...
+        sink.stop()
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+    
+    def __init__(self, address=('127.0.0.1', 1025), fail_first=0, echo=False):
+        super().__init__(address, _SMTPHandler)
+        self.messages = []
+        self.connections = 0
+        self.fail_first = fail_first
+        self.echo = echo
+        self.lock = threading.Lock()
+        self._thread = None
+    
+    @property
+    def port(self):
+        return self.server_address[1]
+    
+    def start(self):
+        """Запуск в фоновом потоке"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        """Остановка сервера"""
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,226 @@
+"""
+Профиль SQLite для многопоточного сервера
+
+На каждом соединении включаются WAL (читатели не блокируют писателя и
+наоборот), synchronous=NORMAL, busy_timeout, mmap и размер кэша страниц.
+Соединения переиспользуются пулом (по умолчанию SQLAlchemy 1.4 открывает
+файл SQLite заново на каждый запрос, и кэш страниц теряется).
+
+Писатель у SQLite всегда один, поэтому транзакции записи процесса
+выстраиваются в очередь (FIFO): соединение встает в очередь перед первым
+INSERT/UPDATE/DELETE/DDL и покидает ее после COMMIT/ROLLBACK. Чтение
+идет без очереди. Между процессами очередь не действует — там ожидание
+обеспечивает busy_timeout.
+
+Профиль подключается до db.init_app: он меняет SQLALCHEMY_ENGINE_OPTIONS.
+"""
+import re
+import sqlite3
+import threading
+import time
+import logging
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+_WRITE_RE = re.compile(r'^\s*(INSERT|UPDATE|DELETE|REPLACE|CREATE|DROP|ALTER)\b', re.IGNORECASE)
+
+class WriterQueue:
+    """
+    Очередь писателей одного файла базы (FIFO, повторно входимая для потока)
+    
+    Поток, уже владеющий очередью, проходит без ожидания — например, если
+    в одном запросе пишут два соединения.
+    """
+    
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self._condition = threading.Condition()
+        self._waiters = []
+        self._owner = None
+        self._depth = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.max_wait = 0.0
+    
+    def acquire(self):
+        """
+        Returns:
+            bool: очередь получена (False — истек timeout, запись идет без очереди)
+        """
+        me = threading.get_ident()
+        with self._condition:
+            if self._owner == me:
+                self._depth += 1
+                return True
+            
+            token = object()
+            self._waiters.append(token)
+            started = time.monotonic()
+            granted = self._condition.wait_for(
+                lambda: self._owner is None and self._waiters[0] is token, self.timeout)
+            self._waiters.remove(token)
+            waited = time.monotonic() - started
+            self.max_wait = max(self.max_wait, waited)
+            if not granted:
+                self.timeouts += 1
+                self._condition.notify_all()
+                logger.warning(f'SQLite writer queue: no turn after {waited:.1f}s, writing without queue')
+                return False
+            
+            self._owner = me
+            self._depth = 1
+            self.acquired += 1
+            return True
+    
+    def release(self):
+        with self._condition:
+            self._depth -= 1
+            if self._depth == 0:
+                self._owner = None
+                self._condition.notify_all()
+    
+    def stats(self):
+        with self._condition:
+            return {
+                'acquired': self.acquired,
+                'waiting': len(self._waiters),
+                'timeouts': self.timeouts,
+                'max_wait_ms': round(self.max_wait * 1000, 1),
+            }
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+def writer_queue(database, timeout):
+    """Очередь писателей файла базы (общая для всех приложений процесса)"""
+    with _queues_lock:
+        if database not in _queues:
+            _queues[database] = WriterQueue(timeout)
+        return _queues[database]
+
+def connection_class(pragmas, queue=None):
+    """Класс соединения sqlite3 с прагмами и очередью записи (connect_args['factory'])"""
+    
+    class ProfiledCursor(sqlite3.Cursor):
+        
+        def execute(self, sql, parameters=()):
+            self.connection._before_write(sql)
+            try:
+                return super().execute(sql, parameters)
+            finally:
+                self.connection._after_statement()
+        
+        def executemany(self, sql, seq_of_parameters):
+            self.connection._before_write(sql)
+            try:
+                return super().executemany(sql, seq_of_parameters)
+            finally:
+                self.connection._after_statement()
+    
+    class ProfiledConnection(sqlite3.Connection):
+        
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self._queued = False
+            for pragma in pragmas:
+                super().execute(f'PRAGMA {pragma}').fetchall()
+        
+        def cursor(self, factory=ProfiledCursor):
+            return super().cursor(factory)
+        
+        def _before_write(self, sql):
+            if queue is not None and not self._queued and _WRITE_RE.match(sql):
+                self._queued = queue.acquire()
+        
+        def _after_statement(self):
+            # DDL и запись вне транзакции фиксируются сразу
+            if self._queued and not self.in_transaction:
+                self._leave_queue()
+        
+        def _leave_queue(self):
+            if self._queued:
+                self._queued = False
+                queue.release()
+        
+        def commit(self):
+            try:
+                super().commit()
+            finally:
+                self._leave_queue()
+        
+        def rollback(self):
+            try:
+                super().rollback()
+            finally:
+                self._leave_queue()
+        
+        def close(self):
+            try:
+                super().close()
+            finally:
+                self._leave_queue()
+    
+    return ProfiledConnection
+
+def is_file_database(uri):
+    if not uri:
+        return False
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+def pragmas(config):
+    busy_timeout = config.get('SQLITE_BUSY_TIMEOUT_MS', 30000)
+    return (
+        'journal_mode = WAL',
+        f"synchronous = {config.get('SQLITE_SYNCHRONOUS', 'NORMAL')}",
+        f'busy_timeout = {busy_timeout}',
+        f"cache_size = -{config.get('SQLITE_CACHE_SIZE_KB', 65536)}",
+        f"mmap_size = {config.get('SQLITE_MMAP_SIZE_MB', 256) * 1024 * 1024}",
+        'temp_store = MEMORY',
+    )
+
+def engine_options(uri, config, options=None):
+    """
+    Параметры движка для файла SQLite с профилем
+    
+    Args:
+        uri: адрес базы
+        config: конфиг приложения (SQLITE_*)
+        options: исходные SQLALCHEMY_ENGINE_OPTIONS
+    """
+    options = dict(options or {})
+    if not config.get('SQLITE_PROFILE_ENABLED', True) or not is_file_database(uri):
+        return options
+    
+    busy_timeout = config.get('SQLITE_BUSY_TIMEOUT_MS', 30000) / 1000
+    queue = None
+    if config.get('SQLITE_WRITER_QUEUE', True):
+        queue = writer_queue(make_url(uri).database, busy_timeout)
+    
+    connect_args = dict(options.get('connect_args') or {})
+    connect_args.update({
+        'factory': connection_class(pragmas(config), queue),
+        'check_same_thread': False,
+        'timeout': busy_timeout,
+    })
+    options.update({
+        'connect_args': connect_args,
+        'poolclass': QueuePool,
+        'pool_size': config.get('SQLITE_POOL_SIZE', 10),
+        'max_overflow': config.get('SQLITE_POOL_OVERFLOW', 20),
+    })
+    # Проверка соединения перед выдачей из пула для локального файла не нужна
+    options.pop('pool_pre_ping', None)
+    return options
+
+def init_app(app):
+    """Профиль для SQLALCHEMY_DATABASE_URI (вызывается до db.init_app)"""
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI')
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+        uri, app.config, app.config.get('SQLALCHEMY_ENGINE_OPTIONS'))
+    if app.config.get('SQLITE_WRITER_QUEUE', True) and is_file_database(uri):
+        app.extensions['sqlite_writer_queue'] = writer_queue(
+            make_url(uri).database, app.config.get('SQLITE_BUSY_TIMEOUT_MS', 30000) / 1000)
@@ -0,0 +1,49 @@
+"""
+Теги, оборудование и противопоказания тренировок
+
+Раньше списки хранились текстом в самой тренировке: где-то JSON, где-то
+строки через перевод строки (форма создания), теги — через запятую.
+Теперь это справочники tags, equipment, contraindications со связями
+training_tags, training_equipment, training_contraindications.
+Прежние значения переносит миграция 0009_training_terms (разбор —
+split_terms); текстовые столбцы остаются нетронутыми.
+"""
+import json
+import re
+import time
+
+_SEPARATORS_RE = re.compile(r'[\n;,]+')
+
+# Популярные теги для фильтра каталога: limit -> (момент устаревания, список)
+_popular_cache = {}
+POPULAR_TAGS_TTL = 300
+
+def split_terms(value):
+    """
+    Список названий из текста: JSON-массив или строки через перевод строки, «;» или «,»
+    
+    Returns:
+        list: непустые названия без крайних пробелов
+    """
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        items = value
+    else:
+        try:
+            items = json.loads(value)
+        except ValueError:
+            items = None
+        if not isinstance(items, list):
+            items = _SEPARATORS_RE.split(str(value))
+    return [str(item).strip() for item in items if item is not None and str(item).strip()]
+
+def popular_tags(limit=30):
+    """Популярные теги (name, key) с кэшем в процессе — без GROUP BY на каждый показ каталога"""
+    from app.models.training import Tag
+    
+    expires, tags = _popular_cache.get(limit, (0, None))
+    if tags is None or time.monotonic() >= expires:
+        tags = [{'name': tag.name, 'key': tag.key} for tag in Tag.popular(limit)]
+        _popular_cache[limit] = (time.monotonic() + POPULAR_TAGS_TTL, tags)
+    return tags
\ No newline at end of file
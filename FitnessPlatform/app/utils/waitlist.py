@@ -0,0 +1,140 @@
+"""
+Лист ожидания тренировок
+
+Очередь FIFO: запись со статусом waitlisted получает номер
+waitlist_position. Номера плотные, а голова очереди задается смещением
+Training.waitlist_offset (сколько записей уже вышло из головы), поэтому
+место в очереди — waitlist_position - waitlist_offset — читается по
+индексу без подсчета стоящих впереди.
+
+- Встать в очередь: waitlist_count + 1, номер offset + count.
+- Освободилось место (отмена записи): если очередь не пуста, offset + 1, и
+  запись с номером offset становится registered в той же транзакции —
+  registrations_count не меняется; иначе registrations_count - 1.
+- Выход из середины очереди сдвигает номера стоящих позади (диапазон
+  индекса idx_registrations_waitlist).
+
+Каждое изменение начинается с UPDATE строки тренировки (и увеличивает
+Training.version) и читает очередь уже после него: параллельные отмены и
+записи одной тренировки идут по очереди, и одна запись не продвигается
+дважды. Коммит — за вызывающим.
+"""
+from datetime import datetime
+import logging
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+def join(training, user_id, version=None):
+    """
+    Постановка в конец очереди (отмененная запись пользователя переиспользуется)
+    
+    Args:
+        version: ожидаемая Training.version — при несовпадении ничего не меняется
+    
+    Returns:
+        int: место в очереди, начиная с 1; None — версия изменилась или
+            у пользователя уже есть активная запись (очередь не меняется)
+    """
+    from app.models.training import Training, TrainingRegistration
+    
+    trainings = Training.__table__
+    condition = trainings.c.id == training.id
+    if version is not None:
+        condition = db.and_(condition, trainings.c.version == version)
+    if not db.session.execute(trainings.update().where(condition).values(
+            waitlist_count=trainings.c.waitlist_count + 1, version=trainings.c.version + 1)).rowcount:
+        return None
+    offset, count = db.session.execute(
+        db.select(trainings.c.waitlist_offset, trainings.c.waitlist_count).where(trainings.c.id == training.id)
+    ).one()
+    db.session.expire(training, ['waitlist_count', 'waitlist_offset', 'version'])
+    
+    if not TrainingRegistration.activate(user_id, training.id, status='waitlisted', registration_type='waitlist',
+                                         waitlist_position=offset + count, payment_amount=training.price):
+        # Номер был последним, строка тренировки еще за нами — освобождаем его
+        db.session.execute(trainings.update().where(trainings.c.id == training.id).values(
+            waitlist_count=trainings.c.waitlist_count - 1, version=trainings.c.version + 1))
+        return None
+    return count
+
+def position(registration):
+    """Место в очереди (None, если запись не в листе ожидания)"""
+    from app.models.training import Training
+    
+    if registration is None or registration.status != 'waitlisted' or registration.waitlist_position is None:
+        return None
+    offset = db.session.query(Training.waitlist_offset).filter(Training.id == registration.training_id).scalar()
+    return registration.waitlist_position - (offset or 0)
+
+def leave(registration, reason=None):
+    """
+    Выход из очереди
+    
+    Returns:
+        bool: False, если запись уже не в очереди (продвинута или вышла раньше)
+    """
+    from app.models.training import Training, TrainingRegistration
+    
+    trainings = Training.__table__
+    registrations = TrainingRegistration.__table__
+    db.session.execute(trainings.update().where(trainings.c.id == registration.training_id)
+                       .values(waitlist_count=trainings.c.waitlist_count - 1, version=trainings.c.version + 1))
+    ticket = db.session.execute(
+        db.select(registrations.c.waitlist_position)
+        .where(registrations.c.id == registration.id, registrations.c.status == 'waitlisted')
+    ).scalar()
+    if ticket is None:
+        db.session.execute(trainings.update().where(trainings.c.id == registration.training_id)
+                           .values(waitlist_count=trainings.c.waitlist_count + 1))
+        db.session.expire(registration)
+        return False
+    
+    db.session.execute(registrations.update().where(
+        registrations.c.training_id == registration.training_id,
+        registrations.c.status == 'waitlisted',
+        registrations.c.waitlist_position > ticket
+    ).values(waitlist_position=registrations.c.waitlist_position - 1))
+    db.session.execute(registrations.update().where(registrations.c.id == registration.id).values(
+        status='cancelled', waitlist_position=None, cancelled_at=datetime.utcnow(), cancellation_reason=reason))
+    db.session.expire(registration)
+    return True
+
+def release_seat(training_id):
+    """
+    Место освободилось: запись головы очереди или уменьшение registrations_count
+    
+    Returns:
+        int: id продвинутого пользователя или None
+    """
+    from app.models.training import Training, TrainingRegistration
+    
+    trainings = Training.__table__
+    registrations = TrainingRegistration.__table__
+    promoted = db.session.execute(
+        trainings.update().where(trainings.c.id == training_id, trainings.c.waitlist_count > 0)
+        .values(waitlist_offset=trainings.c.waitlist_offset + 1, waitlist_count=trainings.c.waitlist_count - 1,
+                version=trainings.c.version + 1)
+    ).rowcount
+    
+    if promoted:
+        ticket = db.session.execute(
+            db.select(trainings.c.waitlist_offset).where(trainings.c.id == training_id)).scalar()
+        head = db.session.execute(
+            db.select(registrations.c.id, registrations.c.user_id).where(
+                registrations.c.training_id == training_id,
+                registrations.c.status == 'waitlisted',
+                registrations.c.waitlist_position == ticket)
+        ).first()
+        if head is not None:
+            db.session.execute(registrations.update().where(registrations.c.id == head.id).values(
+                status='registered', waitlist_position=None, registered_at=datetime.utcnow()))
+            logger.info(f'Waitlist of training {training_id}: user {head.user_id} promoted')
+            return head.user_id
+        logger.warning(f'Waitlist of training {training_id}: no entry with position {ticket}')
+    
+    db.session.execute(trainings.update().where(trainings.c.id == training_id)
+                       .values(registrations_count=trainings.c.registrations_count - 1,
+                               version=trainings.c.version + 1))
+    return None
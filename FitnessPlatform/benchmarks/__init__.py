@@ -0,0 +1,3 @@
+"""
+Бенчмарки: время запуска (startup), страницы на данных заданного объема (endpoints)
+"""
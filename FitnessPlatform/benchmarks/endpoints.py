@@ -0,0 +1,305 @@
+"""
+Бенчмарк основных страниц на данных заданного объема
+
+Страницы вызываются через тестовый клиент Flask (без сети), для каждой
+записываются задержка (p50/p95), количество SQL-запросов и пиковая память
+запроса (tracemalloc). Результаты пишутся в JSON; режим compare сравнивает
+два прогона и завершается с кодом 1 при регрессии.
+
+    python -m benchmarks.endpoints run --scale small --output results/before.json
+    python -m benchmarks.endpoints run --scale medium --db /tmp/bench.db --reuse-db
+    python -m benchmarks.endpoints compare results/before.json results/after.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+# Страницы: (имя, метод, URL, пользователь, ожидаемый код ответа)
+ENDPOINTS = (
+    ('trainings.list', 'GET', '/trainings/', 'client', 200),
+    ('trainings.list_page_5', 'GET', '/trainings/?page=5', 'client', 200),
+    ('trainings.detail', 'GET', '/trainings/{training_id}', 'client', 200),
+    ('trainings.my', 'GET', '/trainings/my', 'client', 200),
+    ('trainings.my_created', 'GET', '/trainings/my?status=created', 'trainer', 200),
+    ('progress.dashboard', 'GET', '/progress/', 'client', 200),
+    ('progress.history', 'GET', '/progress/history', 'client', 200),
+    ('progress.statistics', 'GET', '/progress/statistics', 'client', 200),
+    ('progress.chart_data', 'GET', '/progress/api/chart-data?type=weekly', 'client', 200),
+    ('auth.login', 'POST', '/auth/login', None, 302),
+)
+
+# Пороги регрессии для compare
+LATENCY_THRESHOLD = 0.25   # рост p50/p95 больше чем на 25%...
+LATENCY_MIN_DELTA_MS = 5.0 # ...и больше чем на 5 мс (шум быстрых страниц)
+MEMORY_THRESHOLD = 0.25
+
+def percentile(values, fraction):
+    """Перцентиль по отсортированной выборке (ближайший ранг)"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def make_app(database_uri):
+    from config import TestingConfig
+    from app import create_app
+    
+    class BenchmarkConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = database_uri
+        SQLALCHEMY_ECHO = False
+        SERVER_NAME = None
+        WTF_CSRF_ENABLED = False
+        # Ошибка страницы — ответ 500 и запись в errors, а не остановка прогона
+        PROPAGATE_EXCEPTIONS = False
+    
+    logging.disable(logging.CRITICAL)
+    warnings.filterwarnings('ignore')
+    return create_app(BenchmarkConfig)
+
+class QueryCounter:
+    """Счетчик SQL-запросов движка"""
+    
+    def __init__(self, engine):
+        from sqlalchemy import event
+        
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+    
+    def _on_execute(self, *args):
+        self.count += 1
+
+def _login(client, email, password):
+    return client.post('/auth/login', data={'email': email, 'password': password})
+
+def _request(client, method, url, persona):
+    if method == 'POST' and url == '/auth/login':
+        return _login(client, persona['client_email'], persona['password'])
+    return client.open(url, method=method)
+
+def measure_endpoint(app, counter, persona, name, method, url, user, expected_status, iterations, warmup):
+    """Замеры одной страницы"""
+    url = url.format(**persona)
+    client = app.test_client()
+    if user == 'client':
+        _login(client, persona['client_email'], persona['password'])
+    elif user == 'trainer':
+        _login(client, persona['trainer_email'], persona['password'])
+    
+    def call():
+        # Вход проверяется каждый раз новым клиентом (иначе "уже вошли")
+        target = app.test_client() if user is None else client
+        return _request(target, method, url, persona)
+    
+    errors = 0
+    for _ in range(warmup):
+        call()
+    
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        response = call()
+        latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code != expected_status:
+            errors += 1
+    
+    # Отдельный прогон для запросов и памяти: tracemalloc замедляет работу
+    counter.count = 0
+    tracemalloc.start()
+    response = call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    return {
+        'method': method,
+        'url': url,
+        'status': response.status_code,
+        'errors': errors,
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'mean_ms': round(sum(latencies) / len(latencies), 2),
+        'min_ms': round(min(latencies), 2),
+        'max_ms': round(max(latencies), 2),
+        'queries': counter.count,
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(args):
+    from app import db
+    from app.utils.datagen import SCALES, generate
+    
+    volumes = dict(SCALES[args.scale])
+    for name in volumes:
+        value = getattr(args, name, None)
+        if value is not None:
+            volumes[name] = value
+    
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix='fitness-bench-'), 'bench.db')
+    persona_path = f'{db_path}.seed.json'
+    reuse = args.reuse_db and os.path.exists(db_path) and os.path.exists(persona_path)
+    if not reuse and os.path.exists(db_path):
+        os.remove(db_path)
+    
+    app = make_app(f'sqlite:///{os.path.abspath(db_path)}')
+    with app.app_context():
+        if reuse:
+            with open(persona_path, encoding='utf-8') as f:
+                persona = json.load(f)
+            print(f'База {db_path} используется повторно')
+        else:
+            db.create_all()
+            started = time.perf_counter()
+            counts = generate(seed=args.seed, **volumes)
+            persona = dict(counts.pop('personas'), counts=counts, volumes=volumes)
+            with open(persona_path, 'w', encoding='utf-8') as f:
+                json.dump(persona, f, ensure_ascii=False, indent=2)
+            print(f'Данные подготовлены за {time.perf_counter() - started:.1f} с: '
+                  + ', '.join(f'{table}={rows}' for table, rows in counts.items()))
+        
+        counter = QueryCounter(db.engine)
+    
+    # Запросы выполняются вне контекста приложения: у каждого свой g и своя сессия
+    selected = [endpoint for endpoint in ENDPOINTS if not args.only or endpoint[0] in args.only]
+    results = {}
+    print(f"\n{'страница':24} {'p50':>8} {'p95':>8} {'SQL':>5} {'память':>10}")
+    for name, method, url, user, expected_status in selected:
+        result = measure_endpoint(app, counter, persona, name, method, url, user, expected_status,
+                                  args.iterations, args.warmup)
+        results[name] = result
+        flag = '' if not result['errors'] else f"  ✗ код {result['status']}"
+        print(f"{name:24} {result['p50_ms']:7.1f}ms {result['p95_ms']:7.1f}ms {result['queries']:5d} "
+              f"{result['peak_memory_kb']:8.0f}KB{flag}")
+    
+    report = {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+            'revision': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'scale': args.scale,
+            'volumes': persona.get('volumes', volumes),
+            'seed': args.seed,
+            'iterations': args.iterations,
+        },
+        'results': results,
+    }
+    
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'\nРезультаты: {args.output}')
+    
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        return report_regressions(json.load(f), report)
+
+def find_regressions(baseline, current):
+    """
+    Сравнение двух прогонов
+    
+    Returns:
+        list: (страница, описание) для каждой регрессии
+    """
+    regressions = []
+    for name, new in current['results'].items():
+        old = baseline['results'].get(name)
+        if old is None:
+            continue
+        
+        for metric in ('p50_ms', 'p95_ms'):
+            delta = new[metric] - old[metric]
+            if delta > LATENCY_MIN_DELTA_MS and delta > old[metric] * LATENCY_THRESHOLD:
+                regressions.append((name, f'{metric}: {old[metric]:.1f} → {new[metric]:.1f} мс (+{delta / old[metric]:.0%})'))
+        
+        if new['queries'] > old['queries']:
+            regressions.append((name, f"SQL-запросов: {old['queries']} → {new['queries']}"))
+        
+        if new['peak_memory_kb'] > old['peak_memory_kb'] * (1 + MEMORY_THRESHOLD):
+            regressions.append((name, f"память: {old['peak_memory_kb']:.0f} → {new['peak_memory_kb']:.0f} KB"))
+        
+        if new['errors'] and not old['errors']:
+            regressions.append((name, f"ошибки: {new['errors']} из {new['iterations']} (код {new['status']})"))
+    
+    return regressions
+
+def report_regressions(baseline, current):
+    if baseline['meta'].get('volumes') != current['meta'].get('volumes'):
+        print('\n! Объемы данных в прогонах различаются, сравнение может быть некорректным')
+    
+    print(f"\n{'страница':24} {'p95 было':>10} {'p95 стало':>10} {'SQL':>9}")
+    for name, new in current['results'].items():
+        old = baseline['results'].get(name)
+        if old:
+            print(f"{name:24} {old['p95_ms']:9.1f}ms {new['p95_ms']:9.1f}ms {old['queries']:4d}→{new['queries']:<4d}")
+    
+    regressions = find_regressions(baseline, current)
+    if not regressions:
+        print('\n✓ Регрессий нет')
+        return 0
+    
+    print()
+    for name, description in regressions:
+        print(f'✗ {name}: {description}')
+    return 1
+
+def compare(args):
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+    return report_regressions(baseline, current)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Бенчмарк страниц платформы')
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    run_parser = commands.add_parser('run', help='Подготовить данные и замерить страницы')
+    run_parser.add_argument('--scale', choices=('small', 'medium', 'large', 'production'), default='small')
+    run_parser.add_argument('--clients', type=int)
+    run_parser.add_argument('--trainers', type=int)
+    run_parser.add_argument('--trainings', type=int)
+    run_parser.add_argument('--registrations-per-training', dest='registrations_per_training', type=int)
+    run_parser.add_argument('--progress-years', dest='progress_years', type=int)
+    run_parser.add_argument('--progress-per-week', dest='progress_per_week', type=float)
+    run_parser.add_argument('--metrics-per-progress', dest='metrics_per_progress', type=int)
+    run_parser.add_argument('--feedback-ratio', dest='feedback_ratio', type=float)
+    run_parser.add_argument('--notifications-per-user', dest='notifications_per_user', type=int)
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--iterations', type=int, default=30)
+    run_parser.add_argument('--warmup', type=int, default=3)
+    run_parser.add_argument('--only', nargs='*', help='Только указанные страницы')
+    run_parser.add_argument('--db', help='Файл SQLite (по умолчанию временный)')
+    run_parser.add_argument('--reuse-db', action='store_true', help='Не наполнять заново существующую базу --db')
+    run_parser.add_argument('--output', help='Файл JSON с результатами')
+    run_parser.add_argument('--baseline', help='Сравнить с результатами прошлого прогона')
+    
+    compare_parser = commands.add_parser('compare', help='Сравнить два прогона')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    
+    args = parser.parse_args(argv)
+    return run(args) if args.command == 'run' else compare(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,634 @@
+"""
+Советник по индексам на основе планов запросов
+
+Прогоняет страницы бенчмарка (benchmarks.endpoints) и дополнительные
+сценарии, собирает уникальные SQL-запросы (отпечаток — текст запроса
+SQLAlchemy с параметрами-заполнителями), выполняет для каждого
+EXPLAIN QUERY PLAN (SQLite) или EXPLAIN (PostgreSQL) и отмечает полные
+просмотры таблиц, частичное использование индекса (индекс покрывает не все
+условия на равенство, остальное фильтруется построчно) и сортировки во
+временном B-дереве.
+
+Индекс предлагается по структуре запроса: сначала столбцы сравнений на
+равенство, затем столбцы ORDER BY (или первый столбец диапазона).
+Сравнение с литералом (is_read IS 0, deleted_at IS NULL) превращается в
+условие частичного индекса — планировщик SQLite использует частичный
+индекс, только если условие в запросе совпадает с ним буквально.
+Предложения, уже покрытые существующими индексами, отбрасываются.
+    
+    python -m benchmarks.indexes --scale medium --db /tmp/bench.db --reuse-db
+    python -m benchmarks.indexes --verify                     # создать индексы во временной базе и перепроверить планы
+    python -m benchmarks.indexes --write-migration            # ревизия Alembic в migrations/ поверх последней
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.endpoints import ENDPOINTS, make_app, _login, _request
+
+# Сценарии сверх страниц бенчмарка: цели, уведомления, календарь, фильтры каталога, лучшие тренеры
+WORKLOAD = ENDPOINTS + (
+    ('progress.goals', 'GET', '/progress/goals', 'client', 200),
+    ('progress.achievements', 'GET', '/progress/achievements', 'client', 200),
+    ('trainings.calendar_api', 'GET', '/trainings/api/calendar', 'client', 200),
+    ('api.notifications', 'GET', '/api/notifications', 'client', 200),
+    ('api.notifications_unread', 'GET', '/api/notifications?unread=1', 'client', 200),
+    ('trainings.list_tag', 'GET', '/trainings/?tag=утро', 'client', 200),
+    ('trainings.list_no_equipment', 'GET', '/trainings/?no_equipment=1', 'client', 200),
+    ('trainings.top_trainers', 'GET', '/trainings/trainers/top', 'client', 200),
+    ('trainings.top_trainers_category', 'GET', '/trainings/trainers/top?category=1', 'client', 200),
+)
+
+# Таблицы меньше этого числа строк не анализируются: полный просмотр дешевле индекса
+MIN_TABLE_ROWS = 1000
+
+_SPACES_RE = re.compile(r'\s+')
+_PLACEHOLDER_LIST_RE = re.compile(r'\((?:\?|%\(\w+\)s|%s)(?:,\s*(?:\?|%\(\w+\)s|%s))+\)')
+_SQLITE_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?(?: USING (?:COVERING )?INDEX \w+)?$')
+_SQLITE_SEARCH_RE = re.compile(r'^SEARCH (?:TABLE )?(\w+)(?: AS (\w+))? USING (?:(?:COVERING )?INDEX (\w+)|.*?) \((.*)\)$')
+_CONSTRAINT_COLUMN_RE = re.compile(r'(\w+)\s*(?:=|<|>|\bIN\b)')
+
+def fingerprint(sql):
+    """Отпечаток запроса: пробелы схлопнуты, списки IN (?, ?, ...) сведены к (?)"""
+    return _PLACEHOLDER_LIST_RE.sub('(?)', _SPACES_RE.sub(' ', sql).strip())
+
+class StatementCollector:
+    """Уникальные SELECT движка: первый экземпляр параметров и выражение SQLAlchemy"""
+    
+    def __init__(self, engine):
+        from sqlalchemy import event
+        
+        self.statements = OrderedDict()
+        self.endpoint = None
+        self._engine = engine
+        event.listen(engine, 'after_cursor_execute', self._on_execute)
+    
+    def stop(self):
+        from sqlalchemy import event
+        
+        event.remove(self._engine, 'after_cursor_execute', self._on_execute)
+    
+    def _on_execute(self, connection, cursor, statement, parameters, context, executemany):
+        if executemany or not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            return
+        key = fingerprint(statement)
+        entry = self.statements.get(key)
+        if entry is None:
+            compiled = getattr(context, 'compiled', None)
+            entry = self.statements[key] = {
+                'sql': statement,
+                'parameters': parameters,
+                'clause': getattr(compiled, 'statement', None),
+                'count': 0,
+                'endpoints': [],
+            }
+        entry['count'] += 1
+        if self.endpoint and self.endpoint not in entry['endpoints']:
+            entry['endpoints'].append(self.endpoint)
+
+def explain(connection, sql, parameters):
+    """
+    План запроса
+    
+    Returns:
+        tuple: (строки плана, полные просмотры [таблица или псевдоним],
+            поиски по индексу [(таблица или псевдоним, столбцы условия индекса, имя индекса)],
+            есть ли временная сортировка)
+    """
+    if connection.dialect.name == 'sqlite':
+        rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}', parameters).fetchall()
+        details = [row[-1] for row in rows]
+        scans, searches = [], []
+        for detail in details:
+            match = _SQLITE_SCAN_RE.match(detail)
+            if match:
+                scans.append(match.group(2) or match.group(1))
+                continue
+            match = _SQLITE_SEARCH_RE.match(detail)
+            if match:
+                searches.append((match.group(2) or match.group(1), _CONSTRAINT_COLUMN_RE.findall(match.group(4)),
+                                 match.group(3)))
+        temp_sort = any('USE TEMP B-TREE' in detail for detail in details)
+        return details, scans, searches, temp_sort
+    
+    if connection.dialect.name == 'postgresql':
+        plan = connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {sql}', parameters).scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        details, scans, searches, sorts = [], [], [], []
+        
+        def walk(node, depth=0):
+            details.append('  ' * depth + node['Node Type'] + (f" on {node['Relation Name']}" if 'Relation Name' in node else ''))
+            if node['Node Type'] == 'Seq Scan':
+                scans.append(node.get('Alias') or node['Relation Name'])
+            elif 'Index Cond' in node and 'Relation Name' in node:
+                searches.append((node.get('Alias') or node['Relation Name'],
+                                 _CONSTRAINT_COLUMN_RE.findall(node['Index Cond']), node.get('Index Name')))
+            if node['Node Type'] in ('Sort', 'Incremental Sort'):
+                sorts.append(node)
+            for child in node.get('Plans', []):
+                walk(child, depth + 1)
+        
+        walk(plan[0]['Plan'])
+        return details, scans, searches, bool(sorts)
+    
+    raise ValueError(f'EXPLAIN для {connection.dialect.name} не поддерживается')
+
+def _base_table(selectable):
+    """Таблица за псевдонимом"""
+    while selectable is not None and not hasattr(selectable, 'indexes'):
+        selectable = getattr(selectable, 'element', None)
+    return selectable
+
+def _column(expression):
+    from sqlalchemy.sql.elements import ColumnClause, UnaryExpression, Label
+    
+    while isinstance(expression, (UnaryExpression, Label)):
+        expression = expression.element
+    if isinstance(expression, ColumnClause) and expression.table is not None:
+        table = _base_table(expression.table)
+        if table is not None and expression.name in table.c:
+            return table, expression.name, expression.table
+    return None
+
+def _scoped_comparisons(clause):
+    """
+    Сравнения запроса с таблицами FROM ближайшего SELECT, в котором они стоят
+    
+    Столбец внешнего запроса в коррелированном подзапросе (EXISTS ... WHERE
+    training_tags.training_id = trainings.id) — значение текущей строки
+    внешней таблицы, а не условие на нее.
+    
+    Returns:
+        list: [(BinaryExpression, множество имен таблиц и псевдонимов этого SELECT)]
+    """
+    from sqlalchemy.sql import Select
+    from sqlalchemy.sql.elements import BinaryExpression
+    from sqlalchemy.sql.util import find_tables
+    
+    found = []
+    seen = set()
+    
+    def walk(element, local, enclosing):
+        if id(element) in seen:
+            return
+        seen.add(id(element))
+        if isinstance(element, Select):
+            # Таблицы, которые есть и во внешнем SELECT, подзапрос коррелирует (как при компиляции)
+            enclosing = enclosing | local
+            local = {table.name for source in element.get_final_froms()
+                     for table in find_tables(source, include_aliases=True)} - enclosing
+        elif isinstance(element, BinaryExpression):
+            found.append((element, local))
+        for child in element.get_children():
+            walk(child, local, enclosing)
+    
+    walk(clause, set(), set())
+    return found
+
+def analyze_clause(clause):
+    """
+    Предикаты запроса по таблицам
+    
+    Столбцы внешних таблиц в коррелированных подзапросах не считаются
+    условиями на равенство для внешней таблицы.
+    
+    Returns:
+        dict: таблица -> {'eq': [...], 'join': [...], 'range': [...], 'order': [...],
+            'literal': [(столбец, SQL условия)]} и 'aliases': псевдоним -> таблица
+    """
+    from sqlalchemy.sql import operators, visitors
+    from sqlalchemy.sql.elements import BinaryExpression, BindParameter, BooleanClauseList, Null, True_, False_
+    from sqlalchemy.sql.util import find_tables
+    
+    equality = {operators.eq, operators.in_op, operators.is_}
+    ranges = {operators.lt, operators.le, operators.gt, operators.ge, operators.between_op}
+    tables = {}
+    aliases = {}
+    
+    def slot(table):
+        return tables.setdefault(table.name, {'table': table, 'eq': [], 'join': [], 'range': [], 'order': [], 'literal': []})
+    
+    def add(bucket, name):
+        if name not in bucket:
+            bucket.append(name)
+    
+    for selectable in find_tables(clause, include_aliases=True):
+        table = _base_table(selectable)
+        if table is not None:
+            aliases[selectable.name] = table.name
+    
+    # Условия внутри OR не сужают выборку по отдельности — индекс по ним не строим
+    disjunctive = set()
+    for element in visitors.iterate(clause):
+        if isinstance(element, BooleanClauseList) and element.operator is operators.or_:
+            disjunctive.update(id(inner) for inner in visitors.iterate(element))
+    
+    for element, local in _scoped_comparisons(clause):
+        if id(element) not in disjunctive:
+            left, right = _column(element.left), _column(element.right)
+            value = element.right
+            if left is None and right is not None:
+                left, right, value = right, left, element.left
+            if left is None:
+                continue
+            correlated = False
+            if right is not None:
+                # Коррелированный подзапрос: внешний столбец — значение текущей строки, условие только на подзапрос
+                inner = [column for column in (left, right) if column[2].name in local]
+                if len(inner) == 1:
+                    left, right, correlated = inner[0], None, True
+            table, name, _ = left
+            if correlated:
+                if element.operator in equality:
+                    for bucket in ('eq', 'join'):
+                        add(slot(table)[bucket], name)
+            elif right is not None and element.operator in equality:
+                # Условие соединения: столбцы обеих таблиц — равенства
+                for bucket in ('eq', 'join'):
+                    add(slot(table)[bucket], name)
+                    add(slot(right[0])[bucket], right[1])
+            elif element.operator in (operators.is_, operators.eq) and isinstance(value, (Null, True_, False_)):
+                literal = {Null: 'NULL', True_: '1', False_: '0'}[type(value)]
+                operator = 'IS' if element.operator is operators.is_ else '='
+                condition = (name, f'{name} {operator} {literal}')
+                if condition not in slot(table)['literal']:
+                    slot(table)['literal'].append(condition)
+            elif element.operator in equality and isinstance(value, BindParameter):
+                add(slot(table)['eq'], name)
+            elif element.operator in ranges:
+                add(slot(table)['range'], name)
+    
+    for expression in getattr(clause, '_order_by_clauses', ()):
+        column = _column(expression)
+        if column is not None:
+            add(slot(column[0])['order'], column[1])
+    
+    return tables, aliases
+
+def propose(predicates, leading=(), joins=True):
+    """
+    Индекс для таблицы по ее предикатам
+    
+    Args:
+        leading: столбцы, которые уже использует индекс из плана, — идут первыми
+        joins: учитывать столбцы условий соединения (нужны таблице во внутреннем цикле)
+    
+    Returns:
+        dict или None: {'table', 'columns', 'where'}
+    """
+    literal_columns = {name for name, _ in predicates['literal']}
+    equal = [name for name in predicates['eq']
+             if name not in literal_columns and (joins or name not in predicates['join'])]
+    columns = [name for name in leading if name in equal] + [name for name in equal if name not in leading]
+    order = [name for name in predicates['order'] if name not in columns]
+    if order:
+        columns += order
+    elif predicates['range']:
+        columns += [name for name in predicates['range'] if name not in columns][:1]
+    if not columns:
+        return None
+    
+    where = ' AND '.join(condition for _, condition in predicates['literal']) or None
+    return {'table': predicates['table'].name, 'columns': columns, 'where': where}
+
+def unindexed_filters(predicates, used, index=None):
+    """
+    Условия запроса, которые индекс из плана не покрывает и которые проверяются построчно
+    
+    Поиск по первичному ключу возвращает одну строку — для него ничего не нужно.
+    Литеральные условия, входящие в условие частичного индекса, покрыты им.
+    """
+    table = predicates['table']
+    primary_key = [column.name for column in table.primary_key.columns]
+    if 'rowid' in used or (primary_key and set(primary_key) <= set(used)):
+        return []
+    index_where = ''
+    for candidate in table.indexes:
+        if candidate.name == index and candidate.dialect_kwargs.get('sqlite_where') is not None:
+            index_where = str(candidate.dialect_kwargs['sqlite_where'])
+    filters = [name for name in predicates['eq'] if name not in predicates['join']]
+    filters += [name for name, condition in predicates['literal'] if condition not in index_where]
+    filters += predicates['range'][:1]
+    return [name for name in filters if name not in used]
+
+def _existing_prefixes(table):
+    """Наборы ведущих столбцов существующих индексов (с условием частичного индекса)"""
+    existing = [([column.name for column in table.primary_key.columns], None)]
+    for index in table.indexes:
+        where = index.dialect_kwargs.get('sqlite_where')
+        existing.append(([column.name for column in index.columns], str(where) if where is not None else None))
+    for constraint in table.constraints:
+        if constraint.__class__.__name__ == 'UniqueConstraint':
+            existing.append(([column.name for column in constraint.columns], None))
+    return existing
+
+def is_covered(proposal, table):
+    for columns, where in _existing_prefixes(table):
+        if where not in (None, proposal['where']):
+            continue
+        if columns[:len(proposal['columns'])] == proposal['columns']:
+            return True
+    return False
+
+def index_name(proposal):
+    name = f"ix_{proposal['table']}_{'_'.join(proposal['columns'])}"
+    if proposal['where']:
+        name += '_' + re.sub(r'\W+', '_', proposal['where'].lower()).strip('_')
+    return name[:63]
+
+def merge(proposals):
+    """Без дублей и индексов, которые являются префиксом другого предложения с тем же условием"""
+    unique = OrderedDict()
+    for proposal in proposals:
+        key = (proposal['table'], tuple(proposal['columns']), proposal['where'])
+        if key in unique:
+            unique[key]['statements'] += proposal['statements']
+        else:
+            unique[key] = dict(proposal)
+    
+    merged = []
+    for key, proposal in unique.items():
+        wider = [other for other_key, other in unique.items()
+                 if other_key != key and other_key[0] == key[0] and other_key[2] == key[2]
+                 and other_key[1][:len(key[1])] == key[1]]
+        if wider:
+            wider[0]['statements'] += proposal['statements']
+            continue
+        merged.append(proposal)
+    for proposal in merged:
+        proposal['name'] = index_name(proposal)
+    return merged
+
+def _partial(predicates, aliases, searches, accept):
+    """Таблицы с частичным использованием индекса: таблица -> столбцы условия индекса"""
+    partial = {}
+    for alias, used, index in searches:
+        table_name = aliases.get(alias, alias)
+        if table_name in predicates and accept(table_name) and unindexed_filters(predicates[table_name], used, index):
+            partial[table_name] = used
+    return partial
+
+def timing(connection, sql, parameters, repeat=3):
+    """Лучшее время выполнения запроса, мс"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        connection.exec_driver_sql(sql, parameters).fetchall()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 2)
+
+def analyze(db, collector, min_rows=MIN_TABLE_ROWS):
+    """
+    Планы всех собранных запросов и предложения индексов
+    
+    Returns:
+        tuple: (находки по запросам — самые дорогие первыми, предложения индексов)
+    """
+    metadata_tables = db.metadata.tables
+    findings = []
+    proposals = []
+    with db.engine.connect() as connection:
+        row_counts = {}
+        
+        def large(table_name):
+            if table_name not in metadata_tables:
+                return False
+            if table_name not in row_counts:
+                row_counts[table_name] = connection.exec_driver_sql(
+                    f'SELECT count(*) FROM "{table_name}"').scalar()
+            return row_counts[table_name] >= min_rows
+        
+        for key, entry in collector.statements.items():
+            if entry['clause'] is None:
+                continue
+            plan, scans, searches, temp_sort = explain(connection, entry['sql'], entry['parameters'])
+            predicates, aliases = analyze_clause(entry['clause'])
+            scanned = {name for name in (aliases.get(alias, alias) for alias in scans) if large(name)}
+            partial = _partial(predicates, aliases, searches, large)
+            
+            # Сортировку во временном B-дереве относим к таблицам из ORDER BY
+            sorted_tables = {name for name, data in predicates.items() if data['order'] and large(name)} if temp_sort else set()
+            if not scanned and not partial and not sorted_tables:
+                continue
+            
+            finding = {
+                'sql': key,
+                'count': entry['count'],
+                'endpoints': entry['endpoints'],
+                'full_scans': sorted(scanned),
+                'partial': sorted(partial),
+                'temp_sort': bool(sorted_tables),
+                'elapsed_ms': timing(connection, entry['sql'], entry['parameters']),
+                'plan': plan,
+                'proposals': [],
+            }
+            for table_name in sorted(scanned | set(partial) | sorted_tables):
+                if table_name not in predicates:
+                    continue
+                if table_name in partial:
+                    proposal = propose(predicates[table_name], leading=partial[table_name], joins=False)
+                else:
+                    proposal = propose(predicates[table_name])
+                if proposal is None or is_covered(proposal, metadata_tables[table_name]):
+                    continue
+                proposal['statements'] = [key]
+                proposals.append(proposal)
+                finding['proposals'].append(index_name(proposal))
+            findings.append(finding)
+    
+    findings.sort(key=lambda finding: finding['elapsed_ms'] * finding['count'], reverse=True)
+    return findings, merge(proposals)
+
+def create_indexes(db, proposals):
+    """Создание предложенных индексов (для --verify)"""
+    with db.engine.begin() as connection:
+        for proposal in proposals:
+            columns = ', '.join(f'"{name}"' for name in proposal['columns'])
+            where = f" WHERE {proposal['where']}" if proposal['where'] else ''
+            connection.exec_driver_sql(
+                f'CREATE INDEX IF NOT EXISTS "{proposal["name"]}" ON "{proposal["table"]}" ({columns}){where}')
+        if connection.dialect.name == 'sqlite':
+            connection.exec_driver_sql('ANALYZE')
+
+def verify(db, collector, findings):
+    """Перепроверка планов запросов с находками после создания индексов"""
+    resolved = 0
+    with db.engine.connect() as connection:
+        for finding in findings:
+            entry = collector.statements[finding['sql']]
+            plan, scans, searches, temp_sort = explain(connection, entry['sql'], entry['parameters'])
+            predicates, aliases = analyze_clause(entry['clause'])
+            still_scanned = {aliases.get(name, name) for name in scans} & set(finding['full_scans'])
+            still_partial = set(_partial(predicates, aliases, searches, lambda name: True)) & set(finding['partial'])
+            finding['after'] = {
+                'plan': plan,
+                'full_scans': sorted(still_scanned),
+                'partial': sorted(still_partial),
+                'temp_sort': temp_sort and finding['temp_sort'],
+                'elapsed_ms': timing(connection, entry['sql'], entry['parameters']),
+            }
+            if not still_scanned and not still_partial and not finding['after']['temp_sort']:
+                resolved += 1
+    return resolved
+
+MIGRATION_BODY = '''
+
+def upgrade():
+{upgrade}
+
+
+def downgrade():
+{downgrade}
+'''
+
+def _postgresql_where(where):
+    """Условие частичного индекса для PostgreSQL: булевы литералы вместо 0/1 SQLite"""
+    return re.sub(r'\b(IS|=) ([01])\b', lambda match: f"{match.group(1)} {'true' if match.group(2) == '1' else 'false'}", where)
+
+def render_operations(proposals):
+    upgrade, downgrade = [], []
+    for proposal in proposals:
+        arguments = f"'{proposal['name']}', '{proposal['table']}', {proposal['columns']!r}, unique=False"
+        if proposal['where']:
+            where = proposal['where']
+            arguments += f", sqlite_where=sa.text({where!r}), postgresql_where=sa.text({_postgresql_where(where)!r})"
+        upgrade.append(f'    op.create_index({arguments})')
+        downgrade.append(f"    op.drop_index('{proposal['name']}', table_name='{proposal['table']}')")
+    return '\n'.join(upgrade) or '    pass', '\n'.join(reversed(downgrade)) or '    pass'
+
+def write_migration(app, proposals, directory=None, message='index advisor', rev_id=None):
+    """
+    Ревизия Alembic через настройки Flask-Migrate (поверх текущей последней ревизии)
+    
+    Args:
+        rev_id: идентификатор ревизии (по умолчанию случайный)
+    
+    Returns:
+        str: путь к файлу ревизии
+    """
+    from alembic import command
+    from app import init_migrations
+    
+    init_migrations(app)
+    migrate_state = app.extensions['migrate']
+    config = migrate_state.migrate.get_config(directory or migrate_state.directory)
+    if not os.path.isdir(config.get_main_option('script_location')):
+        raise FileNotFoundError(f"Нет каталога миграций {config.get_main_option('script_location')}: "
+                                f'выполните flask db init')
+    
+    script = command.revision(config, message=message, rev_id=rev_id)
+    with open(script.path, encoding='utf-8') as f:
+        source = f.read()
+    
+    upgrade, downgrade = render_operations(proposals)
+    source = re.sub(r'\ndef upgrade\(\):.*', '', source, flags=re.DOTALL).rstrip() + '\n'
+    source += MIGRATION_BODY.format(upgrade=upgrade, downgrade=downgrade)
+    with open(script.path, 'w', encoding='utf-8') as f:
+        f.write(source)
+    return script.path
+
+def run(args):
+    from app import db
+    from app.utils.datagen import SCALES, generate
+    
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix='fitness-indexes-'), 'bench.db')
+    persona_path = f'{db_path}.seed.json'
+    reuse = args.reuse_db and os.path.exists(db_path) and os.path.exists(persona_path)
+    if not reuse and os.path.exists(db_path):
+        os.remove(db_path)
+    
+    app = make_app(f'sqlite:///{os.path.abspath(db_path)}' if not args.database_url else args.database_url)
+    with app.app_context():
+        if reuse:
+            with open(persona_path, encoding='utf-8') as f:
+                persona = json.load(f)
+        else:
+            db.create_all()
+            counts = generate(seed=args.seed, **SCALES[args.scale])
+            persona = counts.pop('personas')
+            with open(persona_path, 'w', encoding='utf-8') as f:
+                json.dump(dict(persona, counts=counts, volumes=SCALES[args.scale]), f, ensure_ascii=False, indent=2)
+        collector = StatementCollector(db.engine)
+    
+    # Нагрузка: каждая страница по разу от имени своего пользователя
+    for name, method, url, user, _ in WORKLOAD:
+        client = app.test_client()
+        if user == 'client':
+            _login(client, persona['client_email'], persona['password'])
+        elif user == 'trainer':
+            _login(client, persona['trainer_email'], persona['password'])
+        collector.endpoint = name
+        _request(client, method, url.format(**persona), persona)
+    collector.stop()
+    
+    with app.app_context():
+        findings, proposals = analyze(db, collector, args.min_rows)
+        
+        print(f'Запросов: {len(collector.statements)}, с находками: {len(findings)}\n')
+        for finding in findings:
+            problems = [f"SCAN {', '.join(finding['full_scans'])}"] if finding['full_scans'] else []
+            if finding['partial']:
+                problems.append(f"PARTIAL INDEX {', '.join(finding['partial'])}")
+            if finding['temp_sort']:
+                problems.append('TEMP B-TREE')
+            print(f"✗ {' + '.join(problems)} ×{finding['count']}, {finding['elapsed_ms']} мс"
+                  f" ({', '.join(finding['endpoints'])})")
+            print(f"  {finding['sql'][:240]}")
+        
+        print('\nПредлагаемые индексы:')
+        for proposal in proposals:
+            where = f" WHERE {proposal['where']}" if proposal['where'] else ''
+            print(f"  {proposal['name']}: {proposal['table']}({', '.join(proposal['columns'])}){where}"
+                  f" — запросов: {len(proposal['statements'])}")
+        if not proposals:
+            print('  нет')
+        
+        if args.verify and proposals:
+            create_indexes(db, proposals)
+            resolved = verify(db, collector, findings)
+            before = sum(finding['elapsed_ms'] * finding['count'] for finding in findings)
+            after = sum(finding['after']['elapsed_ms'] * finding['count'] for finding in findings)
+            print(f'\nПосле создания индексов устранено находок: {resolved} из {len(findings)},'
+                  f' время запросов с находками: {before:.1f} → {after:.1f} мс')
+        
+        if args.output:
+            os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump({'findings': findings, 'proposals': proposals}, f, ensure_ascii=False, indent=2, default=str)
+        
+        if args.write_migration and proposals:
+            path = write_migration(app, proposals, args.migrations_dir, rev_id=args.rev_id)
+            print(f'\nМиграция: {path}')
+    
+    return 1 if proposals and args.strict else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Советник по индексам на основе планов запросов')
+    parser.add_argument('--scale', choices=('small', 'medium', 'large', 'production'), default='small')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db', help='Файл SQLite (по умолчанию временный)')
+    parser.add_argument('--reuse-db', action='store_true', help='Не наполнять заново существующую базу --db')
+    parser.add_argument('--database-url', help='Готовая база (вместо --db), например PostgreSQL')
+    parser.add_argument('--min-rows', type=int, default=MIN_TABLE_ROWS,
+                        help='Не анализировать таблицы меньше этого числа строк')
+    parser.add_argument('--verify', action='store_true', help='Создать индексы в базе бенчмарка и перепроверить планы')
+    parser.add_argument('--write-migration', action='store_true', help='Записать ревизию Alembic')
+    parser.add_argument('--migrations-dir', help='Каталог миграций (по умолчанию migrations)')
+    parser.add_argument('--rev-id', help='Идентификатор ревизии (по умолчанию случайный)')
+    parser.add_argument('--output', help='Файл JSON с находками и предложениями')
+    parser.add_argument('--strict', action='store_true', help='Код выхода 1, если есть предложения')
+    args = parser.parse_args(argv)
+    return run(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,499 @@
+"""
+Нагрузочный прогон критичных сценариев с проверкой инвариантов
+
+Сценарии (--scenario) — пути пользователя, которые выполняются одновременно
+в пуле потоков или процессов:
+- rush: вход → список → карточка → запись; N клиентов борются за M мест,
+  запись открывается для всех одновременно (как в момент публикации);
+- churn: вход → запись (и повтор той же отправки с ключом идемпотентности)
+  → отмена → повторная запись;
+- waitlist: вход → запись (сверх мест — в лист ожидания) → отмена; отмены
+  записанных продвигают очередь одновременно с выходом ждущих из нее;
+- progress: вход → добавление записи прогресса (с одной датой и видом
+  активности — проверка защиты от дублей).
+
+Цель (--target): wsgi — приложение в этом же процессе (тестовый клиент),
+server — локальный многопоточный HTTP-сервер werkzeug, url — уже запущенный
+сервер (тогда --database-url должен указывать на его базу). --sessions-per-user 2
+имитирует двойное нажатие: один аккаунт в двух параллельных сессиях.
+
+После прогона проверяются инварианты: нет переполнения мест, счетчик
+registrations_count совпадает с фактическими записями, лист ожидания
+согласован (счетчик и номера подряд от головы), нет дублей регистраций и
+записей прогресса. Код выхода 1 — если инвариант нарушен.
+    
+    python -m benchmarks.load --scenario rush --users 500 --seats 10 --concurrency 50
+    python -m benchmarks.load --scenario churn --users 100 --pool process --concurrency 8
+    python -m benchmarks.load --target server --scenario progress --sessions-per-user 2
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import datetime, date, timedelta
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from benchmarks.endpoints import make_app, percentile
+
+PASSWORD = 'load-password'
+EMAIL_DOMAIN = 'loadtest.fitnessplatform.com'
+# Границы гистограммы задержек, мс
+HISTOGRAM_BOUNDS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_CSRF_RE = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+
+# Исключения на стороне приложения (got_request_exception): ответ 500 их
+# не различает, а "database is locked" важно отделить от прочих ошибок
+_server_errors = Counter()
+_server_errors_lock = threading.Lock()
+
+def _on_request_exception(sender, exception, **extra):
+    kind = 'lock_timeout' if 'database is locked' in str(exception) else type(exception).__name__
+    with _server_errors_lock:
+        _server_errors[kind] += 1
+
+def _drain_server_errors():
+    with _server_errors_lock:
+        errors = dict(_server_errors)
+        _server_errors.clear()
+    return errors
+
+def build_app(database_url):
+    from flask import got_request_exception
+    
+    app = make_app(database_url)
+    got_request_exception.connect(_on_request_exception, app)
+    return app
+
+class WsgiClient:
+    """Сессия пользователя через тестовый клиент Flask"""
+    
+    def __init__(self, app):
+        self._client = app.test_client()
+    
+    def get(self, url):
+        response = self._client.get(url)
+        return response.status_code, response.get_data(as_text=True)
+    
+    def post(self, url, data):
+        response = self._client.post(url, data=data)
+        return response.status_code, response.get_data(as_text=True)
+
+class HttpClient:
+    """Сессия пользователя через HTTP"""
+    
+    def __init__(self, base_url):
+        import requests
+        
+        self._base_url = base_url.rstrip('/')
+        self._session = requests.Session()
+    
+    def get(self, url):
+        response = self._session.get(self._base_url + url, allow_redirects=False, timeout=60)
+        return response.status_code, response.text
+    
+    def post(self, url, data):
+        response = self._session.post(self._base_url + url, data=data, allow_redirects=False, timeout=60)
+        return response.status_code, response.text
+
+class Journey:
+    """Шаги одного пути пользователя: (шаг, задержка мс, код ответа или ошибка)"""
+    
+    def __init__(self, client):
+        self.client = client
+        self.steps = []
+        self._csrf_token = None
+    
+    def _call(self, step, method, url, data=None):
+        if data is not None and self._csrf_token:
+            data = dict(data, csrf_token=self._csrf_token)
+        started = time.perf_counter()
+        try:
+            status, text = self.client.get(url) if method == 'GET' else self.client.post(url, data)
+        except Exception as e:
+            self.steps.append((step, (time.perf_counter() - started) * 1000, type(e).__name__))
+            return None, ''
+        self.steps.append((step, (time.perf_counter() - started) * 1000, status))
+        
+        match = _CSRF_RE.search(text)
+        if match:
+            self._csrf_token = match.group(1)
+        return status, text
+    
+    def get(self, step, url):
+        return self._call(step, 'GET', url)
+    
+    def post(self, step, url, data):
+        return self._call(step, 'POST', url, data)
+    
+    def login(self, email):
+        # Форма входа нужна ради CSRF-токена, если защита включена на сервере
+        self.get('login_form', '/auth/login')
+        status, _ = self.post('login', '/auth/login', {'email': email, 'password': PASSWORD})
+        return status == 302
+
+def _wait_until(moment):
+    delay = moment - time.time()
+    if delay > 0:
+        time.sleep(delay)
+
+def journey_rush(journey, email, training_id, opens_at):
+    if not journey.login(email):
+        return
+    journey.get('list', '/trainings/')
+    journey.get('detail', f'/trainings/{training_id}')
+    _wait_until(opens_at)
+    journey.post('register', f'/trainings/{training_id}/register', {})
+
+def journey_churn(journey, email, training_id, opens_at):
+    if not journey.login(email):
+        return
+    journey.get('detail', f'/trainings/{training_id}')
+    _wait_until(opens_at)
+    key = uuid.uuid4().hex
+    journey.post('register', f'/trainings/{training_id}/register', {'idempotency_key': key})
+    journey.post('register_retry', f'/trainings/{training_id}/register', {'idempotency_key': key})
+    journey.post('cancel', f'/trainings/{training_id}/cancel', {})
+    journey.post('register_again', f'/trainings/{training_id}/register', {})
+
+def journey_waitlist(journey, email, training_id, opens_at):
+    if not journey.login(email):
+        return
+    journey.get('detail', f'/trainings/{training_id}')
+    _wait_until(opens_at)
+    journey.post('register', f'/trainings/{training_id}/register', {})
+    journey.post('cancel', f'/trainings/{training_id}/cancel', {})
+
+def journey_progress(journey, email, training_id, opens_at):
+    if not journey.login(email):
+        return
+    journey.get('progress_form', '/progress/add')
+    _wait_until(opens_at)
+    journey.post('add_progress', '/progress/add', {
+        'date': date.today().isoformat(), 'activity_type': 'running', 'duration': 45,
+        'calories_burned': 450, 'source': 'manual',
+    })
+
+SCENARIOS = {
+    'rush': journey_rush,
+    'churn': journey_churn,
+    'waitlist': journey_waitlist,
+    'progress': journey_progress,
+}
+
+# Приложение процесса-исполнителя (--pool process)
+_worker_app = None
+
+def _init_worker(database_url):
+    global _worker_app
+    _worker_app = build_app(database_url)
+
+def run_journey(scenario, email, training_id, opens_at, base_url=None):
+    """Один путь пользователя; выполняется в потоке или процессе пула"""
+    client = HttpClient(base_url) if base_url else WsgiClient(_worker_app)
+    journey = Journey(client)
+    started = time.perf_counter()
+    SCENARIOS[scenario](journey, email, training_id, opens_at)
+    return {
+        'steps': journey.steps,
+        'duration_ms': (time.perf_counter() - started) * 1000,
+        'server_errors': _drain_server_errors(),
+    }
+
+def prepare(db, users, seats, tag):
+    """
+    Участники прогона: тренер, тренировка через 2 дня на seats мест и
+    клиенты load<tag>_<n>. Хэш пароля облегчен (1000 итераций), чтобы
+    прогон мерил конкуренцию за базу, а не вычисление PBKDF2
+    """
+    from werkzeug.security import generate_password_hash
+    from app.models import User, UserProfile, Training
+    from app.utils.datagen import BulkWriter, _next_id
+    
+    password_hash = generate_password_hash(PASSWORD, method='pbkdf2:sha256:1000')
+    now = datetime.utcnow().replace(microsecond=0)
+    emails = []
+    
+    with db.engine.begin() as connection:
+        user_id = _next_id(connection, User.__table__)
+        writer = BulkWriter(connection, User.__table__,
+                            ('id', 'public_id', 'email', 'username', 'password_hash', 'role', 'created_at'))
+        profiles = BulkWriter(connection, UserProfile.__table__, ('user_id', 'full_name'))
+        for position in range(users + 1):
+            role = 'trainer' if position == 0 else 'client'
+            email = f'load{tag}_{position}@{EMAIL_DOMAIN}'
+            writer.add((user_id + position, f'load-{tag}-{position}', email, f'load{tag}_{position}',
+                        password_hash, role, now))
+            profiles.add((user_id + position, f'Нагрузка {position}'))
+            if role == 'client':
+                emails.append(email)
+        writer.flush()
+        profiles.flush()
+        
+        training_id = _next_id(connection, Training.__table__)
+        schedule_time = (now + timedelta(days=2)).replace(hour=10, minute=0, second=0)
+        connection.execute(Training.__table__.insert().values(
+            id=training_id, public_id=f'LOAD{tag}', title=f'Нагрузочная тренировка {tag}',
+            trainer_user_id=user_id, schedule_time=schedule_time, duration=60, training_type='group',
+            status='approved', moderation_status='approved', max_participants=seats,
+            registrations_count=0, created_at=now, published_at=now
+        ))
+    
+    return training_id, emails
+
+def check_invariants(db, training_ids, user_emails):
+    """
+    Returns:
+        list: описания нарушенных инвариантов
+    """
+    from app.models import User, Training, TrainingRegistration, Progress
+    
+    trainings = Training.__table__
+    registrations = TrainingRegistration.__table__
+    progress = Progress.__table__
+    users = User.__table__
+    violations = []
+    
+    with db.engine.connect() as connection:
+        rows = connection.execute(
+            db.select(trainings.c.id, trainings.c.max_participants, trainings.c.registrations_count,
+                      db.select(db.func.count()).where(registrations.c.training_id == trainings.c.id,
+                                                       registrations.c.status == 'registered').scalar_subquery(),
+                      db.select(db.func.count()).where(
+                          registrations.c.training_id == trainings.c.id,
+                          registrations.c.status.notin_(('cancelled', 'waitlisted'))).scalar_subquery())
+            .where(trainings.c.id.in_(training_ids))
+        ).all()
+        for training_id, capacity, counter, registered, active in rows:
+            if registered > capacity:
+                violations.append(f'тренировка {training_id}: записано {registered} при {capacity} местах')
+            if counter != active:
+                violations.append(f'тренировка {training_id}: registrations_count={counter}, '
+                                  f'активных записей {active}')
+        
+        # Лист ожидания: счетчик совпадает с очередью, номера идут подряд от головы
+        queues = connection.execute(
+            db.select(trainings.c.id, trainings.c.waitlist_offset, trainings.c.waitlist_count,
+                      db.select(db.func.count()).where(registrations.c.training_id == trainings.c.id,
+                                                       registrations.c.status == 'waitlisted').scalar_subquery(),
+                      db.select(db.func.min(registrations.c.waitlist_position))
+                      .where(registrations.c.training_id == trainings.c.id,
+                             registrations.c.status == 'waitlisted').scalar_subquery(),
+                      db.select(db.func.count(db.distinct(registrations.c.waitlist_position)))
+                      .where(registrations.c.training_id == trainings.c.id,
+                             registrations.c.status == 'waitlisted').scalar_subquery(),
+                      db.select(db.func.max(registrations.c.waitlist_position))
+                      .where(registrations.c.training_id == trainings.c.id,
+                             registrations.c.status == 'waitlisted').scalar_subquery())
+            .where(trainings.c.id.in_(training_ids))
+        ).all()
+        for training_id, offset, counter, waiting, first, distinct, last in queues:
+            if counter != waiting:
+                violations.append(f'тренировка {training_id}: waitlist_count={counter}, в очереди {waiting}')
+            elif waiting and (first != offset + 1 or last != offset + waiting or distinct != waiting):
+                violations.append(f'тренировка {training_id}: номера очереди {first}..{last} ({distinct} разных) '
+                                  f'при голове {offset + 1} и длине {waiting}')
+        
+        duplicates = connection.execute(
+            db.select(registrations.c.user_id, registrations.c.training_id, db.func.count())
+            .where(registrations.c.training_id.in_(training_ids))
+            .group_by(registrations.c.user_id, registrations.c.training_id)
+            .having(db.func.count() > 1)
+        ).all()
+        for user_id, training_id, count in duplicates:
+            violations.append(f'пользователь {user_id}: {count} записи на тренировку {training_id}')
+        
+        duplicates = connection.execute(
+            db.select(progress.c.user_id, progress.c.date, progress.c.activity_type, db.func.count())
+            .join_from(progress, users, progress.c.user_id == users.c.id)
+            .where(users.c.email.in_(user_emails))
+            .group_by(progress.c.user_id, progress.c.date, progress.c.activity_type)
+            .having(db.func.count() > 1)
+        ).all()
+        for user_id, day, activity_type, count in duplicates:
+            violations.append(f'пользователь {user_id}: {count} записи прогресса {activity_type} за {day}')
+    
+    return violations
+
+def histogram(latencies):
+    """Количество значений по корзинам HISTOGRAM_BOUNDS_MS (последняя — больше верхней границы)"""
+    buckets = Counter()
+    for value in latencies:
+        for bound in HISTOGRAM_BOUNDS_MS:
+            if value <= bound:
+                buckets[f'<={bound}ms'] += 1
+                break
+        else:
+            buckets[f'>{HISTOGRAM_BOUNDS_MS[-1]}ms'] += 1
+    labels = [f'<={bound}ms' for bound in HISTOGRAM_BOUNDS_MS] + [f'>{HISTOGRAM_BOUNDS_MS[-1]}ms']
+    return {label: buckets[label] for label in labels}
+
+def summarize(results, elapsed):
+    """Пропускная способность, задержки по шагам, коды ответов и ошибки"""
+    by_step = defaultdict(list)
+    statuses = defaultdict(Counter)
+    errors = Counter()
+    for result in results:
+        for step, latency, status in result['steps']:
+            by_step[step].append(latency)
+            statuses[step][str(status)] += 1
+            if isinstance(status, str):
+                errors['connection'] += 1
+            elif status >= 500:
+                errors['http_5xx'] += 1
+            elif step == 'login' and status != 302:
+                errors['login_failed'] += 1
+        for kind, count in result['server_errors'].items():
+            errors[f'server:{kind}'] += count
+    
+    requests_total = sum(len(latencies) for latencies in by_step.values())
+    return {
+        'elapsed_s': round(elapsed, 2),
+        'journeys': len(results),
+        'journeys_per_s': round(len(results) / elapsed, 1),
+        'requests': requests_total,
+        'requests_per_s': round(requests_total / elapsed, 1),
+        'errors': dict(errors),
+        'steps': {
+            step: {
+                'count': len(latencies),
+                'p50_ms': round(percentile(latencies, 0.50), 1),
+                'p95_ms': round(percentile(latencies, 0.95), 1),
+                'p99_ms': round(percentile(latencies, 0.99), 1),
+                'max_ms': round(max(latencies), 1),
+                'statuses': dict(statuses[step]),
+                'histogram': histogram(latencies),
+            }
+            for step, latencies in by_step.items()
+        },
+    }
+
+def _start_server(app):
+    """Многопоточный werkzeug-сервер на свободном порту в фоновом потоке"""
+    from werkzeug.serving import make_server
+    
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+def run(args):
+    from app import db
+    
+    database_url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='fitness-load-'), 'load.db')
+    tag = args.tag or datetime.utcnow().strftime('%H%M%S')
+    app = build_app(database_url)
+    with app.app_context():
+        db.create_all()
+        training_id, emails = prepare(db, args.users, args.seats, tag)
+        db.engine.dispose()
+    print(f'База: {database_url}, тренировка {training_id} на {args.seats} мест, клиентов: {len(emails)}')
+    
+    server = None
+    base_url = args.url
+    if args.target == 'server':
+        server, base_url = _start_server(app)
+    elif args.target == 'wsgi':
+        base_url = None
+        global _worker_app
+        _worker_app = app
+    
+    if args.pool == 'process' and base_url is None:
+        executor = ProcessPoolExecutor(args.concurrency, initializer=_init_worker, initargs=(database_url,))
+        # Пул поднимается заранее: создание приложения в процессах не входит в замер
+        list(executor.map(time.sleep, [0] * args.concurrency))
+    elif args.pool == 'process':
+        executor = ProcessPoolExecutor(args.concurrency)
+    else:
+        executor = ThreadPoolExecutor(args.concurrency)
+    
+    journeys = [email for email in emails for _ in range(args.sessions_per_user)]
+    opens_at = time.time() + args.open_after
+    started = time.perf_counter()
+    with executor:
+        futures = [executor.submit(run_journey, args.scenario, email, training_id, opens_at, base_url)
+                   for email in journeys]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+    if server:
+        server.shutdown()
+    
+    summary = summarize(results, elapsed)
+    with app.app_context():
+        registered = db.session.execute(
+            db.text("SELECT count(*) FROM training_registrations WHERE training_id = :id AND status = 'registered'"),
+            {'id': training_id}
+        ).scalar()
+        violations = check_invariants(db, [training_id], emails)
+    summary['registered'] = registered
+    summary['invariant_violations'] = violations
+    # Очередь записи SQLite этого процесса (пул потоков, цели wsgi и server)
+    writer_queue = app.extensions.get('sqlite_writer_queue')
+    if writer_queue is not None and args.target != 'url':
+        summary['writer_queue'] = writer_queue.stats()
+    
+    print(f"\nСценарий {args.scenario}: путей {summary['journeys']} за {summary['elapsed_s']} с "
+          f"({summary['journeys_per_s']}/с), запросов {summary['requests']} ({summary['requests_per_s']}/с)")
+    print(f'Записано на тренировку: {registered} из {args.seats} мест')
+    print(f"\n{'шаг':16} {'кол-во':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  коды ответов")
+    for step, data in summary['steps'].items():
+        codes = ', '.join(f'{code}×{count}' for code, count in sorted(data['statuses'].items()))
+        print(f"{step:16} {data['count']:7d} {data['p50_ms']:7.1f}ms {data['p95_ms']:7.1f}ms "
+              f"{data['p99_ms']:7.1f}ms {data['max_ms']:7.1f}ms  {codes}")
+    
+    for step, data in summary['steps'].items():
+        if step.startswith('register') or step in ('cancel', 'add_progress'):
+            print(f'\nГистограмма {step}:')
+            peak = max(data['histogram'].values()) or 1
+            for label, count in data['histogram'].items():
+                print(f"  {label:>9} {count:6d} {'█' * round(30 * count / peak)}")
+    
+    print('\nОшибки: ' + (', '.join(f'{kind}={count}' for kind, count in summary['errors'].items()) or 'нет'))
+    if summary.get('writer_queue'):
+        print('Очередь записи SQLite: ' + ', '.join(f'{key}={value}' for key, value in summary['writer_queue'].items()))
+    
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'summary': summary}, f, ensure_ascii=False, indent=2)
+    
+    if violations:
+        print()
+        for violation in violations:
+            print(f'✗ {violation}')
+        return 1
+    print('\n✓ Инварианты соблюдены')
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Нагрузочный прогон сценариев записи и прогресса')
+    parser.add_argument('--scenario', choices=tuple(SCENARIOS), default='rush')
+    parser.add_argument('--target', choices=('wsgi', 'server', 'url'), default='wsgi')
+    parser.add_argument('--url', help='Адрес сервера для --target url')
+    parser.add_argument('--database-url', help='База приложения (по умолчанию временная SQLite)')
+    parser.add_argument('--pool', choices=('thread', 'process'), default='thread')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--seats', type=int, default=10)
+    parser.add_argument('--sessions-per-user', type=int, default=1)
+    parser.add_argument('--open-after', type=float, default=1.0,
+                        help='Через сколько секунд после старта открывается запись')
+    parser.add_argument('--tag', help='Метка участников прогона (по умолчанию время запуска)')
+    parser.add_argument('--output', help='Файл JSON с результатами')
+    args = parser.parse_args(argv)
+    
+    if args.target == 'url' and not (args.url and args.database_url):
+        parser.error('--target url требует --url и --database-url (база сервера для подготовки и проверки)')
+    return run(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
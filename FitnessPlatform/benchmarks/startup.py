@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""
+Бенчмарк времени запуска приложения (python -X importtime)
+
+Импорт приложения и create_app выполняются в отдельных процессах несколько
+раз, берется лучший результат. Скрипт завершается с кодом 1, если время
+запуска превысило бюджет или процесс загрузил модули, которые при старте
+не нужны (обработка изображений, миграции, формы у процесса только с API).
+
+    python benchmarks/startup.py                  # веб-процесс (FLASK_CONFIG=default)
+    python benchmarks/startup.py --config api     # процесс только с JSON API
+    python benchmarks/startup.py --budget-ms 400 --runs 7 --top 20
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Бюджет импорта (сумма -X importtime верхнего уровня) и create_app, мс:
+# замеренное лучшее время HEAD (~600 мс, api ~530 мс) с запасом на шум
+BUDGETS_MS = {
+    'default': 700,
+    'testing': 700,
+    'production': 700,
+    'api': 620,
+}
+
+# Модули, которые не должны загружаться при старте
+LAZY_MODULES = ('PIL', 'magic', 'pytz', 'numpy', 'pandas', 'plotly', 'reportlab', 'celery', 'flask_mail')
+API_LAZY_MODULES = LAZY_MODULES + ('alembic', 'flask_migrate', 'wtforms', 'flask_wtf', 'email_validator',
+                                   'app.utils.assets', 'app.utils.email_queue', 'app.utils.moderation',
+                                   'app.utils.moderation_queue', 'app.utils.notification_templates')
+
+CHILD_CODE = '''
+import json, sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+from app import create_app
+from config import config
+create_app(config[{config!r}])
+print(json.dumps({{'create_app': time.perf_counter() - started, 'modules': sorted(sys.modules)}}))
+'''
+
+_IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+def parse_importtime(stderr):
+    """
+    Разбор вывода -X importtime
+    
+    Returns:
+        list: (модуль, собственное время мкс, накопленное мкс, глубина)
+    """
+    rows = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+def measure(config_name):
+    """Один запуск в чистом процессе"""
+    env = dict(os.environ)
+    env.setdefault('DATABASE_URL', 'sqlite://')
+    
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD_CODE.format(root=PROJECT_ROOT, config=config_name)],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    
+    rows = parse_importtime(result.stderr)
+    info = json.loads(result.stdout.strip().splitlines()[-1])
+    return {
+        'import_ms': sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1000,
+        'create_app_ms': info['create_app'] * 1000,
+        'rows': rows,
+        'modules': set(info['modules']),
+    }
+
+def by_package(rows):
+    """Собственное время импорта, сгруппированное по пакету верхнего уровня (мс)"""
+    totals = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        totals[name.split('.', 1)[0]] += self_us
+    return sorted(((us / 1000, package) for package, us in totals.items()), reverse=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Бенчмарк времени запуска приложения')
+    parser.add_argument('--config', default=os.environ.get('FLASK_CONFIG', 'default'))
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=None, help='Бюджет на create_app (по умолчанию из BUDGETS_MS)')
+    parser.add_argument('--top', type=int, default=15, help='Сколько самых дорогих пакетов показать')
+    args = parser.parse_args(argv)
+    
+    budget = args.budget_ms or BUDGETS_MS.get(args.config, BUDGETS_MS['default'])
+    lazy_modules = API_LAZY_MODULES if args.config == 'api' else LAZY_MODULES
+    
+    # Первый запуск прогревает кэш файловой системы и .pyc — не учитывается
+    measure(args.config)
+    runs = [measure(args.config) for _ in range(args.runs)]
+    best = min(runs, key=lambda run: run['create_app_ms'])
+    
+    print(f"Конфиг: {args.config}, запусков: {args.runs}")
+    print(f"create_app: лучший {best['create_app_ms']:.1f} мс, "
+          f"медиана {sorted(run['create_app_ms'] for run in runs)[len(runs) // 2]:.1f} мс, бюджет {budget:.0f} мс")
+    print(f"Импорт (-X importtime): {best['import_ms']:.1f} мс, модулей: {len(best['modules'])}")
+    print('\nСамые дорогие пакеты (собственное время импорта):')
+    for ms, package in by_package(best['rows'])[:args.top]:
+        print(f'  {ms:8.1f} мс  {package}')
+    
+    failures = []
+    if best['create_app_ms'] > budget:
+        failures.append(f"время запуска {best['create_app_ms']:.0f} мс превышает бюджет {budget:.0f} мс")
+    
+    loaded = sorted(name for name in lazy_modules if name in best['modules'])
+    if loaded:
+        failures.append(f"при старте загружены модули, которые должны загружаться по требованию: {', '.join(loaded)}")
+    
+    if failures:
+        print()
+        for failure in failures:
+            print(f'✗ {failure}')
+        return 1
+    
+    print('\n✓ Запуск укладывается в бюджет')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -13,6 +13,18 @@ class Config:
         'pool_pre_ping': True,
         'pool_recycle': 300,
     }
+    # SQLite: WAL и прагмы на каждом соединении, очередь транзакций записи
+    SQLITE_PROFILE_ENABLED = os.environ.get('SQLITE_PROFILE_ENABLED', 'true').lower() == 'true'
+    SQLITE_WRITER_QUEUE = os.environ.get('SQLITE_WRITER_QUEUE', 'true').lower() == 'true'
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 30000))
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 65536))
+    SQLITE_MMAP_SIZE_MB = int(os.environ.get('SQLITE_MMAP_SIZE_MB', 256))
+    SQLITE_POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE', 10))
+    # Реплики для чтения (через запятую) и окно чтения своих записей с основной базы
+    SQLALCHEMY_REPLICA_URIS = [uri for uri in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if uri]
+    REPLICA_STICKINESS_SECONDS = int(os.environ.get('REPLICA_STICKINESS_SECONDS', 10))
+    REPLICA_HEALTH_CHECK_INTERVAL = int(os.environ.get('REPLICA_HEALTH_CHECK_INTERVAL', 10))
     
     # Flask-Login
     REMEMBER_COOKIE_DURATION = timedelta(days=30)
@@ -30,6 +42,31 @@ class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'mp4', 'mov', 'avi'}
+    UPLOAD_URL_PATH = '/uploads'
+    UPLOAD_CACHE_MAX_AGE = 3600  # для файлов без уникального имени
+    # За nginx: internal location с alias на UPLOAD_FOLDER (например, /protected-uploads/)
+    UPLOAD_ACCEL_REDIRECT_PREFIX = os.environ.get('UPLOAD_ACCEL_REDIRECT_PREFIX')
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', 'false').lower() == 'true'
+    IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))  # процессы обработки изображений
+    
+    # Загрузка видео по частям (размер части ограничен MAX_CONTENT_LENGTH)
+    VIDEO_UPLOAD_MAX_SIZE = int(os.environ.get('VIDEO_UPLOAD_MAX_SIZE', 2 * 1024 * 1024 * 1024))
+    UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+    UPLOAD_SESSION_TTL_HOURS = 24
+    # Место под незавершенные загрузки выделяется заранее — ограничиваем на пользователя
+    UPLOAD_SESSIONS_PER_USER = int(os.environ.get('UPLOAD_SESSIONS_PER_USER', 3))
+    UPLOAD_RESERVED_BYTES_PER_USER = int(os.environ.get('UPLOAD_RESERVED_BYTES_PER_USER', 4 * 1024 * 1024 * 1024))
+    
+    # Статические ресурсы (flask assets build / flask assets vendor)
+    ASSETS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'static', 'dist')
+    ASSETS_URL_PATH = '/assets'
+    # false — библиотеки отдаются из локальных копий (static/vendor), а не с CDN
+    ASSETS_USE_CDN = os.environ.get('ASSETS_USE_CDN', 'true').lower() == 'true'
+    
+    # Логи аудита
+    AUDIT_LOG_RETENTION_MONTHS = int(os.environ.get('AUDIT_LOG_RETENTION_MONTHS', 6))
+    AUDIT_ARCHIVE_FOLDER = os.environ.get('AUDIT_ARCHIVE_FOLDER') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'archive', 'audit_logs')
     
     # Настройки приложения
     APP_NAME = 'Фитнес Платформа'
@@ -42,6 +79,31 @@ class Config:
     MAX_TRAINING_PARTICIPANTS = 100
     TRAINING_REGISTRATION_DEADLINE = 1  # час до начала
     
+    # Кэш системных настроек: как часто сверять версию настроек (секунды)
+    SETTINGS_CACHE_POLL_INTERVAL = int(os.environ.get('SETTINGS_CACHE_POLL_INTERVAL', 5))
+    
+    # Рекомендации тренировок: длина списка, горизонт кандидатов (дни), срок жизни матриц в процессе (секунды)
+    RECOMMENDATIONS_TOP_K = int(os.environ.get('RECOMMENDATIONS_TOP_K', 20))
+    RECOMMENDATIONS_HORIZON_DAYS = int(os.environ.get('RECOMMENDATIONS_HORIZON_DAYS', 30))
+    RECOMMENDATIONS_MODEL_TTL = int(os.environ.get('RECOMMENDATIONS_MODEL_TTL', 600))
+    
+    # Байесовский рейтинг: вес априорного среднего (в оценках) и среднее до первого пересчета
+    RATING_PRIOR_WEIGHT = float(os.environ.get('RATING_PRIOR_WEIGHT', 10))
+    RATING_PRIOR_MEAN = float(os.environ.get('RATING_PRIOR_MEAN', 3.0))
+    
+    # Ключи идемпотентности POST-запросов записи и отмены: срок хранения (часы)
+    IDEMPOTENCY_KEY_TTL_HOURS = int(os.environ.get('IDEMPOTENCY_KEY_TTL_HOURS', 24))
+    # Попыток записи при конкурентном изменении тренировки (оптимистическая блокировка)
+    REGISTRATION_MAX_ATTEMPTS = int(os.environ.get('REGISTRATION_MAX_ATTEMPTS', 5))
+    
+    # Очередь модерации контента: веса приоритета (жалоба, штрафной балл автора, час ожидания),
+    # срок захвата пачки модератором (секунды) и размер пачки
+    MODERATION_REPORT_WEIGHT = float(os.environ.get('MODERATION_REPORT_WEIGHT', 10))
+    MODERATION_PENALTY_WEIGHT = float(os.environ.get('MODERATION_PENALTY_WEIGHT', 2))
+    MODERATION_AGE_WEIGHT = float(os.environ.get('MODERATION_AGE_WEIGHT', 1))
+    MODERATION_LEASE_SECONDS = int(os.environ.get('MODERATION_LEASE_SECONDS', 600))
+    MODERATION_CLAIM_BATCH_SIZE = int(os.environ.get('MODERATION_CLAIM_BATCH_SIZE', 20))
+    
     # Настройки безопасности
     PASSWORD_RESET_TIMEOUT = 3600  # 1 час
     ACCOUNT_VERIFICATION_TIMEOUT = 86400  # 24 часа
@@ -50,6 +112,27 @@ class Config:
     
     # API
     API_PREFIX = '/api/v1'
+    
+    # Состав приложения: регистрируемые blueprints (пусто — все).
+    # Flask-Migrate подключается для команд flask всегда, в веб-процессе — только если MIGRATIONS_ENABLED
+    APP_BLUEPRINTS = [name for name in os.environ.get('APP_BLUEPRINTS', '').split(',') if name]
+    MIGRATIONS_ENABLED = os.environ.get('MIGRATIONS_ENABLED', 'false').lower() == 'true'
+    
+    # Фоновые задачи (рассылки уведомлений и т.п.)
+    BACKGROUND_WORKERS = int(os.environ.get('BACKGROUND_WORKERS', 4))
+    BACKGROUND_TASKS_EAGER = False
+    
+    # Поток уведомлений (SSE): интервал heartbeat и проверки базы (секунды)
+    NOTIFICATIONS_STREAM_POLL_INTERVAL = int(os.environ.get('NOTIFICATIONS_STREAM_POLL_INTERVAL', 15))
+    
+    # Очередь email-доставки (flask email worker)
+    EMAIL_QUEUE_BATCH_SIZE = int(os.environ.get('EMAIL_QUEUE_BATCH_SIZE', 50))
+    EMAIL_QUEUE_POLL_INTERVAL = int(os.environ.get('EMAIL_QUEUE_POLL_INTERVAL', 10))
+    EMAIL_QUEUE_MAX_ATTEMPTS = int(os.environ.get('EMAIL_QUEUE_MAX_ATTEMPTS', 5))
+    EMAIL_QUEUE_BACKOFF_BASE = 60  # секунды, удваивается с каждой попыткой
+    EMAIL_QUEUE_BACKOFF_MAX = 6 * 3600
+    EMAIL_QUEUE_CLAIM_TIMEOUT = 300
+    EMAIL_BASE_URL = os.environ.get('EMAIL_BASE_URL', 'http://localhost:5000')
     JSON_SORT_KEYS = False
     JSON_AS_ASCII = False
     
@@ -81,6 +164,7 @@ class TestingConfig(Config):
     SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL') or 'sqlite:///test_fitness_platform.db'
     WTF_CSRF_ENABLED = False
     SERVER_NAME = 'localhost:5000'
+    BACKGROUND_TASKS_EAGER = True
 
 class ProductionConfig(Config):
     """Конфиг для продакшена"""
@@ -106,10 +190,15 @@ class ProductionConfig(Config):
         file_handler.setLevel(logging.WARNING)
         app.logger.addHandler(file_handler)
 
+class ApiConfig(ProductionConfig):
+    """Процесс только с JSON API (без страниц, форм и команд миграций)"""
+    APP_BLUEPRINTS = ['api']
+
 # Словарь конфигов
 config = {
     'development': DevelopmentConfig,
     'testing': TestingConfig,
     'production': ProductionConfig,
+    'api': ApiConfig,
     'default': DevelopmentConfig
 }
\ No newline at end of file
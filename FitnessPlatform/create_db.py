@@ -6,7 +6,7 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
 try:
-    from app import create_app, db
+    from app import create_app, db, init_migrations
     from config import config
     print("✓ Модули импортированы успешно")
 except ImportError as e:
@@ -17,18 +17,32 @@ except ImportError as e:
 
 # Создаем приложение с конфигом по умолчанию
 app = create_app(config['default'])
+init_migrations(app)
+
+BASELINE_REVISION = '0001_baseline'
 
 with app.app_context():
     try:
-        # Создаем все таблицы
+        from flask_migrate import stamp, upgrade
+        
+        # Схема создается и обновляется миграциями (migrations/)
         print("Создание базы данных...")
-        db.create_all()
+        tables = set(db.inspect(db.engine).get_table_names())
+        if tables and 'alembic_version' not in tables:
+            # База создана db.create_all() без миграций: целиком по текущим моделям или в исходной схеме
+            current = set(db.metadata.tables) <= tables
+            stamp(revision='head' if current else BASELINE_REVISION)
+            print(f"✓ Существующая база отмечена ревизией {'head' if current else BASELINE_REVISION}")
+        upgrade()
         print("✓ Таблицы созданы успешно!")
         
         # Импортируем модели после создания app
         from app.models.user import User, UserProfile
         from app.models.training import TrainingCategory
         from app.models.system import SystemSetting
+        from app.models.notification import NotificationTemplate
+        from app.utils.fanout import DEFAULT_TEMPLATES
+        import json
         
         # Создаем начальные данные (опционально)
         # Создаем категории тренировок
@@ -62,6 +76,24 @@ with app.app_context():
                 db.session.add(setting)
                 print(f"✓ Создана настройка: {setting_data['key']}")
         
+        # Создаем шаблоны уведомлений
+        for name, template_data in DEFAULT_TEMPLATES.items():
+            if not NotificationTemplate.query.filter_by(name=name).first():
+                template = NotificationTemplate(
+                    name=name,
+                    title_template=template_data['title_template'],
+                    message_template=template_data['message_template'],
+                    notification_type=template_data['notification_type'],
+                    default_priority=template_data['default_priority'],
+                    default_channels=json.dumps(template_data['default_channels'])
+                )
+                db.session.add(template)
+                print(f"✓ Создан шаблон уведомления: {name}")
+        
+        # Счетчик тренировок на проверке (миграция его уже создает — здесь сверка)
+        from app.utils.moderation import recount
+        print(f"✓ Тренировок на проверке: {recount()}")
+        
         # Создаем тестового администратора
         if not User.query.filter_by(email='admin@example.com').first():
             admin = User(
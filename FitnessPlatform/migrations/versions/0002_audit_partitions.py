@@ -0,0 +1,46 @@
+"""Месячные партиции журнала аудита и таймлайн ресурса
+
+Revision ID: 0002_audit_partitions
+Revises: 0001_baseline
+Create Date: 2026-10-19 03:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_audit_partitions'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+
+def _month_key_sql(dialect):
+    """Ключ месячной партиции (YYYYMM) из audit_logs.created_at"""
+    if dialect == 'sqlite':
+        return "CAST(strftime('%Y%m', COALESCE(created_at, CURRENT_TIMESTAMP)) AS INTEGER)"
+    return ("CAST(EXTRACT(YEAR FROM COALESCE(created_at, CURRENT_TIMESTAMP)) * 100"
+            " + EXTRACT(MONTH FROM COALESCE(created_at, CURRENT_TIMESTAMP)) AS INTEGER)")
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    with op.batch_alter_table('audit_logs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('partition_month', sa.Integer(), nullable=False, server_default='0'))
+    op.execute(f'UPDATE audit_logs SET partition_month = {_month_key_sql(bind.dialect.name)}')
+    with op.batch_alter_table('audit_logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_audit_logs_resource_id')
+        batch_op.drop_index('ix_audit_logs_resource_type')
+        batch_op.create_index('idx_audit_resource_timeline', ['resource_type', 'resource_id', 'created_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_audit_logs_partition_month'), ['partition_month'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('audit_logs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_audit_logs_partition_month'))
+        batch_op.drop_index('idx_audit_resource_timeline')
+        batch_op.create_index('ix_audit_logs_resource_type', ['resource_type'], unique=False)
+        batch_op.create_index('ix_audit_logs_resource_id', ['resource_id'], unique=False)
+        batch_op.drop_column('partition_month')
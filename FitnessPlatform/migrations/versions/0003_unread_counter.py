@@ -0,0 +1,38 @@
+"""Счетчик непрочитанных уведомлений пользователя
+
+Revision ID: 0003_unread_counter
+Revises: 0002_audit_partitions
+Create Date: 2026-10-19 03:11:00.000000
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_unread_counter'
+down_revision = '0002_audit_partitions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('unread_notifications_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Счетчик — по тому же правилу видимости, что и входящие
+    op.execute(sa.text(
+        'UPDATE users SET unread_notifications_count = ('
+        ' SELECT count(*) FROM notifications'
+        ' WHERE notifications.user_id = users.id'
+        ' AND notifications.is_read = :false AND (notifications.send_in_app IS NULL OR notifications.send_in_app = :true)'
+        ' AND (notifications.scheduled_for IS NULL OR notifications.scheduled_for <= :now)'
+        ' AND (notifications.expires_at IS NULL OR notifications.expires_at > :now))'
+    ).bindparams(sa.bindparam('now', datetime.utcnow(), type_=sa.DateTime()), false=False, true=True))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('unread_notifications_count')
@@ -0,0 +1,32 @@
+"""Очередь email-доставки уведомлений
+
+Revision ID: 0004_email_queue
+Revises: 0003_unread_counter
+Create Date: 2026-10-19 03:12:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_email_queue'
+down_revision = '0003_unread_counter'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('email_next_attempt_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('email_claim_token', sa.String(length=32), nullable=True))
+        batch_op.add_column(sa.Column('email_last_error', sa.String(length=500), nullable=True))
+        batch_op.create_index('idx_notifications_email_queue', ['send_email', 'email_sent', 'email_next_attempt_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('idx_notifications_email_queue')
+        batch_op.drop_column('email_last_error')
+        batch_op.drop_column('email_claim_token')
+        batch_op.drop_column('email_next_attempt_at')
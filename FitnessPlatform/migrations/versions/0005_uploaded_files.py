@@ -0,0 +1,48 @@
+"""Загруженные файлы и их обработанные варианты
+
+Revision ID: 0005_uploaded_files
+Revises: 0004_email_queue
+Create Date: 2026-10-19 03:13:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_uploaded_files'
+down_revision = '0004_email_queue'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('uploaded_files',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('purpose', sa.String(length=20), nullable=False),
+    sa.Column('original_filename', sa.String(length=255), nullable=True),
+    sa.Column('relative_path', sa.String(length=500), nullable=False),
+    sa.Column('mime_type', sa.String(length=100), nullable=True),
+    sa.Column('size', sa.BigInteger(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('width', sa.Integer(), nullable=True),
+    sa.Column('height', sa.Integer(), nullable=True),
+    sa.Column('variants', sa.Text(), nullable=True),
+    sa.Column('error', sa.String(length=500), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('uploaded_files', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_uploaded_files_status'), ['status'], unique=False)
+        batch_op.create_index(batch_op.f('ix_uploaded_files_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('uploaded_files', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_uploaded_files_user_id'))
+        batch_op.drop_index(batch_op.f('ix_uploaded_files_status'))
+
+    op.drop_table('uploaded_files')
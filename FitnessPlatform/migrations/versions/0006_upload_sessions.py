@@ -0,0 +1,55 @@
+"""Сессии загрузки видео по частям
+
+Revision ID: 0006_upload_sessions
+Revises: 0005_uploaded_files
+Create Date: 2026-10-19 03:14:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_upload_sessions'
+down_revision = '0005_uploaded_files'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('upload_sessions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('token', sa.String(length=32), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('training_id', sa.Integer(), nullable=True),
+    sa.Column('purpose', sa.String(length=20), nullable=True),
+    sa.Column('original_filename', sa.String(length=255), nullable=False),
+    sa.Column('total_size', sa.BigInteger(), nullable=False),
+    sa.Column('expected_sha256', sa.String(length=64), nullable=True),
+    sa.Column('temp_path', sa.String(length=500), nullable=False),
+    sa.Column('offset', sa.BigInteger(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('uploaded_file_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['training_id'], ['trainings.id'], ),
+    sa.ForeignKeyConstraint(['uploaded_file_id'], ['uploaded_files.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('upload_sessions', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_upload_sessions_expires_at'), ['expires_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_upload_sessions_status'), ['status'], unique=False)
+        batch_op.create_index(batch_op.f('ix_upload_sessions_token'), ['token'], unique=True)
+        batch_op.create_index(batch_op.f('ix_upload_sessions_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('upload_sessions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_upload_sessions_user_id'))
+        batch_op.drop_index(batch_op.f('ix_upload_sessions_token'))
+        batch_op.drop_index(batch_op.f('ix_upload_sessions_status'))
+        batch_op.drop_index(batch_op.f('ix_upload_sessions_expires_at'))
+
+    op.drop_table('upload_sessions')
@@ -0,0 +1,47 @@
+"""Хранилище файлов по содержимому (sha256) со счетчиком ссылок
+
+Revision ID: 0007_stored_blobs
+Revises: 0006_upload_sessions
+Create Date: 2026-10-19 03:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_stored_blobs'
+down_revision = '0006_upload_sessions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stored_blobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('relative_path', sa.String(length=500), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('stored_blobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_stored_blobs_sha256'), ['sha256'], unique=True)
+
+    with op.batch_alter_table('uploaded_files', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('blob_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_uploaded_files_blob_id_stored_blobs', 'stored_blobs', ['blob_id'], ['id'])
+        batch_op.create_index(batch_op.f('ix_uploaded_files_blob_id'), ['blob_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('uploaded_files', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_uploaded_files_blob_id'))
+        batch_op.drop_constraint('fk_uploaded_files_blob_id_stored_blobs', type_='foreignkey')
+        batch_op.drop_column('blob_id')
+
+    with op.batch_alter_table('stored_blobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_stored_blobs_sha256'))
+
+    op.drop_table('stored_blobs')
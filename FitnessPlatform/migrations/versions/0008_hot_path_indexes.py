@@ -0,0 +1,38 @@
+"""Индексы горячих путей (python -m benchmarks.indexes)
+
+Revision ID: 0008_hot_path_indexes
+Revises: 0007_stored_blobs
+Create Date: 2026-10-19 03:16:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_hot_path_indexes'
+down_revision = '0007_stored_blobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('idx_trainings_status_schedule', 'trainings', ['status', 'schedule_time'], unique=False)
+    op.create_index('idx_trainings_trainer_created', 'trainings', ['trainer_user_id', 'created_at'], unique=False)
+    op.create_index('idx_registrations_user_status', 'training_registrations', ['user_id', 'status'], unique=False)
+    op.create_index('idx_registrations_training_status', 'training_registrations', ['training_id', 'status'], unique=False)
+    op.create_index('idx_feedbacks_training_moderation', 'feedbacks', ['training_id', 'moderation_status', 'created_at'], unique=False)
+    op.create_index('idx_progress_user_date', 'progress', ['user_id', 'date', 'created_at'], unique=False)
+    op.create_index('idx_notifications_user_unread', 'notifications', ['user_id', 'id'], unique=False, sqlite_where=sa.text('is_read IS 0'), postgresql_where=sa.text('is_read IS false'))
+    op.create_index('idx_goals_user_status', 'goals', ['user_id', 'status'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_goals_user_status', table_name='goals')
+    op.drop_index('idx_notifications_user_unread', table_name='notifications')
+    op.drop_index('idx_progress_user_date', table_name='progress')
+    op.drop_index('idx_feedbacks_training_moderation', table_name='feedbacks')
+    op.drop_index('idx_registrations_training_status', table_name='training_registrations')
+    op.drop_index('idx_registrations_user_status', table_name='training_registrations')
+    op.drop_index('idx_trainings_trainer_created', table_name='trainings')
+    op.drop_index('idx_trainings_status_schedule', table_name='trainings')
@@ -0,0 +1,130 @@
+"""Справочники тегов, оборудования и противопоказаний тренировок
+
+Revision ID: 0009_training_terms
+Revises: 0008_hot_path_indexes
+Create Date: 2026-10-19 03:17:00.000000
+
+Кроме таблиц, переносит прежние текстовые списки тренировок (trainings.tags,
+required_equipment, medical_contraindications: JSON или строки через
+перевод строки, «;», «,») в справочники и связи. Текстовые столбцы не
+меняются; перенос идет пачками по id и ничего не дублирует.
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009_training_terms'
+down_revision = '0008_hot_path_indexes'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+# (справочник, связь, столбец связи, прежний текстовый столбец trainings)
+KINDS = (
+    ('tags', 'training_tags', 'tag_id', 'tags'),
+    ('equipment', 'training_equipment', 'equipment_id', 'required_equipment'),
+    ('contraindications', 'training_contraindications', 'contraindication_id', 'medical_contraindications'),
+)
+
+
+def _create_term_table(name):
+    op.create_table(name,
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('key', sa.String(length=100), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table(name, schema=None) as batch_op:
+        batch_op.create_index(batch_op.f(f'ix_{name}_key'), ['key'], unique=True)
+
+
+def _create_link_table(name, term_table, term_column):
+    op.create_table(name,
+    sa.Column('training_id', sa.Integer(), nullable=False),
+    sa.Column(term_column, sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint([term_column], [f'{term_table}.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['training_id'], ['trainings.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('training_id', term_column)
+    )
+    with op.batch_alter_table(name, schema=None) as batch_op:
+        batch_op.create_index(f'idx_{name}_term', [term_column, 'training_id'], unique=False)
+
+
+def _migrate_legacy_terms(connection):
+    """Перенос текстовых списков в справочники: справочник и связи — пачкой на каждую пачку тренировок"""
+    from app.models.training import TermMixin
+    from app.utils.training_terms import split_terms
+
+    legacy_columns = [legacy for _, _, _, legacy in KINDS]
+    trainings = sa.table('trainings', sa.column('id'), *(sa.column(name) for name in legacy_columns))
+    has_legacy = sa.or_(*(trainings.c[name].isnot(None) for name in legacy_columns))
+
+    last_id = 0
+    while True:
+        batch = connection.execute(
+            sa.select(trainings).where(has_legacy, trainings.c.id > last_id).order_by(trainings.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        for term_table, link_table, term_column, legacy in KINDS:
+            terms = sa.table(term_table, sa.column('id'), sa.column('name'), sa.column('key'), sa.column('created_at'))
+            links = sa.table(link_table, sa.column('training_id'), sa.column(term_column))
+
+            parsed = {}
+            wanted = {}
+            for row in batch:
+                keys = []
+                for name in split_terms(row._mapping[legacy]):
+                    name = TermMixin.normalize(name)
+                    key = TermMixin.key_for(name)
+                    if name and key not in keys:
+                        keys.append(key)
+                        wanted.setdefault(key, name)
+                parsed[row.id] = keys
+            if not wanted:
+                continue
+
+            known = dict(connection.execute(sa.select(terms.c.key, terms.c.id).where(terms.c.key.in_(list(wanted)))).all())
+            missing = [{'name': name, 'key': key, 'created_at': datetime.utcnow()}
+                       for key, name in wanted.items() if key not in known]
+            if missing:
+                connection.execute(terms.insert(), missing)
+                known.update(connection.execute(
+                    sa.select(terms.c.key, terms.c.id).where(terms.c.key.in_([item['key'] for item in missing]))).all())
+
+            linked = set(map(tuple, connection.execute(
+                sa.select(links.c.training_id, links.c[term_column]).where(links.c.training_id.in_(list(parsed)))).all()))
+            new_links = [{'training_id': training_id, term_column: known[key]}
+                         for training_id, keys in parsed.items() for key in keys
+                         if (training_id, known[key]) not in linked]
+            if new_links:
+                connection.execute(links.insert(), new_links)
+
+
+def upgrade():
+    for term_table, link_table, term_column, _ in KINDS:
+        _create_term_table(term_table)
+    for term_table, link_table, term_column, _ in KINDS:
+        _create_link_table(link_table, term_table, term_column)
+
+    _migrate_legacy_terms(op.get_bind())
+
+
+def downgrade():
+    for term_table, link_table, _, _ in reversed(KINDS):
+        with op.batch_alter_table(link_table, schema=None) as batch_op:
+            batch_op.drop_index(f'idx_{link_table}_term')
+
+        op.drop_table(link_table)
+    for term_table, _, _, _ in reversed(KINDS):
+        with op.batch_alter_table(term_table, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f(f'ix_{term_table}_key'))
+
+        op.drop_table(term_table)
@@ -0,0 +1,36 @@
+"""Предрассчитанные рекомендации тренировок
+
+Revision ID: 0010_training_recommendations
+Revises: 0009_training_terms
+Create Date: 2026-10-19 03:18:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010_training_recommendations'
+down_revision = '0009_training_terms'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('training_recommendations',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('training_ids', sa.Text(), nullable=False),
+    sa.Column('scores', sa.Text(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    with op.batch_alter_table('training_recommendations', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_training_recommendations_computed_at'), ['computed_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('training_recommendations', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_training_recommendations_computed_at'))
+
+    op.drop_table('training_recommendations')
@@ -0,0 +1,69 @@
+"""Байесовские рейтинги тренеров и тренировок, разрезы trainer_rankings
+
+Revision ID: 0011_ratings
+Revises: 0010_training_recommendations
+Create Date: 2026-10-19 03:19:00.000000
+
+Точная сумма оценок переносится из прежнего среднего, оценка для
+сортировки до пересчета равна среднему. Байесовские оценки и разрезы
+зависят от настроек приложения — после обновления их заполняет
+flask ratings rebuild.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011_ratings'
+down_revision = '0010_training_recommendations'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('trainer_rankings',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('scope', sa.String(length=20), nullable=False),
+    sa.Column('scope_key', sa.String(length=100), nullable=False),
+    sa.Column('trainer_user_id', sa.Integer(), nullable=False),
+    sa.Column('rating_sum', sa.Float(), nullable=False),
+    sa.Column('total_ratings', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['trainer_user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('scope', 'scope_key', 'trainer_user_id', name='uq_trainer_rankings_scope_trainer')
+    )
+    with op.batch_alter_table('trainer_rankings', schema=None) as batch_op:
+        batch_op.create_index('idx_trainer_rankings_scope_score', ['scope', 'scope_key', 'score', 'total_ratings'], unique=False)
+        batch_op.create_index(batch_op.f('ix_trainer_rankings_trainer_user_id'), ['trainer_user_id'], unique=False)
+
+    with op.batch_alter_table('trainers', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rating_sum', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('rating_score', sa.Float(), nullable=True))
+    op.execute('UPDATE trainers SET rating_sum = COALESCE(rating, 0) * COALESCE(total_ratings, 0),'
+               ' rating_score = COALESCE(rating, 0)')
+
+    with op.batch_alter_table('trainings', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rating_sum', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('rating_score', sa.Float(), nullable=True))
+        batch_op.create_index('idx_trainings_category_score', ['category_id', 'rating_score'], unique=False)
+    op.execute('UPDATE trainings SET rating_sum = COALESCE(average_rating, 0) * COALESCE(total_ratings, 0),'
+               ' rating_score = COALESCE(average_rating, 0)')
+
+
+def downgrade():
+    with op.batch_alter_table('trainings', schema=None) as batch_op:
+        batch_op.drop_index('idx_trainings_category_score')
+        batch_op.drop_column('rating_score')
+        batch_op.drop_column('rating_sum')
+
+    with op.batch_alter_table('trainers', schema=None) as batch_op:
+        batch_op.drop_column('rating_score')
+        batch_op.drop_column('rating_sum')
+
+    with op.batch_alter_table('trainer_rankings', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_trainer_rankings_trainer_user_id'))
+        batch_op.drop_index('idx_trainer_rankings_scope_score')
+
+    op.drop_table('trainer_rankings')
@@ -0,0 +1,36 @@
+"""Лист ожидания тренировок
+
+Revision ID: 0012_waitlist
+Revises: 0011_ratings
+Create Date: 2026-10-19 03:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0012_waitlist'
+down_revision = '0011_ratings'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('trainings', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('waitlist_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('waitlist_offset', sa.Integer(), nullable=False, server_default='0'))
+
+    with op.batch_alter_table('training_registrations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('waitlist_position', sa.Integer(), nullable=True))
+        batch_op.create_index('idx_registrations_waitlist', ['training_id', 'waitlist_position'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('training_registrations', schema=None) as batch_op:
+        batch_op.drop_index('idx_registrations_waitlist')
+        batch_op.drop_column('waitlist_position')
+
+    with op.batch_alter_table('trainings', schema=None) as batch_op:
+        batch_op.drop_column('waitlist_offset')
+        batch_op.drop_column('waitlist_count')
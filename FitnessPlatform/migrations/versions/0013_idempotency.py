@@ -0,0 +1,49 @@
+"""Версия строки тренировки и ключи идемпотентности POST-запросов
+
+Revision ID: 0013_idempotency
+Revises: 0012_waitlist
+Create Date: 2026-10-19 03:21:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0013_idempotency'
+down_revision = '0012_waitlist'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Версия строки для оптимистической блокировки
+    with op.batch_alter_table('trainings', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+    op.create_table('idempotency_keys',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('endpoint', sa.String(length=100), nullable=True),
+    sa.Column('status_code', sa.Integer(), nullable=True),
+    sa.Column('location', sa.String(length=500), nullable=True),
+    sa.Column('flashes', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'key', name='unique_user_idempotency_key')
+    )
+    with op.batch_alter_table('idempotency_keys', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_idempotency_keys_created_at'), ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('idempotency_keys', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_idempotency_keys_created_at'))
+
+    op.drop_table('idempotency_keys')
+
+    with op.batch_alter_table('trainings', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,37 @@
+"""Счетчик тренировок на проверке
+
+Revision ID: 0014_moderation_counters
+Revises: 0013_idempotency
+Create Date: 2026-10-19 03:22:00.000000
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0014_moderation_counters'
+down_revision = '0013_idempotency'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('moderation_counters',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+    # Счетчик сразу по фактическим строкам
+    op.execute(sa.text(
+        "INSERT INTO moderation_counters (name, value, updated_at)"
+        " SELECT 'pending_trainings', count(*), :now FROM trainings WHERE status IN ('draft', 'pending')"
+    ).bindparams(sa.bindparam('now', datetime.utcnow(), type_=sa.DateTime())))
+
+
+def downgrade():
+    op.drop_table('moderation_counters')
@@ -0,0 +1,57 @@
+"""Очередь модерации контента и штрафные баллы авторов
+
+Revision ID: 0015_moderation_queue
+Revises: 0014_moderation_counters
+Create Date: 2026-10-19 03:23:00.000000
+
+Приоритеты очереди зависят от настроек приложения — после обновления
+очередь заполняет flask moderation rebuild-queue.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0015_moderation_queue'
+down_revision = '0014_moderation_counters'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('moderation_queue',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('content_type', sa.String(length=20), nullable=False),
+    sa.Column('content_id', sa.Integer(), nullable=False),
+    sa.Column('author_user_id', sa.Integer(), nullable=True),
+    sa.Column('reports_count', sa.Integer(), nullable=False),
+    sa.Column('author_penalty', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('priority', sa.Float(), nullable=False),
+    sa.Column('claimed_by', sa.Integer(), nullable=True),
+    sa.Column('claim_token', sa.String(length=32), nullable=True),
+    sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['author_user_id'], ['users.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['claimed_by'], ['users.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('content_type', 'content_id', name='unique_moderation_queue_content')
+    )
+    with op.batch_alter_table('moderation_queue', schema=None) as batch_op:
+        batch_op.create_index('idx_moderation_queue_priority', ['priority', 'id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_moderation_queue_author_user_id'), ['author_user_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_moderation_queue_claim_token'), ['claim_token'], unique=False)
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('penalty_points', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('penalty_points')
+
+    with op.batch_alter_table('moderation_queue', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_moderation_queue_claim_token'))
+        batch_op.drop_index(batch_op.f('ix_moderation_queue_author_user_id'))
+        batch_op.drop_index('idx_moderation_queue_priority')
+
+    op.drop_table('moderation_queue')
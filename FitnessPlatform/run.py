@@ -6,6 +6,14 @@
 import os
 import sys
 
+# Асинхронный сервер (gevent) нужен для потоков SSE: тысячи открытых
+# соединений не занимают по потоку каждое. Патчить стандартную библиотеку
+# нужно до импорта приложения.
+ASYNC_SERVER = os.getenv('ASYNC_SERVER', 'false').lower() == 'true'
+if ASYNC_SERVER:
+    from gevent import monkey
+    monkey.patch_all()
+
 # Добавляем текущую директорию в путь Python
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
@@ -27,19 +35,22 @@ print(f"Используется конфиг: {config_name}")
 app = create_app(config[config_name])
 
 if __name__ == '__main__':
-    # Проверка маршрутов
-    print("\nЗарегистрированные маршруты:")
-    for rule in app.url_map.iter_rules():
-        print(f"  {rule.endpoint}: {rule.rule}")
+    # Список маршрутов: flask routes
     
     # Запуск приложения
     port = int(os.getenv('PORT', 5000))
     debug = os.getenv('FLASK_DEBUG', 'true').lower() == 'true'
     
-    print(f"\n✓ Запуск приложения на порту {port} (debug={debug})")
-    app.run(
-        host='0.0.0.0',
-        port=port,
-        debug=debug,
-        threaded=True
-    )
\ No newline at end of file
+    if ASYNC_SERVER:
+        from gevent.pywsgi import WSGIServer
+        
+        print(f"\n✓ Запуск приложения на порту {port} (gevent)")
+        WSGIServer(('0.0.0.0', port), app).serve_forever()
+    else:
+        print(f"\n✓ Запуск приложения на порту {port} (debug={debug})")
+        app.run(
+            host='0.0.0.0',
+            port=port,
+            debug=debug,
+            threaded=True
+        )
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""
+Общие фикстуры тестов: приложение на временной SQLite-базе, пользователи, тренировки
+
+Схема создается по моделям (db.create_all) — миграции проверяет flask db check.
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from config import TestingConfig
+
+PASSWORD = 'password123'
+
+@pytest.fixture
+def app(tmp_path):
+    """Приложение с отдельной базой и папкой загрузок на каждый тест"""
+    class Config(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        UPLOAD_FOLDER = str(tmp_path / 'uploads')
+    
+    app = create_app(Config)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def make_user(app):
+    """Фабрика пользователей: make_user('anna', role='trainer')"""
+    from app.models.user import User
+    
+    def factory(username, role='client'):
+        user = User(username=username, email=f'{username}@example.com', role=role, is_active=True, is_verified=True)
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return factory
+
+@pytest.fixture
+def make_training(app, make_user):
+    """Фабрика активных тренировок на завтра: make_training(max_participants=1)"""
+    from app.models.training import Training
+    
+    created = []
+    
+    def factory(max_participants=2, trainer=None):
+        trainer = trainer or make_user(f'trainer{len(created) + 1}', role='trainer')
+        training = Training(
+            public_id=f'TR-TEST-{len(created) + 1}',
+            title=f'Тренировка {len(created) + 1}',
+            trainer_user_id=trainer.id,
+            schedule_time=datetime.utcnow() + timedelta(days=2),
+            duration=60,
+            training_type='group',
+            status='active',
+            max_participants=max_participants
+        )
+        db.session.add(training)
+        db.session.commit()
+        created.append(training)
+        return training
+    return factory
+
+@pytest.fixture
+def login(client):
+    """Вход пользователя через форму"""
+    def do_login(user):
+        response = client.post('/auth/login', data={'email': user.email, 'password': PASSWORD})
+        assert response.status_code == 302
+        return response
+    return do_login
\ No newline at end of file
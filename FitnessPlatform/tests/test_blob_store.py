@@ -0,0 +1,58 @@
+"""
+Хранилище по содержимому: дедупликация, счетчик ссылок, гонка release/adopt
+"""
+import io
+import os
+
+from app import db
+from app.models.media import StoredBlob
+from app.utils import blob_store
+
+DATA = b'same content' * 100
+
+def _path(app, blob):
+    return os.path.join(app.config['UPLOAD_FOLDER'], blob.relative_path)
+
+def test_duplicate_shares_blob_and_last_release_deletes_file(app):
+    first, created = blob_store.store_stream(io.BytesIO(DATA), 'bin')
+    assert created
+    second, created = blob_store.store_stream(io.BytesIO(DATA), 'bin')
+    assert not created
+    assert second.id == first.id
+    assert db.session.get(StoredBlob, first.id).ref_count == 2
+    
+    path = _path(app, first)
+    assert blob_store.release(first.id) is False
+    assert os.path.exists(path)
+    assert db.session.get(StoredBlob, first.id).ref_count == 1
+    
+    assert blob_store.release(first.id) is True
+    assert not os.path.exists(path)
+    assert StoredBlob.query.count() == 0
+    assert not any(name.endswith('.deleting') for _, _, files in os.walk(app.config['UPLOAD_FOLDER'])
+                   for name in files)
+
+def test_adopt_during_release_keeps_file(app, monkeypatch):
+    blob, _ = blob_store.store_stream(io.BytesIO(DATA), 'bin')
+    blob_id, path = blob.id, _path(app, blob)
+    original_move = blob_store._move
+    adopted = []
+    
+    def move_then_adopt(source, target):
+        moved = original_move(source, target)
+        if not adopted:
+            # Та же загрузка приходит, пока файл отодвинут под удаление
+            upload = blob_store.temp_path()
+            sha256, size = blob_store.write_stream(io.BytesIO(DATA), upload)
+            adopted.append(blob_store.adopt(upload, sha256, size, 'bin'))
+        return moved
+    
+    monkeypatch.setattr(blob_store, '_move', move_then_adopt)
+    
+    assert blob_store.release(blob_id) is False
+    assert adopted[0][0].id == blob_id
+    assert db.session.get(StoredBlob, blob_id).ref_count == 1
+    with open(path, 'rb') as f:
+        assert f.read() == DATA
+    assert not any(name.endswith('.deleting') for _, _, files in os.walk(app.config['UPLOAD_FOLDER'])
+                   for name in files)
\ No newline at end of file
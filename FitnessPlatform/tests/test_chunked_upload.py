@@ -0,0 +1,122 @@
+"""
+Загрузка видео по частям: продолжение после обрыва, контрольные суммы,
+проверка типа при сборке и срок сеанса
+"""
+import base64
+import hashlib
+import io
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models.media import UploadSession
+from app.utils import chunked_upload
+
+# Минимальный заголовок MP4 (ftyp) — libmagic определяет его как video/mp4
+MP4_DATA = b'\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00mp42isom' + b'\x00\x00\x00\x08free' + bytes(range(256)) * 8
+
+def _start(client, data, filename='clip.mp4'):
+    response = client.post('/api/uploads/videos', json={
+        'filename': filename,
+        'size': len(data),
+        'sha256': hashlib.sha256(data).hexdigest()
+    })
+    assert response.status_code == 201
+    return response.get_json()['upload_id']
+
+def _put(client, token, offset, chunk, headers=None):
+    return client.put(f'/api/uploads/videos/{token}', data=chunk,
+                      headers={'Upload-Offset': str(offset), **(headers or {})})
+
+def _checksum(chunk):
+    return 'sha256 ' + base64.b64encode(hashlib.sha256(chunk).digest()).decode()
+
+def test_resume_after_interrupted_chunk(app, client, make_user, login):
+    login(make_user('coach', role='trainer'))
+    half = len(MP4_DATA) // 2
+    token = _start(client, MP4_DATA)
+    assert _put(client, token, 0, MP4_DATA[:half]).status_code == 200
+    
+    # Обрыв: пришла только часть тела — смещение не сдвигается
+    session = UploadSession.query.filter_by(token=token).one()
+    truncated = io.BytesIO(MP4_DATA[half:half + 100])
+    with pytest.raises(chunked_upload.UploadError) as error:
+        chunked_upload.write_chunk(session, half, truncated, len(MP4_DATA) - half)
+    assert error.value.status == 400
+    
+    head = client.head(f'/api/uploads/videos/{token}')
+    assert head.headers['Upload-Offset'] == str(half)
+    
+    # Продолжение в «другом процессе»: состояние хэша восстанавливается по принятому префиксу
+    chunked_upload._hash_states.discard(token)
+    assert _put(client, token, 0, MP4_DATA[:half]).status_code == 409
+    assert _put(client, token, half, MP4_DATA[half:]).status_code == 200
+    
+    response = client.post(f'/api/uploads/videos/{token}/finalize')
+    assert response.status_code == 200
+    path = os.path.join(app.config['UPLOAD_FOLDER'], response.get_json()['file']['url'].split('/', 2)[2])
+    with open(path, 'rb') as f:
+        assert f.read() == MP4_DATA
+
+def test_chunk_checksum_mismatch_keeps_offset(client, make_user, login):
+    login(make_user('coach', role='trainer'))
+    half = len(MP4_DATA) // 2
+    token = _start(client, MP4_DATA)
+    
+    response = _put(client, token, 0, MP4_DATA[:half], headers={'Upload-Checksum': _checksum(b'other')})
+    assert response.status_code == 460
+    assert UploadSession.query.filter_by(token=token).one().offset == 0
+    
+    response = _put(client, token, 0, MP4_DATA[:half], headers={'Upload-Checksum': _checksum(MP4_DATA[:half])})
+    assert response.status_code == 200
+    assert response.headers['Upload-Offset'] == str(half)
+
+def test_file_checksum_mismatch_refuses_finalize(client, make_user, login):
+    login(make_user('coach', role='trainer'))
+    response = client.post('/api/uploads/videos', json={
+        'filename': 'clip.mp4',
+        'size': len(MP4_DATA),
+        'sha256': hashlib.sha256(b'other').hexdigest()
+    })
+    token = response.get_json()['upload_id']
+    assert _put(client, token, 0, MP4_DATA).status_code == 200
+    
+    assert client.post(f'/api/uploads/videos/{token}/finalize').status_code == 460
+    assert UploadSession.query.filter_by(token=token).one().status == UploadSession.STATUS_ACTIVE
+
+def test_finalize_accepts_video(client, make_user, login):
+    login(make_user('coach', role='trainer'))
+    token = _start(client, MP4_DATA)
+    
+    assert _put(client, token, 0, MP4_DATA).status_code == 200
+    response = client.post(f'/api/uploads/videos/{token}/finalize')
+    
+    assert response.status_code == 200
+    assert response.get_json()['file']['mime_type'] == 'video/mp4'
+
+def test_finalize_rejects_unrecognised_binary(client, make_user, login):
+    login(make_user('coach', role='trainer'))
+    data = os.urandom(4096)
+    token = _start(client, data)
+    
+    assert _put(client, token, 0, data).status_code == 200
+    response = client.post(f'/api/uploads/videos/{token}/finalize')
+    
+    assert response.status_code == 400
+    assert UploadSession.query.filter_by(token=token).one().status == UploadSession.STATUS_ACTIVE
+
+def test_expired_session_refuses_chunks_and_finalize(client, make_user, login):
+    login(make_user('coach', role='trainer'))
+    half = len(MP4_DATA) // 2
+    token = _start(client, MP4_DATA)
+    assert _put(client, token, 0, MP4_DATA[:half]).status_code == 200
+    
+    session = UploadSession.query.filter_by(token=token).one()
+    session.expires_at = datetime.utcnow() - timedelta(minutes=1)
+    db.session.commit()
+    
+    assert _put(client, token, half, MP4_DATA[half:]).status_code == 410
+    assert client.post(f'/api/uploads/videos/{token}/finalize').status_code == 410
+    assert db.session.get(UploadSession, session.id).offset == half
\ No newline at end of file
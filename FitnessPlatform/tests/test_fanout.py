@@ -0,0 +1,61 @@
+"""
+Массовая рассылка: рендеринг пачки скомпилированным шаблоном, счетчики непрочитанных
+"""
+from app import db
+from app.models.notification import Notification, NotificationTemplate
+from app.models.training import TrainingRegistration
+from app.models.user import User
+from app.utils import fanout
+from app.utils.notification_templates import CompiledTemplate
+
+def _spy_render_many(monkeypatch):
+    calls = []
+    original = CompiledTemplate.render_many
+    
+    def render_many(self, contexts, shared=None, channel='in_app'):
+        calls.append((list(contexts), shared))
+        return original(self, contexts, shared=shared, channel=channel)
+    
+    monkeypatch.setattr(CompiledTemplate, 'render_many', render_many)
+    return calls
+
+def test_notify_each_renders_batch_with_shared_context(app, make_user, make_training, monkeypatch):
+    calls = _spy_render_many(monkeypatch)
+    first, second = make_training(), make_training()
+    items = [(training.trainer_user_id, fanout.training_context(training), f'/trainings/{training.id}')
+             for training in (first, second)]
+    
+    assert fanout.notify_each(items, 'training_rejected', shared={'reason': 'нет описания'}) == 2
+    
+    assert len(calls) == 1
+    assert calls[0][1] == {'reason': 'нет описания'}
+    messages = dict(db.session.query(Notification.user_id, Notification.message))
+    assert messages[first.trainer_user_id] == f'Ваша тренировка "{first.title}" отклонена. Причина: нет описания'
+    assert messages[second.trainer_user_id] == f'Ваша тренировка "{second.title}" отклонена. Причина: нет описания'
+    assert db.session.get(User, first.trainer_user_id).unread_notifications_count == 1
+
+def test_fan_out_uses_stored_template(app, make_user, make_training, monkeypatch):
+    calls = _spy_render_many(monkeypatch)
+    training = make_training()
+    members = [make_user('anna'), make_user('boris')]
+    db.session.add_all(TrainingRegistration(training_id=training.id, user_id=user.id, status='registered')
+                       for user in members)
+    db.session.add(NotificationTemplate(
+        name='training_cancelled',
+        title_template='Отмена: $training_title',
+        message_template='$training_title не состоится. $reason',
+        notification_type='training',
+        default_channels='["in_app"]'
+    ))
+    db.session.commit()
+    
+    created = fanout.notify_training_registrants(
+        training.id, 'training_cancelled', fanout.training_context(training, reason='Тренер заболел'))
+    
+    assert created == 2
+    assert calls == [([{}], fanout.training_context(training, reason='Тренер заболел'))]
+    rows = Notification.query.order_by(Notification.user_id).all()
+    assert {row.title for row in rows} == {f'Отмена: {training.title}'}
+    assert {row.message for row in rows} == {f'{training.title} не состоится. Тренер заболел'}
+    assert all(row.send_email is False for row in rows)
+    assert [user.unread_notifications_count for user in members] == [1, 1]
\ No newline at end of file
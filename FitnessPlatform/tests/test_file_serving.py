@@ -0,0 +1,57 @@
+"""
+Отдача загруженных файлов: служебные пути, кэширование, Range
+"""
+import os
+
+import pytest
+
+def _write(app, relative_path, data=b'content'):
+    path = os.path.join(app.config['UPLOAD_FOLDER'], relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+def test_serves_public_file_with_ranges(app, client):
+    _write(app, 'avatars/a.png', b'0123456789')
+    
+    response = client.get('/uploads/avatars/a.png', headers={'Range': 'bytes=2-4'})
+    
+    assert response.status_code == 206
+    assert response.data == b'234'
+
+def test_immutable_file_answers_304_by_hash_etag(app, client):
+    sha256 = 'ab' * 32
+    _write(app, f'blobs/ab/{sha256}.png')
+    
+    response = client.get(f'/uploads/blobs/ab/{sha256}.png')
+    assert response.headers['ETag'] == f'"{sha256}"'
+    assert response.cache_control.immutable
+    
+    response = client.get(f'/uploads/blobs/ab/{sha256}.png', headers={'If-None-Match': f'"{sha256}"'})
+    assert response.status_code == 304
+
+@pytest.mark.parametrize('url', [
+    '/uploads/tmp/token.part',
+    '/uploads/./tmp/token.part',
+    '/uploads/x/../tmp/token.part',
+    '/uploads/avatars/../tmp/token.part',
+])
+def test_partial_uploads_are_not_served(app, client, url):
+    _write(app, 'tmp/token.part', b'secret')
+    
+    assert client.get(url).status_code == 404
+
+@pytest.mark.parametrize('relative_path', [
+    'blobs/ab/file.png.0123abcd.deleting',
+    'blobs/ab/variants/file.0123abcd.deleting/thumb.webp',
+    'videos/upload.part',
+])
+def test_files_moved_aside_are_not_served(app, client, relative_path):
+    _write(app, relative_path, b'secret')
+    
+    assert client.get(f'/uploads/{relative_path}').status_code == 404
+    assert client.get(f'/uploads/./{relative_path}').status_code == 404
+
+def test_path_outside_upload_folder_is_rejected(app, client):
+    assert client.get('/uploads/../config.py').status_code == 404
\ No newline at end of file
@@ -0,0 +1,72 @@
+"""
+Консоль модерации: счетчик тренировок на проверке, пачка решений, уведомления тренерам
+"""
+from app import db
+from app.models.notification import Notification
+from app.models.system import AuditLog
+from app.models.training import Training
+from app.utils import moderation
+
+def _pending_training(make_training, status='pending'):
+    training = make_training()
+    training.status = status
+    db.session.commit()
+    return training
+
+def _counter():
+    counters = moderation._counters_table()
+    return db.session.execute(
+        db.select(counters.c.value).where(counters.c.name == moderation.PENDING_TRAININGS)
+    ).scalar()
+
+def _login_admin(make_user, login):
+    """Вход под администратором (роль выдается после входа формой)"""
+    admin = make_user('admin')
+    login(admin)
+    admin.role = 'admin'
+    db.session.commit()
+    return admin
+
+def test_counter_follows_training_status(app, make_training):
+    moderation.recount()
+    db.session.commit()
+    assert _counter() == 0
+    
+    first = _pending_training(make_training)
+    _pending_training(make_training, status='draft')
+    make_training()
+    first.status = 'active'
+    db.session.commit()
+    
+    assert _counter() == 1
+    assert moderation.recount() == 1
+
+def test_batch_decision_updates_counter_audit_and_notifies(app, client, make_user, make_training, login):
+    moderation.recount()
+    db.session.commit()
+    pending = [_pending_training(make_training) for _ in range(3)]
+    already_active = make_training()
+    _login_admin(make_user, login)
+    
+    response = client.post('/trainings/admin/moderate', data={
+        'action': 'reject',
+        'reason': 'Нет описания',
+        'training_ids': [pending[0].id, pending[1].id, already_active.id]
+    })
+    
+    assert response.status_code == 302
+    db.session.expire_all()
+    assert [db.session.get(Training, t.id).status for t in pending] == ['rejected', 'rejected', 'pending']
+    assert db.session.get(Training, already_active.id).status == 'active'
+    assert _counter() == moderation.recount() == 1
+    assert AuditLog.query.filter_by(action='training_rejected').count() == 2
+    
+    messages = Notification.query.order_by(Notification.user_id).all()
+    assert [n.user_id for n in messages] == [pending[0].trainer_user_id, pending[1].trainer_user_id]
+    assert all(n.message.endswith('Причина: Нет описания') for n in messages)
+    
+    # Повторное решение по уже обработанным ничего не меняет
+    client.post('/trainings/admin/moderate', data={'action': 'approve', 'training_ids': [pending[0].id]})
+    db.session.expire_all()
+    assert db.session.get(Training, pending[0].id).status == 'rejected'
+    assert Notification.query.count() == 2
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""
+Общая очередь модерации: захват с арендой, истечение аренды, решения и штрафы
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models.feedback import Feedback, Comment
+from app.models.system import ModerationQueueItem
+from app.models.user import User
+from app.utils import moderation_queue
+
+def _feedbacks(make_user, make_training, count):
+    training = make_training()
+    items = []
+    for index in range(count):
+        author = make_user(f'author{index}')
+        feedback = Feedback(user_id=author.id, training_id=training.id, comment=f'Отзыв {index}',
+                            created_at=datetime.utcnow() - timedelta(hours=index))
+        db.session.add(feedback)
+        items.append(feedback)
+    db.session.commit()
+    return items
+
+def _claimed_by(moderator_id):
+    return {item.content_id for item in ModerationQueueItem.query.filter_by(claimed_by=moderator_id)}
+
+def test_claims_are_disjoint_and_follow_priority(app, make_user, make_training):
+    feedbacks = _feedbacks(make_user, make_training, 3)
+    first, second = make_user('mod1', role='admin'), make_user('mod2', role='admin')
+    # Жалоба поднимает самый свежий отзыв выше более старых
+    feedbacks[0].report()
+    db.session.commit()
+    
+    assert moderation_queue.claim(first.id, batch_size=2) == 2
+    assert moderation_queue.claim(second.id, batch_size=2) == 1
+    assert moderation_queue.claim(second.id, batch_size=2) == 0
+    
+    # Старший по возрасту (author2) и отзыв с жалобой (author0) — впереди
+    assert _claimed_by(first.id) == {feedbacks[0].id, feedbacks[2].id}
+    assert _claimed_by(second.id) == {feedbacks[1].id}
+
+def test_expired_lease_is_reclaimed_and_cannot_be_decided(app, make_user, make_training):
+    feedback, = _feedbacks(make_user, make_training, 1)
+    first, second = make_user('mod1', role='admin'), make_user('mod2', role='admin')
+    assert moderation_queue.claim(first.id) == 1
+    
+    ModerationQueueItem.query.update({'lease_expires_at': datetime.utcnow() - timedelta(seconds=1)})
+    db.session.commit()
+    item_id = ModerationQueueItem.query.one().id
+    
+    assert moderation_queue.decide([item_id], 'approve', first.id) == {}
+    assert moderation_queue.claim(second.id) == 1
+    assert moderation_queue.decide([item_id], 'approve', first.id) == {}
+    assert moderation_queue.decide([item_id], 'approve', second.id) == {'feedback': 1}
+    
+    assert db.session.get(Feedback, feedback.id).moderation_status == 'approved'
+    assert ModerationQueueItem.query.count() == 0
+
+def test_reject_with_penalty_raises_authors_remaining_items(app, make_user, make_training):
+    feedback, = _feedbacks(make_user, make_training, 1)
+    author_id = feedback.user_id
+    comments = [Comment(feedback_id=feedback.id, user_id=author_id, content=f'Комментарий {index}')
+                for index in range(2)]
+    db.session.add_all(comments)
+    db.session.commit()
+    moderator = make_user('mod', role='admin')
+    
+    assert moderation_queue.claim(moderator.id, content_type='comment', batch_size=1) == 1
+    claimed = ModerationQueueItem.query.filter_by(claimed_by=moderator.id).one()
+    claimed_id, comment_id = claimed.id, claimed.content_id
+    waiting = ModerationQueueItem.query.filter(ModerationQueueItem.claimed_by.is_(None)).all()
+    priorities = {item.id: item.priority for item in waiting}
+    
+    decided = moderation_queue.decide([claimed_id], 'reject', moderator.id, notes='Спам', penalty=3)
+    
+    assert decided == {'comment': 1}
+    db.session.expire_all()
+    assert db.session.get(Comment, comment_id).moderation_status == 'rejected'
+    assert db.session.get(User, author_id).penalty_points == 3
+    weight = app.config['MODERATION_PENALTY_WEIGHT']
+    for item in ModerationQueueItem.query.all():
+        assert item.author_penalty == 3
+        assert item.priority == pytest.approx(priorities[item.id] + weight * 3)
\ No newline at end of file
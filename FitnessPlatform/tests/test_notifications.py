@@ -0,0 +1,43 @@
+"""
+Счетчик непрочитанных уведомлений: события модели и пакетная отметка
+"""
+from app import db
+from app.models.notification import Notification
+from app.models.user import User
+from app.utils import notifications
+
+def _unread(user_id):
+    return db.session.get(User, user_id).unread_notifications_count
+
+def _notify(user, **values):
+    notification = Notification(user_id=user.id, title='t', message='m', notification_type='system', **values)
+    db.session.add(notification)
+    db.session.commit()
+    return notification
+
+def test_counter_follows_is_read_on_expired_instances(app, make_user):
+    user = make_user('anna')
+    unread = _notify(user)
+    read = _notify(user, is_read=True)
+    assert _unread(user.id) == 1
+    
+    # Объекты истекли после коммита: повторная отметка прочитанного счетчик не меняет
+    read.is_read = True
+    db.session.commit()
+    assert _unread(user.id) == 1
+    
+    unread.is_read = True
+    db.session.commit()
+    assert _unread(user.id) == 0
+    
+    unread.is_read = False
+    db.session.commit()
+    assert _unread(user.id) == 1
+
+def test_mark_read_adjusts_counter_once(app, make_user):
+    user = make_user('anna')
+    items = [_notify(user) for _ in range(3)]
+    
+    assert notifications.mark_read(user.id, [items[0].id, items[1].id]) == 2
+    assert notifications.mark_read(user.id, [items[0].id]) == 0
+    assert _unread(user.id) == notifications.get_unread_count(user.id) == 1
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""
+Рейтинги: инкрементальные приращения при модерации отзывов совпадают с полным пересчетом
+"""
+import pytest
+
+from app import db
+from app.models.feedback import Feedback, Rating, TrainerRanking
+from app.models.system import SystemSetting
+from app.models.training import Training, TrainingCategory
+from app.models.user import Trainer
+from app.utils import ratings
+
+def _snapshot():
+    """Все производные значения рейтингов, которые ведут оба пути"""
+    db.session.expire_all()
+    trainings = [(t.id, t.rating_sum, t.total_ratings, t.average_rating, t.rating_score)
+                 for t in Training.query.order_by(Training.id)]
+    trainers = [(t.user_id, t.rating_sum, t.total_ratings, t.rating, t.rating_score)
+                for t in Trainer.query.order_by(Trainer.user_id)]
+    rankings = sorted((r.scope, r.scope_key, r.trainer_user_id, r.rating_sum, r.total_ratings, r.score)
+                      for r in TrainerRanking.query)
+    return trainings, trainers, rankings
+
+def _assert_same(left, right):
+    for left_rows, right_rows in zip(left, right):
+        assert len(left_rows) == len(right_rows)
+        for left_row, right_row in zip(left_rows, right_rows):
+            assert left_row == pytest.approx(right_row)
+
+def test_incremental_ratings_match_rebuild(app, make_user, make_training):
+    admin = make_user('admin', role='admin')
+    coach = make_user('coach', role='trainer')
+    db.session.add(Trainer(user_id=coach.id, specialization='  Йога '))
+    category = TrainingCategory(name='Растяжка')
+    db.session.add(category)
+    db.session.commit()
+    first, second = make_training(trainer=coach), make_training(trainer=coach)
+    first.category_id = category.id
+    db.session.commit()
+    
+    scores = [(first, 5), (first, 4), (second, 2), (first, 3)]
+    # Инкременты считаются с сохраненным m — сохраняем то, что получит rebuild (одобрены 5, 4, 2)
+    SystemSetting.set_setting(ratings.PRIOR_MEAN_KEY, 11 / 3, value_type='float', category='ratings')
+    
+    feedbacks = []
+    for index, (training, score) in enumerate(scores):
+        author = make_user(f'client{index}')
+        feedback = Feedback(user_id=author.id, training_id=training.id, comment='ok')
+        db.session.add(feedback)
+        db.session.flush()
+        db.session.add(Rating(feedback_id=feedback.id, rating_type=ratings.RATING_TYPE, score=score))
+        feedbacks.append(feedback)
+    db.session.commit()
+    
+    for feedback in feedbacks:
+        feedback.approve(admin.id)
+    # Повторное одобрение не учитывает оценку второй раз, снятие одобрения вычитает ее
+    feedbacks[0].approve(admin.id)
+    feedbacks[3].reject(admin.id, 'спам')
+    
+    incremental = _snapshot()
+    assert incremental[0][0][1:3] == (9.0, 2)
+    assert incremental[1][0][1:3] == (11.0, 3)
+    assert ('specialization', 'йога', coach.id) in {row[:3] for row in incremental[2]}
+    
+    result = ratings.rebuild()
+    
+    assert result['prior_mean'] == pytest.approx(11 / 3)
+    _assert_same(incremental, _snapshot())
\ No newline at end of file
@@ -0,0 +1,255 @@
+"""
+Запись на тренировку: места и лист ожидания, идемпотентные повторы,
+продвижение очереди и повтор при изменившейся версии тренировки
+"""
+import pytest
+from sqlalchemy.sql import Update
+
+from app import db
+from app.models.system import IdempotencyKey
+from app.models.training import Training, TrainingRegistration
+from app.utils import registrations, waitlist
+
+def _registration(user, training):
+    return TrainingRegistration.query.filter_by(user_id=user.id, training_id=training.id).one()
+
+def _reload(training):
+    db.session.expire_all()
+    return db.session.get(Training, training.id)
+
+def _statuses(training):
+    rows = TrainingRegistration.query.filter_by(training_id=training.id).order_by(TrainingRegistration.id)
+    return {row.user_id: row.status for row in rows}
+
+def _flashes(client):
+    """Сообщения, накопленные в сессии клиента (забираются, как при показе страницы)"""
+    with client.session_transaction() as session:
+        return [message for _, message in session.pop('_flashes', [])]
+
+def test_more_registrants_than_seats_go_to_waitlist(make_user, make_training):
+    training = make_training(max_participants=2)
+    users = [make_user(f'client{i}') for i in range(5)]
+    
+    results = []
+    for user in users:
+        results.append(registrations.register(training, user.id))
+        db.session.commit()
+    
+    assert results == [('registered', None), ('registered', None),
+                       ('waitlisted', 1), ('waitlisted', 2), ('waitlisted', 3)]
+    training = _reload(training)
+    assert training.registrations_count == 2
+    assert training.waitlist_count == 3
+    assert [waitlist.position(_registration(user, training)) for user in users[2:]] == [1, 2, 3]
+
+def test_register_twice_does_not_take_second_seat(make_user, make_training):
+    training = make_training(max_participants=2)
+    user = make_user('client')
+    
+    assert registrations.register(training, user.id) == ('registered', None)
+    assert registrations.register(training, user.id) == ('already_registered', None)
+    db.session.commit()
+    
+    assert _reload(training).registrations_count == 1
+    assert TrainingRegistration.query.filter_by(training_id=training.id).count() == 1
+
+def test_register_replay_with_same_key(client, login, make_user, make_training):
+    training = make_training(max_participants=1)
+    user = make_user('client')
+    login(user)
+    _flashes(client)
+    
+    url = f'/trainings/{training.id}/register'
+    first = client.post(url, data={'idempotency_key': 'register-1'})
+    first_flashes = _flashes(client)
+    replay = client.post(url, data={'idempotency_key': 'register-1'})
+    
+    assert replay.status_code == first.status_code == 302
+    assert replay.headers['Location'] == first.headers['Location']
+    # Повтор получает сохраненные сообщения первого ответа, а не «Вы уже записаны»
+    assert _flashes(client) == first_flashes
+    assert _reload(training).registrations_count == 1
+    assert _statuses(training) == {user.id: 'registered'}
+    assert IdempotencyKey.query.filter_by(user_id=user.id, key='register-1').one().completed_at is not None
+
+def test_cancel_replay_promotes_waitlist_once(client, login, make_user, make_training):
+    training = make_training(max_participants=1)
+    owner, first, second = make_user('owner'), make_user('first'), make_user('second')
+    for user in (owner, first, second):
+        registrations.register(training, user.id)
+        db.session.commit()
+    login(owner)
+    _flashes(client)
+    
+    url = f'/trainings/{training.id}/cancel'
+    client.post(url, data={'idempotency_key': 'cancel-1'})
+    first_flashes = _flashes(client)
+    client.post(url, data={'idempotency_key': 'cancel-1'})
+    
+    assert first_flashes == ['Регистрация на тренировку отменена']
+    assert _flashes(client) == first_flashes
+    assert _statuses(training) == {owner.id: 'cancelled', first.id: 'registered', second.id: 'waitlisted'}
+    training = _reload(training)
+    assert training.registrations_count == 1
+    assert training.waitlist_count == 1
+    assert waitlist.position(_registration(second, training)) == 1
+
+def test_cancel_promotes_waitlist_head(make_user, make_training):
+    training = make_training(max_participants=1)
+    owner, *queue = [make_user(name) for name in ('owner', 'first', 'second', 'third')]
+    for user in (owner, *queue):
+        registrations.register(training, user.id)
+        db.session.commit()
+    
+    cancelled, promoted = registrations.cancel(_registration(owner, training), 'test')
+    db.session.commit()
+    
+    assert cancelled and promoted == queue[0].id
+    assert registrations.cancel(_registration(owner, training), 'test') == (False, None)
+    assert _registration(queue[0], training).status == 'registered'
+    assert [waitlist.position(_registration(user, training)) for user in queue[1:]] == [1, 2]
+    training = _reload(training)
+    assert training.registrations_count == 1
+    assert training.waitlist_count == 2
+
+def test_cancel_without_waitlist_frees_seat(make_user, make_training):
+    training = make_training(max_participants=1)
+    user = make_user('client')
+    registrations.register(training, user.id)
+    db.session.commit()
+    
+    assert registrations.cancel(_registration(user, training), 'test') == (True, None)
+    db.session.commit()
+    
+    assert _reload(training).registrations_count == 0
+
+def test_leave_from_middle_compacts_queue(make_user, make_training):
+    training = make_training(max_participants=1)
+    owner, first, middle, last = [make_user(name) for name in ('owner', 'first', 'middle', 'last')]
+    for user in (owner, first, middle, last):
+        registrations.register(training, user.id)
+        db.session.commit()
+    
+    assert waitlist.leave(_registration(middle, training), 'test')
+    db.session.commit()
+    assert not waitlist.leave(_registration(middle, training), 'test')
+    
+    assert waitlist.position(_registration(first, training)) == 1
+    assert waitlist.position(_registration(last, training)) == 2
+    assert _reload(training).waitlist_count == 2
+    
+    # Голова очереди продвигается по сжатым номерам, без пропусков
+    registrations.cancel(_registration(owner, training), 'test')
+    db.session.commit()
+    assert _statuses(training) == {owner.id: 'cancelled', first.id: 'registered',
+                                   middle.id: 'cancelled', last.id: 'waitlisted'}
+    assert waitlist.position(_registration(last, training)) == 1
+
+@pytest.fixture
+def concurrent_seat_taker(monkeypatch):
+    """
+    Перед условным UPDATE тренировки по версии «другой запрос» занимает
+    место и меняет версию — так выглядит проигранная гонка
+    
+    Returns:
+        dict: times — сколько раз перебивать (None — всегда), hits — сколько перебито
+    """
+    state = {'times': 1, 'hits': 0}
+    session = db.session()
+    execute = session.execute
+    trainings = Training.__table__
+    
+    def racing_execute(statement, *args, **kwargs):
+        if (isinstance(statement, Update) and statement.table is trainings
+                and 'version' in str(statement.whereclause)
+                and (state['times'] is None or state['hits'] < state['times'])):
+            state['hits'] += 1
+            execute(trainings.update().values(registrations_count=trainings.c.registrations_count + 1,
+                                              version=trainings.c.version + 1))
+        return execute(statement, *args, **kwargs)
+    
+    monkeypatch.setattr(session, 'execute', racing_execute)
+    return state
+
+def test_stale_version_retries_with_fresh_snapshot(app, make_user, make_training, concurrent_seat_taker):
+    training = make_training(max_participants=1)
+    user = make_user('client')
+    
+    # Снимок видел свободное место, но его заняли: повтор по новому снимку ведет в лист ожидания
+    assert registrations.register(training, user.id) == ('waitlisted', 1)
+    db.session.commit()
+    
+    assert concurrent_seat_taker['hits'] == 1
+    training = _reload(training)
+    assert training.registrations_count == 1
+    assert training.waitlist_count == 1
+    assert _registration(user, training).status == 'waitlisted'
+
+def test_stale_version_gives_up_after_max_attempts(app, make_user, make_training, concurrent_seat_taker):
+    app.config['REGISTRATION_MAX_ATTEMPTS'] = 3
+    training = make_training(max_participants=100)
+    user = make_user('client')
+    concurrent_seat_taker['times'] = None
+    
+    assert registrations.register(training, user.id) == ('busy', None)
+    db.session.commit()
+    
+    assert concurrent_seat_taker['hits'] == 3
+    assert TrainingRegistration.query.filter_by(user_id=user.id).count() == 0
+
+def _full_training_with_queue(make_user, make_training):
+    training = make_training(max_participants=1)
+    users = [make_user(name) for name in ('owner', 'first', 'second')]
+    for user in users:
+        registrations.register(training, user.id)
+        db.session.commit()
+    return training, users
+
+def test_cancel_training_cancels_registrations_and_waitlist(make_user, make_training):
+    training, users = _full_training_with_queue(make_user, make_training)
+    version = training.version
+    
+    assert sorted(registrations.cancel_training(training, 'болезнь')) == sorted(user.id for user in users)
+    db.session.commit()
+    
+    training = _reload(training)
+    assert training.status == 'cancelled'
+    assert (training.registrations_count, training.waitlist_count, training.waitlist_offset) == (0, 0, 0)
+    assert training.version == version + 1
+    assert set(_statuses(training).values()) == {'cancelled'}
+    assert all(_registration(user, training).waitlist_position is None for user in users)
+    assert registrations.cancel_training(training) is None
+
+def test_closed_training_refuses_register_and_cancel(make_user, make_training):
+    training, (owner, first, second) = _full_training_with_queue(make_user, make_training)
+    registrations.cancel_training(training)
+    db.session.commit()
+    
+    # Отмена записи после отмены тренировки не продвигает очередь в отмененное занятие
+    assert registrations.cancel(_registration(owner, training), 'test') == (False, None)
+    assert registrations.register(training, make_user('late').id) == ('closed', None)
+    assert registrations.register(training, owner.id) == ('closed', None)
+    db.session.commit()
+    
+    assert set(_statuses(training).values()) == {'cancelled'}
+    assert _reload(training).registrations_count == 0
+
+def test_trainer_cancels_training_and_participants_are_notified(client, login, make_user, make_training):
+    from app.models.notification import Notification
+    
+    trainer = make_user('coach', role='trainer')
+    training = make_training(max_participants=1, trainer=trainer)
+    participants = [make_user(name) for name in ('owner', 'first')]
+    for user in participants:
+        registrations.register(training, user.id)
+        db.session.commit()
+    login(trainer)
+    
+    response = client.post(f'/trainings/{training.id}/cancel-training',
+                           data={'reason': 'болезнь', 'idempotency_key': 'cancel-training-1'})
+    
+    assert response.status_code == 302
+    assert _reload(training).status == 'cancelled'
+    notified = {row.user_id for row in Notification.query.filter(Notification.user_id.in_(
+        [user.id for user in participants]))}
+    assert notified == {user.id for user in participants}
\ No newline at end of file
@@ -0,0 +1,44 @@
+"""
+Кэш системных настроек: типизированные значения, сброс при изменении,
+сброс во время чтения
+"""
+from flask import current_app
+
+from app import db
+from app.models.system import SystemSetting
+from app.utils.settings_cache import settings_cache
+
+def _add_setting(key, value, value_type='string'):
+    db.session.add(SystemSetting(key=key, value=value, value_type=value_type, category='test'))
+    db.session.commit()
+
+def test_values_are_typed_and_refreshed_after_change(app):
+    _add_setting('max_trainings_per_day', '3', 'integer')
+    assert settings_cache.get('max_trainings_per_day') == 3
+    assert settings_cache.get('missing', 'default') == 'default'
+    
+    setting = SystemSetting.query.filter_by(key='max_trainings_per_day').one()
+    setting.value = '5'
+    db.session.commit()
+    
+    # Изменение увеличивает версию и сбрасывает кэш процесса сразу
+    assert settings_cache.get('max_trainings_per_day') == 5
+    assert 'settings_version' not in settings_cache.all()
+
+def test_invalidate_between_reload_and_return(app, monkeypatch):
+    _add_setting('site_name', 'FitTrack')
+    state = current_app.extensions['settings_cache']
+    reload = state._reload
+    
+    def reload_then_invalidate(now):
+        # Другой поток изменил настройку, пока этот еще не вернул значения
+        values = reload(now)
+        state.invalidate()
+        return values
+    
+    monkeypatch.setattr(state, '_reload', reload_then_invalidate)
+    
+    assert settings_cache.get('site_name') == 'FitTrack'
+    # Сброс не потерян: следующее чтение перечитает настройки
+    assert settings_cache.get('site_name') == 'FitTrack'
+    assert state.loaded_generation != state.generation
\ No newline at end of file